@@ -212,6 +212,30 @@ DATABASES[DEPLOYMENT_LOG_DB_ALIAS] = {
     "CONN_MAX_AGE": 60,
 }
 DATABASE_ROUTERS = ["deploy.db_router.DeploymentLogRouter"]
+# Deployment log housekeeping (deploy.log_store, manage_deployment_logs).
+DEPLOY_LOG_PARTITIONS_AHEAD = int(os.environ.get("DEPLOY_LOG_PARTITIONS_AHEAD", "2"))
+DEPLOY_LOG_RETENTION = {
+    "default": int(os.environ.get("DEPLOY_LOG_RETENTION_DAYS", "90")),
+    "levels": {"debug": 7},
+    "stages": {},
+}
+DEPLOY_LOG_ARCHIVE_DIR = os.environ.get("DEPLOY_LOG_ARCHIVE_DIR", os.path.join(BASE_DIR, "deploy_log_archive"))
+
+# Build admission (deployments.celery.scheduler).  Budgets default to the
+# Docker host's NCPU / MemTotal when unset.
+DEPLOY_BUILD_HOST_ID = os.environ.get("DEPLOY_BUILD_HOST_ID", "")
+DEPLOY_BUILD_CPU_BUDGET = float(os.environ["DEPLOY_BUILD_CPU_BUDGET"]) if os.environ.get("DEPLOY_BUILD_CPU_BUDGET") else None
+DEPLOY_BUILD_MEMORY_BUDGET_MB = int(os.environ["DEPLOY_BUILD_MEMORY_BUDGET_MB"]) if os.environ.get("DEPLOY_BUILD_MEMORY_BUDGET_MB") else None
+DEPLOY_BUILD_SLOT_TTL = int(os.environ.get("DEPLOY_BUILD_SLOT_TTL", "3600"))
+# How long a build retries while the scheduler (Redis) is unreachable before
+# the deploy fails; builds are never started without a slot.
+DEPLOY_BUILD_ADMISSION_TIMEOUT = int(os.environ.get("DEPLOY_BUILD_ADMISSION_TIMEOUT", "300"))
+
+# Dependency caches in generated Dockerfiles (deployments.core.buildkit).
+# BuildKit ignores per-build CPU/RAM limits: only enable it where the
+# daemon itself is confined.  Cache mounts are emitted only with BuildKit.
+DEPLOY_BUILD_BUILDKIT = env_bool("DEPLOY_BUILD_BUILDKIT", False)
+DEPLOY_BUILD_CACHE_MOUNTS = env_bool("DEPLOY_BUILD_CACHE_MOUNTS", True)
 # DATABASE_ROUTERS = []
 # Password validation
 
@@ -312,6 +336,13 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 # Media files
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Protected media offload to the fronting proxy once Django has authorized:
+# "" (stream from Python), "x-accel-redirect" (nginx) or "x-sendfile".
+MEDIA_OFFLOAD = os.environ.get("MEDIA_OFFLOAD", "")
+MEDIA_OFFLOAD_PREFIX = os.environ.get("MEDIA_OFFLOAD_PREFIX", "/_protected_media/")
+# Signed media URLs (core.media_signing): "kid:secret" entries, newest first.
+MEDIA_SIGNING_KEYS = [k.strip() for k in os.environ.get("MEDIA_SIGNING_KEYS", "").split(",") if k.strip()]
+MEDIA_URL_TTL = int(os.environ.get("MEDIA_URL_TTL", "3600"))
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -373,6 +404,30 @@ CELERY_TASK_PUBLISH_RETRY_POLICY = {
 CELERY_TASK_DEFAULT_QUEUE = "celery"
 CELERY_TASK_DEFAULT_EXCHANGE = "celery"
 CELERY_TASK_DEFAULT_ROUTING_KEY = "celery"
+# Work is split across queues (see deployments.celery.scheduler) so builds
+# never delay control-plane tasks, chat delivery or email.  The default
+# ``celery`` worker consumes control,messaging,email,celery; ``celery-build``
+# consumes build and ``celery-media`` the Pillow/ffmpeg derivative jobs.
+CELERY_TASK_ROUTES = {
+    "deployments.celery.tasks.deploy": {"queue": "build"},
+    "deployments.celery.tasks.run_db_deploy": {"queue": "build"},
+    "deployments.celery.tasks.stop": {"queue": "control"},
+    "deployments.celery.tasks.compute_volume_dir_sizes": {"queue": "control"},
+    "deployments.celery.schedules.*": {"queue": "control"},
+    "messenger.tasks.generate_attachment_derivatives": {"queue": "media"},
+    "messenger.tasks.generate_image_thumbnail": {"queue": "media"},
+    "messenger.tasks.*": {"queue": "messaging"},
+    "custom_emails.tasks.*": {"queue": "email"},
+    "core.tasks.email.*": {"queue": "email"},
+}
+# Rollbacks/restarts are published with a lower (= earlier) priority than
+# fresh builds; one message per worker process so priorities take effect.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "priority_steps": list(range(10)),
+    "queue_order_strategy": "priority",
+}
+CELERY_TASK_DEFAULT_PRIORITY = 6
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_IMPORTS = (
     "deployments.celery.tasks",
     "core.tasks.email",
@@ -392,6 +447,15 @@ CELERY_BEAT_SCHEDULE = {
         "task": "messenger.tasks.deliver_scheduled_messages",
         "schedule": 15.0,  # every 15s
     },
+    "messenger_reconcile_unread_counts": {
+        "task": "messenger.tasks.reconcile_unread_counts",
+        "schedule": 900.0,  # every 15 min
+    },
+    # Deploy log partitions/retention/archives (deploy.log_store).
+    "deployment_logs_housekeeping": {
+        "task": "deployments.celery.schedules.manage_deployment_logs",
+        "schedule": 86400.0,  # daily
+    },
 }
 CACHES = {
     'default': {
@@ -70,7 +70,8 @@ class DeploymentDownloadAPIView(APIView):
 class ProtectedMediaView(APIView):
     """Serve media files from MEDIA_ROOT with JWT auth.
 
-    Accepts Authorization: Bearer <token> header OR ?token=<token> query.
+    Accepts a signed URL (?exp=&uid=&sig=, see core.media_signing),
+    Authorization: Bearer <token> header OR ?token=<token> query.
     Used for group avatars, user profile photos, ticket attachments and
     other media that <img> tags can't auth with headers.
 
@@ -119,9 +120,11 @@ class ProtectedMediaView(APIView):
 
     def get(self, request, path, media_prefix=""):
         from django.conf import settings
+        from core.media_signing import verify_signed_request
 
-        user = self._authenticate(request)
-        if not user:
+        # A valid signed URL (core.media_signing) skips the JWT decode and
+        # user lookup; ?token= / Authorization / session remain the fallback.
+        if verify_signed_request(request) is None and not self._authenticate(request):
             # Return JSON 404 so the frontend can detect the failure cleanly
             # (an <img> tag will fire onerror and the UI can show a fallback).
             from rest_framework.response import Response
@@ -198,9 +201,11 @@ class ProtectedMediaView(APIView):
         }
         content_type = ct_map.get(ext, "application/octet-stream")
 
+        from core.media_delivery import media_from_path, serve_file
+
         try:
-            fh = open(str(full_path), "rb")
-        except Exception:
+            media = media_from_path(full_path)
+        except OSError:
             from rest_framework.response import Response
             from rest_framework import status as drf_status
             return Response(
@@ -218,14 +223,13 @@ class ProtectedMediaView(APIView):
         }
         disposition = "inline" if ext in inline_exts else "attachment"
 
-        resp = FileResponse(fh, content_type=content_type)
         # Cache for 1 hour on the client (URL contains a unique uuid so caching
-        # is safe — a new avatar upload will produce a new URL).
-        resp["Cache-Control"] = "private, max-age=3600"
-        resp["Content-Disposition"] = f'{disposition}; filename="{full_path.name}"'
-        # Support HTTP Range requests for media (seeking in video/audio)
-        resp["Accept-Ranges"] = "bytes"
-        # Cross-origin <img>/<video>/<audio>/wavesurfer need these exposed
-        resp["Access-Control-Expose-Headers"] = "Content-Range, Accept-Ranges, Content-Length, Content-Type"
-        resp["X-Content-Type-Options"] = "nosniff"
-        return resp
+        # is safe — a new avatar upload will produce a new URL). Ranges,
+        # ETag/304 and proxy offload are handled by serve_file.
+        return serve_file(
+            request,
+            media,
+            content_type=content_type,
+            filename=full_path.name,
+            disposition=disposition,
+        )
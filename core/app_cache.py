@@ -2,12 +2,20 @@
 
 Uses the raw redis client (same as messenger.message_cache).
 Soft-fail: cache errors never break APIs.
+
+Invalidation is generation based: every namespace (``svc``, ``plan``,
+``tkt``, ``usr``) and every scoped sub-namespace (``svc:admin``,
+``svc:user:u:<id>``, …) has a counter under ``appcache:gen:<scope>`` that
+is folded into each cache key.  Invalidating is one INCR — the old
+entries simply stop being addressed and age out by TTL — instead of a
+SCAN over the whole keyspace on every model save.
 """
 from __future__ import annotations
 
 import hashlib
 import json
 import logging
+import time
 from typing import Any
 
 from django.core.serializers.json import DjangoJSONEncoder
@@ -118,11 +126,88 @@ def cache_delete_pattern(pattern: str) -> None:
         logger.exception("cache_delete_pattern failed pattern=%s", pattern)
 
 
+# ---------------------------------------------------------------------------
+# Generation counters
+# ---------------------------------------------------------------------------
+
+GEN_PREFIX = "appcache:gen:"
+NAMESPACES = ("svc", "plan", "tkt", "usr")
+
+# INCR every scope, seeding missing counters first (see _generation_seed).
+_BUMP_LUA = """
+for i, key in ipairs(KEYS) do
+  if redis.call('exists', key) == 0 then
+    redis.call('set', key, ARGV[1])
+  end
+  redis.call('incr', key)
+end
+return #KEYS
+"""
+
+
+def _gen_key(scope: str) -> str:
+    return f"{GEN_PREFIX}{scope}"
+
+
+def _generation_seed() -> int:
+    # Counters start at the current time in ms rather than 0, so a counter
+    # that was lost (eviction, manual delete) never comes back at a value
+    # whose entries may still be alive.
+    return int(time.time() * 1000)
+
+
+def _scope_of(prefix: str, user_id: Any) -> str:
+    return prefix if user_id in (None, "", "all") else f"{prefix}:u:{user_id}"
+
+
+def get_generations(*scopes: str) -> list[int]:
+    """Current generation of each scope (one MGET; seeds missing ones)."""
+    r = _redis()
+    if not r or not scopes:
+        return [0] * len(scopes)
+    keys = [_gen_key(s) for s in scopes]
+    try:
+        values = r.mget(keys)
+        missing = [k for k, v in zip(keys, values) if v is None]
+        if missing:
+            seed = _generation_seed()
+            pipe = r.pipeline(transaction=False)
+            for key in missing:
+                pipe.set(key, seed, nx=True)
+            pipe.execute()
+            values = r.mget(keys)
+        return [int(v or 0) for v in values]
+    except Exception:
+        logger.exception("get_generations failed scopes=%s", scopes)
+        return [0] * len(scopes)
+
+
+def bump_generation(*scopes: str) -> None:
+    """Invalidate every key built from ``scopes`` (one round trip)."""
+    r = _redis()
+    if not r or not scopes:
+        return
+    try:
+        r.eval(_BUMP_LUA, len(scopes), *[_gen_key(s) for s in scopes], _generation_seed())
+    except Exception:
+        logger.exception("bump_generation failed scopes=%s", scopes)
+
+
+def _generation_tag(prefix: str, user_id: Any) -> str:
+    namespace = prefix.split(":", 1)[0]
+    scopes = [namespace]
+    scope = _scope_of(prefix, user_id)
+    if scope != namespace:
+        scopes.append(scope)
+    return ".".join(str(g) for g in get_generations(*scopes))
+
+
 def make_query_key(prefix: str, user_id: Any, params: dict) -> str:
     items = sorted((str(k), str(v)) for k, v in (params or {}).items() if v not in (None, ""))
     raw = "&".join(f"{k}={v}" for k, v in items)
     digest = hashlib.md5(raw.encode("utf-8")).hexdigest()[:12]
-    return f"{prefix}:u:{user_id}:q:{digest}"
+    gen = _generation_tag(prefix, user_id)
+    return f"{prefix}:u:{user_id}:g:{gen}:q:{digest}"
 
 
 def service_user_list_key(user_id: int, params: dict | None = None) -> str:
@@ -130,8 +215,9 @@ def service_user_list_key(user_id: int, params: dict | None = None) -> str:
 
 
 def service_user_detail_key(user_id: int, service_id: str) -> str:
-    # Align with list keys from make_query_key (prefix:u:{user_id}:...)
-    return f"svc:user:u:{user_id}:id:{service_id}"
+    # Align with list keys from make_query_key (prefix:u:{user_id}:g:...)
+    gen = _generation_tag("svc:user", user_id)
+    return f"svc:user:u:{user_id}:g:{gen}:id:{service_id}"
 
 
 def service_admin_list_key(params: dict | None = None) -> str:
@@ -139,17 +225,12 @@ def service_admin_list_key(params: dict | None = None) -> str:
 
 
 def invalidate_user_services(user_id: int) -> None:
-    # List keys: svc:user:u:{user_id}:q:{digest}
-    # Detail keys: svc:user:u:{user_id}:id:{service_id}
-    # Also clear any legacy keys that used svc:user:{user_id}:...
-    cache_delete_pattern(f"svc:user:u:{user_id}:*")
-    cache_delete_pattern(f"svc:user:{user_id}:*")
-    cache_delete_pattern("svc:admin:*")
+    # The admin list shows every user's services, so it goes stale too.
+    bump_generation(_scope_of("svc:user", user_id), "svc:admin")
 
 
 def invalidate_all_services() -> None:
-    cache_delete_pattern("svc:user:*")
-    cache_delete_pattern("svc:admin:*")
+    bump_generation("svc")
 
 
 def plan_list_key(params: dict | None = None) -> str:
@@ -161,11 +242,11 @@ def plan_admin_list_key(params: dict | None = None) -> str:
 
 
 def plan_detail_key(plan_id: str) -> str:
-    return f"plan:id:{plan_id}"
+    return f"plan:id:g:{_generation_tag('plan', 'all')}:{plan_id}"
 
 
 def invalidate_all_plans() -> None:
-    cache_delete_pattern("plan:*")
+    bump_generation("plan")
 
 
 def ticket_user_list_key(user_id: int, params: dict | None = None) -> str:
@@ -177,16 +258,11 @@ def ticket_admin_list_key(params: dict | None = None) -> str:
 
 
 def invalidate_user_tickets(user_id: int) -> None:
-    # List keys: tkt:user:u:{user_id}:q:{digest}
-    # Also clear any legacy keys that used tkt:user:{user_id}:...
-    cache_delete_pattern(f"tkt:user:u:{user_id}:*")
-    cache_delete_pattern(f"tkt:user:{user_id}:*")
-    cache_delete_pattern("tkt:admin:*")
+    bump_generation(_scope_of("tkt:user", user_id), "tkt:admin")
 
 
 def invalidate_all_tickets() -> None:
-    cache_delete_pattern("tkt:user:*")
-    cache_delete_pattern("tkt:admin:*")
+    bump_generation("tkt")
 
 
 def user_admin_list_key(params: dict | None = None) -> str:
@@ -194,7 +270,7 @@ def user_admin_list_key(params: dict | None = None) -> str:
 
 
 def invalidate_all_users_admin() -> None:
-    cache_delete_pattern("usr:admin:*")
+    bump_generation("usr")
 
 
 def scan_app_cache_keys(prefix: str = "", limit: int = 100) -> list:
@@ -230,7 +306,10 @@ def scan_app_cache_keys(prefix: str = "", limit: int = 100) -> list:
 
 
 def get_app_cache_overview() -> dict:
-    overview = {"redis_ok": False, "svc": 0, "plan": 0, "tkt": 0, "usr": 0, "msgcache": 0, "memory": {}}
+    overview = {
+        "redis_ok": False, "svc": 0, "plan": 0, "tkt": 0, "usr": 0, "msgcache": 0,
+        "memory": {}, "generations": {},
+    }
     r = _redis()
     if not r:
         return overview
@@ -246,6 +325,7 @@ def get_app_cache_overview() -> dict:
                 if n >= 5000:
                     break
             overview[field] = n
+        overview["generations"] = dict(zip(NAMESPACES, get_generations(*NAMESPACES)))
         try:
             info = r.info(section="memory")
             overview["memory"] = {
@@ -259,15 +339,23 @@ def get_app_cache_overview() -> dict:
     return overview
 
 
-def invalidate_namespace(ns: str) -> None:
-    """Flush one logical cache namespace, including Messenger when requested."""
+def invalidate_namespace(ns: str, *, purge: bool = True) -> None:
+    """
+    Flush one logical cache namespace, including Messenger when requested.
+
+    Bumping the generation is what invalidates; ``purge`` additionally
+    deletes the orphaned keys right away (SCAN) so a manual flush from the
+    admin dashboard also frees the memory.
+    """
     if ns == "messenger":
         from messenger.message_cache import invalidate_all_cache
         invalidate_all_cache(reset_stats=False)
         return
     if ns == "all":
-        for p in ("svc:*", "plan:*", "tkt:*", "usr:*"):
-            cache_delete_pattern(p)
+        bump_generation(*NAMESPACES)
+        if purge:
+            for p in ("svc:*", "plan:*", "tkt:*", "usr:*"):
+                cache_delete_pattern(p)
         # Messenger owns its cache layout and therefore its invalidation logic.
         try:
             from messenger.message_cache import invalidate_all_cache
@@ -275,10 +363,10 @@ def invalidate_namespace(ns: str) -> None:
         except Exception:
             logger.exception("invalidate_namespace: messenger cache flush failed")
         return
-    mapping = {"svc": "svc:*", "plan": "plan:*", "tkt": "tkt:*", "usr": "usr:*"}
-    pat = mapping.get(ns)
-    if pat:
-        cache_delete_pattern(pat)
+    if ns in NAMESPACES:
+        bump_generation(ns)
+        if purge:
+            cache_delete_pattern(f"{ns}:*")
 
 
 def get_cache_key_preview(key: str, max_len: int = 400) -> dict:
@@ -0,0 +1,294 @@
+"""
+Validator- and range-aware delivery of protected media.
+
+Views authorize first and then hand the file to ``serve_file``, which:
+
+* emits a strong ``ETag`` (size + mtime + identity) and ``Last-Modified``;
+* answers ``If-None-Match`` / ``If-Modified-Since`` with 304;
+* serves ``Range: bytes=…`` as 206 — one range as a plain partial body,
+  several as ``multipart/byteranges`` — honouring ``If-Range``, and 416 for
+  unsatisfiable ranges;
+* or, with ``MEDIA_OFFLOAD`` set, returns an empty response carrying
+  ``X-Accel-Redirect`` (nginx) / ``X-Sendfile`` (Apache, lighttpd, Caddy
+  plugins) so the fronting proxy streams the bytes, ranges included, and
+  the ASGI worker only did the authorization.
+
+Bodies are async iterators (``core.streaming.aiter_chunks``), so a seek's
+open-ended ``Range: bytes=N-`` is read one ``CHUNK_SIZE`` block at a time
+and the file is closed when the client goes away.
+
+nginx needs an ``internal`` location aliasing MEDIA_ROOT under
+``MEDIA_OFFLOAD_PREFIX``::
+
+    location /_protected_media/ { internal; alias /app/media/; }
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import secrets
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+
+from .streaming import aiter_chunks
+
+CHUNK_SIZE = 64 * 1024
+EXPOSED_HEADERS = "Content-Range, Accept-Ranges, Content-Length, Content-Type, ETag, Last-Modified"
+
+OFFLOAD_ACCEL = "x-accel-redirect"
+OFFLOAD_SENDFILE = "x-sendfile"
+
+
+@dataclass
+class MediaFile:
+    size: int
+    mtime: float
+    etag: str
+    open: Callable
+    path: Optional[str] = None  # local filesystem path, when there is one
+
+
+def _etag(size: int, mtime: float, ident: str) -> str:
+    digest = hashlib.blake2b(f"{ident}:{size}:{mtime!r}".encode(), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def media_from_path(path) -> MediaFile:
+    path = str(path)
+    st = os.stat(path)
+    return MediaFile(
+        size=st.st_size,
+        mtime=st.st_mtime,
+        etag=_etag(st.st_size, st.st_mtime, f"{st.st_dev}:{st.st_ino}"),
+        open=lambda: open(path, "rb"),
+        path=path,
+    )
+
+
+def media_from_storage(storage, name: str) -> MediaFile:
+    """Wrap a storage file; remote storages fall back to storage metadata."""
+    try:
+        return media_from_path(storage.path(name))
+    except NotImplementedError:
+        pass
+    size = storage.size(name)
+    try:
+        mtime = storage.get_modified_time(name).timestamp()
+    except Exception:
+        mtime = 0.0
+    return MediaFile(
+        size=size,
+        mtime=mtime,
+        etag=_etag(size, mtime, name),
+        open=lambda: storage.open(name, "rb"),
+    )
+
+
+def media_from_field(field_file) -> MediaFile:
+    return media_from_storage(field_file.storage, field_file.name)
+
+
+# ---------------------------------------------------------------------------
+# Conditional requests / ranges
+# ---------------------------------------------------------------------------
+
+def _not_modified(request, media: MediaFile) -> bool:
+    inm = request.META.get("HTTP_IF_NONE_MATCH")
+    if inm:
+        tags = parse_etags(inm)
+        # weak comparison, as RFC 9110 requires for If-None-Match
+        ours = media.etag.removeprefix("W/")
+        return "*" in tags or any(t.removeprefix("W/") == ours for t in tags)
+    since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE") or "")
+    return since is not None and int(media.mtime) <= since
+
+
+def _if_range_ok(request, media: MediaFile) -> bool:
+    value = (request.META.get("HTTP_IF_RANGE") or "").strip()
+    if not value:
+        return True
+    if value.startswith('"'):
+        return value == media.etag  # strong comparison only
+    since = parse_http_date_safe(value)
+    return since is not None and int(media.mtime) == since
+
+
+def parse_range(header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """Inclusive ``(start, end)`` pairs, sorted and coalesced.
+
+    ``None`` means "ignore the header and send the whole file" (malformed or
+    too many ranges); an empty list means nothing is satisfiable (416).
+    """
+    unit, _, spec = (header or "").partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    parts = [p.strip() for p in spec.split(",") if p.strip()]
+    if not parts or len(parts) > int(getattr(settings, "MEDIA_MAX_RANGES", 16)):
+        return None
+    ranges = []
+    for part in parts:
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if first == "":
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(0, size - length), size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if last and start > end:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < 0 or start >= size:
+            continue
+        ranges.append((start, end))
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _read_range(fh, start: int, end: int) -> Iterator[bytes]:
+    fh.seek(start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = fh.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _single_part(media: MediaFile, start: int, end: int) -> Iterator[bytes]:
+    with media.open() as fh:
+        yield from _read_range(fh, start, end)
+
+
+def _multipart(media: MediaFile, parts, closing: bytes) -> Iterator[bytes]:
+    with media.open() as fh:
+        for head, (start, end) in parts:
+            yield head
+            yield from _read_range(fh, start, end)
+            yield b"\r\n"
+    yield closing
+
+
+# ---------------------------------------------------------------------------
+# Offload
+# ---------------------------------------------------------------------------
+
+def _offload_headers(media: MediaFile) -> Optional[Tuple[str, str]]:
+    mode = (getattr(settings, "MEDIA_OFFLOAD", "") or "").strip().lower()
+    if not mode or not media.path:
+        return None
+    if mode == OFFLOAD_SENDFILE:
+        return "X-Sendfile", media.path
+    if mode == OFFLOAD_ACCEL:
+        try:
+            rel = Path(media.path).resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+        except ValueError:
+            return None
+        prefix = getattr(settings, "MEDIA_OFFLOAD_PREFIX", "/_protected_media/")
+        return "X-Accel-Redirect", prefix.rstrip("/") + "/" + quote(rel.as_posix())
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def serve_file(
+    request,
+    media: MediaFile,
+    *,
+    content_type: str,
+    filename: str = "",
+    disposition: str = "inline",
+    cache_control: str = "private, max-age=3600",
+) -> HttpResponse:
+    """Build the response for an already-authorized download."""
+    offload = _offload_headers(media)
+    if offload is not None:
+        response = HttpResponse(content_type=content_type)
+        response[offload[0]] = offload[1]
+    elif _not_modified(request, media):
+        response = HttpResponse(status=304)
+    else:
+        response = _body_response(request, media, content_type)
+
+    if response.status_code != 304:
+        if filename:
+            safe_name = filename.replace('"', "").replace("\r", "").replace("\n", "")
+            response["Content-Disposition"] = f'{disposition}; filename="{safe_name}"'
+        response["X-Content-Type-Options"] = "nosniff"
+    response["ETag"] = media.etag
+    response["Last-Modified"] = http_date(int(media.mtime))
+    response["Cache-Control"] = cache_control
+    response["Accept-Ranges"] = "bytes"
+    # Cross-origin <img>/<video>/<audio>/wavesurfer need these exposed
+    response["Access-Control-Expose-Headers"] = EXPOSED_HEADERS
+    return response
+
+
+def _body_response(request, media: MediaFile, content_type: str) -> HttpResponse:
+    header = request.META.get("HTTP_RANGE")
+    ranges = None
+    if header and request.method in ("GET", "HEAD") and _if_range_ok(request, media):
+        ranges = parse_range(header, media.size)
+
+    if ranges is None:
+        response = StreamingHttpResponse(
+            aiter_chunks(_single_part(media, 0, media.size - 1)), content_type=content_type
+        )
+        response["Content-Length"] = str(media.size)
+        return response
+
+    if not ranges:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{media.size}"
+        return response
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            aiter_chunks(_single_part(media, start, end)), status=206, content_type=content_type
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{media.size}"
+        response["Content-Length"] = str(end - start + 1)
+        return response
+
+    boundary = secrets.token_hex(16)
+    parts = []
+    length = 0
+    for start, end in ranges:
+        head = (
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{media.size}\r\n\r\n"
+        ).encode()
+        parts.append((head, (start, end)))
+        length += len(head) + (end - start + 1) + 2
+    closing = f"--{boundary}--\r\n".encode()
+    length += len(closing)
+
+    response = StreamingHttpResponse(
+        aiter_chunks(_multipart(media, parts, closing)),
+        status=206,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+    )
+    response["Content-Length"] = str(length)
+    return response
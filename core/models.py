@@ -5,7 +5,6 @@ Keys are stable strings; values are stored as text and cast via value_type.
 """
 from __future__ import annotations
 
-from django.core.cache import cache
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
@@ -114,15 +113,11 @@ class SystemSetting(models.Model):
             self.value = "" if value is None else str(value)
 
 
-# Cache invalidation on save/delete
-_CACHE_PREFIX = "syssetting:"
-_CACHE_ALL = "syssetting:__all__"
+# Snapshot invalidation on save/delete (see core.settings_service)
+def _bust_cache() -> None:
+    from core import settings_service
 
-
-def _bust_cache(key: str | None = None) -> None:
-    if key:
-        cache.delete(f"{_CACHE_PREFIX}{key}")
-    cache.delete(_CACHE_ALL)
+    settings_service.invalidate_on_commit()
 
 
 from django.db.models.signals import post_save, post_delete
@@ -131,9 +126,9 @@ from django.dispatch import receiver
 
 @receiver(post_save, sender=SystemSetting)
 def _setting_saved(sender, instance, **kwargs):
-    _bust_cache(instance.key)
+    _bust_cache()
 
 
 @receiver(post_delete, sender=SystemSetting)
 def _setting_deleted(sender, instance, **kwargs):
-    _bust_cache(instance.key)
+    _bust_cache()
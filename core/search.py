@@ -0,0 +1,210 @@
+"""
+Indexed text search helpers shared by the search endpoints.
+
+Two Postgres index types back the lookups here:
+
+* a ``tsvector`` column with a GIN index → word / prefix matches, ranked
+  with ``ts_rank`` (``ranked_search``);
+* a ``gin_trgm_ops`` GIN index (pg_trgm) → ``ILIKE '%q%'`` substring
+  matches (``substring_q``).  ``icontains`` compiles to
+  ``UPPER(col) LIKE UPPER(…)``, which a trigram index on ``col`` cannot
+  serve, so search code should go through ``substring_q`` instead.
+
+``cursor_page`` does keyset pagination over ``(rank, pk)`` or ``pk`` so deep
+pages cost the same as the first one, and ``headlines`` builds highlight
+snippets for the rows of a single page only.
+"""
+from __future__ import annotations
+
+import base64
+import json
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.db.models import F, FloatField, Lookup, Q, Value
+from django.utils.html import escape
+
+# Text search configuration used for stored vectors.  ``simple`` does no
+# stemming or stop-word removal, which suits multilingual chat text.
+SEARCH_CONFIG = "simple"
+
+# Trigram indexes need at least one full trigram to narrow anything down;
+# shorter terms only use the word-prefix match.
+MIN_SUBSTRING_LENGTH = 3
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_HL_START, _HL_STOP = "\x02", "\x03"
+
+
+class ILike(Lookup):
+    """``lhs ILIKE rhs`` — usable directly in ``filter()`` and ``Q``."""
+
+    lookup_name = "ilike"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", [*lhs_params, *rhs_params]
+
+
+def like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def substring_q(fields: Iterable[str], term: str) -> Q:
+    """OR of ``field ILIKE '%term%'`` over ``fields`` (trigram-indexable)."""
+    pattern = like_pattern(term)
+    q = Q()
+    for name in fields:
+        q |= Q(ILike(F(name), pattern))
+    return q
+
+
+def prefix_query(term: str, config: str = SEARCH_CONFIG) -> Optional[SearchQuery]:
+    """Every word of ``term`` as a prefix (``foo:* & bar:*``) — search-as-you-type."""
+    words = _WORD_RE.findall(term.lower())
+    if not words:
+        return None
+    raw = " & ".join(f"{w}:*" for w in words)
+    return SearchQuery(raw, search_type="raw", config=config)
+
+
+def ranked_search(
+    qs,
+    term: str,
+    *,
+    vector: str = "search_vector",
+    fields: Sequence[str] = (),
+    config: str = SEARCH_CONFIG,
+):
+    """Filter ``qs`` to rows matching ``term`` and annotate ``search_rank``.
+
+    Rows match on the tsvector column (prefix words) or, for terms of at
+    least ``MIN_SUBSTRING_LENGTH`` characters, on a substring of ``fields``.
+    Substring-only matches rank 0 and sort after word matches.
+    """
+    term = (term or "").strip()
+    query = prefix_query(term, config)
+    cond = Q()
+    if query is not None:
+        cond |= Q(**{vector: query})
+    if fields and len(term) >= MIN_SUBSTRING_LENGTH:
+        cond |= substring_q(fields, term)
+    if not cond:
+        return qs.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+    if query is not None:
+        rank = SearchRank(F(vector), query)
+    else:
+        rank = Value(0.0, output_field=FloatField())
+    return qs.filter(cond).annotate(search_rank=rank)
+
+
+def encode_cursor(state: Dict) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        state = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return state if isinstance(state, dict) and "pk" in state else None
+
+
+def cursor_page(qs, *, cursor: Optional[str] = None, limit: int = 30, ranked: bool = True) -> Tuple[List, Optional[str]]:
+    """Keyset page of ``qs``; returns ``(items, next_cursor)``.
+
+    ``ranked`` orders by ``(-search_rank, -pk)`` (requires ``ranked_search``),
+    otherwise newest first by ``-pk``.
+    """
+    state = decode_cursor(cursor)
+    if state:
+        try:
+            pk = int(state["pk"])
+            if ranked:
+                rank = float(state.get("rank", 0.0))
+                qs = qs.filter(Q(search_rank__lt=rank) | Q(search_rank=rank, pk__lt=pk))
+            else:
+                qs = qs.filter(pk__lt=pk)
+        except (TypeError, ValueError):
+            pass
+    order = ("-search_rank", "-pk") if ranked else ("-pk",)
+    items = list(qs.order_by(*order)[: limit + 1])
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        state = {"pk": last.pk}
+        if ranked:
+            state["rank"] = float(getattr(last, "search_rank", 0.0) or 0.0)
+        next_cursor = encode_cursor(state)
+    return items, next_cursor
+
+
+def _mark_substring(text: str, term: str, width: int) -> str:
+    idx = text.lower().find(term.lower())
+    if idx < 0:
+        return escape(text[:width])
+    start = max(0, idx - width // 3)
+    end = min(len(text), idx + len(term) + width // 2)
+    head = "…" if start else ""
+    tail = "…" if end < len(text) else ""
+    return (
+        head
+        + escape(text[start:idx])
+        + "<mark>" + escape(text[idx:idx + len(term)]) + "</mark>"
+        + escape(text[idx + len(term):end])
+        + tail
+    )
+
+
+def headlines(
+    model,
+    pks: Iterable,
+    field: str,
+    term: str,
+    *,
+    config: str = SEARCH_CONFIG,
+    max_words: int = 24,
+    min_words: int = 8,
+) -> Dict:
+    """``{pk: html}`` highlight snippets for ``pks`` (one page of results).
+
+    Word matches come from ``ts_headline``; substring-only matches are cut
+    around the first occurrence in Python.  Text is HTML-escaped and hits
+    are wrapped in ``<mark>``.
+    """
+    pks = list(pks)
+    term = (term or "").strip()
+    if not pks or not term:
+        return {}
+    query = prefix_query(term, config)
+    qs = model._default_manager.filter(pk__in=pks)
+    if query is None:
+        rows = ((pk, "", text) for pk, text in qs.values_list("pk", field))
+    else:
+        qs = qs.annotate(
+            _headline=SearchHeadline(
+                field, query, config=config,
+                start_sel=_HL_START, stop_sel=_HL_STOP,
+                max_words=max_words, min_words=min_words,
+            )
+        )
+        rows = qs.values_list("pk", "_headline", field)
+    out = {}
+    for pk, headline, text in rows:
+        if headline and _HL_START in headline:
+            out[pk] = (
+                escape(headline)
+                .replace(_HL_START, "<mark>")
+                .replace(_HL_STOP, "</mark>")
+            )
+        else:
+            out[pk] = _mark_substring(text or "", term, max_words * 8)
+    return out
@@ -1,51 +1,256 @@
 """
-Read/write SystemSetting with process cache + Django cache.
+Read/write SystemSetting through a per-process snapshot.
 Fallback chain: DB → code defaults (initial_config.DEFAULTS) → hardcoded.
+
+``get_setting`` sits on hot paths (image builds, DB provisioning, mirror
+resolution, email), so lookups do no I/O: every process holds one
+immutable ``_Snapshot`` of all settings, loaded with a single query and
+replaced wholesale (one reference swap) on reload, so a reader sees either
+the old set or the new one, never a mix.
+
+Invalidation, after the writing transaction commits:
+
+* ``syssetting:version`` is INCR-ed and the new version is published on
+  ``syssetting:changed``.  A daemon thread per process subscribes and
+  marks the snapshot stale; the next lookup reloads it.
+* Pub/sub is fire-and-forget (a listener reconnecting misses messages),
+  so a lookup also compares the snapshot's version with the key at most
+  every ``_VERSION_CHECK_SECONDS``.  The version is read *before* the
+  rows, so a write racing a reload leaves the snapshot stale, not wrong.
+* Without Redis the snapshot falls back to expiring after ``_CACHE_TTL``.
+
+Writes that bypass model signals (``QuerySet.update``, raw SQL) must call
+:func:`invalidate`.
 """
 from __future__ import annotations
 
+import copy
 import logging
-from typing import Any, Optional
+import os
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
 
-from django.core.cache import cache
 from django.db.utils import OperationalError, ProgrammingError
 
 logger = logging.getLogger(__name__)
 
-_CACHE_PREFIX = "syssetting:"
-_CACHE_ALL = "syssetting:__all__"
-_CACHE_TTL = 60  # seconds
+_VERSION_KEY = "syssetting:version"
+_CHANNEL = "syssetting:changed"
+_CACHE_TTL = 60  # seconds; snapshot lifetime when Redis is unreachable
+_VERSION_CHECK_SECONDS = 5
+_DB_RETRY_SECONDS = 5  # reload cadence while the table is missing
+_LISTENER_RETRY_SECONDS = 5
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    values: Mapping[str, Any]
+    version: Optional[int]
+    loaded_at: float
+    complete: bool = True
+
+
+_snapshot: Optional[_Snapshot] = None
+_checked_at = 0.0
+_stale = threading.Event()
+_reload_lock = threading.Lock()
+_listener_lock = threading.Lock()
+_listener_pid: Optional[int] = None
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        logger.debug("settings_service: redis unavailable", exc_info=True)
+        return None
 
 
-def _defaults_map() -> dict[str, Any]:
+@lru_cache(maxsize=1)
+def _defaults_map() -> Mapping[str, Any]:
     try:
         from core.initial_config import DEFAULTS
 
-        return {d["key"]: d for d in DEFAULTS}
+        return MappingProxyType({d["key"]: d for d in DEFAULTS})
     except Exception:
-        return {}
+        return MappingProxyType({})
 
 
-def get_setting(key: str, default: Any = None) -> Any:
-    """
-    Return cast value for key.
-    """
-    cache_key = f"{_CACHE_PREFIX}{key}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+# ---------------------------------------------------------------------------
+# Snapshot
+# ---------------------------------------------------------------------------
+
+def _remote_version() -> Optional[int]:
+    r = _redis()
+    if r is None:
+        return None
+    try:
+        raw = r.get(_VERSION_KEY)
+        return int(raw) if raw is not None else 0
+    except Exception:
+        logger.debug("settings_service: version check failed", exc_info=True)
+        return None
 
+
+def _load() -> _Snapshot:
+    version = _remote_version()
     try:
         from core.models import SystemSetting
 
-        row = SystemSetting.objects.filter(key=key).first()
-        if row is not None:
-            val = row.cast_value()
-            cache.set(cache_key, val, _CACHE_TTL)
-            return val
+        rows = SystemSetting.objects.only("key", "value", "value_type")
+        values = {row.key: row.cast_value() for row in rows}
+        complete = True
     except (OperationalError, ProgrammingError, ImportError) as exc:
         # Migrations not applied / app not ready
-        logger.debug("get_setting(%s) DB unavailable: %s", key, exc)
+        logger.debug("settings snapshot: DB unavailable: %s", exc)
+        values, complete = {}, False
+    return _Snapshot(MappingProxyType(values), version, time.monotonic(), complete)
+
+
+def _is_fresh(snap: _Snapshot, now: float) -> bool:
+    global _checked_at
+    if not snap.complete:
+        return now - snap.loaded_at < _DB_RETRY_SECONDS
+    if snap.version is None:
+        return now - snap.loaded_at < _CACHE_TTL
+    if now - _checked_at < _VERSION_CHECK_SECONDS:
+        return True
+    _checked_at = now
+    version = _remote_version()
+    if version is None:
+        return now - snap.loaded_at < _CACHE_TTL
+    return version == snap.version
+
+
+def _current() -> _Snapshot:
+    _ensure_listener()
+    snap = _snapshot
+    if snap is not None and not _stale.is_set() and _is_fresh(snap, time.monotonic()):
+        return snap
+    return reload(snap)
+
+
+def reload(previous: Optional[_Snapshot] = None) -> _Snapshot:
+    """Load all settings and swap them in as one snapshot.
+
+    Callers that found ``previous`` stale and queued on the lock behind a
+    reload reuse its result instead of querying again.
+    """
+    global _snapshot, _checked_at
+    with _reload_lock:
+        if previous is not None and _snapshot is not previous and not _stale.is_set():
+            return _snapshot
+        # Clear first: an invalidation arriving mid-load re-flags it.
+        _stale.clear()
+        snap = _load()
+        _snapshot = snap
+        _checked_at = snap.loaded_at
+    return snap
+
+
+def snapshot() -> Mapping[str, Any]:
+    """Read-only view of every DB setting (cast values)."""
+    return _current().values
+
+
+# ---------------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------------
+
+def invalidate() -> None:
+    """Drop this process's snapshot and tell every other process to."""
+    _stale.set()
+    r = _redis()
+    if r is None:
+        return
+    try:
+        version = r.incr(_VERSION_KEY)
+        r.publish(_CHANNEL, version)
+    except Exception:
+        logger.warning("settings_service: could not publish invalidation", exc_info=True)
+
+
+def invalidate_on_commit() -> None:
+    """``invalidate`` once the current transaction commits (or now)."""
+    from django.db import transaction
+
+    transaction.on_commit(invalidate)
+
+
+def _listen() -> None:
+    reconnect = False
+    while True:
+        r = _redis()
+        pubsub = None
+        try:
+            if r is None:
+                raise ConnectionError("redis unavailable")
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(_CHANNEL)
+            if reconnect:
+                # Anything published while we were not subscribed is lost.
+                _stale.set()
+            reconnect = True
+            while True:
+                message = pubsub.get_message(timeout=30.0)
+                if message and message.get("type") == "message":
+                    _stale.set()
+        except Exception:
+            logger.debug("settings_service: listener reconnecting", exc_info=True)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+        time.sleep(_LISTENER_RETRY_SECONDS)
+
+
+def _ensure_listener() -> None:
+    """Start the subscriber thread once per process."""
+    global _listener_pid
+    pid = os.getpid()
+    if _listener_pid == pid:
+        return
+    with _listener_lock:
+        if _listener_pid == pid:
+            return
+        _listener_pid = pid
+        threading.Thread(target=_listen, name="settings-invalidation", daemon=True).start()
+
+
+def _after_fork() -> None:
+    # Prefork workers: the listener thread does not survive the fork, the
+    # locks may have been held by a parent thread, and invalidations sent
+    # before the child subscribes are missed.
+    global _reload_lock, _listener_lock, _listener_pid
+    _reload_lock = threading.Lock()
+    _listener_lock = threading.Lock()
+    _listener_pid = None
+    _stale.set()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+# ---------------------------------------------------------------------------
+# Lookups
+# ---------------------------------------------------------------------------
+
+def get_setting(key: str, default: Any = None) -> Any:
+    """
+    Return cast value for key.
+    """
+    val = _current().values.get(key)
+    if val is not None:
+        # JSON settings are shared by every caller of the snapshot.
+        return copy.deepcopy(val) if isinstance(val, (dict, list)) else val
 
     # Code defaults
     meta = _defaults_map().get(key)
@@ -102,8 +307,6 @@ def set_setting(key: str, value: Any, *, actor: str | None = None) -> bool:
             return False
         row.set_cast_value(value)
         row.save(update_fields=["value", "updated_at"])
-        cache.delete(f"{_CACHE_PREFIX}{key}")
-        cache.delete(_CACHE_ALL)
         logger.info("SystemSetting %s updated (by %s)", key, actor or "system")
         return True
     except Exception:
@@ -0,0 +1,51 @@
+"""
+Async bodies for ``StreamingHttpResponse`` under ASGI.
+
+Under ASGI Django reads a sync streaming iterator through
+``sync_to_async(list)``, so the whole body -- the rest of a video after a
+seek, a multi-gigabyte volume archive -- is built in memory before the
+first byte goes out.  ``aiter_chunks`` wraps the blocking iterator in an
+async generator that pulls one chunk at a time on a dedicated worker
+thread.  When the client goes away the response task is cancelled and the
+sync iterator is closed on that same thread, after any in-flight pull.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+def _close(chunks) -> None:
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            logger.warning("closing streamed response body failed", exc_info=True)
+
+
+async def aiter_chunks(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Async view of a blocking chunk iterator, one thread hop per chunk.
+
+    A single-worker executor serialises the pulls and the final
+    ``close()``, so closing never races a ``next()`` that is still
+    blocked on the disk or the daemon.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-pull")
+    try:
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, _DONE)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        # Not awaited: on cancellation the in-flight pull may still block.
+        executor.submit(_close, chunks)
+        executor.shutdown(wait=False)
@@ -0,0 +1,93 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core import app_cache
+
+
+class _GenRedis:
+    """Just enough of redis-py for the generation helpers."""
+
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+        self.scans = 0
+
+    def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class _Pipe:
+            def __init__(self):
+                self.ops = []
+
+            def set(self, key, value, nx=False):
+                self.ops.append((key, value, nx))
+
+            def execute(self):
+                redis.round_trips += 1
+                for key, value, nx in self.ops:
+                    if not (nx and key in redis.data):
+                        redis.data[key] = str(value)
+
+        return _Pipe()
+
+    def eval(self, script, numkeys, *args):
+        assert script == app_cache._BUMP_LUA
+        self.round_trips += 1
+        keys, seed = args[:numkeys], args[numkeys]
+        for key in keys:
+            self.data.setdefault(key, str(seed))
+            self.data[key] = str(int(self.data[key]) + 1)
+        return len(keys)
+
+    def scan_iter(self, *args, **kwargs):
+        self.scans += 1
+        return iter(())
+
+
+class GenerationKeyTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = _GenRedis()
+        patcher = patch.object(app_cache, "_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_key_is_stable_until_invalidated(self):
+        first = app_cache.service_user_list_key(7, {"page": "1"})
+        self.assertEqual(first, app_cache.service_user_list_key(7, {"page": "1"}))
+        self.assertTrue(first.startswith("svc:user:u:7:g:"))
+
+        self.redis.round_trips = 0
+        app_cache.invalidate_user_services(7)
+        self.assertEqual(self.redis.round_trips, 1)
+        self.assertEqual(self.redis.scans, 0)
+        self.assertNotEqual(first, app_cache.service_user_list_key(7, {"page": "1"}))
+
+    def test_user_invalidation_is_scoped(self):
+        other = app_cache.service_user_list_key(8, {})
+        admin = app_cache.service_admin_list_key({})
+        app_cache.invalidate_user_services(7)
+        self.assertEqual(other, app_cache.service_user_list_key(8, {}))
+        self.assertNotEqual(admin, app_cache.service_admin_list_key({}))
+
+    def test_namespace_bump_invalidates_all_scopes(self):
+        user_key = app_cache.ticket_user_list_key(3, {})
+        admin_key = app_cache.ticket_admin_list_key({})
+        plan_key = app_cache.plan_list_key({})
+        app_cache.invalidate_namespace("tkt", purge=False)
+        self.assertNotEqual(user_key, app_cache.ticket_user_list_key(3, {}))
+        self.assertNotEqual(admin_key, app_cache.ticket_admin_list_key({}))
+        self.assertEqual(plan_key, app_cache.plan_list_key({}))
+
+    def test_lost_counter_is_reseeded_from_clock(self):
+        with patch.object(app_cache, "_generation_seed", return_value=1000):
+            (gen,) = app_cache.get_generations("svc")
+        self.assertEqual(gen, 1000)
+        self.redis.data.clear()
+        with patch.object(app_cache, "_generation_seed", return_value=2000):
+            app_cache.invalidate_all_services()
+        self.assertEqual(app_cache.get_generations("svc"), [2001])
@@ -0,0 +1,114 @@
+import os
+import tempfile
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.media_delivery import CHUNK_SIZE, MediaFile, media_from_path, parse_range, serve_file
+
+
+async def _read(response):
+    return [chunk async for chunk in response]
+
+
+def _body(response):
+    return b"".join(async_to_sync(_read)(response)) if response.streaming else response.content
+
+
+class MediaDeliveryTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, "clip.bin")
+        self.data = bytes(range(256)) * 4
+        with open(self.path, "wb") as fh:
+            fh.write(self.data)
+        self.rf = RequestFactory()
+
+    def tearDown(self):
+        os.unlink(self.path)
+        os.rmdir(self.root)
+
+    def _get(self, **headers):
+        request = self.rf.get("/media/x", **headers)
+        return serve_file(request, media_from_path(self.path), content_type="video/mp4", filename="clip.bin")
+
+    def test_full_response_carries_validators(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(_body(response), self.data)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+    def test_conditional_get_returns_304(self):
+        etag = self._get()["ETag"]
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_single_range(self):
+        response = self._get(HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.data)}")
+        self.assertEqual(_body(response), self.data[10:20])
+        self.assertEqual(_body(self._get(HTTP_RANGE="bytes=-4")), self.data[-4:])
+
+    def test_open_ended_seek_is_not_buffered(self):
+        reads = []
+        size = 64 * CHUNK_SIZE
+
+        class _File:
+            def seek(self, offset):
+                pass
+
+            def read(self, n):
+                reads.append(n)
+                return b"v" * n
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        media = MediaFile(size=size, mtime=0.0, etag='"v"', open=_File)
+        request = self.rf.get("/media/v", HTTP_RANGE=f"bytes={CHUNK_SIZE}-")
+        response = serve_file(request, media, content_type="video/mp4")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Length"], str(size - CHUNK_SIZE))
+
+        async def first_chunk():
+            stream = response.streaming_content
+            chunk = await stream.__anext__()
+            return chunk, len(reads)
+
+        chunk, reads_before_first_byte = async_to_sync(first_chunk)()
+        self.assertEqual(len(chunk), CHUNK_SIZE)
+        self.assertEqual(reads_before_first_byte, 1)
+
+    def test_multi_range_is_multipart(self):
+        response = self._get(HTTP_RANGE="bytes=0-1,100-101")
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response["Content-Type"].startswith("multipart/byteranges; boundary="))
+        body = _body(response)
+        self.assertEqual(len(body), int(response["Content-Length"]))
+        self.assertIn(b"Content-Range: bytes 100-101/1024\r\n\r\n" + self.data[100:102], body)
+
+    def test_unsatisfiable_and_stale_if_range(self):
+        response = self._get(HTTP_RANGE="bytes=5000-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */1024")
+        stale = self._get(HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+
+    def test_parse_range_coalesces_and_rejects(self):
+        self.assertEqual(parse_range("bytes=0-4,3-9,20-", 30), [(0, 9), (20, 29)])
+        self.assertIsNone(parse_range("items=0-1", 30))
+        self.assertIsNone(parse_range("bytes=9-2", 30))
+
+    def test_offload_headers(self):
+        with override_settings(MEDIA_ROOT=self.root, MEDIA_OFFLOAD="x-accel-redirect"):
+            response = self._get(HTTP_RANGE="bytes=0-1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/_protected_media/clip.bin")
+        self.assertEqual(response.content, b"")
+        with override_settings(MEDIA_OFFLOAD="x-sendfile"):
+            self.assertEqual(self._get()["X-Sendfile"], self.path)
@@ -0,0 +1,56 @@
+from urllib.parse import urlsplit
+
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.media_signing import sign_media_url, verify_signed_request
+
+NOW = 1_700_000_000
+
+
+class MediaSigningTests(SimpleTestCase):
+    rf = RequestFactory()
+
+    def _verify(self, url, now=NOW):
+        parts = urlsplit(url)
+        return verify_signed_request(self.rf.get(f"{parts.path}?{parts.query}"), now=now)
+
+    def test_round_trip(self):
+        url = sign_media_url("/media/images/a.jpg", 7, now=NOW)
+        self.assertEqual(self._verify(url), 7)
+
+    def test_escaped_and_non_ascii_names(self):
+        for url in (
+            "/media/images/%D8%B9%DA%A9%D8%B3_%D9%85%D9%86.jpg",
+            "/media/images/my%20photo.jpg",
+        ):
+            self.assertEqual(self._verify(sign_media_url(url, 7, now=NOW)), 7, url)
+        raw = sign_media_url("/media/images/عکس من.jpg", 7, now=NOW)
+        self.assertEqual(
+            verify_signed_request(self.rf.get(raw.replace(" ", "%20")), now=NOW), 7
+        )
+
+    def test_tampering_and_expiry_are_rejected(self):
+        url = sign_media_url("/media/images/a.jpg", 7, now=NOW)
+        self.assertIsNone(self._verify(url.replace("a.jpg", "b.jpg")))
+        self.assertIsNone(self._verify(url.replace("uid=7", "uid=8")))
+        self.assertIsNone(self._verify(url, now=NOW + 3 * 3600))
+
+    def test_expiry_is_bucketed_for_cacheability(self):
+        self.assertEqual(
+            sign_media_url("/media/x.png", 1, now=NOW),
+            sign_media_url("/media/x.png", 1, now=NOW + 30),
+        )
+
+    def test_rotation_keeps_old_urls_valid(self):
+        with override_settings(MEDIA_SIGNING_KEYS=["old:s1"]):
+            url = sign_media_url("/media/x.png", 1, now=NOW)
+        with override_settings(MEDIA_SIGNING_KEYS=["new:s2", "old:s1"]):
+            self.assertEqual(self._verify(url), 1)
+            self.assertIn("sig=new.", sign_media_url("/media/x.png", 1, now=NOW))
+        with override_settings(MEDIA_SIGNING_KEYS=["new:s2"]):
+            self.assertIsNone(self._verify(url))
+
+    def test_unsignable_urls_are_untouched(self):
+        self.assertEqual(sign_media_url("https://cdn.example.com/a.png", 1), "https://cdn.example.com/a.png")
+        self.assertIsNone(sign_media_url(None, 1))
+        self.assertEqual(sign_media_url("/media/a.png", None), "/media/a.png")
@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from core import search
+
+
+class SearchHelperTests(SimpleTestCase):
+    def test_like_pattern_escapes_wildcards(self):
+        self.assertEqual(search.like_pattern("50%_off\\"), "%50\\%\\_off\\\\%")
+
+    def test_prefix_query_uses_sanitised_words(self):
+        query = search.prefix_query("Hello, wor!ld")
+        self.assertEqual(query.source_expressions[-1].value, "hello:* & wor:* & ld:*")
+        self.assertIsNone(search.prefix_query("!?"))
+
+    def test_cursor_round_trip_and_garbage(self):
+        state = {"pk": 42, "rank": 0.0607927}
+        self.assertEqual(search.decode_cursor(search.encode_cursor(state)), state)
+        self.assertIsNone(search.decode_cursor("not-a-cursor"))
+        self.assertIsNone(search.decode_cursor(search.encode_cursor({"rank": 1})))
+
+    def test_substring_snippet_is_escaped_and_marked(self):
+        text = "<b>see</b> the deployment logs"
+        self.assertEqual(
+            search._mark_substring(text, "PLOY", 200),
+            "&lt;b&gt;see&lt;/b&gt; the de<mark>ploy</mark>ment logs",
+        )
@@ -0,0 +1,122 @@
+import threading
+from types import MappingProxyType
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core import settings_service
+
+
+class _VersionRedis:
+    """Just enough of redis-py for the version key and the channel."""
+
+    def __init__(self):
+        self.version = None
+        self.published = []
+        self.round_trips = 0
+
+    def get(self, key):
+        assert key == settings_service._VERSION_KEY
+        self.round_trips += 1
+        return None if self.version is None else str(self.version).encode()
+
+    def incr(self, key):
+        self.round_trips += 1
+        self.version = (self.version or 0) + 1
+        return self.version
+
+    def publish(self, channel, message):
+        self.round_trips += 1
+        self.published.append((channel, message))
+
+
+class SettingsSnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.redis = _VersionRedis()
+        self.rows = {"mirror.docker": "mirror.example.com", "runtime.versions": {"python": "3.12"}}
+        self.loads = 0
+        self.clock = [1000.0]
+
+        def load():
+            self.loads += 1
+            version = settings_service._remote_version()
+            return settings_service._Snapshot(MappingProxyType(dict(self.rows)), version, self.clock[0])
+
+        patches = [
+            patch.object(settings_service, "_redis", lambda: self.redis),
+            patch.object(settings_service, "_load", load),
+            patch.object(settings_service, "_ensure_listener", lambda: None),
+            patch.object(settings_service.time, "monotonic", lambda: self.clock[0]),
+            patch.object(settings_service, "_snapshot", None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        settings_service._stale.clear()
+        self.addCleanup(settings_service._stale.clear)
+
+    def test_lookups_are_served_from_one_load(self):
+        for _ in range(50):
+            self.assertEqual(settings_service.mirror_docker(), "mirror.example.com")
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.redis.round_trips, 1)
+
+    def test_invalidate_bumps_version_and_publishes(self):
+        settings_service.get_setting("mirror.docker")
+        self.rows["mirror.docker"] = "other.example.com"
+        settings_service.invalidate()
+
+        self.assertEqual(self.redis.published, [(settings_service._CHANNEL, 1)])
+        self.assertEqual(settings_service.mirror_docker(), "other.example.com")
+        self.assertEqual(self.loads, 2)
+
+    def test_pubsub_message_marks_snapshot_stale(self):
+        settings_service.get_setting("mirror.docker")
+        self.rows["mirror.docker"] = "other.example.com"
+        settings_service._stale.set()  # what the listener does per message
+        self.assertEqual(settings_service.mirror_docker(), "other.example.com")
+
+    def test_version_key_catches_missed_messages(self):
+        settings_service.get_setting("mirror.docker")
+        self.rows["mirror.docker"] = "other.example.com"
+        self.redis.version = 7  # another process wrote; we never heard
+
+        self.clock[0] += settings_service._VERSION_CHECK_SECONDS - 1
+        self.assertEqual(settings_service.mirror_docker(), "mirror.example.com")
+        self.clock[0] += 1
+        self.assertEqual(settings_service.mirror_docker(), "other.example.com")
+
+    def test_without_redis_snapshot_expires_after_ttl(self):
+        with patch.object(settings_service, "_redis", lambda: None):
+            settings_service.get_setting("mirror.docker")
+            self.rows["mirror.docker"] = "other.example.com"
+            self.clock[0] += settings_service._CACHE_TTL - 1
+            self.assertEqual(settings_service.mirror_docker(), "mirror.example.com")
+            self.clock[0] += 1
+            self.assertEqual(settings_service.mirror_docker(), "other.example.com")
+
+    def test_json_values_are_copied(self):
+        settings_service.default_runtime_versions()["python"] = "2.7"
+        self.assertEqual(settings_service.default_runtime_versions(), {"python": "3.12"})
+
+    def test_unknown_key_falls_back_to_code_defaults(self):
+        self.assertEqual(settings_service.get_setting("missing.key", "x"), "x")
+        with patch.object(settings_service, "_defaults_map", return_value={"missing.key": {"default": 3}}):
+            self.assertEqual(settings_service.get_setting("missing.key"), 3)
+
+    def test_concurrent_readers_share_one_reload(self):
+        stale = settings_service.reload()
+        settings_service._stale.set()
+        self.loads = 0
+        barrier = threading.Barrier(8)
+
+        def read():
+            barrier.wait()
+            settings_service.reload(stale)
+
+        threads = [threading.Thread(target=read) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(self.loads, 1)
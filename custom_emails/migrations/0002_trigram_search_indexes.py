@@ -0,0 +1,22 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("custom_emails", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="emaillog",
+            index=GinIndex(fields=["recipient_email"], name="emaillog_recipient_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="emaillog",
+            index=GinIndex(fields=["subject"], name="emaillog_subject_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
@@ -1,5 +1,6 @@
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 User = settings.AUTH_USER_MODEL
@@ -39,6 +40,11 @@ class EmailLog(models.Model):
     celery_task_id = models.CharField(max_length=64, blank=True, default="")
     class Meta:
         ordering = ["-created_at"]
-        indexes = [models.Index(fields=["status", "created_at"])]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            # ILIKE '%q%' admin/table search (core.search.substring_q)
+            GinIndex(fields=["recipient_email"], name="emaillog_recipient_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["subject"], name="emaillog_subject_trgm", opclasses=["gin_trgm_ops"]),
+        ]
     def __str__(self):
         return f"{self.recipient_email} ({self.status})"
@@ -3,7 +3,7 @@ from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
-from .models import Deploy, DeployLog
+from .models import Deploy, DeployLog, ImageBuildCache
 
 
 # ─────────────────────────────────────────────────────────────
@@ -295,3 +295,52 @@ class DeployLogAdmin(admin.ModelAdmin):
         if len(msg) > 80:
             return msg[:80] + "…"
         return msg
+
+
+# ─────────────────────────────────────────────────────────────
+# Image build cache
+# ─────────────────────────────────────────────────────────────
+@admin.register(ImageBuildCache)
+class ImageBuildCacheAdmin(admin.ModelAdmin):
+    change_list_template = "admin/deploy/imagebuildcache/change_list.html"
+    list_display = (
+        "digest_short",
+        "image_ref",
+        "image_id_short",
+        "build_count",
+        "hit_count",
+        "build_seconds",
+        "seconds_saved",
+        "last_used_at",
+    )
+    search_fields = ("digest", "image_id", "image_ref")
+    ordering = ("-last_used_at",)
+    list_per_page = 50
+    readonly_fields = (
+        "digest",
+        "image_id",
+        "image_ref",
+        "build_seconds",
+        "build_count",
+        "hit_count",
+        "seconds_saved",
+        "last_used_at",
+        "created_at",
+        "updated_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = dict(extra_context or {})
+        extra_context["build_cache_stats"] = ImageBuildCache.stats()
+        return super().changelist_view(request, extra_context=extra_context)
+
+    @admin.display(description="Digest", ordering="digest")
+    def digest_short(self, obj):
+        return obj.digest[:12]
+
+    @admin.display(description="Image ID", ordering="image_id")
+    def image_id_short(self, obj):
+        return (obj.image_id or "")[:19]
@@ -16,7 +16,6 @@ from django.db import transaction
 from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.utils.dateparse import parse_datetime
 from django.utils.translation import gettext as _
 
 from rest_framework import status
@@ -31,6 +30,7 @@ from core.global_settings.config import SERVICE_STATUS_CHOICES
 from deployments.celery.tasks import deploy as deploy_task
 from deployments.celery.tasks import stop as stop_service
 from deployments.celery.tasks import run_db_deploy  # DB platforms — NOT deploy.tasks
+from deployments.celery import scheduler
 from deployments.core.db_deployer import (
     DB_PLATFORMS,
     DBDeployer,
@@ -42,6 +42,7 @@ from deployments.core.manager.client_manager import Client
 from deployments.core.manager.container_manager import Container
 from docker.errors import APIError, NotFound as DockerNotFound
 
+from . import log_store
 from .models import Deploy, DeployLog
 from .serializers import DeployLogSerializer, DeploySerializer
 from services.models import Service
@@ -153,17 +154,6 @@ class DeployPagination(PageNumberPagination):
     max_page_size = 50
 
 
-def _parse_cursor(value):
-    if not value:
-        return None
-    dt = parse_datetime(value)
-    if dt is None:
-        return None
-    if timezone.is_naive(dt):
-        dt = timezone.make_aware(dt, timezone.get_current_timezone())
-    return dt
-
-
 class DeployViewSet(ModelViewSet):
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = "deploy.action"
@@ -406,14 +396,17 @@ class DeployViewSet(ModelViewSet):
                 cancel_requested=False,
             )
 
-            deploy_pk = str(deploy.pk)
             if is_db:
                 transaction.on_commit(
-                    lambda: run_db_deploy.apply_async(args=[deploy_pk], task_id=task_id)
+                    lambda: scheduler.enqueue_deploy(
+                        run_db_deploy, deploy, kind=scheduler.KIND_BUILD, task_id=task_id, track=False,
+                    )
                 )
             else:
                 transaction.on_commit(
-                    lambda: deploy_task.apply_async(args=[deploy_pk], task_id=task_id)
+                    lambda: scheduler.enqueue_deploy(
+                        deploy_task, deploy, kind=scheduler.KIND_BUILD, task_id=task_id,
+                    )
                 )
 
         return Response({"result": "success", "task_id": task_id}, status=status.HTTP_202_ACCEPTED)
@@ -436,6 +429,8 @@ class DeployViewSet(ModelViewSet):
             deploy.save(update_fields=["cancel_requested", "status", "stage", "status_message", "completed_at"])
         else:
             deploy.save(update_fields=["cancel_requested"])
+        # A deploy still queued (or waiting for a build slot) gives up its place.
+        scheduler.forget(deploy.pk)
 
         return Response(
             {"result": "success", "detail": _(f"Cancel requested for {deploy.name}.")},
@@ -563,18 +558,22 @@ class DeployViewSet(ModelViewSet):
                 cancel_requested=False,
             )
 
-            deploy_pk = str(deploy.pk)
             if is_db:
                 transaction.on_commit(
-                    lambda: run_db_deploy.apply_async(
-                        args=[deploy_pk],
-                        kwargs={"force_reinit": force_reinit},
+                    lambda: scheduler.enqueue_deploy(
+                        run_db_deploy,
+                        deploy,
+                        kind=scheduler.KIND_REBUILD,
                         task_id=task_id,
+                        track=False,
+                        kwargs={"force_reinit": force_reinit},
                     )
                 )
             else:
                 transaction.on_commit(
-                    lambda: deploy_task.apply_async(args=[deploy_pk], task_id=task_id)
+                    lambda: scheduler.enqueue_deploy(
+                        deploy_task, deploy, kind=scheduler.KIND_REBUILD, task_id=task_id,
+                    )
                 )
 
         return Response(
@@ -857,45 +856,50 @@ def deploy_logs_apiview(request, pk):
         )
 
     if after:
-        after_dt = _parse_cursor(after)
-        if after_dt is None:
+        after_cursor = log_store.parse_cursor(after)
+        if after_cursor is None:
             return Response(
                 {"result": "error", "detail": _("Invalid after timestamp.")},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        rows = list(base_qs.filter(created_at__gt=after_dt).order_by("created_at")[:limit])
-        next_after = rows[-1].created_at.isoformat() if rows else after
+        rows = list(
+            base_qs.filter(log_store.keyset_filter(*after_cursor, newer=True))
+            .order_by("created_at", "id")[: limit + 1]
+        )
+        has_more_newer = len(rows) > limit
+        rows = rows[:limit]
+        next_after = log_store.encode_cursor(rows[-1]) if rows else after
         return Response(
             {
                 "result": "success",
                 "deploy": DeploySerializer(deploy).data,
                 "logs": DeployLogSerializer(rows, many=True).data,
                 "next_after": next_after,
-                "has_more_newer": len(rows) == limit,
+                "has_more_newer": has_more_newer,
                 "direction": "forward",
             },
             status=status.HTTP_200_OK,
         )
 
     if before:
-        before_dt = _parse_cursor(before)
-        if before_dt is None:
+        before_cursor = log_store.parse_cursor(before)
+        if before_cursor is None:
             return Response(
                 {"result": "error", "detail": _("Invalid before timestamp.")},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        queryset = base_qs.filter(created_at__lt=before_dt)
+        queryset = base_qs.filter(log_store.keyset_filter(*before_cursor, newer=False))
     else:
         queryset = base_qs
 
-    rows_desc = list(queryset.order_by("-created_at")[: limit + 1])
+    rows_desc = list(queryset.order_by("-created_at", "-id")[: limit + 1])
     has_more_older = len(rows_desc) > limit
     rows_desc = rows_desc[:limit]
     rows = list(reversed(rows_desc))
 
-    next_before = rows[0].created_at.isoformat() if rows else before
-    latest_after = rows[-1].created_at.isoformat() if rows else before
+    next_before = log_store.encode_cursor(rows[0]) if rows else before
+    latest_after = log_store.encode_cursor(rows[-1]) if rows else before
 
     return Response(
         {
@@ -1,7 +1,9 @@
 from django.db import transaction
 from django.utils import timezone
 import logging
+import time
 
+from .event_buffer import BufferedDeployWriter
 from .event_pipeline import DeploymentEventPipeline
 from .models import Deploy, DeploymentStatusChoices, RollbackStatusChoices
 from deployments.core.exceptions import DeploymentCancelled
@@ -9,6 +11,10 @@ from deployments.core.types import DeploymentEvent
 
 logger = logging.getLogger(__name__)
 
+# The cancel flag is re-read from the DB on every stage change and at most
+# this often within a stage (image_build emits an event per output line).
+CANCEL_CHECK_INTERVAL_SEC = 1.0
+
 RESOURCE_STATUS_FIELDS = {
     "image_build": ("image_status", "building"),
     "network_creation": ("network_status", "creating"),
@@ -49,14 +55,21 @@ class DjangoDeploymentState:
 
     ``event_sink`` is a bound method used as the EventSink callable by
     DeploymentOrchestrator / DeployFacade / DeploymentLogger.
+
+    Live events go through a ``BufferedDeployWriter``: Deploy updates are
+    coalesced and DeployLog rows bulk-inserted.  ``start``, ``finish``,
+    ``record_exception`` and terminal / error events write synchronously.
     """
 
     def __init__(self, deploy: Deploy):
         if deploy is None:
             raise ValueError("DjangoDeploymentState requires a Deploy instance")
         self.deploy = deploy
-        self.events = DeploymentEventPipeline(deploy)
+        self.writer = BufferedDeployWriter(deploy.pk)
+        self.events = DeploymentEventPipeline(deploy, writer=self.writer)
         self._finished = False
+        self._cancel_checked_at = None
+        self._cancel_checked_stage = None
 
     # ------------------------------------------------------------------
     # Lifecycle
@@ -96,6 +109,7 @@ class DjangoDeploymentState:
                 "Failed to record deployment_started for deploy %s",
                 self.deploy.pk,
             )
+        self._flush_quietly()
 
     def event_sink(self, event: DeploymentEvent):
         """
@@ -104,14 +118,16 @@ class DjangoDeploymentState:
         Raises DeploymentCancelled when the user has requested cancel so the
         orchestrator can abort cleanly.
         """
-        # Fresh read for cancel flag (avoid stale in-memory value)
-        if Deploy.objects.filter(pk=self.deploy.pk, cancel_requested=True).exists():
+        if self._cancel_requested(event.stage):
+            # Persist what we have so the log shows how far the deploy got.
+            self._flush_quietly()
             raise DeploymentCancelled("Deployment was cancelled by the user.")
 
         if self._finished:
             # Ignore late events after finish() already wrote terminal state
             try:
                 self.events.record(event)
+                self.writer.flush()
             except Exception:
                 logger.debug(
                     "Late event after finish ignored/failed deploy=%s stage=%s",
@@ -194,7 +210,7 @@ class DjangoDeploymentState:
                 update["rollback_status"] = RollbackStatusChoices.FAILED
             self._finished = True
 
-        self._update_deploy(**update)
+        self._buffer_deploy(**update)
 
         try:
             self.events.record(event)
@@ -207,8 +223,13 @@ class DjangoDeploymentState:
                 stage,
             )
 
+        # Terminal and error events are written before we return so the
+        # caller (and anyone polling the row) sees them immediately.
+        self.writer.note_event(stage, force=self._finished or level == "error")
+
     def finish(self, result):
         self._finished = True
+        self._flush_quietly()
         success = bool(getattr(result, "success", False))
         result_status = (getattr(result, "status", None) or "").lower()
         result_stage = getattr(result, "stage", None) or ""
@@ -281,12 +302,14 @@ class DjangoDeploymentState:
             logger.exception(
                 "Failed to record finish event for deploy %s", self.deploy.pk
             )
+        self._flush_quietly()
 
     def record_exception(self, exception: Exception, traceback_text: str):
         stage = getattr(exception, "stage", None) or "deployment_failed"
         message = str(exception) or "Deployment failed."
         recoverable = bool(getattr(exception, "recoverable", False))
 
+        self._flush_quietly()
         try:
             self._update_deploy(
                 stage=str(stage)[:64],
@@ -322,6 +345,7 @@ class DjangoDeploymentState:
             logger.exception(
                 "record_exception pipeline failed for deploy %s", self.deploy.pk
             )
+        self._flush_quietly()
 
     # ------------------------------------------------------------------
     # Helpers
@@ -347,6 +371,33 @@ class DjangoDeploymentState:
                 return "unhealthy"
         return default
 
+    def _cancel_requested(self, stage) -> bool:
+        now = time.monotonic()
+        if (
+            self._cancel_checked_at is not None
+            and stage == self._cancel_checked_stage
+            and now - self._cancel_checked_at < CANCEL_CHECK_INTERVAL_SEC
+        ):
+            return False
+        self._cancel_checked_at = now
+        self._cancel_checked_stage = stage
+        # Fresh read for cancel flag (avoid stale in-memory value)
+        return Deploy.objects.filter(pk=self.deploy.pk, cancel_requested=True).exists()
+
+    def _buffer_deploy(self, **fields):
+        """Queue a Deploy update; the in-memory instance is updated at once."""
+        if not fields:
+            return
+        self.writer.update_deploy(**fields)
+        for key, value in fields.items():
+            setattr(self.deploy, key, value)
+
+    def _flush_quietly(self):
+        try:
+            self.writer.flush()
+        except Exception:
+            logger.exception("Buffered deploy flush failed deploy=%s", self.deploy.pk)
+
     def _update_deploy(self, **fields):
         if not fields:
             return
@@ -0,0 +1,171 @@
+"""Coalescing writer for Deploy row updates and DeployLog inserts.
+
+The deployment event path used to issue one ``Deploy`` UPDATE and one
+``DeployLog`` INSERT per event — and ``image_build`` emits an event per
+docker build-output line.  ``BufferedDeployWriter`` keeps both in memory:
+
+* ``Deploy`` field updates are merged last-write-wins into one pending
+  UPDATE;
+* ``DeployLog`` rows are queued and written with one ``bulk_create``.
+
+The buffer is flushed when the stage changes, when ``flush_interval``
+has elapsed since the last flush, when ``max_batch`` log rows are
+queued, and synchronously whenever the caller asks for it (terminal and
+error events).  Flushing happens on the calling thread, so the worker's
+DB connection handling is unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+
+from .models import Deploy, DeployLog, DeploymentStatusChoices
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FLUSH_INTERVAL_MS = 500
+DEFAULT_MAX_BATCH = 50
+
+_TERMINAL_STATUSES = (
+    DeploymentStatusChoices.FAILED,
+    DeploymentStatusChoices.CANCELLED,
+    DeploymentStatusChoices.ROLLED_BACK,
+)
+
+
+def _flush_interval() -> float:
+    return max(0, int(getattr(settings, "DEPLOY_EVENT_FLUSH_INTERVAL_MS", DEFAULT_FLUSH_INTERVAL_MS))) / 1000.0
+
+
+def _max_batch() -> int:
+    return max(1, int(getattr(settings, "DEPLOY_EVENT_MAX_BATCH", DEFAULT_MAX_BATCH)))
+
+
+class BufferedDeployWriter:
+    """
+    Buffer Deploy updates and DeployLog rows for one deployment.
+
+    ``guard_terminal_success`` keeps a buffered SUCCEEDED from overwriting
+    a FAILED / CANCELLED / ROLLED_BACK status written by someone else
+    (the container monitor, an explicit cancel) in the meantime.
+    """
+
+    def __init__(
+        self,
+        deploy_id,
+        *,
+        log_database: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        max_batch: Optional[int] = None,
+        guard_terminal_success: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.deploy_id = deploy_id
+        self.log_database = (
+            log_database
+            or getattr(settings, "DEPLOYMENT_LOG_DB_ALIAS", None)
+            or "default"
+        )
+        self.flush_interval = _flush_interval() if flush_interval is None else flush_interval
+        self.max_batch = _max_batch() if max_batch is None else max_batch
+        self.guard_terminal_success = guard_terminal_success
+        self._clock = clock
+
+        self._pending_fields: dict[str, Any] = {}
+        self._pending_logs: list[DeployLog] = []
+        self._last_flush_at = clock()
+        self._last_stage: Optional[str] = None
+
+        # Write counters (read by the benchmark and debug logging).
+        self.events = 0
+        self.deploy_updates = 0
+        self.log_inserts = 0
+        self.log_rows = 0
+
+    # ------------------------------------------------------------------
+    # Buffering
+    # ------------------------------------------------------------------
+
+    def update_deploy(self, **fields) -> None:
+        self._pending_fields.update(fields)
+
+    def add_log(self, log: DeployLog) -> None:
+        self._pending_logs.append(log)
+
+    def note_event(self, stage: Optional[str], *, force: bool = False) -> None:
+        """
+        Call once per event after buffering its writes.
+
+        Flushes when ``force`` is set, the stage changed, the batch is full
+        or the flush interval elapsed.
+        """
+        self.events += 1
+        stage = stage or None
+        stage_changed = stage is not None and stage != self._last_stage
+        if stage is not None:
+            self._last_stage = stage
+        if (
+            force
+            or stage_changed
+            or len(self._pending_logs) >= self.max_batch
+            or (self._clock() - self._last_flush_at) >= self.flush_interval
+        ):
+            self.flush()
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._pending_fields or self._pending_logs)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    def flush(self) -> None:
+        """
+        Write everything buffered.
+
+        DeployLog failures are logged and dropped (the log DB must never
+        break a deploy); a failing Deploy UPDATE is re-raised, matching
+        the unbuffered behaviour.
+        """
+        self._last_flush_at = self._clock()
+        logs, self._pending_logs = self._pending_logs, []
+        fields, self._pending_fields = self._pending_fields, {}
+
+        if logs:
+            try:
+                DeployLog.objects.using(self.log_database).bulk_create(
+                    logs, batch_size=self.max_batch,
+                )
+                self.log_inserts += 1
+                self.log_rows += len(logs)
+            except Exception:
+                logger.exception(
+                    "Failed to write %d DeployLog rows for deploy %s",
+                    len(logs),
+                    self.deploy_id,
+                )
+
+        if fields:
+            qs = Deploy.objects.filter(pk=self.deploy_id)
+            if (
+                self.guard_terminal_success
+                and fields.get("status") == DeploymentStatusChoices.SUCCEEDED
+            ):
+                qs = qs.exclude(status__in=_TERMINAL_STATUSES)
+            qs.update(**fields)
+            self.deploy_updates += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "events": self.events,
+            "deploy_updates": self.deploy_updates,
+            "log_inserts": self.log_inserts,
+            "log_rows": self.log_rows,
+            "writes": self.deploy_updates + self.log_inserts,
+        }
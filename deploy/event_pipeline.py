@@ -34,10 +34,16 @@ def sanitize(value: Any) -> Any:
 
 
 class DeploymentEventPipeline:
-    """Persist events to the log DB and publish them without affecting deployment work."""
+    """Persist events to the log DB and publish them without affecting deployment work.
 
-    def __init__(self, deploy):
+    With a ``writer`` (``deploy.event_buffer.BufferedDeployWriter``) log rows
+    are queued for a bulk insert instead of being written one by one; the
+    caller decides when the writer flushes.
+    """
+
+    def __init__(self, deploy, *, writer=None):
         self.deploy = deploy
+        self.writer = writer
         self.database = settings.DEPLOYMENT_LOG_DB_ALIAS
         self.channel_layer = get_channel_layer()
         self.group_name = f"deploy_{deploy.pk}"
@@ -60,19 +66,26 @@ class DeploymentEventPipeline:
         if traceback_text:
             payload["traceback"] = sanitize(traceback_text)
 
+        fields = dict(
+            deploy_id=self.deploy.pk,
+            service_id=self.deploy.service_id,
+            stage=event.stage,
+            event_type=payload["event"],
+            level=event.level.lower(),
+            message=payload["message"],
+            progress=event.progress,
+            details=details,
+            exception_type=payload.get("exception_type", ""),
+            traceback=payload.get("traceback", ""),
+        )
         try:
-            log = DeployLog.objects.using(self.database).create(
-                deploy_id=self.deploy.pk,
-                service_id=self.deploy.service_id,
-                stage=event.stage,
-                event_type=payload["event"],
-                level=event.level.lower(),
-                message=payload["message"],
-                progress=event.progress,
-                details=details,
-                exception_type=payload.get("exception_type", ""),
-                traceback=payload.get("traceback", ""),
-            )
+            if self.writer is not None:
+                # The primary key is a client-side UUID, so the payload can
+                # carry the id before the row is actually inserted.
+                log = DeployLog(**fields)
+                self.writer.add_log(log)
+            else:
+                log = DeployLog.objects.using(self.database).create(**fields)
             payload["id"] = str(log.pk)
         except Exception:
             logger.exception("Unable to persist deployment event for %s.", self.deploy.pk)
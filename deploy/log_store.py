@@ -0,0 +1,450 @@
+"""Storage layout and housekeeping for the deployment log database.
+
+``DeployLog`` is written at build-output rate and read back a page at a
+time per deployment, so the table is shaped for exactly that:
+
+* a ``(deploy_id, created_at, id)`` index; pages are keyset cursors of
+  ``"<created_at iso>|<id>"`` so rows sharing a timestamp are neither
+  skipped nor repeated (``encode_cursor`` / ``parse_cursor`` /
+  ``keyset_filter``);
+* the table is ``PARTITION BY RANGE (created_at)`` with one partition per
+  month, ``<table>_pYYYYMM``, created ``DEPLOY_LOG_PARTITIONS_AHEAD``
+  months in advance (the primary key becomes ``(id, created_at)`` because
+  Postgres requires the partition key in every unique constraint).  A
+  ``<table>_default`` partition catches rows past the last month, so a
+  missed housekeeping run never fails inserts; ``ensure_partitions`` moves
+  those rows into their month when it creates it;
+* ``DEPLOY_LOG_RETENTION`` deletes rows per stage / level::
+
+      DEPLOY_LOG_RETENTION = {
+          "default": 90,                       # days
+          "levels": {"debug": 7, "info": 30},
+          "stages": {"image_build": 14},       # wins over the level rule
+      }
+
+* partitions entirely older than ``DEPLOY_LOG_ARCHIVE_AFTER_DAYS`` are
+  detached, written to ``DEPLOY_LOG_ARCHIVE_DIR/<partition>.jsonl.gz``
+  (one ``row_to_json`` object per line) and dropped.
+
+``setup_deployment_log_db`` creates the layout and
+``manage_deployment_logs`` runs the periodic part (partitions, retention,
+archives); beat runs it daily (``deployments.celery.schedules``).
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Index, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+logger = logging.getLogger(__name__)
+
+CURSOR_SEPARATOR = "|"
+
+DEFAULT_PARTITIONS_AHEAD = 2
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_DELETE_BATCH = 5000
+
+
+# ============================================================
+# Cursors
+# ============================================================
+
+def encode_cursor(log) -> str:
+    return f"{log.created_at.isoformat()}{CURSOR_SEPARATOR}{log.pk}"
+
+
+def parse_cursor(value) -> Optional[Tuple[datetime, Optional[str]]]:
+    """``"<iso>|<id>"`` (or a bare timestamp) → ``(created_at, id or None)``."""
+    if not value:
+        return None
+    stamp, _, pk = str(value).partition(CURSOR_SEPARATOR)
+    dt = parse_datetime(stamp.strip().replace(" ", "+"))
+    if dt is None:
+        return None
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt, (pk.strip() or None)
+
+
+def keyset_filter(created_at: datetime, pk=None, *, newer: bool) -> Q:
+    """Rows strictly after (``newer``) or before the cursor position.
+
+    A bare timestamp cursor (no id) keeps the old strict-timestamp
+    semantics so cursors handed out before the id tiebreak still work.
+    """
+    op = "gt" if newer else "lt"
+    cond = Q(**{f"created_at__{op}": created_at})
+    if pk is not None:
+        cond |= Q(created_at=created_at, **{f"id__{op}": pk})
+    return cond
+
+
+# ============================================================
+# Settings
+# ============================================================
+
+def partitions_ahead() -> int:
+    return max(1, int(getattr(settings, "DEPLOY_LOG_PARTITIONS_AHEAD", DEFAULT_PARTITIONS_AHEAD)))
+
+
+def retention_policy() -> Dict:
+    policy = getattr(settings, "DEPLOY_LOG_RETENTION", None) or {}
+    return {
+        "default": policy.get("default", DEFAULT_RETENTION_DAYS),
+        "levels": {str(k).lower(): v for k, v in (policy.get("levels") or {}).items()},
+        "stages": dict(policy.get("stages") or {}),
+    }
+
+
+def archive_after_days() -> int:
+    """Partitions older than this are archived; defaults to the longest retention."""
+    configured = getattr(settings, "DEPLOY_LOG_ARCHIVE_AFTER_DAYS", None)
+    if configured:
+        return int(configured)
+    policy = retention_policy()
+    days = [d for d in (policy["default"], *policy["levels"].values(), *policy["stages"].values()) if d]
+    return int(max(days)) if days else DEFAULT_RETENTION_DAYS
+
+
+def archive_dir() -> str:
+    return str(getattr(settings, "DEPLOY_LOG_ARCHIVE_DIR", None) or os.path.join(settings.BASE_DIR, "deploy_log_archive"))
+
+
+# ============================================================
+# Partitions
+# ============================================================
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+
+def month_range(first: datetime, last: datetime) -> List[datetime]:
+    months, current = [], month_start(first)
+    last = month_start(last)
+    while current <= last:
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def is_partitioned(connection, table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s AND relkind IN ('r', 'p')", [table])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def list_partitions(connection, table: str) -> List[Tuple[str, Optional[datetime], Optional[datetime]]]:
+    """``(name, lower, upper)`` for every partition, oldest first (DEFAULT last)."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = %s
+            """,
+            [table],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        lower = upper = None
+        if bound and "FROM (" in bound:
+            # FOR VALUES FROM ('2026-10-01 00:00:00+00') TO ('2026-11-01 00:00:00+00')
+            parts = bound.split("'")
+            if len(parts) >= 4:
+                lower, upper = parse_datetime(parts[1]), parse_datetime(parts[3])
+        partitions.append((name, lower, upper))
+    partitions.sort(key=lambda p: (p[1] is None, p[1] or datetime.min.replace(tzinfo=dt_timezone.utc)))
+    return partitions
+
+
+def _create_partitioned_table(schema_editor, model) -> None:
+    """``CREATE TABLE … PARTITION BY RANGE (created_at)`` for ``model``."""
+    qn = schema_editor.quote_name
+    columns, params = [], []
+    for field in model._meta.local_fields:
+        definition, extra = schema_editor.column_sql(model, field)
+        if definition is None:
+            continue
+        check = field.db_parameters(connection=schema_editor.connection)["check"]
+        if check:
+            definition += " " + schema_editor.sql_check_constraint % {"check": check}
+        columns.append(f"{qn(field.column)} {definition.replace(' PRIMARY KEY', '')}")
+        params.extend(extra or [])
+    pk = model._meta.pk.column
+    columns.append(f"PRIMARY KEY ({qn(pk)}, {qn('created_at')})")
+    schema_editor.execute(
+        f"CREATE TABLE {qn(model._meta.db_table)} ({', '.join(columns)}) PARTITION BY RANGE ({qn('created_at')})",
+        params or None,
+    )
+    # Indexes on a partitioned parent cascade to every partition.
+    indexes = list(model._meta.indexes)
+    for field in model._meta.local_fields:
+        if field.db_index and not field.unique and not field.primary_key:
+            index = Index(fields=[field.name])
+            index.set_name_with_model(model)
+            indexes.append(index)
+    for index in indexes:
+        schema_editor.add_index(model, index)
+
+
+def ensure_default_partition(connection, table: str) -> bool:
+    name = default_partition_name(table)
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+        if cursor.fetchone():
+            return False
+        cursor.execute(f"CREATE TABLE {qn(name)} PARTITION OF {qn(table)} DEFAULT")
+    return True
+
+
+def _create_month(connection, table: str, name: str, start: datetime) -> int:
+    """Create one month partition, moving its rows out of DEFAULT first.
+
+    Postgres refuses to add a range that rows in the DEFAULT partition
+    already cover, so those rows are moved into a detached table that is
+    then attached.  Returns the number of rows moved.
+    """
+    qn = connection.ops.quote_name
+    default = default_partition_name(table)
+    end = add_months(start, 1)
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {qn(name)} (LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [default])
+        moved = 0
+        if cursor.fetchone():
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {qn(default)} WHERE created_at >= %s AND created_at < %s "
+                f"RETURNING *) INSERT INTO {qn(name)} SELECT * FROM moved",
+                [start, end],
+            )
+            moved = cursor.rowcount
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+    if moved:
+        logger.warning("moved %s deploy log rows from %s into %s", moved, default, name)
+    return moved
+
+
+def ensure_partitions(connection, table: str, first: Optional[datetime] = None, ahead: Optional[int] = None) -> List[str]:
+    """Create monthly partitions from ``first`` (default: now) up to ``ahead`` months out."""
+    now = timezone.now()
+    last = add_months(month_start(now), partitions_ahead() if ahead is None else ahead)
+    created = []
+    for start in month_range(first or now, last):
+        name = partition_name(table, start)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_class WHERE relname = %s", [name])
+            if cursor.fetchone():
+                continue
+        _create_month(connection, table, name, start)
+        created.append(name)
+    if ensure_default_partition(connection, table):
+        created.append(default_partition_name(table))
+    return created
+
+
+def create_log_table(connection, model) -> List[str]:
+    """Create the partitioned log table and its current partitions."""
+    with connection.schema_editor() as schema_editor:
+        _create_partitioned_table(schema_editor, model)
+    return ensure_partitions(connection, model._meta.db_table)
+
+
+def convert_to_partitioned(connection, model) -> int:
+    """Rebuild an existing plain log table as a partitioned one; returns rows moved."""
+    table = model._meta.db_table
+    legacy = f"{table}_unpartitioned"
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(f.column) for f in model._meta.local_fields)
+    with connection.schema_editor() as schema_editor:
+        schema_editor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+        # Index names are database-wide; free them for the new table.
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, legacy)
+        for name, info in constraints.items():
+            if info.get("index") or info.get("primary_key"):
+                schema_editor.execute(f"ALTER INDEX {qn(name)} RENAME TO {qn(name[:50] + '_old')}")
+        _create_partitioned_table(schema_editor, model)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT min(created_at) FROM {qn(legacy)}")
+            oldest = cursor.fetchone()[0]
+        ensure_partitions(connection, table, first=oldest)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {qn(table)} ({columns}) SELECT {columns} FROM {qn(legacy)}")
+            moved = cursor.rowcount
+        schema_editor.execute(f"DROP TABLE {qn(legacy)}")
+    return moved
+
+
+def ensure_keyset_index(connection, model) -> bool:
+    """Add the ``(deploy_id, created_at, id)`` index to an existing table."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(cursor, table)
+    missing = [index for index in model._meta.indexes if index.name not in existing]
+    if not missing:
+        return False
+    with connection.schema_editor() as schema_editor:
+        for index in missing:
+            schema_editor.add_index(model, index)
+    return True
+
+
+# ============================================================
+# Retention
+# ============================================================
+
+def retention_rules(policy: Optional[Dict] = None) -> List[Tuple[Q, int]]:
+    """``(condition, days)`` pairs; each row matches exactly one rule.
+
+    Precedence is stage, then level, then the default.  A ``None`` / 0
+    value keeps matching rows forever (until their partition is archived).
+    """
+    policy = policy or retention_policy()
+    stages, levels = policy["stages"], policy["levels"]
+    rules: List[Tuple[Q, int]] = []
+    for stage, days in stages.items():
+        rules.append((Q(stage=stage), days))
+    not_stage = ~Q(stage__in=list(stages)) if stages else Q()
+    for level, days in levels.items():
+        rules.append((Q(level__iexact=level) & not_stage, days))
+    default = not_stage
+    for level in levels:
+        default &= ~Q(level__iexact=level)
+    rules.append((default, policy["default"]))
+    return [(cond, int(days)) for cond, days in rules if days]
+
+
+def prune(using: str, *, batch_size: int = DEFAULT_DELETE_BATCH, now: Optional[datetime] = None, dry_run: bool = False) -> int:
+    """Delete rows past their retention in ``batch_size`` chunks."""
+    from .models import DeployLog
+
+    now = now or timezone.now()
+    total = 0
+    for cond, days in retention_rules():
+        cutoff = now - timedelta(days=days)
+        qs = DeployLog.objects.using(using).filter(cond, created_at__lt=cutoff)
+        if dry_run:
+            total += qs.count()
+            continue
+        while True:
+            ids = list(qs.order_by().values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            # created_at bound lets the planner prune partitions.
+            deleted, _ = DeployLog.objects.using(using).filter(id__in=ids, created_at__lt=cutoff).delete()
+            total += deleted
+            if len(ids) < batch_size:
+                break
+    return total
+
+
+# ============================================================
+# Archives
+# ============================================================
+
+def archivable_partitions(connection, table: str, *, now: Optional[datetime] = None) -> List[str]:
+    cutoff = (now or timezone.now()) - timedelta(days=archive_after_days())
+    return [name for name, _, upper in list_partitions(connection, table) if upper is not None and upper <= cutoff]
+
+
+def _write_archive(connection, partition: str, path: str) -> int:
+    tmp = f"{path}.part"
+    rows = 0
+    qn = connection.ops.quote_name
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(filename=os.path.basename(path)[:-3], mode="wb", fileobj=raw) as out:
+            with connection.chunked_cursor() as cursor:
+                cursor.execute(f"SELECT row_to_json(t)::text FROM {qn(partition)} t ORDER BY created_at, id")
+                while True:
+                    chunk = cursor.fetchmany(2000)
+                    if not chunk:
+                        break
+                    out.write("".join(f"{line}\n" for (line,) in chunk).encode("utf-8"))
+                    rows += len(chunk)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return rows
+
+
+def archive_partition(connection, table: str, partition: str, directory: Optional[str] = None) -> Tuple[str, int]:
+    """Detach ``partition``, gzip it to ``<dir>/<partition>.jsonl.gz`` and drop it.
+
+    The partition is detached first so readers stop seeing it; it is only
+    dropped once the archive file is complete on disk.
+    """
+    directory = directory or archive_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{partition}.jsonl.gz")
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(partition)}")
+    try:
+        rows = _write_archive(connection, partition, path)
+    except Exception:
+        logger.exception("deploy log archive of %s failed; re-attaching", partition)
+        _reattach(connection, table, partition)
+        raise
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE {qn(partition)}")
+    return path, rows
+
+
+def _reattach(connection, table: str, partition: str) -> None:
+    start = datetime.strptime(partition.rsplit("_p", 1)[1], "%Y%m").replace(tzinfo=dt_timezone.utc)
+    qn = connection.ops.quote_name
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(partition)} FOR VALUES FROM (%s) TO (%s)",
+                [start, add_months(start, 1)],
+            )
+    except Exception:
+        logger.exception("could not re-attach %s to %s", partition, table)
+
+
+def archive_cold_partitions(connection, table: str, *, now: Optional[datetime] = None, dry_run: bool = False) -> List[Tuple[str, int]]:
+    done = []
+    for partition in archivable_partitions(connection, table, now=now):
+        if dry_run:
+            done.append((partition, 0))
+            continue
+        path, rows = archive_partition(connection, table, partition)
+        logger.info("archived %s (%s rows) to %s", partition, rows, path)
+        done.append((path, rows))
+    return done
@@ -0,0 +1,124 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from deployments.core import buildkit
+from deployments.core.manager.image_manager import Image
+
+REQUIREMENTS = ["Django>=5.0,<6", "djangorestframework", "celery", "redis", "pillow", "gunicorn"]
+
+# Shape of the Django template before dependency-manifest-first ordering:
+# any change in the context invalidates the install layer.
+LEGACY_DOCKERFILE = """FROM python:3.12-slim
+WORKDIR /app
+COPY . /app
+RUN pip install --no-cache-dir -r requirements.txt
+CMD ["gunicorn", "app.wsgi:application"]
+"""
+
+CURRENT_DOCKERFILE = """FROM python:3.12-slim
+WORKDIR /app
+COPY requirements.txt /app/
+RUN pip install --no-cache-dir -r requirements.txt
+COPY . /app
+CMD ["gunicorn", "app.wsgi:application"]
+"""
+
+FIXTURE_FILES = {
+    "manage.py": "import sys\nfrom django.core.management import execute_from_command_line\n"
+                 "execute_from_command_line(sys.argv)\n",
+    "app/__init__.py": "",
+    "app/settings.py": "SECRET_KEY = 'bench'\nROOT_URLCONF = 'app.urls'\nINSTALLED_APPS = []\n",
+    "app/urls.py": "urlpatterns = []\n",
+    "app/wsgi.py": "from django.core.wsgi import get_wsgi_application\napplication = get_wsgi_application()\n",
+    "app/views.py": "REVISION = 0\n",
+}
+
+
+def _requirements(revision=None):
+    extra = [f"six=={('1.16.0', '1.17.0')[revision % 2]}"] if revision is not None else []
+    return "\n".join(REQUIREMENTS + extra) + "\n"
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a fixture Django project and time rebuilds after a code-only edit and after "
+        "adding a requirement, with the legacy layout and with manifest-first + cache mounts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Timed rebuilds per scenario.")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the benchmark images instead of removing them afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        runs = max(options["runs"], 1)
+        if not buildkit.buildkit_enabled():
+            self.stdout.write(
+                "DEPLOY_BUILD_BUILDKIT is off: the cached variant is built without cache mounts."
+            )
+        namespace = f"bench-{uuid.uuid4().hex[:8]}"
+        variants = (
+            ("legacy", LEGACY_DOCKERFILE),
+            ("cached", buildkit.add_cache_mounts(CURRENT_DOCKERFILE, namespace)),
+        )
+        images = []
+        root = tempfile.mkdtemp(prefix="bench-dependency-cache-")
+        try:
+            for label, dockerfile in variants:
+                context = os.path.join(root, label)
+                self._write_fixture(context)
+                image = Image(f"{namespace}-{label}", "latest", dockerfile, context_dir=context)
+                images.append(image)
+
+                started = time.perf_counter()
+                image.create()
+                self.stdout.write(f"{label:7} cold build {time.perf_counter() - started:.1f}s")
+
+                code = self._measure(runs, image, lambda n: self._edit(context, "app/views.py", f"REVISION = {n}\n"))
+                deps = self._measure(
+                    runs, image, lambda n: self._edit(context, "requirements.txt", _requirements(n))
+                )
+                self.stdout.write(
+                    f"{label:7} code-only p50={code[0]:.1f}s max={code[1]:.1f}s"
+                    f"  new requirement p50={deps[0]:.1f}s max={deps[1]:.1f}s"
+                )
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+            if options["keep"]:
+                self.stdout.write(f"Kept images {', '.join(i.image_ref for i in images)}.")
+            else:
+                for image in images:
+                    image.remove(force=True)
+
+    @staticmethod
+    def _write_fixture(context):
+        files = dict(FIXTURE_FILES, **{"requirements.txt": _requirements()})
+        for name, content in files.items():
+            path = os.path.join(context, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(content)
+
+    @staticmethod
+    def _edit(context, name, content):
+        with open(os.path.join(context, name), "w", encoding="utf-8") as fh:
+            fh.write(content)
+
+    @staticmethod
+    def _measure(runs, image, edit):
+        samples = []
+        for n in range(1, runs + 1):
+            edit(n)
+            started = time.perf_counter()
+            image.create()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples), max(samples)
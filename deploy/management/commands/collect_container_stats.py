@@ -0,0 +1,44 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from deployments.core.manager.client_manager import get_docker_client
+from deployments.core.stats_collector import StatsCollector
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream CPU/memory stats for every running managed container into "
+        "per-container Redis ring buffers (serves the service status API)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sample-seconds",
+            type=float,
+            default=None,
+            help="Seconds between stored samples (default: SERVICE_STATS_SAMPLE_SECONDS).",
+        )
+        parser.add_argument(
+            "--ring-size",
+            type=int,
+            default=None,
+            help="Samples kept per container (default: SERVICE_STATS_RING_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        collector = StatsCollector(
+            get_docker_client().api,
+            sample_interval=options["sample_seconds"],
+            size=options["ring_size"],
+        )
+
+        def _shutdown(signum, frame):
+            collector.stop()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+        self.stdout.write("Collecting container stats…")
+        collector.run()
+        self.stdout.write(self.style.SUCCESS("Stats collector stopped."))
@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from deploy import log_store
+from deploy.models import DeployLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Deployment log housekeeping: create upcoming monthly partitions, delete rows past their "
+        "DEPLOY_LOG_RETENTION and archive cold partitions to gzip files. Run daily."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--skip-partitions", action="store_true", help="Do not create upcoming partitions.")
+        parser.add_argument("--skip-prune", action="store_true", help="Do not apply the retention policy.")
+        parser.add_argument("--skip-archive", action="store_true", help="Do not archive cold partitions.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=log_store.DEFAULT_DELETE_BATCH,
+            help="Rows deleted per statement while pruning.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report what would be pruned/archived without changing anything.",
+        )
+
+    def handle(self, *args, **options):
+        alias = settings.DEPLOYMENT_LOG_DB_ALIAS
+        connection = connections[alias]
+        table = DeployLog._meta.db_table
+        dry_run = options["dry_run"]
+        partitioned = log_store.is_partitioned(connection, table)
+
+        if not options["skip_partitions"]:
+            if not partitioned:
+                raise CommandError(
+                    f"{table} on {alias} is not partitioned; run setup_deployment_log_db --partition first."
+                )
+            if dry_run:
+                self.stdout.write("Dry run: partitions not checked.")
+            else:
+                created = log_store.ensure_partitions(connection, table)
+                self.stdout.write(
+                    f"Created partitions: {', '.join(created)}." if created else "Partitions are up to date."
+                )
+
+        if not options["skip_prune"]:
+            removed = log_store.prune(alias, batch_size=max(options["batch_size"], 1), dry_run=dry_run)
+            verb = "Would delete" if dry_run else "Deleted"
+            self.stdout.write(f"{verb} {removed} deployment log rows past retention.")
+
+        if not options["skip_archive"] and partitioned:
+            archived = log_store.archive_cold_partitions(connection, table, dry_run=dry_run)
+            for target, rows in archived:
+                if dry_run:
+                    self.stdout.write(f"Would archive {target}.")
+                else:
+                    self.stdout.write(self.style.SUCCESS(f"Archived {rows} rows to {target}."))
+            if not archived:
+                self.stdout.write("No partitions to archive.")
@@ -2,11 +2,22 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import connections
 
+from deploy import log_store
 from deploy.models import DeployLog
 
 
 class Command(BaseCommand):
-    help = "Create/update the dedicated DeployLog table without running the deploy app migrations on the log database."
+    help = (
+        "Create/update the dedicated DeployLog table without running the deploy app migrations "
+        "on the log database. New tables are range-partitioned by month on created_at."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--partition",
+            action="store_true",
+            help="Rebuild an existing unpartitioned log table as a partitioned one (copies every row).",
+        )
 
     def handle(self, *args, **options):
         alias = settings.DEPLOYMENT_LOG_DB_ALIAS
@@ -17,12 +28,16 @@ class Command(BaseCommand):
         with connection.cursor() as cursor:
             existing_tables = connection.introspection.table_names(cursor)
 
-        with connection.schema_editor() as schema_editor:
-            if table not in existing_tables:
-                schema_editor.create_model(model)
-                self.stdout.write(self.style.SUCCESS(f"Created {table} on {alias}."))
-                return
+        if table not in existing_tables:
+            partitions = log_store.create_log_table(connection, model)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Created partitioned {table} on {alias} with partitions: {', '.join(partitions)}."
+                )
+            )
+            return
 
+        with connection.schema_editor() as schema_editor:
             # Keep an already existing log table compatible with the current model.
             description = connection.introspection.get_table_description(
                 connection.cursor(), table
@@ -41,7 +56,27 @@ class Command(BaseCommand):
                     f"Updated {table} on {alias}; added columns: {', '.join(added)}."
                 )
             )
-        else:
+
+        if log_store.ensure_keyset_index(connection, model):
+            self.stdout.write(self.style.SUCCESS(f"Added the keyset index to {table}."))
+
+        if not log_store.is_partitioned(connection, table):
+            if not options["partition"]:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{table} on {alias} is not partitioned; run with --partition to convert it."
+                    )
+                )
+                return
+            moved = log_store.convert_to_partitioned(connection, model)
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt {table} as a partitioned table ({moved} rows moved).")
+            )
+
+        created = log_store.ensure_partitions(connection, table)
+        if created:
+            self.stdout.write(self.style.SUCCESS(f"Created partitions: {', '.join(created)}."))
+        elif not added:
             self.stdout.write(
                 self.style.SUCCESS(f"{table} on {alias} is already up to date.")
             )
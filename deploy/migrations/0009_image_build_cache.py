@@ -0,0 +1,35 @@
+# Generated by Django 5.2.11 on 2026-10-18 11:52
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deploy', '0008_deploylog_event_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBuildCache',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+                ('digest', models.CharField(max_length=64, unique=True, verbose_name='Build Digest')),
+                ('image_id', models.CharField(max_length=128, verbose_name='Image ID')),
+                ('image_ref', models.CharField(blank=True, default='', max_length=255, verbose_name='Image Reference')),
+                ('build_seconds', models.FloatField(default=0.0, verbose_name='Build Seconds')),
+                ('build_count', models.PositiveIntegerField(default=0, verbose_name='Builds')),
+                ('hit_count', models.PositiveIntegerField(default=0, verbose_name='Cache Hits')),
+                ('seconds_saved', models.FloatField(default=0.0, verbose_name='Seconds Saved')),
+                ('last_used_at', models.DateTimeField(blank=True, null=True, verbose_name='Last Used')),
+            ],
+            options={
+                'verbose_name': 'Image Build Cache Entry',
+                'verbose_name_plural': 'Image Build Cache',
+                'ordering': ('-last_used_at',),
+            },
+        ),
+    ]
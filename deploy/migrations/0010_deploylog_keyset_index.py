@@ -0,0 +1,17 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deploy', '0009_image_build_cache'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deploylog',
+            index=models.Index(fields=['deploy', 'created_at', 'id'], name='deploylog_deploy_created_id'),
+        ),
+    ]
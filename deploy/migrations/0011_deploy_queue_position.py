@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-18 12:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('deploy', '0010_deploylog_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deploy',
+            name='queue_eta',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Estimated Build Start'),
+        ),
+        migrations.AddField(
+            model_name='deploy',
+            name='queue_position',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Queue Position'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("deploy", "0011_deploy_queue_position"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="deploy",
+            index=GinIndex(fields=["name"], name="deploy_name_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.core.exceptions import ValidationError
 from core.base.BaseModel import BaseModel
@@ -59,6 +60,9 @@ class Deploy(BaseModel):
     volume_status = models.CharField(_("Volume Status"), max_length=64, blank=True, default="")
     network_status = models.CharField(_("Network Status"), max_length=64, blank=True, default="")
     cancel_requested = models.BooleanField(_("Cancel Requested"), default=False)
+    # Maintained by deployments.celery.scheduler while the deploy waits to build.
+    queue_position = models.PositiveIntegerField(_("Queue Position"), blank=True, null=True, editable=False)
+    queue_eta = models.DateTimeField(_("Estimated Build Start"), blank=True, null=True, editable=False)
     MAX_ZIP_SIZE_MB = 100
     # Set by admin API path to skip the zip size cap for staff/superuser uploads
     skip_zip_size_limit = False
@@ -66,6 +70,8 @@ class Deploy(BaseModel):
     class Meta:
         verbose_name = _("Deploy")
         verbose_name_plural = _("Deploy")
+        # ILIKE '%q%' admin/table search (core.search.substring_q)
+        indexes = [GinIndex(fields=["name"], name="deploy_name_trgm", opclasses=["gin_trgm_ops"])]
     
     def clean(self):
         super().clean()
@@ -116,7 +122,59 @@ class DeployLog(BaseModel):
         verbose_name = _("Deploy Log")
         verbose_name_plural = _("Deploy Logs")
         ordering = ("created_at",)
+        indexes = [
+            # Keyset pagination per deployment (see deploy.log_store).
+            models.Index(fields=["deploy", "created_at", "id"], name="deploylog_deploy_created_id"),
+        ]
 
     def __str__(self):
         return f"Deployment {self.deploy_id}: {self.stage} - {self.level}"
 
+
+
+class ImageBuildCache(BaseModel):
+    """
+    Content-addressed index of built images (see deployments.core.build_cache).
+
+    ``digest`` covers the archive contents, rendered Dockerfile, build args
+    and platform config; ``image_id`` is the image that build produced.
+    """
+
+    digest = models.CharField(_("Build Digest"), max_length=64, unique=True)
+    image_id = models.CharField(_("Image ID"), max_length=128)
+    image_ref = models.CharField(_("Image Reference"), max_length=255, blank=True, default="")
+    build_seconds = models.FloatField(_("Build Seconds"), default=0.0)
+    build_count = models.PositiveIntegerField(_("Builds"), default=0)
+    hit_count = models.PositiveIntegerField(_("Cache Hits"), default=0)
+    seconds_saved = models.FloatField(_("Seconds Saved"), default=0.0)
+    last_used_at = models.DateTimeField(_("Last Used"), blank=True, null=True)
+
+    class Meta:
+        verbose_name = _("Image Build Cache Entry")
+        verbose_name_plural = _("Image Build Cache")
+        ordering = ("-last_used_at",)
+
+    def __str__(self):
+        return f"{self.digest[:12]} -> {self.image_id[:19]}"
+
+    @classmethod
+    def stats(cls) -> dict:
+        """Aggregate hit rate and time saved across all entries."""
+        from django.db.models import Count, Sum
+
+        agg = cls.objects.aggregate(
+            entries=Count("id"),
+            builds=Sum("build_count"),
+            hits=Sum("hit_count"),
+            seconds_saved=Sum("seconds_saved"),
+        )
+        builds = int(agg["builds"] or 0)
+        hits = int(agg["hits"] or 0)
+        lookups = builds + hits
+        return {
+            "entries": int(agg["entries"] or 0),
+            "builds": builds,
+            "hits": hits,
+            "hit_rate": round(100.0 * hits / lookups, 1) if lookups else 0.0,
+            "seconds_saved": round(float(agg["seconds_saved"] or 0.0), 1),
+        }
@@ -48,6 +48,7 @@ class DeploySerializer(serializers.ModelSerializer):
             "status_message", "error_message", "rollback_status",
             "health_status", "container_status", "image_status",
             "volume_status", "network_status",
+            "queue_position", "queue_eta",
             "recent_logs", "created_at", "updated_at",
         ]
         read_only_fields = [
@@ -55,6 +56,7 @@ class DeploySerializer(serializers.ModelSerializer):
             "status_message", "error_message", "rollback_status",
             "health_status", "container_status", "image_status",
             "volume_status", "network_status",
+            "queue_position", "queue_eta",
             "recent_logs", "created_at", "updated_at", "updated_file_at",
         ]
 
@@ -66,7 +68,7 @@ class DeploySerializer(serializers.ModelSerializer):
                 DeployLog.objects
                 .using(settings.DEPLOYMENT_LOG_DB_ALIAS)
                 .filter(deploy_id=obj.pk)
-                .order_by("-created_at")[:20]
+                .order_by("-created_at", "-id")[:20]
             )
             return DeployLogSerializer(reversed(list(logs)), many=True).data
         except (OperationalError, InterfaceError, ProgrammingError) as exc:
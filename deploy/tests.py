@@ -83,3 +83,271 @@ class DeploymentEventPipelineTests(SimpleTestCase):
             "deploy_deploy-1",
             {"type": "deployment.message", "payload": payload},
         )
+
+
+class _FakeClock:
+    def __init__(self, step=0.01):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        return self.now
+
+    def advance(self):
+        self.now += self.step
+
+
+@override_settings(DEPLOYMENT_LOG_DB_ALIAS="deployment_logs")
+class BufferedDeployWriterTests(SimpleTestCase):
+    def make_writer(self, **kwargs):
+        from deploy.event_buffer import BufferedDeployWriter
+
+        kwargs.setdefault("flush_interval", 10.0)
+        kwargs.setdefault("max_batch", 50)
+        return BufferedDeployWriter("deploy-1", clock=_FakeClock(), **kwargs)
+
+    @patch("deploy.event_buffer.DeployLog.objects")
+    @patch("deploy.event_buffer.Deploy.objects")
+    def test_updates_coalesce_last_write_wins_until_stage_changes(self, deploys, logs):
+        from deploy.models import DeployLog
+
+        writer = self.make_writer()
+        writer.note_event("image_build")  # first stage flushes (nothing pending)
+        for progress in (21, 22, 23):
+            writer.update_deploy(stage="image_build", progress=progress)
+            writer.add_log(DeployLog(stage="image_build", message=str(progress)))
+            writer.note_event("image_build")
+        deploys.filter.return_value.update.assert_not_called()
+
+        writer.update_deploy(stage="network_creation", progress=36)
+        writer.note_event("network_creation")
+
+        deploys.filter.return_value.update.assert_called_once_with(stage="network_creation", progress=36)
+        logs.using.assert_called_once_with("deployment_logs")
+        rows = logs.using.return_value.bulk_create.call_args.args[0]
+        self.assertEqual([row.message for row in rows], ["21", "22", "23"])
+        self.assertFalse(writer.pending)
+
+    @patch("deploy.event_buffer.DeployLog.objects")
+    @patch("deploy.event_buffer.Deploy.objects")
+    def test_forced_flush_and_terminal_success_guard(self, deploys, logs):
+        writer = self.make_writer(guard_terminal_success=True)
+        writer.note_event("deployment_completed")
+        writer.update_deploy(status="succeeded", progress=100)
+        writer.note_event("deployment_completed", force=True)
+
+        deploys.filter.return_value.exclude.assert_called_once()
+        deploys.filter.return_value.exclude.return_value.update.assert_called_once_with(
+            status="succeeded", progress=100,
+        )
+
+    @patch("deploy.event_buffer.DeployLog.objects")
+    @patch("deploy.event_buffer.Deploy.objects")
+    def test_log_database_failure_does_not_block_deploy_update(self, deploys, logs):
+        from deploy.models import DeployLog
+
+        logs.using.return_value.bulk_create.side_effect = OperationalError("log database unavailable")
+        writer = self.make_writer()
+        writer.update_deploy(progress=5)
+        writer.add_log(DeployLog(stage="validation", message="ok"))
+        writer.flush()
+
+        deploys.filter.return_value.update.assert_called_once_with(progress=5)
+        self.assertEqual(writer.log_rows, 0)
+
+
+@override_settings(DEPLOYMENT_LOG_DB_ALIAS="deployment_logs")
+class DeploymentStateEventWriteBenchmark(SimpleTestCase):
+    """
+    Count DB round trips for a synthetic deploy trace.
+
+    "before" replays the trace with flushing on every event and the cancel
+    flag read per event (the unbuffered behaviour); "after" uses the
+    default buffering.
+    """
+
+    BUILD_LINES = 300
+
+    def trace(self):
+        yield DeploymentEvent(stage="validation", message="Validating.", progress=5)
+        yield DeploymentEvent(stage="prepare_resources", message="Preparing.", progress=10)
+        yield DeploymentEvent(stage="image_build", message="Building Docker image.", progress=20)
+        for i in range(self.BUILD_LINES):
+            yield DeploymentEvent(stage="image_build", message=f"Step {i}: RUN something", progress=25)
+        yield DeploymentEvent(stage="image_build", message="Docker image built successfully.", progress=35)
+        yield DeploymentEvent(stage="network_creation", message="Networks.", progress=36)
+        yield DeploymentEvent(stage="volume_creation", message="Volumes.", progress=40)
+        yield DeploymentEvent(stage="container_creation", message="Creating.", progress=65)
+        yield DeploymentEvent(stage="container_startup", message="Starting.", progress=80)
+        yield DeploymentEvent(stage="health_check", message="Healthy.", progress=86)
+        yield DeploymentEvent(stage="deployment_completed", message="Done.", progress=100)
+
+    def run_trace(self, *, buffered):
+        from functools import partial
+
+        from deploy.deployment_state import DjangoDeploymentState
+        from deploy.event_buffer import BufferedDeployWriter
+
+        clock = _FakeClock(step=0.01)
+        writer_kwargs = {"clock": clock} if buffered else {"clock": clock, "flush_interval": 0, "max_batch": 1}
+        deploy = SimpleNamespace(pk="deploy-1", service_id="service-1", stage="", progress=0, rollback_status="not_required")
+        # deploy_state and event_buffer share the Deploy class, so one patch
+        # covers both the cancel-flag reads and the buffered UPDATEs.
+        with patch("deploy.models.Deploy.objects") as deploys, \
+                patch("deploy.models.DeployLog.objects") as logs, \
+                patch("deploy.deployment_state.time.monotonic", clock), \
+                patch("deploy.deployment_state.CANCEL_CHECK_INTERVAL_SEC", 1.0 if buffered else 0), \
+                patch("deploy.deployment_state.BufferedDeployWriter", partial(BufferedDeployWriter, **writer_kwargs)), \
+                patch("deploy.event_pipeline.get_channel_layer", return_value=None):
+            deploys.filter.return_value.exists.return_value = False
+            state = DjangoDeploymentState(deploy)
+            for event in self.trace():
+                clock.advance()
+                state.event_sink(event)
+            stats = state.writer.stats()
+            stats["cancel_queries"] = deploys.filter.return_value.exists.call_count
+            stats["deploy_updates"] = deploys.filter.return_value.update.call_count
+            stats["log_inserts"] = logs.using.return_value.bulk_create.call_count
+        stats["round_trips"] = stats["cancel_queries"] + stats["deploy_updates"] + stats["log_inserts"]
+        return stats
+
+    def test_buffering_cuts_writes_per_deploy(self):
+        before = self.run_trace(buffered=False)
+        after = self.run_trace(buffered=True)
+
+        self.assertEqual(before["round_trips"], 3 * before["events"])
+        self.assertEqual(after["log_rows"], before["log_rows"])
+        self.assertLess(after["round_trips"] * 10, before["round_trips"])
+
+
+class DeployLogStoreTests(SimpleTestCase):
+    def test_cursor_round_trip_carries_id_tiebreak(self):
+        from datetime import datetime, timezone as dt_timezone
+
+        from deploy import log_store
+
+        created_at = datetime(2026, 10, 18, 12, 0, 0, 5, tzinfo=dt_timezone.utc)
+        cursor = log_store.encode_cursor(SimpleNamespace(created_at=created_at, pk="log-7"))
+
+        self.assertEqual(log_store.parse_cursor(cursor), (created_at, "log-7"))
+        # a "+" offset that arrived unencoded in the query string
+        self.assertEqual(log_store.parse_cursor(cursor.replace("+", " ")), (created_at, "log-7"))
+        self.assertEqual(log_store.parse_cursor(created_at.isoformat()), (created_at, None))
+        self.assertIsNone(log_store.parse_cursor("yesterday"))
+
+    def test_keyset_filter_breaks_timestamp_ties_on_id(self):
+        from deploy import log_store
+
+        newer = str(log_store.keyset_filter("T", "log-7", newer=True))
+        self.assertIn("created_at__gt", newer)
+        self.assertIn("id__gt", newer)
+        self.assertNotIn("id", str(log_store.keyset_filter("T", None, newer=False)).replace("created_at", ""))
+
+    def test_month_partitions(self):
+        from datetime import datetime, timezone as dt_timezone
+
+        from deploy import log_store
+
+        start = log_store.month_start(datetime(2026, 11, 30, 23, 59, tzinfo=dt_timezone.utc))
+        months = log_store.month_range(start, log_store.add_months(start, 2))
+
+        self.assertEqual(
+            [log_store.partition_name("deploy_deploylog", m) for m in months],
+            ["deploy_deploylog_p202611", "deploy_deploylog_p202612", "deploy_deploylog_p202701"],
+        )
+
+    def _fake_connection(self, existing):
+        statements = []
+
+        class _Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                statements.append(sql)
+                self._row = (1,) if sql.startswith("SELECT 1") and params[0] in existing else None
+                if sql.startswith("CREATE TABLE") and "DEFAULT" in sql:
+                    existing.add(sql.split('"')[1])
+                self.rowcount = 3 if sql.startswith("WITH moved") else 0
+
+            def fetchone(self):
+                return self._row
+
+        connection = SimpleNamespace(
+            alias="deploy_logs",
+            cursor=_Cursor,
+            ops=SimpleNamespace(quote_name=lambda name: f'"{name}"'),
+        )
+        return connection, statements
+
+    def test_months_are_carved_out_of_the_default_partition(self):
+        from contextlib import nullcontext
+        from datetime import datetime, timezone as dt_timezone
+        from unittest import mock
+
+        from deploy import log_store
+
+        connection, statements = self._fake_connection({"deploy_deploylog_default"})
+        now = datetime(2026, 10, 18, tzinfo=dt_timezone.utc)
+        with mock.patch.object(log_store.timezone, "now", return_value=now), \
+                mock.patch.object(log_store.transaction, "atomic", lambda **kw: nullcontext()):
+            created = log_store.ensure_partitions(connection, "deploy_deploylog", ahead=0)
+
+        self.assertEqual(created, ["deploy_deploylog_p202610"])
+        moved = [sql for sql in statements if sql.startswith("WITH moved")]
+        self.assertEqual(len(moved), 1)
+        self.assertIn('DELETE FROM "deploy_deploylog_default"', moved[0])
+        attach = [i for i, sql in enumerate(statements) if " ATTACH PARTITION " in sql]
+        self.assertEqual(len(attach), 1)
+        self.assertLess(statements.index(moved[0]), attach[0])
+
+    def test_default_partition_is_created_when_missing(self):
+        from deploy import log_store
+
+        connection, statements = self._fake_connection(set())
+        self.assertTrue(log_store.ensure_default_partition(connection, "deploy_deploylog"))
+        self.assertIn('PARTITION OF "deploy_deploylog" DEFAULT', statements[-1])
+        self.assertFalse(log_store.ensure_default_partition(connection, "deploy_deploylog"))
+
+    def test_partitioned_table_indexes_use_schema_editor_add_index(self):
+        from unittest import mock
+
+        from deploy import log_store
+        from deploy.models import DeployLog
+
+        editor = mock.MagicMock()
+        editor.column_sql.return_value = (None, None)
+        editor.quote_name.side_effect = lambda name: f'"{name}"'
+        log_store._create_partitioned_table(editor, DeployLog)
+
+        names = [c.args[1].name for c in editor.add_index.call_args_list]
+        self.assertIn("deploylog_deploy_created_id", names)
+        fields = [c.args[1].fields for c in editor.add_index.call_args_list]
+        self.assertIn(["deploy"], fields)
+        self.assertIn(["service"], fields)
+
+    def test_housekeeping_is_scheduled_daily(self):
+        from django.conf import settings
+
+        entry = settings.CELERY_BEAT_SCHEDULE["deployment_logs_housekeeping"]
+        self.assertEqual(entry["task"], "deployments.celery.schedules.manage_deployment_logs")
+
+    @override_settings(
+        DEPLOY_LOG_RETENTION={"default": 90, "levels": {"DEBUG": 7, "error": None}, "stages": {"image_build": 14}},
+        DEPLOY_LOG_ARCHIVE_AFTER_DAYS=None,
+    )
+    def test_retention_rules_give_stage_precedence_over_level(self):
+        from deploy import log_store
+
+        rules = log_store.retention_rules()
+
+        self.assertEqual([days for _, days in rules], [14, 7, 90])
+        debug_rule = str(rules[1][0])
+        self.assertIn("'level__iexact', 'debug'", debug_rule)
+        self.assertIn("'stage__in', ['image_build']", debug_rule)
+        default_rule = str(rules[2][0])
+        self.assertIn("'level__iexact', 'error'", default_rule)
+        self.assertEqual(log_store.archive_after_days(), 90)
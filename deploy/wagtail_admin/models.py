@@ -5,7 +5,7 @@ from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
 from cms.wagtail_admin.utils import panels_for, read_only_panels
-from deploy.models import Deploy, DeployLog
+from deploy.models import Deploy, DeployLog, ImageBuildCache
 from wagtail.permission_policies.base import ModelPermissionPolicy
 from wagtail.snippets.views.snippets import SnippetViewSet, SnippetViewSetGroup
 
@@ -115,10 +115,48 @@ class DeployLogViewSet(SnippetViewSet):
         return DeployLog.objects.using(alias).all()
 
 
+class ImageBuildCacheViewSet(SnippetViewSet):
+    model = ImageBuildCache
+    icon = "repeat"
+    menu_label = _("Build cache")
+    menu_order = 106
+    permission_policy = ReadOnlyModelPermissionPolicy(ImageBuildCache)
+    list_display = [
+        "digest",
+        "image_ref",
+        "build_count",
+        "hit_count",
+        "build_seconds",
+        "seconds_saved",
+        "last_used_at",
+    ]
+    search_fields = ["digest", "image_id", "image_ref"]
+    ordering = ["-last_used_at"]
+    list_per_page = 50
+    # Entries are written by the build pipeline; hit rate and seconds
+    # saved are summarised on the Django admin changelist.
+    panels = read_only_panels(
+        [
+            "id",
+            "digest",
+            "image_id",
+            "image_ref",
+            "build_seconds",
+            "build_count",
+            "hit_count",
+            "seconds_saved",
+            "last_used_at",
+            "created_at",
+            "updated_at",
+        ]
+    )
+
+
 class DeployGroup(SnippetViewSetGroup):
     items = (
         DeployViewSet,
         DeployLogViewSet,
+        ImageBuildCacheViewSet,
     )
     menu_label = _("Deploy")
     menu_icon = "upload"
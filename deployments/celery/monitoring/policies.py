@@ -59,3 +59,15 @@ ACTIVE_SERVICE_STATUSES: tuple = (
     # the container is actually up, and downgrade to failed when it is not.
     "succeeded",
 )
+
+# ---------------------------------------------------------------------------
+# Runtime index (one Docker snapshot + /events per tick)
+# ---------------------------------------------------------------------------
+
+# Label carried by every container this platform creates; used to scope the
+# container list snapshot and the /events stream.
+MANAGED_CONTAINER_LABEL: str = "managed-by=django-paas-deployer"
+
+# The index is rebuilt from a full ``containers`` snapshot at least this
+# often; between resyncs it is advanced from the Docker /events stream.
+RUNTIME_RESYNC_SECONDS: int = 300
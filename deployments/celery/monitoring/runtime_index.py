@@ -0,0 +1,251 @@
+"""
+deployments/celery/monitoring/runtime_index.py
+----------------------------------------------
+Docker runtime state for every managed container, kept in one index.
+
+The monitor used to call ``Container.inspect_runtime()`` once per active
+deploy and once per active service on every tick.  ``ContainerRuntimeIndex``
+replaces that with O(1) Docker calls per tick:
+
+  * a full snapshot from one ``/containers/json?all=1`` call, taken on a
+    cold start and then every ``RUNTIME_RESYNC_SECONDS``;
+  * in between, the index is advanced from the Docker ``/events`` stream
+    (start / die / destroy / rename / health_status …) drained from the
+    previous tick's cursor up to "now".
+
+The index is stored in the Django cache so consecutive ticks on different
+workers share it.  Entries use the same dict shape as
+``Container.inspect_runtime()`` so the reconciliation rules do not care
+where the state came from.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from typing import Any, Iterable, Optional
+
+from django.core.cache import cache
+
+from .policies import MANAGED_CONTAINER_LABEL, RUNTIME_RESYNC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_KEY = "monitor:runtime_index"
+
+MISSING_RUNTIME: dict[str, Any] = {
+    "exists": False, "running": False, "status": "missing",
+    "exit_code": None, "health": None, "restart_count": None,
+}
+
+# Container lifecycle actions that change what the monitor cares about.
+# (Docker matches ``health_status`` against ``health_status: <state>``.)
+WATCHED_EVENTS = (
+    "create", "start", "restart", "die", "kill", "oom", "stop",
+    "pause", "unpause", "destroy", "rename", "health_status",
+)
+
+_EXIT_CODE_RE = re.compile(r"exited \((-?\d+)\)", re.IGNORECASE)
+_HEALTH_RE = re.compile(r"\((healthy|unhealthy|health: starting)\)", re.IGNORECASE)
+
+
+def _runtime_from_summary(summary: dict) -> dict[str, Any]:
+    """Runtime dict from one ``/containers/json`` entry (no inspect)."""
+    state = str(summary.get("State") or "").lower()
+    status_text = str(summary.get("Status") or "")
+    exit_code = None
+    match = _EXIT_CODE_RE.search(status_text)
+    if match:
+        exit_code = int(match.group(1))
+    health = None
+    match = _HEALTH_RE.search(status_text)
+    if match:
+        health = match.group(1).lower().replace("health: ", "")
+    return {
+        "exists": True,
+        "running": state == "running",
+        "status": state or "unknown",
+        "exit_code": exit_code,
+        "health": health,
+        "restart_count": None,
+    }
+
+
+def _container_name(names: Iterable[str] | None) -> Optional[str]:
+    for name in names or ():
+        name = (name or "").lstrip("/")
+        # Linked containers show up as "/other/alias"; skip those.
+        if name and "/" not in name:
+            return name
+    return None
+
+
+class ContainerRuntimeIndex:
+    """``container name -> runtime dict`` plus the /events cursor."""
+
+    def __init__(
+        self,
+        states: Optional[dict[str, dict[str, Any]]] = None,
+        *,
+        cursor: Optional[int] = None,
+        synced_at: Optional[float] = None,
+    ):
+        self.states: dict[str, dict[str, Any]] = dict(states or {})
+        self.cursor = cursor
+        self.synced_at = synced_at
+        self.events_applied = 0
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def snapshot(cls, api, *, now: Optional[float] = None) -> "ContainerRuntimeIndex":
+        """One ``containers(all=True)`` call filtered to managed containers."""
+        now = time.time() if now is None else now
+        summaries = api.containers(all=True, filters={"label": MANAGED_CONTAINER_LABEL})
+        states = {}
+        for summary in summaries or ():
+            name = _container_name(summary.get("Names"))
+            if name:
+                states[name] = _runtime_from_summary(summary)
+        return cls(states, cursor=int(now), synced_at=now)
+
+    def apply_event(self, event: dict) -> Optional[str]:
+        """Fold one Docker event into the index; returns the container name."""
+        if (event.get("Type") or event.get("type")) not in (None, "container"):
+            return None
+        action = str(event.get("Action") or event.get("status") or "")
+        attrs = (event.get("Actor") or {}).get("Attributes") or {}
+        name = (attrs.get("name") or "").lstrip("/")
+        if not name:
+            return None
+
+        if action == "destroy":
+            self.states.pop(name, None)
+            return name
+        if action == "rename":
+            old = (attrs.get("oldName") or "").lstrip("/")
+            self.states[name] = self.states.pop(old, None) or dict(MISSING_RUNTIME, exists=True, status="created")
+            return name
+
+        state = dict(self.states.get(name) or MISSING_RUNTIME)
+        state["exists"] = True
+        if action == "create":
+            state.update(running=False, status="created", exit_code=None, health=None)
+        elif action in ("start", "restart", "unpause"):
+            state.update(running=True, status="running", exit_code=None)
+        elif action == "pause":
+            state.update(running=True, status="paused")
+        elif action == "die":
+            exit_code = attrs.get("exitCode")
+            try:
+                exit_code = int(exit_code) if exit_code is not None else None
+            except (TypeError, ValueError):
+                exit_code = None
+            state.update(running=False, status="exited", exit_code=exit_code)
+        elif action.startswith("health_status"):
+            state["health"] = action.split(":", 1)[-1].strip() or None
+        else:
+            # kill / oom / stop are always followed by "die".
+            return None
+        self.states[name] = state
+        return name
+
+    def drain_events(self, api, *, until: int) -> set[str]:
+        """
+        Apply every event from the cursor up to ``until`` (exclusive stream
+        end); returns the container names that changed.
+
+        The window starts one second before the cursor: Docker timestamps
+        have second granularity, and replaying a boundary event in order
+        is harmless.
+        """
+        since = max(0, int(self.cursor or until) - 1)
+        changed: set[str] = set()
+        stream = api.events(
+            since=since,
+            until=until,
+            filters={
+                "type": "container",
+                "label": MANAGED_CONTAINER_LABEL,
+                "event": list(WATCHED_EVENTS),
+            },
+            decode=True,
+        )
+        for event in stream:
+            name = self.apply_event(event)
+            if name:
+                changed.add(name)
+                self.events_applied += 1
+        self.cursor = until
+        return changed
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, name: str) -> Optional[dict[str, Any]]:
+        return self.states.get(name)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_cache(self) -> dict[str, Any]:
+        return {"states": self.states, "cursor": self.cursor, "synced_at": self.synced_at}
+
+    @classmethod
+    def from_cache(cls, data: Any) -> Optional["ContainerRuntimeIndex"]:
+        if not isinstance(data, dict) or not isinstance(data.get("states"), dict):
+            return None
+        return cls(data["states"], cursor=data.get("cursor"), synced_at=data.get("synced_at"))
+
+
+def load_runtime_index(api, *, now: Optional[float] = None) -> tuple[Optional[ContainerRuntimeIndex], str]:
+    """
+    Current index for this tick and how it was obtained
+    (``"events"``, ``"snapshot"`` or ``"unavailable"``).
+
+    Never raises: if Docker cannot be reached the caller gets ``None`` and
+    falls back to per-container inspection.
+    """
+    now = time.time() if now is None else now
+    try:
+        index = ContainerRuntimeIndex.from_cache(cache.get(CACHE_KEY))
+    except Exception:
+        logger.debug("Runtime index cache read failed", exc_info=True)
+        index = None
+
+    if (
+        index is not None
+        and index.cursor is not None
+        and index.synced_at is not None
+        and now - float(index.synced_at) < RUNTIME_RESYNC_SECONDS
+    ):
+        try:
+            index.drain_events(api, until=int(now))
+            _save(index)
+            return index, "events"
+        except Exception:
+            logger.warning("Docker /events drain failed; taking a full snapshot.", exc_info=True)
+
+    try:
+        index = ContainerRuntimeIndex.snapshot(api, now=now)
+    except Exception:
+        logger.warning("Docker container snapshot failed; monitor falls back to inspect.", exc_info=True)
+        return None, "unavailable"
+    _save(index)
+    return index, "snapshot"
+
+
+def _save(index: ContainerRuntimeIndex) -> None:
+    try:
+        cache.set(CACHE_KEY, index.to_cache(), timeout=RUNTIME_RESYNC_SECONDS * 2)
+    except Exception:
+        logger.debug("Runtime index cache write failed", exc_info=True)
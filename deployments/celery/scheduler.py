@@ -0,0 +1,495 @@
+"""
+deployments/celery/scheduler.py
+-------------------------------
+Build scheduling: priorities, per-host admission and per-user fair share.
+
+Queues
+------
+``CELERY_TASK_ROUTES`` (settings) splits the work that used to share the
+single ``celery`` queue:
+
+build      ``deploy`` / ``run_db_deploy`` — consumed by the dedicated
+           ``celery-build`` worker, so a burst of builds cannot delay
+           anything else.
+control    ``stop``, ``monitor_services``, volume size scans.
+messaging  ``messenger.tasks.*`` (scheduled messages, fan-out, calls).
+media      attachment derivatives and avatar thumbnails (Pillow/ffmpeg) —
+           consumed by ``celery-media`` so a video upload cannot hold up
+           scheduled-message delivery.
+email      ``custom_emails.tasks.*`` and ``core.tasks.email.*``.
+
+Priorities
+----------
+Every deploy is published through :func:`enqueue_deploy` with a broker
+priority derived from its kind (rollback > restart > rebuild > build).  The
+Redis transport is configured with ``queue_order_strategy="priority"``,
+where 0 is consumed first.
+
+Admission
+---------
+Broker order alone cannot bound how many ``docker build`` runs hit one
+daemon, nor stop one user's ten uploads from starving everyone else.  So
+``Image.create`` wraps the actual build (cache hits skip it) in
+:func:`build_slot`, which waits until the admission controller grants the
+deploy a share of the host's build budget:
+
+* the budget is ``DEPLOY_BUILD_CPU_BUDGET`` vCPUs and
+  ``DEPLOY_BUILD_MEMORY_BUDGET_MB`` per Docker host (defaults: the daemon's
+  ``NCPU`` / ``MemTotal``); a build costs its container limits;
+* waiters are served in fair-share order — priority first, then the
+  user's running builds plus their place among that user's waiters, then
+  enqueue time — so users take turns instead of draining FIFO;
+* the head of the line is never overtaken: a large build waits for room
+  instead of being starved by small ones behind it.
+
+State lives in one Redis hash (deploy id -> JSON entry) guarded by a Redis
+lock; every transition goes through :func:`_mutate`.  Entries left behind
+by dead workers are reaped: slots after ``DEPLOY_BUILD_SLOT_TTL``, waiters
+that stop polling after a few poll intervals, queued entries after
+``DEPLOY_BUILD_QUEUED_TTL``.  Builds never run ungated: if Redis is
+unavailable the waiter keeps retrying with backoff and, after
+``DEPLOY_BUILD_ADMISSION_TIMEOUT`` seconds, fails with DeploymentLockError.
+
+``Deploy.queue_position`` / ``queue_eta`` are rewritten in one UPDATE on
+enqueue, on a deploy's first wait, on admission and on exit; the ETA uses
+an exponentially weighted average of recent build durations.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Callable, Iterator, NamedTuple, Optional
+
+from django.utils import timezone
+
+from deployments.common.exceptions import DeploymentCancelled, DeploymentLockError
+
+logger = logging.getLogger(__name__)
+
+QUEUE_BUILD = "build"
+QUEUE_CONTROL = "control"
+QUEUE_MESSAGING = "messaging"
+QUEUE_EMAIL = "email"
+QUEUE_MEDIA = "media"
+
+KIND_ROLLBACK = "rollback"
+KIND_RESTART = "restart"
+KIND_REBUILD = "rebuild"
+KIND_BUILD = "build"
+
+# Broker priorities (Redis transport: lower is consumed first).
+KIND_PRIORITY = {
+    KIND_ROLLBACK: 0,
+    KIND_RESTART: 2,
+    KIND_REBUILD: 4,
+    KIND_BUILD: 6,
+}
+
+STATE_QUEUED = "queued"
+STATE_WAITING = "waiting"
+STATE_BUILDING = "building"
+
+JOBS_KEY = "deploy:sched:jobs"
+LOCK_KEY = "deploy:sched:lock"
+DURATION_KEY = "deploy:sched:build_seconds"
+
+DEFAULT_BUILD_SECONDS = 120.0
+EWMA_ALPHA = 0.2
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _redis():
+    from django_redis import get_redis_connection
+    return get_redis_connection("default")
+
+
+def kind_priority(kind: str) -> int:
+    return KIND_PRIORITY.get(kind, KIND_PRIORITY[KIND_BUILD])
+
+
+def poll_seconds() -> float:
+    return float(_setting("DEPLOY_BUILD_SLOT_POLL_SECONDS", 2.0))
+
+
+def admission_timeout() -> float:
+    """Seconds a build keeps retrying while the scheduler is unreachable."""
+    return float(_setting("DEPLOY_BUILD_ADMISSION_TIMEOUT", 300))
+
+
+def _parallelism() -> int:
+    """Builds expected to run side by side; only used for the ETA."""
+    try:
+        from core import settings_service as svc
+        return max(1, int(svc.build_parallelism()))
+    except Exception:
+        return max(1, int(_setting("DEPLOY_BUILD_PARALLELISM", 1) or 1))
+
+
+# ---------------------------------------------------------------------------
+# Host budget
+# ---------------------------------------------------------------------------
+
+class HostBudget(NamedTuple):
+    host: str
+    cpu: float
+    memory_mb: int
+
+
+_host_budget: Optional[HostBudget] = None
+
+
+def host_budget(client=None) -> HostBudget:
+    """Build budget of the Docker host this worker talks to (cached)."""
+    global _host_budget
+    if _host_budget is not None:
+        return _host_budget
+    host = _setting("DEPLOY_BUILD_HOST_ID", "") or ""
+    cpu = _setting("DEPLOY_BUILD_CPU_BUDGET", None)
+    memory = _setting("DEPLOY_BUILD_MEMORY_BUDGET_MB", None)
+    if not host or cpu is None or memory is None:
+        info: dict = {}
+        try:
+            if client is None:
+                from deployments.core.manager.client_manager import Client
+                client = Client()()
+            info = client.info() or {}
+        except Exception:
+            logger.warning("Docker info unavailable; using fallback build budget", exc_info=True)
+        host = host or info.get("ID") or info.get("Name") or "default"
+        if cpu is None:
+            cpu = info.get("NCPU") or 2
+        if memory is None:
+            memory = int(info.get("MemTotal") or 4096 * 1024 * 1024) // (1024 * 1024)
+    _host_budget = HostBudget(str(host), float(cpu), int(memory))
+    return _host_budget
+
+
+def build_cost(limits: dict, budget: HostBudget) -> tuple[float, int]:
+    """(vCPU, MB) a build with these container limits takes from the budget.
+
+    Clamped to the budget so an oversized build still runs — alone.
+    """
+    cpu = float(limits.get("NanoCpus") or 1_000_000_000) / 1_000_000_000
+    memory = int(limits.get("Memory") or 0) // (1024 * 1024)
+    return min(cpu, budget.cpu), min(memory, budget.memory_mb)
+
+
+# ---------------------------------------------------------------------------
+# Pure scheduling logic (entries are plain dicts keyed by deploy id)
+# ---------------------------------------------------------------------------
+
+def fair_order(entries: dict[str, dict]) -> list[dict]:
+    """Entries that are not building yet, in the order they should run."""
+    running: dict[str, int] = {}
+    for entry in entries.values():
+        if entry.get("state") == STATE_BUILDING:
+            running[entry.get("user")] = running.get(entry.get("user"), 0) + 1
+
+    pending = sorted(
+        (e for e in entries.values() if e.get("state") != STATE_BUILDING),
+        key=lambda e: (e.get("priority", 0), e.get("enqueued", 0.0), e["id"]),
+    )
+    seen: dict[str, int] = {}
+    keyed = []
+    for entry in pending:
+        user = entry.get("user")
+        turn = running.get(user, 0) + seen.get(user, 0)
+        seen[user] = seen.get(user, 0) + 1
+        keyed.append(((entry.get("priority", 0), turn, entry.get("enqueued", 0.0), entry["id"]), entry))
+    keyed.sort(key=lambda item: item[0])
+    return [entry for _key, entry in keyed]
+
+
+def reap(entries: dict[str, dict], now: float) -> bool:
+    """Drop or demote entries abandoned by dead workers.  True if changed."""
+    slot_ttl = float(_setting("DEPLOY_BUILD_SLOT_TTL", 3600))
+    queued_ttl = float(_setting("DEPLOY_BUILD_QUEUED_TTL", 6 * 3600))
+    stale_wait = poll_seconds() * 5
+    changed = False
+    for key, entry in list(entries.items()):
+        state = entry.get("state")
+        if state == STATE_BUILDING and now - entry.get("started", now) > slot_ttl:
+            logger.warning("Reclaiming expired build slot of deploy %s", key)
+            del entries[key]
+            changed = True
+        elif state == STATE_WAITING and now - entry.get("seen", now) > stale_wait:
+            entry["state"] = STATE_QUEUED
+            changed = True
+        elif state == STATE_QUEUED and now - entry.get("enqueued", now) > queued_ttl:
+            del entries[key]
+            changed = True
+    return changed
+
+
+def try_admit(entries: dict[str, dict], deploy_id: str, budget: HostBudget) -> bool:
+    """Grant ``deploy_id`` a build slot if its turn has come on its host."""
+    free_cpu, free_memory = budget.cpu, budget.memory_mb
+    for entry in entries.values():
+        if entry.get("state") == STATE_BUILDING and entry.get("host") == budget.host:
+            free_cpu -= entry.get("cpu", 0.0)
+            free_memory -= entry.get("memory", 0)
+
+    for entry in fair_order(entries):
+        if entry.get("state") != STATE_WAITING or entry.get("host") != budget.host:
+            continue
+        cpu, memory = entry.get("cpu", 0.0), entry.get("memory", 0)
+        if cpu > free_cpu + 1e-9 or memory > free_memory:
+            return False
+        if entry["id"] == deploy_id:
+            return True
+        # Earlier waiter fits: it is about to take this room, keep it free.
+        free_cpu -= cpu
+        free_memory -= memory
+    return False
+
+
+def queue_positions(entries: dict[str, dict], average_seconds: float, parallelism: int) -> dict[str, tuple[int, float]]:
+    """deploy id -> (1-based position, seconds until its build is expected to start)."""
+    ordered = fair_order(entries)
+    # Workers already blocked on a slot are closer to running than messages
+    # still in the broker.
+    ordered.sort(key=lambda e: e.get("state") != STATE_WAITING)
+    building = sum(1 for e in entries.values() if e.get("state") == STATE_BUILDING)
+    slots = max(1, parallelism, building)
+    return {
+        entry["id"]: (index + 1, ((building + index) // slots) * average_seconds)
+        for index, entry in enumerate(ordered)
+    }
+
+
+# ---------------------------------------------------------------------------
+# Redis state
+# ---------------------------------------------------------------------------
+
+def _load(conn) -> dict[str, dict]:
+    entries = {}
+    for key, raw in (conn.hgetall(JOBS_KEY) or {}).items():
+        key = key.decode() if isinstance(key, bytes) else key
+        try:
+            entries[key] = json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+    return entries
+
+
+def _store(conn, before: dict[str, dict], after: dict[str, dict]) -> None:
+    pipe = conn.pipeline()
+    removed = [key for key in before if key not in after]
+    if removed:
+        pipe.hdel(JOBS_KEY, *removed)
+    for key, entry in after.items():
+        if before.get(key) != entry:
+            pipe.hset(JOBS_KEY, key, json.dumps(entry))
+    pipe.execute()
+
+
+def _mutate(conn, change: Callable[[dict[str, dict], float], Any]) -> tuple[Any, dict[str, dict]]:
+    """Run ``change(entries, now)`` under the scheduler lock and persist it."""
+    with conn.lock(LOCK_KEY, timeout=10, blocking_timeout=5):
+        entries = _load(conn)
+        before = json.loads(json.dumps(entries))
+        now = time.time()
+        reap(entries, now)
+        result = change(entries, now)
+        _store(conn, before, entries)
+    return result, entries
+
+
+def average_build_seconds(conn=None) -> float:
+    try:
+        raw = (conn or _redis()).get(DURATION_KEY)
+        return float(raw) if raw else DEFAULT_BUILD_SECONDS
+    except Exception:
+        return DEFAULT_BUILD_SECONDS
+
+
+def _record_duration(conn, seconds: float) -> None:
+    previous = average_build_seconds(conn)
+    conn.set(DURATION_KEY, round(previous + EWMA_ALPHA * (seconds - previous), 2))
+
+
+# ---------------------------------------------------------------------------
+# Deploy rows
+# ---------------------------------------------------------------------------
+
+def refresh_queue_positions(conn=None, entries: Optional[dict[str, dict]] = None) -> None:
+    """Write queue_position / queue_eta for every scheduled deploy in one UPDATE."""
+    from django.db.models import Case, Value, When
+    from deploy.models import Deploy  # type: ignore
+
+    try:
+        conn = conn or _redis()
+        if entries is None:
+            entries = _load(conn)
+        positions = queue_positions(entries, average_build_seconds(conn), _parallelism())
+    except Exception:
+        logger.warning("Could not compute build queue positions", exc_info=True)
+        return
+
+    running = [key for key, e in entries.items() if e.get("state") == STATE_BUILDING]
+    if not positions and not running:
+        return
+    now = timezone.now()
+    # Running deploys fall through to the NULL default.
+    Deploy.objects.filter(pk__in=[*positions, *running]).update(
+        queue_position=Case(
+            *(When(pk=key, then=Value(position)) for key, (position, _s) in positions.items()),
+            default=None,
+            output_field=Deploy._meta.get_field("queue_position"),
+        ),
+        queue_eta=Case(
+            *(
+                When(pk=key, then=Value(now + timedelta(seconds=math.ceil(seconds))))
+                for key, (_p, seconds) in positions.items()
+            ),
+            default=None,
+            output_field=Deploy._meta.get_field("queue_eta"),
+        ),
+    )
+
+
+def _clear_position(deploy_id: str) -> None:
+    from deploy.models import Deploy  # type: ignore
+
+    Deploy.objects.filter(pk=deploy_id).update(queue_position=None, queue_eta=None)
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def enqueue_deploy(task, deploy, *, kind: str = KIND_BUILD, task_id: Optional[str] = None, track: bool = True, **options):
+    """Publish ``task(deploy.pk)`` with the kind's priority and register it.
+
+    ``track=False`` (database platforms: nothing is built) only applies the
+    priority.  Registration failures are logged; publishing still happens.
+    """
+    deploy_id = str(deploy.pk)
+    priority = kind_priority(kind)
+    if track:
+        service = getattr(deploy, "service", None)
+        entry = {
+            "id": deploy_id,
+            "user": str(getattr(service, "user_id", "") or ""),
+            "kind": kind,
+            "priority": priority,
+            "enqueued": time.time(),
+            "state": STATE_QUEUED,
+        }
+        try:
+            conn = _redis()
+            _result, entries = _mutate(conn, lambda entries, now: entries.__setitem__(deploy_id, entry))
+            refresh_queue_positions(conn, entries)
+        except Exception:
+            logger.warning("Could not register deploy %s with the build scheduler", deploy_id, exc_info=True)
+    return task.apply_async(args=[deploy_id], task_id=task_id, priority=priority, **options)
+
+
+def forget(deploy_id) -> None:
+    """Drop the deploy from the scheduler (finished, failed or cancelled)."""
+    deploy_id = str(deploy_id)
+    try:
+        conn = _redis()
+        _result, entries = _mutate(conn, lambda entries, now: entries.pop(deploy_id, None))
+    except Exception:
+        logger.warning("Could not remove deploy %s from the build scheduler", deploy_id, exc_info=True)
+        return
+    try:
+        _clear_position(deploy_id)
+        refresh_queue_positions(conn, entries)
+    except Exception:
+        logger.warning("Could not refresh build queue positions", exc_info=True)
+
+
+@contextmanager
+def build_slot(
+    deploy_id,
+    limits: dict,
+    *,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    on_wait: Optional[Callable[[int, float], None]] = None,
+) -> Iterator[None]:
+    """Block until the deploy may run ``docker build``; release on exit.
+
+    ``on_wait(position, eta_seconds)`` is called whenever the position
+    changes.  Raises DeploymentCancelled if ``cancel_check`` turns true
+    while waiting, and DeploymentLockError if the scheduler stays
+    unreachable for ``admission_timeout()`` seconds.
+    """
+    deploy_id = str(deploy_id)
+    budget = host_budget()
+    cpu, memory = build_cost(limits, budget)
+
+    def wait(entries, now):
+        entry = entries.get(deploy_id) or {
+            "id": deploy_id, "user": "", "kind": KIND_BUILD,
+            "priority": kind_priority(KIND_BUILD), "enqueued": now,
+        }
+        entry.update(state=STATE_WAITING, host=budget.host, cpu=cpu, memory=memory, seen=now)
+        entries[deploy_id] = entry
+        if try_admit(entries, deploy_id, budget):
+            entry.update(state=STATE_BUILDING, started=now)
+            return True
+        return False
+
+    conn = None
+    last_position = None
+    failing_since = None
+    backoff = poll_seconds()
+    try:
+        while True:
+            if cancel_check is not None and cancel_check():
+                raise DeploymentCancelled("Deployment cancelled by user request.", stage="cancelled")
+            try:
+                conn = conn or _redis()
+                admitted, entries = _mutate(conn, wait)
+            except Exception as exc:
+                now = time.monotonic()
+                failing_since = failing_since or now
+                if now - failing_since >= admission_timeout():
+                    raise DeploymentLockError(
+                        "Build scheduler unavailable; could not obtain a build slot.",
+                        details={"error": str(exc), "error_type": type(exc).__name__},
+                    ) from exc
+                logger.warning("Build admission failed for %s; retrying", deploy_id, exc_info=True)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            failing_since, backoff = None, poll_seconds()
+            # Only transitions rewrite every row: the first wait (waiters
+            # sort ahead of queued deploys) and admission.
+            if admitted or last_position is None:
+                refresh_queue_positions(conn, entries)
+            if admitted:
+                break
+            position, eta = queue_positions(
+                entries, average_build_seconds(conn), _parallelism(),
+            ).get(deploy_id, (0, 0.0))
+            if position != last_position:
+                last_position = position
+                if on_wait is not None:
+                    on_wait(position, eta)
+            time.sleep(poll_seconds())
+
+        started = time.monotonic()
+        yield
+        try:
+            _record_duration(conn, time.monotonic() - started)
+        except Exception:
+            logger.debug("Could not record build duration", exc_info=True)
+    finally:
+        # The build is over either way; a retried task re-registers on its
+        # next build_slot() call.
+        forget(deploy_id)
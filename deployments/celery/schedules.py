@@ -9,6 +9,7 @@ from django.utils import timezone
 from core.utils import make_uuid4
 
 from core.global_settings.config import MAX_DEPLOY_TIME_MINUTE, SERVICE_STATUS_CHOICES
+from deployments.core.manager.client_manager import get_docker_client
 from deployments.core.manager.container_manager import Container
 from deploy.models import (
     Deploy,
@@ -26,6 +27,7 @@ from .monitoring.policies import (
     ACTIVE_DEPLOY_STATUSES,
     ACTIVE_SERVICE_STATUSES,
 )
+from .monitoring.runtime_index import MISSING_RUNTIME, load_runtime_index
 from .monitoring.actions import (
     mark_service_running,
     mark_service_stopped,
@@ -98,6 +100,56 @@ def create_deploy_log(
     )
 
 
+class _RuntimeView:
+    """
+    Runtime lookups for one tick, backed by the shared runtime index.
+
+    The index is advanced from the Docker /events stream and may lag, so it
+    only ever decides "nothing changed": a row it shows as diverged is
+    re-checked against ``inspect(name)`` (one ``inspect_runtime`` per
+    container per tick) before any transition.  Containers missing from the
+    index are only inspected when the caller needs confirmation; without an
+    index (Docker unreachable for the snapshot) every lookup inspects like
+    the legacy monitor.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.inspected = 0
+        self._inspect_cache: dict[str, dict] = {}
+
+    def runtime(self, name: str, *, confirm_missing: bool = True) -> dict:
+        if self.index is not None:
+            found = self.index.get(name)
+            if found is not None:
+                return found
+            if not confirm_missing:
+                return MISSING_RUNTIME
+        return self.inspect(name)
+
+    def inspect(self, name: str, *, confirm_missing: bool = True) -> dict:
+        if name not in self._inspect_cache:
+            self.inspected += 1
+            try:
+                self._inspect_cache[name] = Container(name).inspect_runtime()
+            except Exception as exc:
+                logger.warning("Failed to inspect container '%s': %s", name, exc)
+                self._inspect_cache[name] = dict(MISSING_RUNTIME, status="error")
+        return self._inspect_cache[name]
+
+
+@shared_task
+def manage_deployment_logs():
+    """Daily deployment log housekeeping (partitions, retention, archives)."""
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+
+    try:
+        call_command("manage_deployment_logs")
+    except CommandError as exc:
+        logger.warning("Deployment log housekeeping skipped: %s", exc)
+
+
 @shared_task
 def monitor_services():
     """
@@ -106,22 +158,40 @@ def monitor_services():
       2) Service.status (DB)
       3) Docker container reality
 
+    Docker state comes from ``ContainerRuntimeIndex`` — one container
+    snapshot or one /events drain per tick — instead of an inspect call
+    per row.  Rows are compared with that state in memory and only those
+    whose state diverged are locked and reconciled, so the tick cost is
+    O(changed) rather than O(services).
+
     Two independent scans:
       A. Active deployments (pending, running, rolling_back)
       B. Services needing runtime reconciliation (queued, deploying, running,
          stopping, succeeded)
     """
+    try:
+        index, source = load_runtime_index(get_docker_client().api)
+    except Exception:
+        logger.warning("Docker client unavailable for monitor tick.", exc_info=True)
+        index, source = None, "unavailable"
+    view = _RuntimeView(index)
+    now = timezone.now()
+
     # ------------------------------------------------------------------
     # 1. Active deployments (pipeline progress / timeout)
     # ------------------------------------------------------------------
-    deployments = (
+    deployments = list(
         Deploy.objects
         .select_related("service")
         .filter(status__in=ACTIVE_DEPLOY_STATUSES)
     )
+    deploys_touched = 0
     for deploy in deployments:
         try:
-            _reconcile_active_deploy(deploy)
+            runtime = _confirmed_divergence(_deploy_runtime_if_diverged, deploy, view, now)
+            if runtime is not None:
+                deploys_touched += 1
+                _reconcile_active_deploy(deploy, runtime=runtime)
         except Exception:
             logger.exception("Monitor error for deployment %s", deploy.pk)
 
@@ -129,31 +199,129 @@ def monitor_services():
     # 2. Services that need runtime reconciliation
     # ------------------------------------------------------------------
     _retry_orphaned_queued_deploys()
-    services = (
+    services = list(
         Service.objects
-        .select_related("selected_deploy")
         .filter(status__in=ACTIVE_SERVICE_STATUSES)
+        .only("id", "name", "status", "deploy_started", "selected_deploy_id")
     )
+    services_touched = 0
     for service in services:
         try:
-            _reconcile_service_runtime(service)
+            runtime = _confirmed_divergence(_service_runtime_if_diverged, service, view, now)
+            if runtime is not None:
+                services_touched += 1
+                _reconcile_service_runtime(service, runtime=runtime)
         except Exception:
             logger.exception("Monitor error for service %s", service.pk)
 
     logger.info(
-        "Monitor tick completed (deployments=%s, services=%s)",
+        "Monitor tick completed (deployments=%s/%s, services=%s/%s, source=%s, "
+        "events=%s, inspected=%s)",
+        deploys_touched,
         len(deployments),
+        services_touched,
         len(services),
-        extra={"event": "monitor_tick", "deployments": len(deployments), "services": len(services)},
+        source,
+        getattr(index, "events_applied", 0),
+        view.inspected,
+        extra={
+            "event": "monitor_tick",
+            "deployments": len(deployments),
+            "services": len(services),
+            "deployments_reconciled": deploys_touched,
+            "services_reconciled": services_touched,
+            "runtime_source": source,
+            "containers_inspected": view.inspected,
+        },
     )
 
 
+# ---------------------------------------------------------------------------
+# Divergence checks (no locks, no writes)
+# ---------------------------------------------------------------------------
+# Each returns the container runtime when the row needs reconciling and
+# None when DB and Docker already agree.  They mirror the rules in
+# ``_reconcile_active_deploy`` / ``_reconcile_service_runtime``, which
+# re-check everything under ``select_for_update``.  ``lookup`` is
+# ``_RuntimeView.runtime`` (index) or ``_RuntimeView.inspect`` (Docker).
+
+def _confirmed_divergence(check, row, view: _RuntimeView, now):
+    """Run ``check`` against the index; confirm a divergence with Docker."""
+    if check(row, view.runtime, now) is None:
+        return None
+    return check(row, view.inspect, now)
+
+
+def _still_building(deploy: Deploy) -> bool:
+    stage_name = (deploy.stage or "").strip().lower()
+    return stage_name in PRE_CONTAINER_STAGES or int(deploy.progress or 0) < 85
+
+
+def _minutes_since(moment, now) -> float:
+    return (now - moment).total_seconds() / 60.0
+
+
+def _deploy_runtime_if_diverged(deploy: Deploy, lookup, now):
+    name = deploy.service.get_docker_service_name()
+    status = deploy.status
+
+    if (
+        status in (DeploymentStatusChoices.PENDING, DeploymentStatusChoices.RUNNING)
+        and deploy.started_at
+        and _minutes_since(deploy.started_at, now) >= DEPLOY_TIMEOUT_MINUTES
+    ):
+        return lookup(name)
+
+    if status == DeploymentStatusChoices.PENDING:
+        runtime = lookup(name, confirm_missing=False)
+        return runtime if runtime.get("running") else None
+
+    if status == DeploymentStatusChoices.RUNNING:
+        if _still_building(deploy):
+            return None
+        runtime = lookup(name)
+        return None if runtime.get("running") else runtime
+
+    if status == DeploymentStatusChoices.ROLLING_BACK:
+        return lookup(name)
+
+    return None
+
+
+def _service_runtime_if_diverged(service: Service, lookup, now):
+    name = service.get_docker_service_name()
+    status = service.status
+
+    if status in (SERVICE_STATUS_CHOICES.RUNNING, SERVICE_STATUS_CHOICES.SUCCEEDED):
+        runtime = lookup(name)
+        if status == SERVICE_STATUS_CHOICES.SUCCEEDED:
+            return runtime  # legacy row: upgraded to running or failed
+        return None if runtime.get("running") else runtime
+
+    if status in (SERVICE_STATUS_CHOICES.QUEUED, SERVICE_STATUS_CHOICES.DEPLOYING):
+        if service.deploy_started and _minutes_since(service.deploy_started, now) >= STUCK_QUEUED_MINUTES:
+            return lookup(name)
+        runtime = lookup(name, confirm_missing=False)
+        return runtime if runtime.get("running") else None
+
+    if status == SERVICE_STATUS_CHOICES.STOPPING:
+        runtime = lookup(name)
+        if not runtime.get("running"):
+            return runtime
+        if service.deploy_started and _minutes_since(service.deploy_started, now) >= STOP_TIMEOUT_MINUTES:
+            return runtime
+        return None
+
+    return None
+
+
 def _retry_orphaned_queued_deploys() -> None:
     """Re-enqueue deployments whose DB transaction committed but Celery did not.
 
     This makes Redis/Celery outages non-fatal to the API request: the operation
     stays QUEUED/PENDING and is picked up automatically once the broker returns.
     """
+    from deployments.celery import scheduler
     from deployments.celery.tasks import deploy as app_deploy, run_db_deploy
     from deployments.core.db_deployer import DB_PLATFORMS
     from deployments.common import parse_config
@@ -177,8 +345,14 @@ def _retry_orphaned_queued_deploys() -> None:
                 or getattr(getattr(service, "plan", None), "platform", "")
                 or ""
             ).strip().lower()
-            task = run_db_deploy if platform in DB_PLATFORMS else app_deploy
-            task.apply_async(args=[str(deploy.id)], task_id=lock_id)
+            is_db = platform in DB_PLATFORMS
+            scheduler.enqueue_deploy(
+                run_db_deploy if is_db else app_deploy,
+                deploy,
+                kind=scheduler.KIND_BUILD,
+                task_id=lock_id,
+                track=not is_db,
+            )
             Deploy.objects.filter(pk=deploy.pk, status=DeploymentStatusChoices.PENDING).update(
                 status_message="Deployment re-queued after temporary broker unavailability.",
             )
@@ -193,7 +367,15 @@ def _retry_orphaned_queued_deploys() -> None:
             )
 
 
-def _reconcile_active_deploy(deploy: Deploy) -> None:
+def _inspect_runtime(container: Container) -> dict:
+    try:
+        return container.inspect_runtime()
+    except Exception as exc:
+        logger.warning("Failed to inspect container '%s': %s", container.name, exc)
+        return dict(MISSING_RUNTIME, status="error")
+
+
+def _reconcile_active_deploy(deploy: Deploy, runtime: dict | None = None) -> None:
     """
     Reconcile a single deployment in pipeline (pending/running/rolling_back).
 
@@ -204,21 +386,16 @@ def _reconcile_active_deploy(deploy: Deploy) -> None:
       - running + container not running → failed
       - rolling_back + container running → rollback complete
       - rolling_back + container missing → rollback failed
-    """
-    container_name = deploy.service.get_docker_service_name()
-    container = Container(container_name)
 
-    try:
-        runtime = container.inspect_runtime()
-        exists = runtime.get("exists", False)
-        is_running = runtime.get("running", False)
-        status_raw = runtime.get("status", "missing")
-        exit_code = runtime.get("exit_code")
-    except Exception as exc:
-        logger.warning("Failed to inspect container '%s': %s", container_name, exc)
-        exists = False
-        is_running = False
-        status_raw = "error"
+    ``runtime`` is the container state from the monitor's runtime index;
+    when omitted the container is inspected directly.
+    """
+    if runtime is None:
+        runtime = _inspect_runtime(Container(deploy.service.get_docker_service_name()))
+    exists = runtime.get("exists", False)
+    is_running = runtime.get("running", False)
+    status_raw = runtime.get("status", "missing")
+    exit_code = runtime.get("exit_code")
 
     now = timezone.now()
 
@@ -319,7 +496,7 @@ def _reconcile_active_deploy(deploy: Deploy) -> None:
             return
 
 
-def _reconcile_service_runtime(service: Service) -> None:
+def _reconcile_service_runtime(service: Service, runtime: dict | None = None) -> None:
     """
     Reconcile a service's DB status against the real container state.
 
@@ -334,24 +511,21 @@ def _reconcile_service_runtime(service: Service) -> None:
       - running + container not running → failed
       - stopping + container not running → stopped
       - stopping + timeout → failed (force stop/remove)
+
+    ``runtime`` is the container state from the monitor's runtime index;
+    when omitted the container is inspected directly.
     """
     container_name = service.get_docker_service_name()
     container = Container(container_name)
 
-    try:
-        runtime = container.inspect_runtime()
-        exists = runtime.get("exists", False)
-        is_running = runtime.get("running", False)
-        status_raw = runtime.get("status", "missing")
-        exit_code = runtime.get("exit_code")
-    except Exception as exc:
-        logger.warning("Failed to inspect container '%s': %s", container_name, exc)
-        exists = False
-        is_running = False
-        status_raw = "error"
+    if runtime is None:
+        runtime = _inspect_runtime(container)
+    exists = runtime.get("exists", False)
+    is_running = runtime.get("running", False)
+    status_raw = runtime.get("status", "missing")
+    exit_code = runtime.get("exit_code")
 
     now = timezone.now()
-    deploy = service.selected_deploy  # may be None
 
     with transaction.atomic():
         # Do NOT select_related("selected_deploy") with select_for_update:
@@ -13,6 +13,8 @@ Key changes vs. legacy:
     cancel between stages is honoured (legacy code only checked at start).
   * Reports ``rollback_failed`` distinctly from ``rollback_performed``
     in the final state transition.
+  * ``docker build`` waits for a slot from the build scheduler
+    (``deployments.celery.scheduler``); the wait is cancellable.
 """
 
 from __future__ import annotations
@@ -42,6 +44,7 @@ from deployments.common.exceptions import (
     OrchestratorDeploymentError,
 )
 
+from .. import scheduler
 from ..service_status import ServiceStateManager
 from ..validators import DeploymentValidator
 from ..helpers import DeploymentHelper, MockOrchestratorResult
@@ -100,6 +103,9 @@ class DeployService:
             # The lock itself raised (e.g. DeploymentLockError) — log and exit.
             logger.exception("Deploy %s could not acquire deployment lock.", deploy_id)
             return
+        finally:
+            # Restarts, cache hits and early failures never reach build_slot().
+            scheduler.forget(deploy_id)
 
     def _execute_locked(self, deploy_id: int, service_id: int) -> None:
         try:
@@ -384,6 +390,19 @@ class DeployService:
         except Exception:
             pass
 
+        # docker build waits for the build scheduler's per-host admission.
+        def _on_wait(position: int, eta_seconds: float) -> None:
+            Deploy.objects.filter(pk=deploy_item.pk).update(
+                status_message=(
+                    f"Waiting for a build slot (position {position}, "
+                    f"about {max(1, round(eta_seconds / 60))} min)."
+                ),
+            )
+
+        deployer._build_slot = lambda limits: scheduler.build_slot(  # type: ignore[attr-defined]
+            deploy_item.pk, limits, cancel_check=_cancel_check, on_wait=_on_wait,
+        )
+
         result = deployer.deploy_result()
         state_tracker.finish(result)
 
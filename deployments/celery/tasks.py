@@ -11,6 +11,8 @@ stop            Container stop pipeline (StopService).
 run_db_deploy   Database-platform pipeline (DBDeployer).  No zip, no
                 Dockerfile — credentials from Deploy.config + Service metadata.
 monitor_services  Periodic reconciler (re-exported from .schedules).
+compute_volume_dir_sizes  Recursive directory totals for the volume
+                browser (services.volume_browser), cached per generation.
 
 Key changes vs. legacy:
   * Uses the unified ``deployments.common.parse_config`` (was a triplicate copy).
@@ -56,7 +58,7 @@ from services.models import Service  # type: ignore
 
 from .services.deploy_service import DeployService
 from .services.stop_service import StopService
-from .schedules import monitor_services  # noqa: F401  — re-export for beat
+from .schedules import manage_deployment_logs, monitor_services  # noqa: F401  — re-export for beat
 
 logger = logging.getLogger(__name__)
 
@@ -132,6 +134,7 @@ def stop(self, service_id) -> None:
     logger.info("Initializing stop for service_id: %s", service_id)
     try:
         StopService().execute(service_id)
+        _bump_volume_generations(service_id)
     except InvalidServiceStateError:
         pass
     except Exception as exc:
@@ -144,6 +147,32 @@ def stop(self, service_id) -> None:
         logger.exception("Stop exhausted retries for service_id: %s", service_id)
 
 
+def _bump_volume_generations(service_id) -> None:
+    """The stopped container may have written to its volumes."""
+    from services.models import Volume
+    from services.volume_browser import bump_generation
+
+    try:
+        for volume_id in Volume.objects.filter(service_id=service_id).values_list("pk", flat=True):
+            bump_generation(volume_id)
+    except Exception:
+        logger.warning("Volume generation bump failed for service %s", service_id, exc_info=True)
+
+
+@shared_task(ignore_result=True, soft_time_limit=600)
+def compute_volume_dir_sizes(volume_id, paths, generation) -> None:
+    from services.models import Volume
+    from services.volume_browser import compute_sizes
+
+    volume = Volume.objects.filter(pk=volume_id).first()
+    if volume is None:
+        return
+    try:
+        compute_sizes(volume, list(paths or []), int(generation))
+    except Exception:
+        logger.exception("Volume size computation failed for %s", volume_id)
+
+
 # ===========================================================================
 # DB deploy helpers
 # ===========================================================================
@@ -823,6 +852,8 @@ def run_db_deploy(self, deploy_id: str | int, force_reinit: bool = False) -> Non
             )
     except Exception as exc:
         tb = traceback.format_exc()
+        if event_sink is not None:
+            event_sink.flush()
         logger.exception(
             "DBDeployer raised for deploy=%s container=%s",
             deploy.pk, container_name,
@@ -853,6 +884,10 @@ def run_db_deploy(self, deploy_id: str | int, force_reinit: bool = False) -> Non
         )
         return
 
+    if event_sink is not None:
+        # Trailing buffered events must land before the terminal writes.
+        event_sink.flush()
+
     if result.success:
         _mark_success(deploy, service, result.message)
     else:
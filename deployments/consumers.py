@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 import urllib.parse
 
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.contrib.auth import get_user_model
@@ -11,6 +12,7 @@ from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
 from deploy.models import Deploy
+from deployments.core import event_stream
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +22,21 @@ class DeploymentConsumer(AsyncJsonWebsocketConsumer):
     Live deployment events for one Deploy row.
 
     Client connects to:
-      ws/deployments/<deploy_id>/?token=<jwt>
+      ws/deployments/<deploy_id>/?token=<jwt>[&last_event_id=<id>]
 
     Server pushes:
-      {"type": "deployment.event", "event": {stage, message, level, progress, ...}}
+      {"type": "deployment.connected", "event": {..snapshot, last_event_id}}
+      {"type": "deployment.event", "event": {id, stage, message, level, progress, ...}}
+
+    With ``last_event_id`` (the ``id`` of the last event the client saw, or
+    ``0`` for everything retained) the missed events are replayed from the
+    deployment's Redis Stream right after ``deployment.connected``, followed
+    by ``{"type": "deployment.replayed", "event": {count, truncated}}``.
+    The group is joined before the stream is read and live events whose id
+    was part of the replay are dropped, so there is neither a gap nor a
+    duplicate.  Several producers publish to the group, so a live event may
+    carry a lower id than one already sent; only replayed ids count.
+    ``truncated`` tells the client to page the DB logs instead.
     """
 
     async def connect(self):
@@ -57,9 +70,20 @@ class DeploymentConsumer(AsyncJsonWebsocketConsumer):
             return
 
         self.group_name = f"deploy_{self.deploy_id}"
+        self._replayed_ids = set()
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
+        last_event_id = (params.get("last_event_id") or [None])[0]
+        replay, truncated = [], False
+        if last_event_id is not None:
+            replay, truncated = await self._read_stream(last_event_id)
+            # Cursor = last event the client will have seen; never a fresh
+            # tip read, which could skip events appended after the replay.
+            tip = replay[-1]["id"] if replay else last_event_id
+        else:
+            tip = await self._stream_tip()
+
         bootstrap = await self._bootstrap_snapshot()
         await self.send_json(
             {
@@ -67,10 +91,22 @@ class DeploymentConsumer(AsyncJsonWebsocketConsumer):
                 "event": {
                     "deploy_id": self.deploy_id,
                     "message": "Subscribed to deployment events.",
+                    "last_event_id": tip,
                     **bootstrap,
                 },
             }
         )
+        if last_event_id is not None:
+            for payload in replay:
+                await self.send_json({"type": "deployment.event", "event": payload})
+            await self.send_json(
+                {
+                    "type": "deployment.replayed",
+                    "event": {"count": len(replay), "truncated": truncated, "last_event_id": tip},
+                }
+            )
+            self._replayed_ids = {event_stream.parse_id(payload.get("id")) for payload in replay}
+            self._replayed_ids.discard(None)
         logger.info(
             "WS subscribed deploy=%s user=%s group=%s",
             self.deploy_id,
@@ -89,6 +125,11 @@ class DeploymentConsumer(AsyncJsonWebsocketConsumer):
     async def deployment_message(self, event):
         """Channel-layer handler: type = \"deployment.message\"."""
         payload = event.get("payload") or {}
+        event_id = event_stream.parse_id(payload.get("id"))
+        if event_id is not None and event_id in self._replayed_ids:
+            # Published while the stream was being read: already replayed.
+            self._replayed_ids.discard(event_id)
+            return
         try:
             await self.send_json({"type": "deployment.event", "event": payload})
         except Exception:
@@ -97,6 +138,14 @@ class DeploymentConsumer(AsyncJsonWebsocketConsumer):
                 getattr(self, "deploy_id", None),
             )
 
+    @sync_to_async(thread_sensitive=False)
+    def _read_stream(self, last_event_id):
+        return event_stream.read_after(self.deploy_id, last_event_id)
+
+    @sync_to_async(thread_sensitive=False)
+    def _stream_tip(self):
+        return event_stream.latest_id(self.deploy_id)
+
     @database_sync_to_async
     def _user_may_subscribe(self, deploy_id, user_id: int) -> bool:
         try:
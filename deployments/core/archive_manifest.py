@@ -0,0 +1,177 @@
+"""
+deployments/core/archive_manifest.py
+------------------------------------
+One-scan index over an extracted deployment archive.
+
+Dockerfile rendering and entrypoint detection ask the same questions
+many times per deploy ("is there a pnpm-lock.yaml?", "what does the
+shallowest package.json say?").  ``ArchiveManifest`` answers them from a
+single directory walk:
+
+  * ``paths``        – set of normalized relative file paths
+  * ``by_basename``  – basename -> paths multimap (shallowest first)
+  * ``read_text``    – lazily loaded, size-capped content cache for the
+                       small manifest files helpers parse (package.json,
+                       composer.json, manage.py, settings.py, …)
+
+Build it once per deploy (``ArchiveManifest.scan(context.root)``) and
+hand the same instance to ``DockerfileGenerator.render`` and the
+``entrypoints.resolve_*`` functions.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Optional
+
+from deployments.common.security import safe_join
+
+
+# Files larger than this are never cached; reads are truncated to it.
+MAX_CACHED_FILE_BYTES = 256 * 1024
+# Total budget for the content cache of one manifest.
+MAX_CACHE_BYTES = 8 * 1024 * 1024
+
+
+def _depth(path: str) -> int:
+    return path.count("/")
+
+
+class ArchiveManifest:
+    """Immutable file index plus a bounded content cache for one archive."""
+
+    def __init__(
+        self,
+        root: str,
+        sizes: dict[str, int],
+        *,
+        max_file_bytes: int = MAX_CACHED_FILE_BYTES,
+        max_cache_bytes: int = MAX_CACHE_BYTES,
+    ):
+        self.root = os.path.abspath(root)
+        self.sizes = dict(sizes)
+        self.paths: frozenset[str] = frozenset(self.sizes)
+        self.ordered: tuple[str, ...] = tuple(sorted(self.paths))
+
+        by_basename: dict[str, list[str]] = {}
+        for path in self.ordered:
+            by_basename.setdefault(path.rsplit("/", 1)[-1], []).append(path)
+        self.by_basename: dict[str, tuple[str, ...]] = {
+            base: tuple(sorted(items, key=lambda p: (_depth(p), p)))
+            for base, items in by_basename.items()
+        }
+
+        self.max_file_bytes = max_file_bytes
+        self.max_cache_bytes = max_cache_bytes
+        self._cache: dict[str, str] = {}
+        self._cache_bytes = 0
+        self._json_cache: dict[str, Optional[dict]] = {}
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def scan(cls, root: str, **kwargs) -> "ArchiveManifest":
+        """Walk ``root`` once and index every regular file."""
+        root = os.path.abspath(root)
+        sizes: dict[str, int] = {}
+        stack = [("", root)]
+        while stack:
+            rel_dir, abs_dir = stack.pop()
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((rel, entry.path))
+                    elif entry.is_file(follow_symlinks=False):
+                        sizes[rel] = entry.stat(follow_symlinks=False).st_size
+        return cls(root, sizes, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Lookups (no I/O)
+    # ------------------------------------------------------------------
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.paths
+
+    def __iter__(self):
+        return iter(self.ordered)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def find_basename(self, basename: str, *, max_depth: Optional[int] = None) -> tuple[str, ...]:
+        """Paths whose last segment is ``basename``, shallowest first."""
+        found = self.by_basename.get(basename, ())
+        if max_depth is None:
+            return found
+        return tuple(p for p in found if _depth(p) <= max_depth)
+
+    def first(self, basename: str, *, max_depth: Optional[int] = None) -> Optional[str]:
+        found = self.find_basename(basename, max_depth=max_depth)
+        return found[0] if found else None
+
+    def has_basename(self, *basenames: str) -> bool:
+        """True when any of ``basenames`` exists at any depth."""
+        return any(b in self.by_basename for b in basenames)
+
+    def endswith(self, suffix: str) -> tuple[str, ...]:
+        """Paths equal to ``suffix`` or ending in ``/suffix``, shallowest first."""
+        if "/" not in suffix:
+            return self.find_basename(suffix)
+        base = suffix.rsplit("/", 1)[-1]
+        return tuple(
+            p for p in self.find_basename(base)
+            if p == suffix or p.endswith("/" + suffix)
+        )
+
+    # ------------------------------------------------------------------
+    # Content (lazy, size-capped cache)
+    # ------------------------------------------------------------------
+
+    def read_text(self, path: str) -> str:
+        """
+        Decoded content of ``path`` (first ``max_file_bytes`` bytes).
+
+        Results are cached until the manifest's cache budget is spent;
+        after that reads still work but go to disk every time.
+        """
+        cached = self._cache.get(path)
+        if cached is not None:
+            return cached
+        if path not in self.paths:
+            return ""
+        try:
+            with open(safe_join(self.root, path), "rb") as fh:
+                data = fh.read(self.max_file_bytes)
+        except Exception:
+            return ""
+        text = data.decode("utf-8", "ignore")
+        if (
+            self.sizes.get(path, 0) <= self.max_file_bytes
+            and self._cache_bytes + len(data) <= self.max_cache_bytes
+        ):
+            self._cache[path] = text
+            self._cache_bytes += len(data)
+        return text
+
+    def read_json(self, path: str) -> Optional[dict]:
+        """Parsed JSON object at ``path``, or None if missing / invalid."""
+        if path in self._json_cache:
+            return self._json_cache[path]
+        try:
+            data = json.loads(self.read_text(path))
+        except Exception:
+            data = None
+        if not isinstance(data, dict):
+            data = None
+        if path in self._cache:
+            self._json_cache[path] = data
+        return data
+
+    @property
+    def cache_bytes(self) -> int:
+        return self._cache_bytes
+
@@ -0,0 +1,214 @@
+"""
+deployments/core/build_cache.py
+-------------------------------
+Content-addressed image build cache.
+
+A deploy's image is fully determined by:
+
+  * the archive contents (paths + bytes, independent of ZIP timestamps),
+  * the rendered Dockerfile,
+  * the docker build args,
+  * the platform settings that shape the build (platform, server type, …).
+
+``compute_build_digest`` folds those into one sha256.  After a build the
+digest is stored twice:
+
+  * as the image label ``BUILD_DIGEST_LABEL`` (survives a DB restore), and
+  * in Postgres (``deploy.ImageBuildCache``), which also carries hit/miss
+    counters and the seconds each hit saved.
+
+``Image.create`` consults the cache first; on a hit it re-tags the
+existing image instead of running ``api.build`` again.  Redeploys and
+rollbacks of an unchanged ZIP therefore finish the image stage in
+milliseconds.
+
+All DB access is best-effort: a missing table or an unavailable database
+degrades to "cache miss", never to a failed deploy.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from typing import Any, Optional
+
+from deployments.common.security import safe_join
+
+from .archive_manifest import ArchiveManifest
+from .types import DeploymentConfig
+
+logger = logging.getLogger(__name__)
+
+
+BUILD_DIGEST_LABEL = "paas.build-digest"
+# Bump when the digest recipe changes so old entries stop matching.
+DIGEST_VERSION = "1"
+
+_HASH_CHUNK_BYTES = 256 * 1024
+
+# DeploymentConfig fields that change what ends up inside the image.
+# Runtime-only fields (environment, limits, networks, volumes) are left out
+# on purpose: they are applied at container start, not at build time.
+_PLATFORM_FIELDS = (
+    "platform",
+    "platform_type",
+    "server_type",
+    "entry_point",
+    "celery",
+    "celery_beat",
+    "worker_count",
+    "port",
+    "document_root",
+)
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def build_cache_enabled() -> bool:
+    return bool(_setting("DEPLOY_BUILD_CACHE_ENABLED", True))
+
+
+# ---------------------------------------------------------------------------
+# Digest
+# ---------------------------------------------------------------------------
+
+def digest_source_tree(manifest: ArchiveManifest) -> str:
+    """sha256 over every file path and its bytes, in sorted path order."""
+    h = hashlib.sha256()
+    for path in manifest.ordered:
+        h.update(path.encode("utf-8", "surrogateescape"))
+        h.update(b"\0")
+        h.update(str(manifest.sizes.get(path, 0)).encode())
+        h.update(b"\0")
+        with open(safe_join(manifest.root, path), "rb") as fh:
+            while True:
+                chunk = fh.read(_HASH_CHUNK_BYTES)
+                if not chunk:
+                    break
+                h.update(chunk)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def platform_fingerprint(config: DeploymentConfig) -> dict[str, Any]:
+    return {
+        name: getattr(config, name, None)
+        for name in _PLATFORM_FIELDS
+        if hasattr(config, name)
+    }
+
+
+def compute_build_digest(
+    manifest: ArchiveManifest,
+    *,
+    dockerfile_text: str,
+    buildargs: dict[str, str],
+    config: DeploymentConfig,
+) -> str:
+    payload = json.dumps(
+        {
+            "v": DIGEST_VERSION,
+            "source": digest_source_tree(manifest),
+            "dockerfile": hashlib.sha256(
+                (dockerfile_text or "").encode("utf-8")
+            ).hexdigest(),
+            "buildargs": dict(sorted((buildargs or {}).items())),
+            "platform": platform_fingerprint(config),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Postgres index (best-effort)
+# ---------------------------------------------------------------------------
+
+def _model():
+    from deploy.models import ImageBuildCache
+    return ImageBuildCache
+
+
+def lookup_image_id(digest: str) -> Optional[str]:
+    """Image id recorded for ``digest``, or None."""
+    try:
+        return (
+            _model().objects.filter(digest=digest)
+            .values_list("image_id", flat=True)
+            .first()
+        )
+    except Exception:
+        logger.debug("Build cache lookup failed for %s", digest[:12], exc_info=True)
+        return None
+
+
+def record_build(
+    digest: str,
+    *,
+    image_id: str,
+    image_ref: str,
+    build_seconds: float,
+) -> None:
+    """Store ``digest -> image_id`` after a real build (a cache miss)."""
+    try:
+        from django.db.models import F
+        from django.utils import timezone
+
+        model = _model()
+        now = timezone.now()
+        entry, created = model.objects.get_or_create(
+            digest=digest,
+            defaults={
+                "image_id": image_id,
+                "image_ref": image_ref,
+                "build_seconds": build_seconds,
+                "build_count": 1,
+                "last_used_at": now,
+            },
+        )
+        if not created:
+            model.objects.filter(pk=entry.pk).update(
+                image_id=image_id,
+                image_ref=image_ref,
+                build_seconds=build_seconds,
+                build_count=F("build_count") + 1,
+                last_used_at=now,
+            )
+    except Exception:
+        logger.warning("Could not record build cache entry %s", digest[:12], exc_info=True)
+
+
+def record_hit(digest: str, *, image_id: str, image_ref: str) -> float:
+    """
+    Count a cache hit and return the seconds it saved (the duration of
+    the build that produced the image, 0.0 if unknown).
+    """
+    try:
+        from django.db.models import F
+        from django.utils import timezone
+
+        model = _model()
+        entry, _created = model.objects.get_or_create(
+            digest=digest,
+            defaults={"image_id": image_id, "image_ref": image_ref},
+        )
+        saved = float(entry.build_seconds or 0.0)
+        model.objects.filter(pk=entry.pk).update(
+            image_id=image_id,
+            image_ref=image_ref,
+            hit_count=F("hit_count") + 1,
+            seconds_saved=F("seconds_saved") + saved,
+            last_used_at=timezone.now(),
+        )
+        return saved
+    except Exception:
+        logger.warning("Could not record build cache hit %s", digest[:12], exc_info=True)
+        return 0.0
@@ -0,0 +1,231 @@
+"""
+deployments/core/build_context.py
+---------------------------------
+Single-pass ingestion of an uploaded deployment ZIP.
+
+The archive is validated and inflated exactly ONCE into a scratch build
+directory.  That directory is then shared by every later stage:
+
+  * platform inspection (``ProjectInspector`` walks ``project_root``)
+  * Dockerfile rendering (indexed once by ``ArchiveManifest.scan``)
+  * ``Image.create`` (the directory *is* the docker build context)
+
+Members are streamed from the ZIP to disk in fixed-size chunks, so peak
+RSS stays flat no matter how large the archive is.  The legacy path
+built an in-memory tar, copied it again in ``merge_tar_streams``,
+re-extracted the ZIP for inspection and then extracted the tar a third
+time inside ``Image.create``.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from typing import Optional
+
+from deployments.common.exceptions import (
+    DeploymentSecurityError,
+    DeploymentValidationError,
+)
+from deployments.common.security import (
+    is_safe_archive_name,
+    is_zip_symlink,
+    safe_join,
+    validate_final_app_layout,
+)
+
+from .converter import MAX_ARCHIVE_BYTES, MAX_ARCHIVE_MEMBERS
+
+
+_COPY_CHUNK_BYTES = 64 * 1024
+
+
+def _normalize_member_name(name: str) -> str:
+    """Forward slashes, no leading ``./`` segments (keeps dotfiles intact)."""
+    normalized = (name or "").replace("\\", "/")
+    while normalized.startswith("./"):
+        normalized = normalized[2:]
+    return normalized
+
+
+@dataclass
+class BuildContext:
+    """
+    A validated, extracted deployment archive on local disk.
+
+    ``root`` is the scratch directory used as the docker build context;
+    ``project_root`` is the same tree with a single wrapping top-level
+    directory (GitHub release zips) peeled off, for platform detection.
+    """
+
+    root: str
+    project_root: str
+    file_count: int = 0
+    total_bytes: int = 0
+
+    def names(self) -> list[str]:
+        """Sorted file paths relative to ``root`` using ``/`` separators."""
+        found: list[str] = []
+        for dirpath, _dirnames, filenames in os.walk(self.root):
+            rel_dir = os.path.relpath(dirpath, self.root)
+            for filename in filenames:
+                rel = filename if rel_dir == "." else os.path.join(rel_dir, filename)
+                found.append(rel.replace(os.sep, "/"))
+        found.sort()
+        return found
+
+    def path(self, name: str) -> str:
+        """Absolute path of ``name``; refuses paths escaping ``root``."""
+        return safe_join(self.root, _normalize_member_name(name))
+
+    def read_bytes(self, name: str, limit: Optional[int] = None) -> Optional[bytes]:
+        """Return the file content (optionally truncated), or None if missing."""
+        try:
+            with open(self.path(name), "rb") as fh:
+                return fh.read(limit) if limit is not None else fh.read()
+        except (OSError, DeploymentSecurityError):
+            return None
+
+    def read_text(self, name: str, limit: Optional[int] = None) -> str:
+        data = self.read_bytes(name, limit=limit)
+        return data.decode("utf-8", "ignore") if data else ""
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def __enter__(self) -> "BuildContext":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.cleanup()
+
+
+def ingest_zip(
+    zip_path: str,
+    *,
+    max_bytes: int = MAX_ARCHIVE_BYTES,
+    max_members: int = MAX_ARCHIVE_MEMBERS,
+    prefix: str = "deploy-build-",
+) -> BuildContext:
+    """
+    Validate and inflate ``zip_path`` into a fresh scratch directory.
+
+    Caller owns the returned context and MUST call ``cleanup()``.
+
+    Security (same policy as ``convert_zip_to_tar``):
+      * Rejects absolute paths, ``../`` traversal, Windows drive prefixes.
+      * Rejects symlink members.
+      * Caps member count and total uncompressed size.  The size cap is
+        enforced on the bytes actually written, not only on the header
+        ``file_size`` which a crafted archive can understate.
+      * Files are written with mode 0o644 — no executable bits.
+    """
+    if not os.path.exists(zip_path):
+        raise FileNotFoundError(f"ZIP file not found at: {zip_path}")
+
+    root = tempfile.mkdtemp(prefix=prefix)
+    file_count = 0
+    total_bytes = 0
+    try:
+        with zipfile.ZipFile(zip_path, "r") as zf:
+            members = zf.infolist()
+            if len(members) > max_members:
+                raise DeploymentValidationError(
+                    "ZIP archive contains too many files.",
+                    stage="archive_validation",
+                    details={
+                        "max_members": max_members,
+                        "actual_members": len(members),
+                    },
+                )
+
+            declared = 0
+            for info in members:
+                if not is_safe_archive_name(info.filename):
+                    raise DeploymentSecurityError(
+                        "ZIP archive contains an unsafe file path "
+                        "(path traversal or absolute path).",
+                        stage="archive_validation",
+                        details={"filename": info.filename},
+                    )
+                if is_zip_symlink(info):
+                    raise DeploymentSecurityError(
+                        "ZIP archive contains symbolic links, which are not allowed.",
+                        stage="archive_validation",
+                        details={"filename": info.filename},
+                    )
+                declared += info.file_size
+                if declared > max_bytes:
+                    raise DeploymentValidationError(
+                        "ZIP archive is too large after extraction.",
+                        stage="archive_validation",
+                        details={"max_bytes": max_bytes},
+                    )
+
+            for info in members:
+                name = _normalize_member_name(info.filename)
+                if not name or name in (".", "./"):
+                    continue
+                target = safe_join(root, name)
+                if info.is_dir():
+                    os.makedirs(target, exist_ok=True)
+                    continue
+
+                parent = os.path.dirname(target)
+                if os.path.exists(parent) and not os.path.isdir(parent):
+                    raise DeploymentValidationError(
+                        "ZIP archive contains a file and a directory with the same path.",
+                        stage="archive_validation",
+                        details={"filename": info.filename},
+                    )
+                os.makedirs(parent, exist_ok=True)
+
+                with zf.open(info, "r") as src, open(target, "wb") as dst:
+                    while True:
+                        chunk = src.read(_COPY_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        total_bytes += len(chunk)
+                        if total_bytes > max_bytes:
+                            raise DeploymentValidationError(
+                                "ZIP archive is too large after extraction.",
+                                stage="archive_validation",
+                                details={"max_bytes": max_bytes},
+                            )
+                        dst.write(chunk)
+                os.chmod(target, 0o644)
+                file_count += 1
+    except zipfile.BadZipFile as exc:
+        shutil.rmtree(root, ignore_errors=True)
+        raise DeploymentValidationError(
+            "Uploaded file is not a valid ZIP archive.",
+            stage="archive_validation",
+            details={"error": str(exc)},
+        ) from exc
+    except Exception:
+        shutil.rmtree(root, ignore_errors=True)
+        raise
+
+    entries = [e for e in os.listdir(root) if not e.startswith(".")]
+    if len(entries) == 1 and os.path.isdir(os.path.join(root, entries[0])):
+        project_root = os.path.join(root, entries[0])
+    else:
+        project_root = root
+
+    # Post-extract gate: refuse any path that escaped the scratch root
+    # (defense in depth after safe_join).
+    try:
+        validate_final_app_layout(project_root)
+    except DeploymentSecurityError:
+        shutil.rmtree(root, ignore_errors=True)
+        raise
+
+    return BuildContext(
+        root=root,
+        project_root=project_root,
+        file_count=file_count,
+        total_bytes=total_bytes,
+    )
@@ -0,0 +1,266 @@
+"""
+deployments/core/buildkit.py
+----------------------------
+BuildKit dependency caches for generated Dockerfiles.
+
+Layer caching only helps while the dependency manifest is unchanged; a
+single new requirement re-downloads every package.  The generator
+therefore adds ``RUN --mount=type=cache`` to every dependency-install
+instruction (pip/pipenv/poetry, npm/pnpm/yarn/bun, composer, go), so the
+package manager's download cache survives between builds even when its
+layer does not.  Cache ids are namespaced per service
+(``paas-<service>-<tool>``): one tenant's builds never read another's
+cache.
+
+``--mount`` needs BuildKit, and BuildKit ignores the classic per-build
+``container_limits`` (the plan's ``max_cpu``/``max_ram``).  It is
+therefore an operator opt-in (``DEPLOY_BUILD_BUILDKIT``) for hosts whose
+Docker daemon is confined as a whole (e.g. a dedicated build host with
+``DEPLOY_BUILD_CPU_BUDGET`` / ``DEPLOY_BUILD_MEMORY_BUDGET_MB`` sized to
+it).  With it off -- the default -- no cache mounts are emitted and every
+build keeps its limits on the classic builder.  With it on,
+``Image.create`` checks daemon support *before* building; a daemon without
+BuildKit gets the Dockerfile through :func:`strip_cache_mounts` (flags
+removed, cache directories deleted at the end of the instruction), so the
+classic build runs once and its images stay as lean as before.
+
+BuildKit streams progress as base64 protobuf ``StatusResponse`` messages
+(``moby.buildkit.trace``); :func:`decode_build_stream` turns them into the
+classic ``{"stream": ...}`` chunks the deploy log already understands.
+The decoder reads only the handful of fields it needs, so no protobuf
+dependency is required.
+"""
+
+from __future__ import annotations
+
+import base64
+import re
+from typing import Any, Iterable, Iterator, Optional
+
+MOUNT_ID_PREFIX = "paas-"
+
+# (tool key, command pattern, cache targets)
+_CACHE_RULES: tuple[tuple[str, re.Pattern, tuple[str, ...]], ...] = (
+    ("pip", re.compile(r"\bpip3?\s+install\b"), ("/root/.cache/pip",)),
+    ("pipenv", re.compile(r"\bpipenv\s+(?:install|sync)\b"), ("/root/.cache/pipenv",)),
+    ("poetry", re.compile(r"\bpoetry\s+install\b"), ("/root/.cache/pypoetry",)),
+    ("npm", re.compile(r"\bnpm\s+(?:ci|install|i)\b"), ("/root/.npm",)),
+    ("pnpm", re.compile(r"\bpnpm\s+(?:install|i)\b"), ("/root/.local/share/pnpm/store",)),
+    (
+        "yarn",
+        re.compile(r"\byarn(?:\s+install\b|\s+--|\s*$|\s*&&|\s*\|\|)"),
+        ("/usr/local/share/.cache/yarn", "/root/.yarn/berry/cache"),
+    ),
+    ("bun", re.compile(r"\bbun\s+install\b"), ("/root/.bun/install/cache",)),
+    ("composer", re.compile(r"\bcomposer\s+install\b"), ("/root/.cache/composer", "/root/.composer/cache")),
+    ("go", re.compile(r"\bgo\s+(?:build|install|mod\s+download)\b"), ("/go/pkg/mod", "/root/.cache/go-build")),
+)
+
+_RUN_RE = re.compile(r"^(\s*RUN\s+)(.*)$", re.IGNORECASE | re.DOTALL)
+_CACHE_MOUNT_RE = re.compile(r"--mount=(?=[^\s]*\btype=cache\b)([^\s]+)\s*")
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def buildkit_enabled() -> bool:
+    return bool(_setting("DEPLOY_BUILD_BUILDKIT", False))
+
+
+def cache_mounts_enabled() -> bool:
+    return buildkit_enabled() and bool(_setting("DEPLOY_BUILD_CACHE_MOUNTS", True))
+
+
+def cache_namespace(name: str | None) -> str:
+    cleaned = re.sub(r"[^a-z0-9_.-]+", "-", (name or "").lower()).strip("-.")
+    return (cleaned or "default")[:63]
+
+
+# ---------------------------------------------------------------------------
+# Dockerfile rewriting
+# ---------------------------------------------------------------------------
+
+def _instructions(dockerfile: str) -> list[list[str]]:
+    """Split into logical instructions (continuation lines kept together)."""
+    groups: list[list[str]] = []
+    current: list[str] = []
+    for line in dockerfile.split("\n"):
+        current.append(line)
+        if not line.rstrip().endswith("\\"):
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _rewrite_runs(dockerfile: str, rewrite) -> str:
+    out: list[str] = []
+    for group in _instructions(dockerfile):
+        text = "\n".join(group)
+        match = _RUN_RE.match(text)
+        # Heredoc bodies are opaque; leave them alone.
+        if match and "<<" not in match.group(2):
+            text = rewrite(match.group(1), match.group(2))
+        out.append(text)
+    return "\n".join(out)
+
+
+def uses_cache_mounts(dockerfile: str | None) -> bool:
+    return bool(dockerfile) and bool(_CACHE_MOUNT_RE.search(dockerfile))
+
+
+def add_cache_mounts(dockerfile: str, namespace: str) -> str:
+    """Add per-service cache mounts to dependency-install RUN instructions."""
+    namespace = cache_namespace(namespace)
+
+    def rewrite(prefix: str, body: str) -> str:
+        flags = []
+        for tool, pattern, targets in _CACHE_RULES:
+            if not pattern.search(body):
+                continue
+            for index, target in enumerate(targets):
+                if f"target={target}" in body:
+                    continue
+                suffix = f"-{index}" if index else ""
+                flags.append(
+                    f"--mount=type=cache,id={MOUNT_ID_PREFIX}{namespace}-{tool}{suffix},target={target}"
+                )
+            if tool == "pip":
+                # --no-cache-dir would make pip ignore the mounted cache.
+                body = re.sub(r"[ \t]+--no-cache-dir\b", "", body)
+        if not flags:
+            return prefix + body
+        return prefix + " ".join(flags) + " " + body
+
+    return _rewrite_runs(dockerfile, rewrite)
+
+
+def strip_cache_mounts(dockerfile: str) -> str:
+    """Classic-builder form: drop cache mounts and clean up what they cached."""
+
+    def rewrite(prefix: str, body: str) -> str:
+        targets = []
+        for match in _CACHE_MOUNT_RE.finditer(body):
+            options = dict(
+                part.split("=", 1) for part in match.group(1).split(",") if "=" in part
+            )
+            if options.get("id", "").startswith(MOUNT_ID_PREFIX) and options.get("target"):
+                targets.append(options["target"])
+        if not _CACHE_MOUNT_RE.search(body):
+            return prefix + body
+        body = _CACHE_MOUNT_RE.sub("", body)
+        if targets:
+            body = body.rstrip() + " && rm -rf " + " ".join(targets)
+        return prefix + body
+
+    return _rewrite_runs(dockerfile, rewrite)
+
+
+def is_capability_error(message: str | None) -> bool:
+    """True when the daemon cannot do BuildKit (or RUN --mount) at all."""
+    text = (message or "").lower()
+    return any(
+        needle in text
+        for needle in (
+            "buildkit not supported",
+            "buildkit is not supported",
+            "unsupported builder version",
+            "requires buildkit",
+            "unknown flag: mount",
+            "experimental syntax",
+        )
+    )
+
+
+# ---------------------------------------------------------------------------
+# BuildKit progress stream
+# ---------------------------------------------------------------------------
+
+def _varint(buf: bytes, pos: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf: bytes) -> Iterator[tuple[int, Any]]:
+    """(field number, value) pairs of one protobuf message."""
+    pos = 0
+    while pos < len(buf):
+        key, pos = _varint(buf, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(buf, pos)
+        elif wire == 2:
+            length, pos = _varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire == 5:
+            value, pos = buf[pos:pos + 4], pos + 4
+        else:
+            return
+        yield field, value
+
+
+def _text(value: Any) -> str:
+    return value.decode("utf-8", "replace") if isinstance(value, (bytes, bytearray)) else str(value)
+
+
+def decode_status(payload: bytes, seen: Optional[dict] = None) -> list[str]:
+    """Human-readable lines from one ``StatusResponse``.
+
+    ``seen`` carries vertex state across messages so a step is announced
+    once when it starts and once when it finishes.
+    """
+    seen = {} if seen is None else seen
+    lines: list[str] = []
+    for field, value in _fields(payload):
+        if field == 1:  # Vertex
+            vertex = {}
+            for f, v in _fields(value):
+                vertex.setdefault(f, v)
+            digest = _text(vertex.get(1, b""))
+            name = _text(vertex.get(3, b""))
+            state = seen.setdefault(digest, set())
+            if vertex.get(4) and "cached" not in state:
+                state.add("cached")
+                lines.append(f"CACHED {name}")
+            elif 5 in vertex and "started" not in state:
+                state.add("started")
+                lines.append(name)
+            if 7 in vertex and "error" not in state:
+                state.add("error")
+                lines.append(f"ERROR: {name}: {_text(vertex[7])}")
+        elif field == 3:  # VertexLog
+            for f, v in _fields(value):
+                if f == 4:
+                    lines.extend(line for line in _text(v).splitlines() if line.strip())
+    return lines
+
+
+def decode_build_stream(chunks: Iterable[dict]) -> Iterator[dict]:
+    """Translate BuildKit trace chunks into classic ``stream`` chunks."""
+    seen: dict = {}
+    for chunk in chunks:
+        if isinstance(chunk, dict) and chunk.get("id") == "moby.buildkit.trace":
+            try:
+                payload = base64.b64decode(chunk.get("aux") or "")
+                lines = decode_status(payload, seen)
+            except Exception:
+                continue
+            for line in lines:
+                yield {"stream": line + "\n"}
+            continue
+        yield chunk
@@ -53,6 +53,7 @@ from docker.errors import APIError, NotFound
 from core.global_settings.config import MIRROR_DOCKER
 from deployments.core.exceptions import DeploymentError
 from deployments.core.manager.client_manager import Client
+from deployments.core.manager.volume_manager import release_browser_helpers
 from deployments.common.security import validate_bind_source, validate_docker_name
 
 
@@ -1770,6 +1771,7 @@ class DBDeployer:
                         source
                     )
 
+                    release_browser_helpers(client, source)
                     volume.remove(
                         force=True
                     )
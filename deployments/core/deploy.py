@@ -6,7 +6,7 @@ from docker.errors import APIError, NotFound
 from core.global_settings.config import PlanTypeChoices
 from deployments.core.entrypoints import (
     django_find_entrypoint_from_settings,
-    django_read_settings_module_from_tar,
+    django_read_settings_module,
 )
 from deployments.core.exceptions import DeploymentError
 from deployments.core.manager.client_manager import Client
@@ -166,6 +166,7 @@ class Deploy:
             event_sink=self.event_sink,
             deployment_id=self.deployment_id,
             cancel_check=getattr(self, '_cancel_check', None),
+            build_slot=getattr(self, '_build_slot', None),
         )
         self.result = orchestrator.deploy(self._config())
         self.errors = [] if self.result.success else [DeployException(self.result.message, stage=self.result.stage)]
@@ -176,6 +177,7 @@ class Deploy:
             event_sink=self.event_sink,
             deployment_id=self.deployment_id,
             cancel_check=getattr(self, '_cancel_check', None),
+            build_slot=getattr(self, '_build_slot', None),
         )
         self.result = orchestrator.deploy(self._config())
         return self.result
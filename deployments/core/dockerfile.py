@@ -3,6 +3,8 @@ from __future__ import annotations
 import base64
 import re
 
+from . import buildkit
+from .archive_manifest import ArchiveManifest
 from .entrypoints import (
     check_package_json,
     check_requirements_txt,
@@ -143,6 +145,10 @@ def _runtime_pip_packages(
     return ordered
 
 
+# ``COPY . /app`` / ``COPY . .`` — the layer every code change invalidates.
+_SOURCE_COPY_RE = re.compile(r"^COPY\s+\.\s+(?:/app/?|\./?|\.)\s*$", re.MULTILINE)
+
+
 def _inject_pip_install(dockerfile: str, packages: list[str]) -> str:
     if not packages:
         return dockerfile
@@ -157,6 +163,10 @@ def _inject_pip_install(dockerfile: str, packages: list[str]) -> str:
         dockerfile,
         flags=re.MULTILINE,
     ).rstrip()
+    # Install ahead of the source COPY so a code-only change keeps this layer.
+    source_copy = _SOURCE_COPY_RE.search(body)
+    if source_copy:
+        return body[:source_copy.start()] + block.lstrip("\n") + "\n" + body[source_copy.start():]
     return body + block
 
 
@@ -172,42 +182,25 @@ def _replace_cmd(dockerfile: str, new_cmd: str) -> str:
     return cleaned + f"\n\nCMD {json_array}\n"
 
 
-def _detect_node_package_manager_from_tar(tar_stream) -> str:
+def _detect_node_package_manager(manifest) -> str:
     """Detect npm/pnpm/yarn/bun from lockfiles/package.json."""
     try:
-        import json as _json
-        import tarfile as _tf
-        tar_stream.seek(0)
-        with _tf.open(fileobj=tar_stream, mode="r:*") as tar:
-            names = {m.name.replace("\\", "/").lstrip("./") for m in tar.getmembers()}
-            if any(n == "pnpm-lock.yaml" or n.endswith("/pnpm-lock.yaml") for n in names):
-                return "pnpm"
-            if any(n == "yarn.lock" or n.endswith("/yarn.lock") for n in names):
-                return "yarn"
-            if any(n in {"bun.lockb", "bun.lock"} or n.endswith("/bun.lockb") or n.endswith("/bun.lock") for n in names):
-                return "bun"
-            for m in tar.getmembers():
-                norm = m.name.replace("\\", "/").lstrip("./")
-                if norm not in {"package.json"} and not norm.endswith("/package.json"):
-                    continue
-                f = tar.extractfile(m)
-                if f is None:
-                    continue
-                try:
-                    pkg = _json.loads(f.read().decode("utf-8", "ignore"))
-                except Exception:
-                    continue
-                pm = str(pkg.get("packageManager") or "").split("@", 1)[0].lower()
-                if pm in {"npm", "pnpm", "yarn", "bun"}:
-                    return pm
-                break
+        if manifest.has_basename("pnpm-lock.yaml"):
+            return "pnpm"
+        if manifest.has_basename("yarn.lock"):
+            return "yarn"
+        if manifest.has_basename("bun.lockb", "bun.lock"):
+            return "bun"
+        for name in manifest.find_basename("package.json"):
+            pkg = manifest.read_json(name)
+            if pkg is None:
+                continue
+            pm = str(pkg.get("packageManager") or "").split("@", 1)[0].lower()
+            if pm in {"npm", "pnpm", "yarn", "bun"}:
+                return pm
+            break
     except Exception:
         pass
-    finally:
-        try:
-            tar_stream.seek(0)
-        except Exception:
-            pass
     return "npm"
 
 
@@ -333,7 +326,7 @@ def _build_supervisor_addon(
 # Platform renderers
 # ---------------------------------------------------------------------------
 
-def _render_django(dockerfile_template, tar_stream, config, logger):
+def _render_django(dockerfile_template, manifest, config, logger):
     server_type_override = entry_point_override = None
     use_celery = use_beat = False
     if config is not None:
@@ -362,7 +355,7 @@ def _render_django(dockerfile_template, tar_stream, config, logger):
         )
     try:
         entrypoint = resolve_django_entrypoint(
-            tar_stream, server_type=server_type_override
+            manifest, server_type=server_type_override
         )
     except DeploymentValidationError:
         raise
@@ -409,7 +402,7 @@ def _render_django(dockerfile_template, tar_stream, config, logger):
         install_cmd = getattr(_pc, "install_command", None) if _pc else None
     except Exception:
         pass
-    rendered = _prepare_python_dependency_install(rendered, tar_stream, install_cmd)
+    rendered = _prepare_python_dependency_install(rendered, manifest, install_cmd)
 
     workers = _worker_count_from_config(config)
 
@@ -462,35 +455,19 @@ def _render_django(dockerfile_template, tar_stream, config, logger):
     rendered = _replace_cmd(rendered, web_cmd)
     return rendered
 
-def _archive_names(tar_stream) -> set[str]:
-    try:
-        import tarfile as _tf
-        tar_stream.seek(0)
-        with _tf.open(fileobj=tar_stream, mode="r:*") as tar:
-            return {m.name.replace("\\", "/").lstrip("./") for m in tar.getmembers()}
-    except Exception:
-        return set()
-    finally:
-        try:
-            tar_stream.seek(0)
-        except Exception:
-            pass
-
-
-def _python_dependency_manifest(tar_stream) -> str:
-    names = _archive_names(tar_stream)
-    if any(n == "requirements.txt" or n.endswith("/requirements.txt") for n in names):
+def _python_dependency_manifest(manifest) -> str:
+    if manifest.has_basename("requirements.txt"):
         return "requirements"
-    if any(n == "Pipfile" or n.endswith("/Pipfile") for n in names):
+    if manifest.has_basename("Pipfile"):
         return "pipenv"
-    if any(n == "pyproject.toml" or n.endswith("/pyproject.toml") for n in names):
+    if manifest.has_basename("pyproject.toml"):
         return "pyproject"
     return "requirements"
 
 
-def _prepare_python_dependency_install(dockerfile: str, tar_stream, install_cmd: str | None) -> str:
-    manifest = _python_dependency_manifest(tar_stream)
-    if manifest == "requirements":
+def _prepare_python_dependency_install(dockerfile: str, manifest, install_cmd: str | None) -> str:
+    dependency_manifest = _python_dependency_manifest(manifest)
+    if dependency_manifest == "requirements":
         return dockerfile
 
     dockerfile = re.sub(r"^COPY\s+requirements\.txt\s+/app/?\s*$", "", dockerfile, flags=re.MULTILINE)
@@ -501,8 +478,8 @@ def _prepare_python_dependency_install(dockerfile: str, tar_stream, install_cmd:
     )
     dockerfile = re.sub(r"^\s*&&\s*pip install .*?(?:gunicorn|uvicorn).*?$", "", dockerfile, flags=re.MULTILINE)
 
-    if manifest == "pipenv":
-        lock = "COPY Pipfile.lock /app/\n" if any(n == "Pipfile.lock" or n.endswith("/Pipfile.lock") for n in _archive_names(tar_stream)) else ""
+    if dependency_manifest == "pipenv":
+        lock = "COPY Pipfile.lock /app/\n" if manifest.has_basename("Pipfile.lock") else ""
         block = (
             "\n# --- Pipenv dependency install ---\n"
             "WORKDIR /app\n"
@@ -512,7 +489,7 @@ def _prepare_python_dependency_install(dockerfile: str, tar_stream, install_cmd:
             "    && pipenv install --deploy --system\n"
         )
     else:
-        lock = "COPY poetry.lock /app/\n" if any(n == "poetry.lock" or n.endswith("/poetry.lock") for n in _archive_names(tar_stream)) else ""
+        lock = "COPY poetry.lock /app/\n" if manifest.has_basename("poetry.lock") else ""
         if "poetry" in (install_cmd or "").lower() or lock:
             block = (
                 "\n# --- Poetry dependency install ---\n"
@@ -548,7 +525,7 @@ def _prepare_python_dependency_install(dockerfile: str, tar_stream, install_cmd:
     return dockerfile
 
 
-def _render_flask_or_python(platform, dockerfile_template, tar_stream, config, logger):
+def _render_flask_or_python(platform, dockerfile_template, manifest, config, logger):
     server_type_override = entry_point_override = None
     use_celery = use_beat = False
     if config is not None:
@@ -576,7 +553,7 @@ def _render_flask_or_python(platform, dockerfile_template, tar_stream, config, l
             progress=12,
         )
     entrypoint = resolve_flask_entrypoint(
-        tar_stream, server_type=server_type_override
+        manifest, server_type=server_type_override
     )
     module = entrypoint.get("module", "app")
     callable_name = entrypoint.get("callable", "app")
@@ -602,7 +579,7 @@ def _render_flask_or_python(platform, dockerfile_template, tar_stream, config, l
         install_cmd = getattr(_pc, "install_command", None) if _pc else None
     except Exception:
         pass
-    rendered = _prepare_python_dependency_install(rendered, tar_stream, install_cmd)
+    rendered = _prepare_python_dependency_install(rendered, manifest, install_cmd)
 
     workers = _worker_count_from_config(config)
 
@@ -697,7 +674,7 @@ def _resolve_spa_build_dir(
     platform: str,
     project_cfg,
     info: dict | None,
-    tar_stream=None,
+    manifest=None,
     *,
     user_build_dir: str | None = None,
 ) -> str:
@@ -716,9 +693,9 @@ def _resolve_spa_build_dir(
         return str(user_build_dir).strip().lstrip("./").rstrip("/")
 
     # 2. Archive signals – most reliable for the actual zip being built
-    tar_signal = _detect_build_dir_from_tar(tar_stream)
-    if tar_signal:
-        return tar_signal
+    archive_signal = _detect_build_dir(manifest)
+    if archive_signal:
+        return archive_signal
 
     # 3. Detector ProjectConfig (only trust non-default-ish values when framework known)
     if project_cfg is not None:
@@ -739,83 +716,61 @@ def _resolve_spa_build_dir(
     return _default_spa_build_dir(platform, fw)
 
 
-def _detect_build_dir_from_tar(tar_stream) -> str | None:
-    """Return 'dist' / 'build' / custom outDir based on files inside the tar."""
-    if tar_stream is None:
+def _detect_build_dir(manifest) -> str | None:
+    """Return 'dist' / 'build' / custom outDir based on files inside the archive."""
+    if manifest is None:
         return None
     try:
-        import json
-        import tarfile as _tf
-
-        tar_stream.seek(0)
-        with _tf.open(fileobj=tar_stream, mode="r:*") as tar:
-            vite_cfg_names = (
-                "vite.config.ts",
-                "vite.config.js",
-                "vite.config.mjs",
-                "vite.config.cjs",
-            )
+        vite_cfg_names = (
+            "vite.config.ts",
+            "vite.config.js",
+            "vite.config.mjs",
+            "vite.config.cjs",
+        )
+
+        has_react_scripts = False
+        has_vite_dep = False
+        vite_config_text = None
 
-            has_vite_config = False
-            has_react_scripts = False
-            has_vite_dep = False
-            vite_config_text = None
-
-            for member in tar.getmembers():
-                n = member.name.replace("\\", "/")
-                base = n.rsplit("/", 1)[-1]
-                depth = 0 if "/" not in n else n.count("/")
-
-                if base in vite_cfg_names and depth <= 2:
-                    has_vite_config = True
-                    fobj = tar.extractfile(member)
-                    if fobj is not None and vite_config_text is None:
-                        vite_config_text = fobj.read().decode("utf-8", "ignore")
-
-                if base == "package.json" and depth <= 1:
-                    fobj = tar.extractfile(member)
-                    if fobj is None:
-                        continue
-                    try:
-                        pkg = json.loads(fobj.read().decode("utf-8", "ignore"))
-                    except Exception:
-                        continue
-                    deps = {
-                        **(pkg.get("dependencies") or {}),
-                        **(pkg.get("devDependencies") or {}),
-                    }
-                    if "react-scripts" in deps:
-                        has_react_scripts = True
-                    if "vite" in deps or "@vitejs/plugin-react" in deps:
-                        has_vite_dep = True
-
-            if has_vite_config or has_vite_dep:
-                if vite_config_text:
-                    m = re.search(
-                        r"outDir\s*:\s*['\"]([^'\"]+)['\"]",
-                        vite_config_text,
-                        re.DOTALL | re.IGNORECASE,
-                    )
-                    if m:
-                        tar_stream.seek(0)
-                        return m.group(1).strip().lstrip("./").rstrip("/")
-                tar_stream.seek(0)
-                return "dist"
-
-            if has_react_scripts:
-                tar_stream.seek(0)
-                return "build"
-
-        tar_stream.seek(0)
+        vite_configs = [
+            p for base in vite_cfg_names
+            for p in manifest.find_basename(base, max_depth=2)
+        ]
+        has_vite_config = bool(vite_configs)
+        if vite_configs:
+            vite_config_text = manifest.read_text(vite_configs[0])
+
+        for n in manifest.find_basename("package.json", max_depth=1):
+            pkg = manifest.read_json(n)
+            if pkg is None:
+                continue
+            deps = {
+                **(pkg.get("dependencies") or {}),
+                **(pkg.get("devDependencies") or {}),
+            }
+            if "react-scripts" in deps:
+                has_react_scripts = True
+            if "vite" in deps or "@vitejs/plugin-react" in deps:
+                has_vite_dep = True
+
+        if has_vite_config or has_vite_dep:
+            if vite_config_text:
+                m = re.search(
+                    r"outDir\s*:\s*['\"]([^'\"]+)['\"]",
+                    vite_config_text,
+                    re.DOTALL | re.IGNORECASE,
+                )
+                if m:
+                    return m.group(1).strip().lstrip("./").rstrip("/")
+            return "dist"
+
+        if has_react_scripts:
+            return "build"
     except Exception:
-        try:
-            tar_stream.seek(0)
-        except Exception:
-            pass
+        pass
     return None
 
 
-
 def _is_nginx_spa_template(dockerfile: str) -> bool:
     """True when the template is a multi-stage build that serves via nginx."""
     lower = dockerfile.lower()
@@ -947,7 +902,7 @@ def _apply_spa_port(dockerfile: str, port: int) -> str:
     return dockerfile
 
 
-def _render_node_family(platform, dockerfile_template, tar_stream, config, logger):
+def _render_node_family(platform, dockerfile_template, manifest, config, logger):
     """
     Render Node / Next.js / React / Vue / Angular / Vite Dockerfiles.
 
@@ -984,7 +939,7 @@ def _render_node_family(platform, dockerfile_template, tar_stream, config, logge
     except Exception:
         project_cfg = None
 
-    info = resolve_node_entrypoint(tar_stream) or {}
+    info = resolve_node_entrypoint(manifest) or {}
 
     # User may pass build_dir via Deploy.config → environment or a top-level field
     user_bd = None
@@ -996,7 +951,7 @@ def _render_node_family(platform, dockerfile_template, tar_stream, config, logge
         platform,
         project_cfg,
         info,
-        tar_stream=tar_stream,
+        manifest=manifest,
         user_build_dir=user_bd,
     )
 
@@ -1017,7 +972,7 @@ def _render_node_family(platform, dockerfile_template, tar_stream, config, logge
 
     rendered = dockerfile_template.replace("{MIRROR_DOCKER}", MIRROR_DOCKER)
 
-    package_manager = (getattr(project_cfg, "package_manager", None) if project_cfg else None) or _detect_node_package_manager_from_tar(tar_stream)
+    package_manager = (getattr(project_cfg, "package_manager", None) if project_cfg else None) or _detect_node_package_manager(manifest)
     rendered = _prepare_node_package_manager(rendered, package_manager)
     if project_cfg and project_cfg.install_command:
         rendered = _swap_npm_install(rendered, project_cfg.install_command)
@@ -1113,34 +1068,18 @@ def _render_node_family(platform, dockerfile_template, tar_stream, config, logge
     return rendered
 
 
-def _php_member_names(tar_stream) -> list[str]:
+def _php_member_names(manifest) -> list[str]:
     """Return normalized file paths from the deployment archive."""
-    if tar_stream is None:
+    if manifest is None:
         return []
-    names: list[str] = []
-    try:
-        import tarfile as _tf
-
-        tar_stream.seek(0)
-        with _tf.open(fileobj=tar_stream, mode="r:*") as tar:
-            for member in tar.getmembers():
-                if not member.isfile() and not member.isdir():
-                    continue
-                n = member.name.replace("\\", "/").lstrip("./")
-                if not n or n in {".", ".."} or "/../" in f"/{n}/":
-                    continue
-                names.append(n)
-        tar_stream.seek(0)
-    except Exception:
-        try:
-            tar_stream.seek(0)
-        except Exception:
-            pass
-    return names
+    return [
+        n for n in manifest.ordered
+        if n and n not in {".", ".."} and "/../" not in f"/{n}/"
+    ]
 
 
 def _detect_php_document_root(
-    tar_stream,
+    manifest,
     *,
     user_override: str | None = None,
     project_cfg=None,
@@ -1174,9 +1113,9 @@ def _detect_php_document_root(
 
     # project_cfg paths (e.g. static_dir="public") are relative to the
     # *application* root. Archives often wrap that root in a single
-    # top-level directory, so resolve against the tar layout first.
+    # top-level directory, so resolve against the archive layout first.
 
-    names = _php_member_names(tar_stream)
+    names = _php_member_names(manifest)
     if not names:
         if project_cfg is not None:
             sd = getattr(project_cfg, "static_dir", None) or getattr(
@@ -1350,29 +1289,17 @@ _PHP_EXT_PACKAGE_MAP = {
 }
 
 
-def _composer_info(tar_stream) -> dict:
+def _composer_info(manifest) -> dict:
     info = {"php_constraint": None, "extensions": []}
     try:
-        import json as _json
-        import tarfile as _tf
-        tar_stream.seek(0)
-        with _tf.open(fileobj=tar_stream, mode="r:*") as tar:
-            candidates = [m for m in tar.getmembers() if m.isfile() and m.name.replace("\\", "/").lstrip("./").endswith("composer.json")]
-            candidate = min(candidates, key=lambda m: m.name.count("/"), default=None)
-            if candidate is not None:
-                f = tar.extractfile(candidate)
-                if f is not None:
-                    data = _json.loads(f.read().decode("utf-8", "ignore"))
-                    req = dict(data.get("require") or {})
-                    info["php_constraint"] = str(req.get("php")) if req.get("php") else None
-                    info["extensions"] = sorted({str(k)[4:].lower() for k in req if str(k).lower().startswith("ext-")})
+        candidate = manifest.first("composer.json")
+        data = manifest.read_json(candidate) if candidate is not None else None
+        if data is not None:
+            req = dict(data.get("require") or {})
+            info["php_constraint"] = str(req.get("php")) if req.get("php") else None
+            info["extensions"] = sorted({str(k)[4:].lower() for k in req if str(k).lower().startswith("ext-")})
     except Exception:
         pass
-    finally:
-        try:
-            tar_stream.seek(0)
-        except Exception:
-            pass
     return info
 
 
@@ -1412,7 +1339,7 @@ def _inject_php_extensions(dockerfile: str, extensions: list[str]) -> str:
     return dockerfile.rstrip() + "\n" + "\n".join(blocks) + "\n"
 
 
-def _detect_php_project(tar_stream) -> dict:
+def _detect_php_project(manifest) -> dict:
     """
     Inspect the deployment archive for PHP framework / schema signals.
 
@@ -1426,100 +1353,67 @@ def _detect_php_project(tar_stream) -> dict:
         "schema_files": [],
         "has_vendor": False,
         "composer": {"php_constraint": None, "extensions": []},
+        "composer_files": [],
     }
-    if tar_stream is None:
+    if manifest is None:
         return info
     try:
-        import tarfile as _tf
-        import json as _json
-
-        tar_stream.seek(0)
-        with _tf.open(fileobj=tar_stream, mode="r:*") as tar:
-            names = []
-            for member in tar.getmembers():
-                n = member.name.replace("\\", "/").lstrip("./")
-                if not n or n in {".", ".."} or "/../" in f"/{n}/":
-                    continue
-                names.append(n)
-
+        names = _php_member_names(manifest)
+
+        for n in manifest.find_basename("composer.json", max_depth=2):
+            info["has_composer"] = True
+            info["composer_files"].append(n)
+            pkg = manifest.read_json(n) or {}
+            req = {
+                **(pkg.get("require") or {}),
+                **(pkg.get("require-dev") or {}),
+            }
+            if any(k.startswith("laravel/") for k in req):
+                info["is_laravel"] = True
+        if manifest.find_basename("artisan", max_depth=2):
+            info["has_artisan"] = True
+            info["is_laravel"] = True
+        if manifest.endswith("vendor/autoload.php"):
+            info["has_vendor"] = True
+
+        schema_candidates = (
+            "schema.sql",
+            "database.sql",
+            "db.sql",
+            "init.sql",
+            "migrate.sql",
+            "migrations.sql",
+            "sql/schema.sql",
+            "sql/init.sql",
+            "database/schema.sql",
+            "database/init.sql",
+            "install/schema.sql",
+            "install.sql",
+        )
+        for cand in schema_candidates:
+            if cand in manifest:
+                info["schema_files"].append(cand)
+                continue
             for n in names:
-                base = n.rsplit("/", 1)[-1]
-                depth = 0 if "/" not in n else n.count("/")
-                if base == "composer.json" and depth <= 2:
-                    info["has_composer"] = True
-                    try:
-                        m = next(
-                            (
-                                x
-                                for x in tar.getmembers()
-                                if x.name.replace("\\", "/").lstrip("./") == n
-                            ),
-                            None,
-                        )
-                        if m is not None:
-                            fobj = tar.extractfile(m)
-                            if fobj is not None:
-                                pkg = _json.loads(
-                                    fobj.read().decode("utf-8", "ignore")
-                                )
-                                req = {
-                                    **(pkg.get("require") or {}),
-                                    **(pkg.get("require-dev") or {}),
-                                }
-                                if any(k.startswith("laravel/") for k in req):
-                                    info["is_laravel"] = True
-                    except Exception:
-                        pass
-                if base == "artisan" and depth <= 2:
-                    info["has_artisan"] = True
-                    info["is_laravel"] = True
-                if n.endswith("vendor/autoload.php"):
-                    info["has_vendor"] = True
-
-            schema_candidates = (
-                "schema.sql",
-                "database.sql",
-                "db.sql",
-                "init.sql",
-                "migrate.sql",
-                "migrations.sql",
-                "sql/schema.sql",
-                "sql/init.sql",
-                "database/schema.sql",
-                "database/init.sql",
-                "install/schema.sql",
-                "install.sql",
-            )
-            name_set = set(names)
-            for cand in schema_candidates:
-                if cand in name_set:
-                    info["schema_files"].append(cand)
-                    continue
-                for n in names:
-                    if n.endswith("/" + cand) and n.count("/") <= 2:
-                        info["schema_files"].append(n)
-                        break
-
-            sql_files = sorted(
-                n
-                for n in names
-                if n.endswith(".sql")
-                and n.count("/") <= 2
-                and not n.startswith("vendor/")
-                and "test" not in n.lower()
-            )
-            for n in sql_files:
-                if n not in info["schema_files"] and len(info["schema_files"]) < 5:
+                if n.endswith("/" + cand) and n.count("/") <= 2:
                     info["schema_files"].append(n)
+                    break
+
+        sql_files = sorted(
+            n
+            for n in names
+            if n.endswith(".sql")
+            and n.count("/") <= 2
+            and not n.startswith("vendor/")
+            and "test" not in n.lower()
+        )
+        for n in sql_files:
+            if n not in info["schema_files"] and len(info["schema_files"]) < 5:
+                info["schema_files"].append(n)
 
-        tar_stream.seek(0)
-        info["composer"] = _composer_info(tar_stream)
-        tar_stream.seek(0)
+        info["composer"] = _composer_info(manifest)
     except Exception:
-        try:
-            tar_stream.seek(0)
-        except Exception:
-            pass
+        pass
     return info
 
 
@@ -1686,6 +1580,30 @@ def _inject_php_runtime(
             app_root = f"/var/www/html/{rel}"
 
     if has_composer and not info.get("has_vendor"):
+        rel_root = app_root[len("/var/www/html"):].strip("/")
+        manifest_rel = f"{rel_root}/composer.json" if rel_root else "composer.json"
+        if manifest_rel in (info.get("composer_files") or []) and re.search(
+            r"^COPY\s+\.\s+/var/www/html/?\s*$", dockerfile, re.MULTILINE
+        ):
+            # Install from composer.json/lock alone first; the post-COPY
+            # install below then only runs scripts and dumps the autoloader,
+            # so a code-only change reuses the vendor layer.
+            src = f"{rel_root}/" if rel_root else ""
+            prefetch_block = (
+                "# --- Composer dependencies, manifest first (injected by deployer) ---\n"
+                f"COPY --from={MIRROR_DOCKER}/composer:2 /usr/bin/composer /usr/bin/composer\n"
+                f"COPY {src}composer.json {src}composer.lock* {app_root}/\n"
+                f"RUN cd {app_root} \\\n"
+                "    && composer install --no-dev --prefer-dist --no-interaction --no-progress "
+                "--no-scripts --no-autoloader\n"
+            )
+            dockerfile = re.sub(
+                r"^(COPY\s+\.\s+/var/www/html/?\s*)$",
+                lambda m: prefetch_block + m.group(1),
+                dockerfile,
+                count=1,
+                flags=re.MULTILINE,
+            )
         composer_block = (
             "\n# --- Composer dependencies (injected by deployer) ---\n"
             f"COPY --from={MIRROR_DOCKER}/composer:2 /usr/bin/composer /usr/bin/composer\n"
@@ -1753,7 +1671,7 @@ def _inject_php_runtime(
         )
     return dockerfile
 
-def _render_php(dockerfile_template, tar_stream, config, logger):
+def _render_php(dockerfile_template, manifest, config, logger):
     entry_point_override = None
     if config is not None:
         # SECURITY: validate user-supplied entry_point override before it
@@ -1793,7 +1711,7 @@ def _render_php(dockerfile_template, tar_stream, config, logger):
             project_cfg = None
 
     doc_root_rel = _detect_php_document_root(
-        tar_stream,
+        manifest,
         user_override=user_doc_root,
         project_cfg=project_cfg,
     )
@@ -1832,7 +1750,7 @@ def _render_php(dockerfile_template, tar_stream, config, logger):
     # Detect Laravel / schema.sql and inject composer + migrate entrypoint.
     # Prefer official platform plugin signals (LaravelPlatform.defaults migrate=True)
     # when enrich_config_from_project has attached ProjectConfig.
-    php_info = _detect_php_project(tar_stream)
+    php_info = _detect_php_project(manifest)
     composer_meta = php_info.get("composer") or {}
     min_php = _php_min_version(composer_meta.get("php_constraint"))
     if min_php:
@@ -1870,11 +1788,69 @@ def _render_php(dockerfile_template, tar_stream, config, logger):
         doc_root_rel=doc_root_rel or "",
         logger=logger,
     )
-    return rendered
+    return _hoist_php_system_layers(rendered)
+
 
+_PHP_SYSTEM_RUN_RE = re.compile(r"docker-php-ext-(?:install|configure)|apt-get\s+install")
 
 
-def _render_generic(platform, dockerfile_template, tar_stream, config, logger):
+def _hoist_php_system_layers(dockerfile: str) -> str:
+    """
+    Move extension / apt installs above the source COPY (and the composer
+    prefetch) so a code change does not recompile PHP extensions.
+
+    The template and the injectors above anchor on ``COPY . /var/www/html/``
+    and append after it; these RUNs never read the application source.
+    """
+    groups = buildkit._instructions(dockerfile)
+
+    def _starts(group, pattern):
+        return re.match(pattern, group[0].strip()) is not None
+
+    anchor = next(
+        (i for i, g in enumerate(groups) if _starts(g, r"# --- Composer dependencies, manifest first")),
+        None,
+    )
+    if anchor is None:
+        anchor = next(
+            (i for i, g in enumerate(groups) if _starts(g, r"COPY\s+\.\s+/var/www/html/?$")),
+            None,
+        )
+    if anchor is None:
+        return dockerfile
+
+    moved: list[list[str]] = []
+    kept: list[list[str]] = []
+    for index, group in enumerate(groups):
+        text = "\n".join(group)
+        if index > anchor and _starts(group, r"RUN\s") and _PHP_SYSTEM_RUN_RE.search(text):
+            # Take the section comment along with its RUN.
+            if kept and kept[-1][0].startswith("# ---") and len(kept) - 1 > anchor:
+                moved.append(kept.pop())
+            moved.append(group)
+        else:
+            kept.append(group)
+    if not moved:
+        return dockerfile
+    result = kept[:anchor] + moved + kept[anchor:]
+    return "\n".join("\n".join(g) for g in result)
+
+
+
+def _prepare_go_modules(dockerfile: str, manifest) -> str:
+    """Download modules from go.mod/go.sum before copying the source."""
+    if manifest is None or "go.mod" not in manifest:
+        return dockerfile
+    if re.search(r"^COPY\s+go\.mod\b", dockerfile, flags=re.MULTILINE):
+        return dockerfile
+    return _SOURCE_COPY_RE.sub(
+        lambda m: "COPY go.mod go.sum* ./\nRUN go mod download\n" + m.group(0),
+        dockerfile,
+        count=1,
+    )
+
+
+def _render_generic(platform, dockerfile_template, manifest, config, logger):
     entry_point_override = None
     if config is not None:
         # SECURITY: validate user-supplied entry_point override before it
@@ -1891,6 +1867,8 @@ def _render_generic(platform, dockerfile_template, tar_stream, config, logger):
         else:
             entry_point_override = None
     rendered = dockerfile_template.replace("{MIRROR_DOCKER}", MIRROR_DOCKER)
+    if platform == "go":
+        rendered = _prepare_go_modules(rendered, manifest)
     if entry_point_override:
         rendered = _replace_cmd(rendered, entry_point_override)
     return rendered
@@ -1922,7 +1900,7 @@ class DockerfileGenerator:
         *,
         platform: str,
         dockerfile_template: str,
-        tar_stream,
+        manifest: ArchiveManifest,
         config: DeploymentConfig | None = None,
         logger=None,
     ) -> str:
@@ -1931,31 +1909,31 @@ class DockerfileGenerator:
                 "Dockerfile template is required.",
                 stage="dockerfile_generation",
             )
-        check_requirements_txt(tar_stream, platform=platform)
-        check_package_json(tar_stream, platform=platform)
+        check_requirements_txt(manifest, platform=platform)
+        check_package_json(manifest, platform=platform)
         platform = (platform or "").lower().strip()
 
         if platform == "django":
-            rendered = _render_django(dockerfile_template, tar_stream, config, logger)
+            rendered = _render_django(dockerfile_template, manifest, config, logger)
         elif platform in ("flask", "python", "fastapi"):
             rendered = _render_flask_or_python(
                 platform if platform != "fastapi" else "python",
-                dockerfile_template, tar_stream, config, logger,
+                dockerfile_template, manifest, config, logger,
             )
         elif platform in (
             "nodejs", "nextjs", "react", "vuejs", "vue", "angular",
             "vite", "express",
         ):
             rendered = _render_node_family(
-                platform, dockerfile_template, tar_stream, config, logger,
+                platform, dockerfile_template, manifest, config, logger,
             )
         elif platform in ("php", "laravel"):
-            rendered = _render_php(dockerfile_template, tar_stream, config, logger)
+            rendered = _render_php(dockerfile_template, manifest, config, logger)
         elif platform == "go":
-            rendered = _render_generic(platform, dockerfile_template, tar_stream, config, logger)
+            rendered = _render_generic(platform, dockerfile_template, manifest, config, logger)
         else:
             rendered = _render_generic(
-                platform, dockerfile_template, tar_stream, config, logger,
+                platform, dockerfile_template, manifest, config, logger,
             )
 
         # Final pass: resolve any leftover {port} from Config templates.
@@ -1963,5 +1941,9 @@ class DockerfileGenerator:
         if config is not None and getattr(config, "port", None) is not None:
             port = config.port
         rendered = _ensure_port_placeholder(rendered, port)
+        if buildkit.cache_mounts_enabled():
+            rendered = buildkit.add_cache_mounts(
+                rendered, getattr(config, "name", None) or platform,
+            )
         return rendered
 
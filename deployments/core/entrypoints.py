@@ -1,19 +1,21 @@
+"""
+Entrypoint detection over an extracted deployment archive.
+
+Every resolver takes the per-deploy ``ArchiveManifest`` so file lookups
+are index hits and each source file is read from disk at most once.
+"""
+
 import re
-import tarfile
-import json
 
 from .exceptions import DeploymentValidationError
 
 
-def django_read_settings_module_from_tar(tar: tarfile.TarFile):
+def django_read_settings_module(manifest):
     """Return the DJANGO_SETTINGS_MODULE value found in manage.py, or None."""
-    for member in tar.getmembers():
-        if not member.name.endswith("manage.py"):
-            continue
-        file_obj = tar.extractfile(member)
-        if not file_obj:
+    for name in manifest.find_basename("manage.py"):
+        text = manifest.read_text(name)
+        if not text:
             continue
-        text = file_obj.read().decode("utf-8", errors="ignore")
         text = re.sub(r"#.*", "", text)
         match = re.search(
             r"os\.environ\.setdefault\s*\(\s*['\"]DJANGO_SETTINGS_MODULE['\"]\s*,\s*['\"]([\w\.]+)['\"]\s*\)",
@@ -27,18 +29,17 @@ def django_read_settings_module_from_tar(tar: tarfile.TarFile):
     return None
 
 
-def django_find_entrypoint_from_settings(tar: tarfile.TarFile):
-    settings_module = django_read_settings_module_from_tar(tar)
+def django_find_entrypoint_from_settings(manifest):
+    settings_module = django_read_settings_module(manifest)
     if not settings_module:
         return None
     settings_path = settings_module.replace(".", "/") + ".py"
-    member = next((item for item in tar.getmembers() if item.name.endswith(settings_path)), None)
-    if not member:
+    matches = manifest.endswith(settings_path)
+    if not matches:
         return None
-    file_obj = tar.extractfile(member)
-    if not file_obj:
+    text = manifest.read_text(matches[0])
+    if not text:
         return None
-    text = file_obj.read().decode("utf-8", errors="ignore")
     patterns = (
         ("asgi", re.compile(r"(?<!\w)ASGI_APPLICATION\s*=\s*['\"]([\w\.]+)['\"]")),
         ("wsgi", re.compile(r"(?<!\w)WSGI_APPLICATION\s*=\s*['\"]([\w\.]+)['\"]")),
@@ -51,11 +52,8 @@ def django_find_entrypoint_from_settings(tar: tarfile.TarFile):
     return None
 
 
-def require_django_entrypoint(tar_stream):
-    tar_stream.seek(0)
-    with tarfile.open(fileobj=tar_stream, mode="r:*") as tar:
-        entrypoint = django_find_entrypoint_from_settings(tar)
-    tar_stream.seek(0)
+def require_django_entrypoint(manifest):
+    entrypoint = django_find_entrypoint_from_settings(manifest)
     if not entrypoint:
         raise DeploymentValidationError(
             "Django entrypoint could not be detected. "
@@ -66,7 +64,7 @@ def require_django_entrypoint(tar_stream):
     return entrypoint
 
 
-def resolve_django_entrypoint(tar_stream, *, server_type: str | None = None) -> dict:
+def resolve_django_entrypoint(manifest, *, server_type: str | None = None) -> dict:
     server_type_clean = (server_type or "").strip().lower() or None
     if server_type_clean not in (None, "asgi", "wsgi"):
         raise DeploymentValidationError(
@@ -74,10 +72,7 @@ def resolve_django_entrypoint(tar_stream, *, server_type: str | None = None) ->
             stage="entrypoint_detection",
             details={"server_type": server_type},
         )
-    tar_stream.seek(0)
-    with tarfile.open(fileobj=tar_stream, mode="r:*") as tar:
-        detected = django_find_entrypoint_from_settings(tar)
-    tar_stream.seek(0)
+    detected = django_find_entrypoint_from_settings(manifest)
     if detected is None:
         raise DeploymentValidationError(
             "Django entrypoint could not be detected. "
@@ -90,7 +85,7 @@ def resolve_django_entrypoint(tar_stream, *, server_type: str | None = None) ->
     return {"type": detected["type"], "module": detected["module"], "override": False}
 
 
-def resolve_flask_entrypoint(tar_stream, *, server_type: str | None = None) -> dict:
+def resolve_flask_entrypoint(manifest, *, server_type: str | None = None) -> dict:
     """Detect Flask / FastAPI / create_app entrypoint."""
     server_type_clean = (server_type or "").strip().lower() or None
     if server_type_clean not in (None, "asgi", "wsgi"):
@@ -100,42 +95,29 @@ def resolve_flask_entrypoint(tar_stream, *, server_type: str | None = None) -> d
             details={"server_type": server_type},
         )
     candidates: list[dict] = []
-    tar_stream.seek(0)
-    with tarfile.open(fileobj=tar_stream, mode="r:*") as tar:
-        for member in tar.getmembers():
-            if not member.name.endswith(".py") or member.name.count("/") > 2:
-                continue
-            if any(skip in member.name for skip in ("test_", "tests/", "__pycache__", "migrations/")):
-                continue
-            file_obj = tar.extractfile(member)
-            if not file_obj:
-                continue
-            text = file_obj.read().decode("utf-8", errors="ignore")
-            if re.search(r"\b(FastAPI|Starlette)\s*\(", text):
-                for name in ("app", "application", "api"):
-                    if re.search(rf"\b{name}\s*=\s*(FastAPI|Starlette)\s*\(", text):
-                        module = member.name.rsplit(".", 1)[0].replace("/", ".")
-                        if module.startswith("./"):
-                            module = module[2:]
-                        candidates.append({"type": "asgi", "module": module, "callable": name, "priority": 10})
-                        break
-            if re.search(r"\bFlask\s*\(", text):
-                for name in ("app", "application"):
-                    if re.search(rf"\b{name}\s*=\s*Flask\s*\(", text):
-                        module = member.name.rsplit(".", 1)[0].replace("/", ".")
-                        if module.startswith("./"):
-                            module = module[2:]
-                        candidates.append({"type": "wsgi", "module": module, "callable": name, "priority": 5})
-                        break
-                if re.search(r"def\s+create_app\s*\(", text):
-                    module = member.name.rsplit(".", 1)[0].replace("/", ".")
-                    if module.startswith("./"):
-                        module = module[2:]
-                    candidates.append({"type": "wsgi", "module": module, "callable": "create_app()", "priority": 4})
-            if re.search(r"\bapplication\s*=\s*", text) and "wsgi" in member.name.lower():
-                module = member.name.rsplit(".", 1)[0].replace("/", ".")
-                candidates.append({"type": "wsgi", "module": module, "callable": "application", "priority": 3})
-    tar_stream.seek(0)
+    for member_name in manifest:
+        if not member_name.endswith(".py") or member_name.count("/") > 2:
+            continue
+        if any(skip in member_name for skip in ("test_", "tests/", "__pycache__", "migrations/")):
+            continue
+        text = manifest.read_text(member_name)
+        if not text:
+            continue
+        module = member_name.rsplit(".", 1)[0].replace("/", ".")
+        if re.search(r"\b(FastAPI|Starlette)\s*\(", text):
+            for name in ("app", "application", "api"):
+                if re.search(rf"\b{name}\s*=\s*(FastAPI|Starlette)\s*\(", text):
+                    candidates.append({"type": "asgi", "module": module, "callable": name, "priority": 10})
+                    break
+        if re.search(r"\bFlask\s*\(", text):
+            for name in ("app", "application"):
+                if re.search(rf"\b{name}\s*=\s*Flask\s*\(", text):
+                    candidates.append({"type": "wsgi", "module": module, "callable": name, "priority": 5})
+                    break
+            if re.search(r"def\s+create_app\s*\(", text):
+                candidates.append({"type": "wsgi", "module": module, "callable": "create_app()", "priority": 4})
+        if re.search(r"\bapplication\s*=\s*", text) and "wsgi" in member_name.lower():
+            candidates.append({"type": "wsgi", "module": module, "callable": "application", "priority": 3})
     if not candidates:
         return {
             "type": server_type_clean or "wsgi",
@@ -153,32 +135,24 @@ def resolve_flask_entrypoint(tar_stream, *, server_type: str | None = None) -> d
     return best
 
 
-def resolve_python_entrypoint(tar_stream, *, server_type: str | None = None) -> dict:
-    return resolve_flask_entrypoint(tar_stream, server_type=server_type)
+def resolve_python_entrypoint(manifest, *, server_type: str | None = None) -> dict:
+    return resolve_flask_entrypoint(manifest, server_type=server_type)
 
 
-def resolve_node_entrypoint(tar_stream) -> dict:
-    tar_stream.seek(0)
-    with tarfile.open(fileobj=tar_stream, mode="r:*") as tar:
-        for member in tar.getmembers():
-            if member.name.endswith("package.json") and member.name.count("/") <= 1:
-                file_obj = tar.extractfile(member)
-                if not file_obj:
-                    continue
-                try:
-                    pkg = json.loads(file_obj.read().decode("utf-8", errors="ignore"))
-                except Exception:
-                    continue
-                scripts = pkg.get("scripts") or {}
-                start = scripts.get("start") or scripts.get("serve") or scripts.get("dev")
-                main = pkg.get("main") or "index.js"
-                return {
-                    "start_script": start,
-                    "main": main,
-                    "has_build": "build" in scripts,
-                    "framework": _detect_node_framework(pkg),
-                }
-    tar_stream.seek(0)
+def resolve_node_entrypoint(manifest) -> dict:
+    for name in manifest.find_basename("package.json", max_depth=1):
+        pkg = manifest.read_json(name)
+        if pkg is None:
+            continue
+        scripts = pkg.get("scripts") or {}
+        start = scripts.get("start") or scripts.get("serve") or scripts.get("dev")
+        main = pkg.get("main") or "index.js"
+        return {
+            "start_script": start,
+            "main": main,
+            "has_build": "build" in scripts,
+            "framework": _detect_node_framework(pkg),
+        }
     return {"start_script": None, "main": "index.js", "has_build": False, "framework": "node"}
 
 
@@ -218,7 +192,7 @@ PLATFORMS_REQUIRING_PACKAGE_JSON = frozenset({
 })
 
 
-def check_requirements_txt(tar_stream, *, platform: str) -> None:
+def check_requirements_txt(manifest, *, platform: str) -> None:
     """Validate that a Python deployment contains a supported dependency manifest.
 
     Older code required requirements.txt for every Python-family project, which
@@ -226,17 +200,7 @@ def check_requirements_txt(tar_stream, *, platform: str) -> None:
     """
     if platform not in PLATFORMS_REQUIRING_REQUIREMENTS_TXT:
         return
-    tar_stream.seek(0)
-    try:
-        with tarfile.open(fileobj=tar_stream, mode="r:*") as tar:
-            names = [n.replace("\\", "/") for n in tar.getnames()]
-    finally:
-        tar_stream.seek(0)
-    found = [
-        n for n in names
-        if any(n == marker or n.endswith("/" + marker) for marker in PYTHON_DEPENDENCY_MARKERS)
-    ]
-    if not found:
+    if not manifest.has_basename(*PYTHON_DEPENDENCY_MARKERS):
         raise DeploymentValidationError(
             "No supported Python dependency manifest was found. Add requirements.txt, pyproject.toml, or Pipfile.",
             stage="requirements_check",
@@ -244,17 +208,10 @@ def check_requirements_txt(tar_stream, *, platform: str) -> None:
         )
 
 
-def check_package_json(tar_stream, *, platform: str) -> None:
+def check_package_json(manifest, *, platform: str) -> None:
     if platform not in PLATFORMS_REQUIRING_PACKAGE_JSON:
         return
-    tar_stream.seek(0)
-    try:
-        with tarfile.open(fileobj=tar_stream, mode="r:*") as tar:
-            names = tar.getnames()
-    finally:
-        tar_stream.seek(0)
-    found = [n for n in names if n.endswith("package.json")]
-    if not found:
+    if not manifest.has_basename("package.json"):
         raise DeploymentValidationError(
             "package.json not found in the deployment archive. "
             "A package.json file is required for Node-based platforms.",
@@ -0,0 +1,153 @@
+"""
+deployments/core/event_stream.py
+--------------------------------
+Replayable per-deployment event log in a capped Redis Stream.
+
+``DBAndChannelEventSink`` appends every event it broadcasts:
+
+    deploy:events:<deploy id>   XADD MAXLEN ~N + EXPIRE (one pipeline)
+
+and sends the stream entry id along as ``event["id"]``.  A reconnecting
+``DeploymentConsumer`` passes the last id it saw (``?last_event_id=``) and
+gets everything after it from ``read_after`` before live delivery resumes;
+the consumer drops live events whose id it already replayed.  No DeployLog
+query is involved, so a network-blip reconnect costs a couple of XRANGEs.
+
+When the requested id is older than the oldest retained entry, the reply is
+marked ``truncated`` and the client should page the DB logs instead.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY_PREFIX = "deploy:events:"
+
+DEFAULT_MAXLEN = 2000
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def maxlen() -> int:
+    return max(10, int(_setting("DEPLOY_EVENT_STREAM_MAXLEN", DEFAULT_MAXLEN)))
+
+
+def ttl_seconds() -> int:
+    return max(60, int(_setting("DEPLOY_EVENT_STREAM_TTL", DEFAULT_TTL_SECONDS)))
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        logger.exception("event_stream: cannot obtain redis connection")
+        return None
+
+
+def stream_key(deploy_id) -> str:
+    return f"{STREAM_KEY_PREFIX}{deploy_id}"
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def parse_id(event_id) -> Optional[Tuple[int, int]]:
+    """``"1700000000000-3"`` → ``(1700000000000, 3)``; ``None`` if malformed."""
+    if event_id is None:
+        return None
+    ms, _, seq = _text(event_id).partition("-")
+    try:
+        return int(ms), int(seq or 0)
+    except ValueError:
+        return None
+
+
+def append(deploy_id, payload: dict, redis=None) -> Optional[str]:
+    """Add ``payload`` to the deployment's stream; returns the entry id."""
+    r = redis or _redis()
+    if r is None:
+        return None
+    key = stream_key(deploy_id)
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.xadd(key, {"p": json.dumps(payload, default=str)}, maxlen=maxlen(), approximate=True)
+        pipe.expire(key, ttl_seconds())
+        entry_id = pipe.execute()[0]
+        return _text(entry_id)
+    except Exception:
+        logger.warning("event_stream: XADD failed for deploy %s", deploy_id, exc_info=True)
+        return None
+
+
+def _decode(entries) -> List[dict]:
+    events = []
+    for entry_id, fields in entries or []:
+        raw = fields.get(b"p") if b"p" in fields else fields.get("p")
+        try:
+            payload = json.loads(_text(raw))
+        except (TypeError, ValueError):
+            continue
+        payload["id"] = _text(entry_id)
+        events.append(payload)
+    return events
+
+
+def read_after(deploy_id, last_id, *, limit: Optional[int] = None, redis=None) -> Tuple[List[dict], bool]:
+    """Events strictly after ``last_id`` (``"0"`` = from the start).
+
+    Returns ``(events, truncated)``.  ``truncated`` means the client is
+    missing events the stream no longer holds: its id predates the oldest
+    retained entry of a stream that has been trimmed (or has expired), or
+    more than ``limit`` events are pending and only the newest are returned.
+    """
+    r = redis or _redis()
+    parsed = parse_id(last_id)
+    if r is None or parsed is None:
+        return [], False
+    key = stream_key(deploy_id)
+    limit = limit or maxlen()
+    from_start = parsed == (0, 0)
+    try:
+        start = "-" if from_start else f"({parsed[0]}-{parsed[1]}"
+        entries = r.xrange(key, min=start, max="+", count=limit + 1)
+        if len(entries) > limit:
+            entries = list(reversed(r.xrevrange(key, max="+", min=start, count=limit)))
+            return _decode(entries), True
+        if from_start:
+            return _decode(entries), False
+        oldest = r.xrange(key, min="-", max="+", count=1)
+        if not oldest:
+            truncated = True  # expired (or never written) — DB is the only source
+        else:
+            # Approximate MAXLEN only trims once the stream is at least
+            # ``maxlen`` long, so a shorter stream still holds everything.
+            truncated = parse_id(oldest[0][0]) > parsed and r.xlen(key) >= maxlen()
+        return _decode(entries), truncated
+    except Exception:
+        logger.warning("event_stream: replay failed for deploy %s", deploy_id, exc_info=True)
+        return [], False
+
+
+def latest_id(deploy_id, redis=None) -> Optional[str]:
+    r = redis or _redis()
+    if r is None:
+        return None
+    try:
+        entries = r.xrevrange(stream_key(deploy_id), max="+", min="-", count=1)
+        return _text(entries[0][0]) if entries else None
+    except Exception:
+        logger.warning("event_stream: XREVRANGE failed for deploy %s", deploy_id, exc_info=True)
+        return None
@@ -928,63 +928,9 @@ class Container(Client):
                 return zero
 
             stats = container.stats(stream=False)
-
-            cpu_stats = stats.get("cpu_stats", {}) or {}
-            precpu_stats = stats.get("precpu_stats", {}) or {}
-
-            cpu_usage = cpu_stats.get("cpu_usage", {}) or {}
-            precpu_usage = precpu_stats.get("cpu_usage", {}) or {}
-
-            cpu_delta = float(cpu_usage.get("total_usage", 0) or 0) - float(
-                precpu_usage.get("total_usage", 0) or 0
-            )
-            system_delta = float(cpu_stats.get("system_cpu_usage", 0) or 0) - float(
-                precpu_stats.get("system_cpu_usage", 0) or 0
-            )
-
-            cpu_count = (
-                cpu_stats.get("online_cpus")
-                or len(cpu_usage.get("percpu_usage", []) or [])
-                or 1
-            )
-            try:
-                cpu_count = max(int(cpu_count), 1)
-            except (TypeError, ValueError):
-                cpu_count = 1
-
-            if cpu_delta > 0 and system_delta > 0:
-                used_cores = (cpu_delta / system_delta) * cpu_count
-            else:
-                used_cores = 0.0
-
-            host_config = (container.attrs or {}).get("HostConfig", {}) or {}
-            cpu_quota = float(host_config.get("CpuQuota", 0) or 0)
-            cpu_period = float(host_config.get("CpuPeriod", 0) or 0)
-
-            if cpu_quota > 0 and cpu_period > 0:
-                cpu_limit_cores = cpu_quota / cpu_period
-                cpu_percent = (used_cores / cpu_limit_cores) * 100.0 if cpu_limit_cores > 0 else 0.0
-            else:
-                cpu_percent = used_cores * 100.0 / cpu_count
-
-            cpu_percent = min(max(cpu_percent, 0.0), 100.0)
-
-            memory_stats = stats.get("memory_stats", {}) or {}
-            memory_usage = float(memory_stats.get("usage", 0) or 0)
-            memory_limit = float(memory_stats.get("limit", 0) or 0)
-
-            mem_limit_cfg = host_config.get("Memory") or 0
-            try:
-                mem_limit_cfg = float(mem_limit_cfg or 0)
-            except (TypeError, ValueError):
-                mem_limit_cfg = 0.0
-            if mem_limit_cfg > 0:
-                memory_limit = mem_limit_cfg
-
-            memory_percent = (
-                (memory_usage / memory_limit) * 100.0 if memory_limit > 0 else 0.0
+            cpu_percent, memory_percent, memory_limit = compute_usage_percent(
+                stats, (container.attrs or {}).get("HostConfig", {}) or {},
             )
-            memory_percent = min(max(memory_percent, 0.0), 100.0)
 
             return {
                 "cpu": round(cpu_percent, 2),
@@ -1003,6 +949,81 @@ class Container(Client):
 # Helpers
 # ---------------------------------------------------------------------------
 
+def compute_usage_percent(
+    stats: dict,
+    host_config: dict,
+    previous: dict | None = None,
+) -> tuple[float, float, float]:
+    """
+    ``(cpu_percent, memory_percent, memory_limit)`` from one Docker stats
+    sample.
+
+    CPU is measured against ``previous`` (the prior sample of a streaming
+    subscription) when given, else against the sample's ``precpu_stats``.
+    Percentages are relative to the container's CPU quota / memory limit
+    when set, host-relative otherwise, and clamped to 0..100.
+    """
+    cpu_stats = stats.get("cpu_stats", {}) or {}
+    if previous is not None:
+        precpu_stats = previous.get("cpu_stats", {}) or {}
+    else:
+        precpu_stats = stats.get("precpu_stats", {}) or {}
+
+    cpu_usage = cpu_stats.get("cpu_usage", {}) or {}
+    precpu_usage = precpu_stats.get("cpu_usage", {}) or {}
+
+    cpu_delta = float(cpu_usage.get("total_usage", 0) or 0) - float(
+        precpu_usage.get("total_usage", 0) or 0
+    )
+    system_delta = float(cpu_stats.get("system_cpu_usage", 0) or 0) - float(
+        precpu_stats.get("system_cpu_usage", 0) or 0
+    )
+
+    cpu_count = (
+        cpu_stats.get("online_cpus")
+        or len(cpu_usage.get("percpu_usage", []) or [])
+        or 1
+    )
+    try:
+        cpu_count = max(int(cpu_count), 1)
+    except (TypeError, ValueError):
+        cpu_count = 1
+
+    if cpu_delta > 0 and system_delta > 0:
+        used_cores = (cpu_delta / system_delta) * cpu_count
+    else:
+        used_cores = 0.0
+
+    cpu_quota = float(host_config.get("CpuQuota", 0) or 0)
+    cpu_period = float(host_config.get("CpuPeriod", 0) or 0)
+
+    if cpu_quota > 0 and cpu_period > 0:
+        cpu_limit_cores = cpu_quota / cpu_period
+        cpu_percent = (used_cores / cpu_limit_cores) * 100.0 if cpu_limit_cores > 0 else 0.0
+    else:
+        cpu_percent = used_cores * 100.0 / cpu_count
+
+    cpu_percent = min(max(cpu_percent, 0.0), 100.0)
+
+    memory_stats = stats.get("memory_stats", {}) or {}
+    memory_usage = float(memory_stats.get("usage", 0) or 0)
+    memory_limit = float(memory_stats.get("limit", 0) or 0)
+
+    mem_limit_cfg = host_config.get("Memory") or 0
+    try:
+        mem_limit_cfg = float(mem_limit_cfg or 0)
+    except (TypeError, ValueError):
+        mem_limit_cfg = 0.0
+    if mem_limit_cfg > 0:
+        memory_limit = mem_limit_cfg
+
+    memory_percent = (
+        (memory_usage / memory_limit) * 100.0 if memory_limit > 0 else 0.0
+    )
+    memory_percent = min(max(memory_percent, 0.0), 100.0)
+    return cpu_percent, memory_percent, memory_limit
+
+
 def _get_deployment_domain() -> str:
     """Read DEPLOYMENT_DOMAIN from Django settings with a safe fallback."""
     try:
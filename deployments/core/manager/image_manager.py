@@ -7,6 +7,7 @@ import os
 import re
 import tarfile
 import tempfile
+import time
 import traceback
 from typing import Any, Callable, Optional
 
@@ -14,6 +15,7 @@ import docker
 import docker.errors
 from docker.errors import BuildError, ImageNotFound
 
+from deployments.core import buildkit
 from deployments.core.exceptions import CleanupError, ImageBuildError
 from .client_manager import Client
 
@@ -56,6 +58,9 @@ def _build_default_parallelism() -> int:
         return int(_setting("DEPLOY_BUILD_PARALLELISM", os.getenv("DEPLOY_BUILD_PARALLELISM", "1")))
 
 
+# Per-process answer to "does the daemon accept BuildKit builds?" (None = unknown)
+_BUILDKIT_SUPPORTED: bool | None = None
+
 # Lazy defaults — re-read from DB on each build via helpers below
 DEFAULT_BUILD_CPU: float = 1.0
 DEFAULT_BUILD_RAM_MB: int = 1024
@@ -228,6 +233,9 @@ def _make_safe_ref(name: str, tag: str) -> str:
 # ---------------------------------------------------------------------------
 
 class Image(Client):
+    # Build args passed to every ``api.build``; part of the build-cache digest.
+    DEFAULT_BUILDARGS: dict[str, str] = {"BUILDKIT_INLINE_CACHE": "1"}
+
     def __init__(
         self,
         name: str,
@@ -235,20 +243,36 @@ class Image(Client):
         dockerfile_text: str = None,
         tarfile: io.BytesIO = None,
         *,
+        context_dir: str | None = None,
+        build_digest: str | None = None,
         max_cpu: float | None = None,
         max_ram: int | None = None,
+        build_slot: Callable | None = None,
     ):
         super().__init__()
         self.name = _sanitize_image_name(name)
         self.tag = _sanitize_image_tag(tag)
         self.dockerfile_text = dockerfile_text
         self.tarfile = tarfile
+        # Pre-extracted build context (see build_context.ingest_zip).
+        # Preferred over ``tarfile``, which is extracted to a temp dir.
+        self.context_dir = context_dir
+        # Content digest from build_cache.compute_build_digest.  When set,
+        # create() re-tags a previously built image with the same digest
+        # instead of rebuilding.
+        self.build_digest = build_digest
+        self.cache_hit = False
+        self.seconds_saved = 0.0
         self.image_ref = _make_safe_ref(self.name, self.tag)
         # Keep name/tag in sync with image_ref
         if ":" in self.image_ref:
             self.name, self.tag = self.image_ref.rsplit(":", 1)
         self.max_cpu = max_cpu
         self.max_ram = max_ram
+        # Optional ``build_slot(limits)`` context manager (the build
+        # scheduler's admission gate).  Only real builds enter it; cache
+        # hits and re-tags never wait for a slot.
+        self.build_slot = build_slot
         if not self.name:
             raise ValueError("Image name must not be empty")
 
@@ -390,6 +414,348 @@ class Image(Client):
         return image_id
 
 
+    def _build_from_directory(
+        self,
+        root: str,
+        *,
+        limits: dict[str, Any],
+        buildargs: dict[str, str],
+        target_ref: str,
+        labels: Optional[dict[str, str]] = None,
+        on_build_output: Optional[Callable] = None,
+    ):
+        """Write the rendered Dockerfile into ``root`` and run ``api.build``."""
+        build_path = root
+        app_dir = os.path.join(root, "app")
+        if os.path.isdir(app_dir) and os.path.exists(
+            os.path.join(app_dir, "Dockerfile")
+        ):
+            build_path = app_dir
+        else:
+            with open(
+                os.path.join(root, "Dockerfile"),
+                "w",
+                encoding="utf-8",
+            ) as f:
+                f.write(self.dockerfile_text)
+
+        # Ensure Dockerfile exists at build root
+        df_path = os.path.join(build_path, "Dockerfile")
+        if not os.path.isfile(df_path):
+            with open(df_path, "w", encoding="utf-8") as f:
+                f.write(self.dockerfile_text)
+
+        logger.info(
+            "Build context ready path=%s files=%s",
+            build_path,
+            len(os.listdir(build_path)),
+        )
+
+        with open(df_path, encoding="utf-8") as f:
+            dockerfile = f.read()
+        if buildkit.uses_cache_mounts(dockerfile):
+            if self._buildkit_available():
+                image_id = self._build_with_buildkit(
+                    build_path,
+                    buildargs=buildargs,
+                    labels=labels,
+                    on_build_output=on_build_output,
+                )
+                self._tag_image(image_id)
+                try:
+                    return self.client.images.get(target_ref)
+                except ImageNotFound:
+                    return self.client.images.get(image_id)
+            # Decided before anything was built: the classic builder runs
+            # once, on the same Dockerfile without the cache mounts.
+            with open(df_path, "w", encoding="utf-8") as f:
+                f.write(buildkit.strip_cache_mounts(dockerfile))
+
+        # Try progressively simpler kwargs so unsupported options
+        # never abort the whole deploy.
+        attempt_kwargs = [
+            dict(
+                path=build_path,
+                rm=True,
+                forcerm=True,
+                decode=True,
+                container_limits=limits,
+                buildargs=buildargs,
+                network_mode="default",
+                **({"labels": labels} if labels else {}),
+            ),
+            dict(
+                path=build_path,
+                rm=True,
+                forcerm=True,
+                decode=True,
+                buildargs=buildargs,
+                **({"labels": labels} if labels else {}),
+            ),
+            dict(
+                path=build_path,
+                rm=True,
+                forcerm=True,
+                decode=True,
+            ),
+        ]
+
+        response = None
+        last_err: Exception | None = None
+        for i, kwargs in enumerate(attempt_kwargs):
+            try:
+                logger.info(
+                    "api.build attempt %d kwargs=%s",
+                    i + 1,
+                    sorted(k for k in kwargs if k != "path"),
+                )
+                response = self.client.api.build(**kwargs)
+                last_err = None
+                break
+            except TypeError as exc:
+                # Unknown kwarg for this docker-py version
+                logger.warning(
+                    "api.build attempt %d TypeError: %s", i + 1, exc
+                )
+                last_err = exc
+            except docker.errors.DockerException as exc:
+                msg = str(exc).lower()
+                # Still the broken match_tag? (should not happen without tag=)
+                logger.warning(
+                    "api.build attempt %d DockerException: %s: %s",
+                    i + 1,
+                    type(exc).__name__,
+                    exc,
+                )
+                last_err = exc
+                # If somehow tag validation still triggers, continue
+                if "invalid tag" in msg or "invalid reference" in msg:
+                    continue
+                # Other docker errors (daemon down, etc.) — stop
+                break
+            except Exception as exc:
+                logger.warning(
+                    "api.build attempt %d %s: %s",
+                    i + 1,
+                    type(exc).__name__,
+                    exc,
+                )
+                last_err = exc
+                break
+
+        if response is None:
+            raise ImageBuildError(
+                f"Docker api.build failed: "
+                f"{type(last_err).__name__ if last_err else 'unknown'}: "
+                f"{last_err}",
+                details={
+                    "image": target_ref,
+                    "error": str(last_err),
+                    "error_type": type(last_err).__name__
+                    if last_err
+                    else None,
+                },
+            ) from last_err
+
+        image_id = self._handle_build_stream_collect_id(
+            response, on_build_output=on_build_output
+        )
+
+        if not image_id:
+            # SECURITY/RELIABILITY: the legacy code fell back to
+            # ``dangling[0].id`` here, which could pick up an
+            # UNRELATED dangling image and silently tag it as the
+            # deployment image — deploying the wrong code.  We
+            # now fail loudly instead of guessing.
+            raise ImageBuildError(
+                "Docker build finished but no image ID was returned "
+                "by the build stream. Refusing to guess a dangling image.",
+                details={
+                    "image": target_ref,
+                    "hint": (
+                        "Enable BuildKit (DOCKER_BUILDKIT=1) or upgrade "
+                        "docker-py to a version that emits 'writing image "
+                        "sha256:...' in the build stream."
+                    ),
+                },
+            )
+
+        self._tag_image(image_id)
+
+        try:
+            return self.client.images.get(target_ref)
+        except ImageNotFound:
+            return self.client.images.get(image_id)
+
+    def _buildkit_available(self) -> bool:
+        """BuildKit over the Engine API needs API >= 1.39 on a Linux daemon.
+
+        Only consulted when ``DEPLOY_BUILD_BUILDKIT`` is on: BuildKit
+        ignores per-build ``container_limits``, so it is an operator
+        opt-in for hosts whose daemon is confined as a whole.
+        """
+        global _BUILDKIT_SUPPORTED
+        if not buildkit.buildkit_enabled():
+            return False
+        if _BUILDKIT_SUPPORTED is None:
+            try:
+                version = self.client.version() or {}
+                api = tuple(int(p) for p in str(version.get("ApiVersion", "0")).split(".")[:2])
+                _BUILDKIT_SUPPORTED = api >= (1, 39) and str(version.get("Os", "linux")).lower() == "linux"
+            except Exception:
+                logger.warning("Could not determine BuildKit support", exc_info=True)
+                return False
+        return _BUILDKIT_SUPPORTED
+
+    def _build_with_buildkit(
+        self,
+        build_path: str,
+        *,
+        buildargs: dict[str, str],
+        labels: Optional[dict[str, str]] = None,
+        on_build_output: Optional[Callable] = None,
+    ) -> str:
+        """
+        ``POST /build?version=2`` with the context as a tar upload.
+
+        docker-py's ``api.build`` has no BuildKit switch, so the request
+        goes through the client's public ``requests`` session.  There is
+        no retry with the classic builder here: if the daemon turns out
+        not to support BuildKit the build fails, and later builds in this
+        process use the classic builder.
+        """
+        global _BUILDKIT_SUPPORTED
+        import requests
+        from docker import auth as docker_auth
+        from docker import utils as docker_utils
+        from docker.utils.json_stream import json_stream
+
+        api = self.client.api
+        exclude = None
+        dockerignore = os.path.join(build_path, ".dockerignore")
+        if os.path.exists(dockerignore):
+            with open(dockerignore, encoding="utf-8") as f:
+                exclude = [
+                    line.strip() for line in f.read().splitlines()
+                    if line.strip() and not line.strip().startswith("#")
+                ]
+        params = {
+            "version": "2",
+            "rm": True,
+            "forcerm": True,
+            "buildargs": json.dumps(buildargs or {}),
+        }
+        if labels:
+            params["labels"] = json.dumps(labels)
+        headers = {"Content-Type": "application/tar"}
+        try:
+            credentials = docker_auth.load_config().get_all_credentials()
+            if credentials:
+                headers["X-Registry-Config"] = docker_auth.encode_header(credentials)
+        except Exception:
+            logger.debug("Registry credentials unavailable for BuildKit build", exc_info=True)
+
+        context = docker_utils.tar(build_path, exclude=exclude)
+        try:
+            response = api.post(
+                f"{api.base_url}/v{api.api_version}/build",
+                params=params,
+                data=context,
+                headers=headers,
+                stream=True,
+                timeout=None,
+            )
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as exc:
+                raise docker.errors.create_api_error_from_http_exception(exc) from exc
+        except docker.errors.APIError as exc:
+            if buildkit.is_capability_error(str(exc)):
+                _BUILDKIT_SUPPORTED = False
+                raise ImageBuildError(
+                    "The Docker daemon rejected a BuildKit build.",
+                    details={
+                        "image": self.image_ref,
+                        "error": str(exc),
+                        "hint": "Retry the deploy; this worker now uses the classic builder.",
+                    },
+                ) from exc
+            raise
+        finally:
+            context.close()
+
+        logger.info("api.build BuildKit (version=2) started")
+        try:
+            image_id = self._handle_build_stream_collect_id(
+                buildkit.decode_build_stream(
+                    json_stream(response.iter_content(chunk_size=None))
+                ),
+                on_build_output=on_build_output,
+            )
+        except BuildError as exc:
+            if buildkit.is_capability_error(str(exc)):
+                _BUILDKIT_SUPPORTED = False
+            raise
+        if not image_id:
+            raise ImageBuildError(
+                "BuildKit build finished but no image ID was returned.",
+                details={"image": self.image_ref},
+            )
+        return image_id
+
+    def _reuse_cached_image(self, digest: str):
+        """
+        Re-tag an existing image built from the same digest, if any.
+
+        The Postgres index is consulted first; the image label is the
+        fallback (e.g. after a DB restore).  Returns the image or None.
+        """
+        from deployments.core import build_cache
+
+        candidate = None
+        image_id = build_cache.lookup_image_id(digest)
+        if image_id:
+            try:
+                candidate = self.client.images.get(image_id)
+            except ImageNotFound:
+                candidate = None
+            except Exception:
+                logger.debug("Build cache image lookup failed", exc_info=True)
+                candidate = None
+            if candidate is not None:
+                labels = (candidate.attrs.get("Config") or {}).get("Labels") or {}
+                recorded = labels.get(build_cache.BUILD_DIGEST_LABEL)
+                if recorded and recorded != digest:
+                    candidate = None
+
+        if candidate is None:
+            try:
+                found = self.client.images.list(
+                    filters={"label": f"{build_cache.BUILD_DIGEST_LABEL}={digest}"}
+                )
+            except Exception:
+                found = []
+            candidate = found[0] if found else None
+
+        if candidate is None:
+            return None
+
+        self._tag_image(candidate.id)
+        self.cache_hit = True
+        self.seconds_saved = build_cache.record_hit(
+            digest, image_id=candidate.id, image_ref=self.image_ref,
+        )
+        logger.info(
+            "Build cache hit digest=%s image=%s saved=%.1fs",
+            digest[:12],
+            (candidate.id or "")[:19],
+            self.seconds_saved,
+        )
+        try:
+            return self.client.images.get(self.image_ref)
+        except ImageNotFound:
+            return candidate
+
     def create(self, on_build_output: Optional[Callable] = None):
         """
         Build Docker image without passing tag= (avoids broken match_tag).
@@ -397,8 +763,8 @@ class Image(Client):
         Also degrades gracefully if container_limits / network_mode are
         unsupported by the installed docker-py or engine.
         """
-        if not self.dockerfile_text or not self.tarfile:
-            raise ValueError("dockerfile_text and tarfile are required")
+        if not self.dockerfile_text or not (self.context_dir or self.tarfile):
+            raise ValueError("dockerfile_text and context_dir (or tarfile) are required")
 
         limits = _build_container_limits(
             max_cpu=self.max_cpu,
@@ -430,9 +796,47 @@ class Image(Client):
         except Exception:
             pass
 
-        buildargs = {"BUILDKIT_INLINE_CACHE": "1"}
+        buildargs = dict(self.DEFAULT_BUILDARGS)
+        labels = None
+
+        if self.build_digest:
+            from deployments.core import build_cache
 
+            labels = {build_cache.BUILD_DIGEST_LABEL: self.build_digest}
+            try:
+                cached = self._reuse_cached_image(self.build_digest)
+            except Exception:
+                logger.warning(
+                    "Build cache reuse failed for %s; building instead",
+                    target_ref,
+                    exc_info=True,
+                )
+                cached = None
+            if cached is not None:
+                return cached
+
+        if self.build_slot is None:
+            return self._build(limits, buildargs, target_ref, labels, on_build_output)
+        with self.build_slot(limits):
+            return self._build(limits, buildargs, target_ref, labels, on_build_output)
+
+    def _build(self, limits, buildargs, target_ref, labels, on_build_output):
         try:
+            started = time.monotonic()
+            if self.context_dir:
+                # Single-pass ingestion already laid the archive out on
+                # disk; build straight from that directory.
+                image = self._build_from_directory(
+                    self.context_dir,
+                    limits=limits,
+                    buildargs=buildargs,
+                    target_ref=target_ref,
+                    labels=labels,
+                    on_build_output=on_build_output,
+                )
+                self._record_build(image, time.monotonic() - started)
+                return image
+
             with tempfile.TemporaryDirectory() as tmpdir:
                 tar_stream = (
                     io.BytesIO(self.tarfile)
@@ -443,145 +847,16 @@ class Image(Client):
                 with tarfile.open(fileobj=tar_stream, mode="r:*") as tar:
                     safe_extract(tar, tmpdir, max_bytes=500 * 1024 * 1024)
 
-                build_path = tmpdir
-                app_dir = os.path.join(tmpdir, "app")
-                if os.path.isdir(app_dir) and os.path.exists(
-                    os.path.join(app_dir, "Dockerfile")
-                ):
-                    build_path = app_dir
-                else:
-                    with open(
-                        os.path.join(tmpdir, "Dockerfile"),
-                        "w",
-                        encoding="utf-8",
-                    ) as f:
-                        f.write(self.dockerfile_text)
-
-                # Ensure Dockerfile exists at build root
-                df_path = os.path.join(build_path, "Dockerfile")
-                if not os.path.isfile(df_path):
-                    with open(df_path, "w", encoding="utf-8") as f:
-                        f.write(self.dockerfile_text)
-
-                logger.info(
-                    "Build context ready path=%s files=%s",
-                    build_path,
-                    len(os.listdir(build_path)),
+                image = self._build_from_directory(
+                    tmpdir,
+                    limits=limits,
+                    buildargs=buildargs,
+                    target_ref=target_ref,
+                    labels=labels,
+                    on_build_output=on_build_output,
                 )
-
-                # Try progressively simpler kwargs so unsupported options
-                # never abort the whole deploy.
-                attempt_kwargs = [
-                    dict(
-                        path=build_path,
-                        rm=True,
-                        forcerm=True,
-                        decode=True,
-                        container_limits=limits,
-                        buildargs=buildargs,
-                        network_mode="default",
-                    ),
-                    dict(
-                        path=build_path,
-                        rm=True,
-                        forcerm=True,
-                        decode=True,
-                        buildargs=buildargs,
-                    ),
-                    dict(
-                        path=build_path,
-                        rm=True,
-                        forcerm=True,
-                        decode=True,
-                    ),
-                ]
-
-                response = None
-                last_err: Exception | None = None
-                for i, kwargs in enumerate(attempt_kwargs):
-                    try:
-                        logger.info(
-                            "api.build attempt %d kwargs=%s",
-                            i + 1,
-                            sorted(k for k in kwargs if k != "path"),
-                        )
-                        response = self.client.api.build(**kwargs)
-                        last_err = None
-                        break
-                    except TypeError as exc:
-                        # Unknown kwarg for this docker-py version
-                        logger.warning(
-                            "api.build attempt %d TypeError: %s", i + 1, exc
-                        )
-                        last_err = exc
-                    except docker.errors.DockerException as exc:
-                        msg = str(exc).lower()
-                        # Still the broken match_tag? (should not happen without tag=)
-                        logger.warning(
-                            "api.build attempt %d DockerException: %s: %s",
-                            i + 1,
-                            type(exc).__name__,
-                            exc,
-                        )
-                        last_err = exc
-                        # If somehow tag validation still triggers, continue
-                        if "invalid tag" in msg or "invalid reference" in msg:
-                            continue
-                        # Other docker errors (daemon down, etc.) — stop
-                        break
-                    except Exception as exc:
-                        logger.warning(
-                            "api.build attempt %d %s: %s",
-                            i + 1,
-                            type(exc).__name__,
-                            exc,
-                        )
-                        last_err = exc
-                        break
-
-                if response is None:
-                    raise ImageBuildError(
-                        f"Docker api.build failed: "
-                        f"{type(last_err).__name__ if last_err else 'unknown'}: "
-                        f"{last_err}",
-                        details={
-                            "image": target_ref,
-                            "error": str(last_err),
-                            "error_type": type(last_err).__name__
-                            if last_err
-                            else None,
-                        },
-                    ) from last_err
-
-                image_id = self._handle_build_stream_collect_id(
-                    response, on_build_output=on_build_output
-                )
-
-                if not image_id:
-                    # SECURITY/RELIABILITY: the legacy code fell back to
-                    # ``dangling[0].id`` here, which could pick up an
-                    # UNRELATED dangling image and silently tag it as the
-                    # deployment image — deploying the wrong code.  We
-                    # now fail loudly instead of guessing.
-                    raise ImageBuildError(
-                        "Docker build finished but no image ID was returned "
-                        "by the build stream. Refusing to guess a dangling image.",
-                        details={
-                            "image": target_ref,
-                            "hint": (
-                                "Enable BuildKit (DOCKER_BUILDKIT=1) or upgrade "
-                                "docker-py to a version that emits 'writing image "
-                                "sha256:...' in the build stream."
-                            ),
-                        },
-                    )
-
-                self._tag_image(image_id)
-
-                try:
-                    return self.client.images.get(target_ref)
-                except ImageNotFound:
-                    return self.client.images.get(image_id)
+                self._record_build(image, time.monotonic() - started)
+                return image
 
         except BuildError as exc:
             raise ImageBuildError(
@@ -608,6 +883,18 @@ class Image(Client):
             ) from exc
 
 
+    def _record_build(self, image, build_seconds: float) -> None:
+        if not self.build_digest or image is None:
+            return
+        from deployments.core import build_cache
+
+        build_cache.record_build(
+            self.build_digest,
+            image_id=image.id,
+            image_ref=self.image_ref,
+            build_seconds=round(build_seconds, 3),
+        )
+
     def inspect(self):
         image = self.client.images.get(self.image_ref)
         return image.attrs
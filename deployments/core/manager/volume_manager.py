@@ -21,6 +21,32 @@ _SIZE_CAPABLE_DRIVERS = frozenset({
 })
 
 
+# Label on the read-only browsing containers started by
+# services.volume_browser; the value is the Docker volume name.
+BROWSER_HELPER_LABEL = "paas.volume-browser"
+
+
+def release_browser_helpers(client, volume_name: str) -> int:
+    """Remove browsing helpers that keep ``volume_name`` in use."""
+    removed = 0
+    try:
+        helpers = client.containers.list(
+            all=True, filters={"label": f"{BROWSER_HELPER_LABEL}={volume_name}"}
+        )
+    except docker.errors.DockerException as exc:
+        logger.warning("Could not list browser helpers for '%s': %s", volume_name, exc)
+        return 0
+    for helper in helpers:
+        try:
+            helper.remove(force=True)
+            removed += 1
+        except docker.errors.NotFound:
+            pass
+        except docker.errors.DockerException as exc:
+            logger.warning("Could not remove browser helper %s: %s", helper.name, exc)
+    return removed
+
+
 class Volume(Client):
     def __init__(
         self,
@@ -149,6 +175,7 @@ class Volume(Client):
             logger.info("Volume '%s' not found; nothing to remove.", self.name)
             return True
 
+        release_browser_helpers(self.client, self.name)
         try:
             volume.remove()
             logger.info("Volume '%s' deleted.", self.name)
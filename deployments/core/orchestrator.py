@@ -20,15 +20,24 @@ Key changes vs. legacy:
     tokens checked between stages.
   * ``prune_dangling_images`` failures are logged but do not mask the
     deploy result.
+  * The upload is inflated exactly once (``build_context.ingest_zip``);
+    the scratch directory feeds detection, Dockerfile rendering and the
+    docker build, instead of an in-memory tar plus two extra extractions.
+  * Builds are content-addressed (``build_cache``): an unchanged ZIP +
+    Dockerfile + platform config re-tags the previously built image
+    instead of running ``docker build`` again.
+  * ``docker build`` runs inside an optional ``build_slot`` so the build
+    scheduler can cap concurrent builds per Docker host.
 """
 
 from __future__ import annotations
 
-import shutil
 from typing import Optional
 
+from .archive_manifest import ArchiveManifest
+from .build_cache import build_cache_enabled, compute_build_digest
+from .build_context import BuildContext, ingest_zip
 from .cleanup import CleanupManager
-from .converter import convert_zip_to_tar
 from .deployment_logger import DeploymentLogger
 from .dockerfile import DockerfileGenerator
 from deployments.common.exceptions import (
@@ -40,7 +49,7 @@ from .health import DockerHealthChecker
 from .manager.container_manager import Container
 from .manager.image_manager import Image
 from .manager.network_manager import Network
-from .platform_bridge import enrich_config_from_project, extract_zip_to_temp
+from .platform_bridge import enrich_config_from_project
 from .rollback import ContainerSnapshot, RollbackManager
 from .types import DeploymentConfig, DeploymentResult, EventSink
 from .validation import DeploymentValidator
@@ -54,6 +63,7 @@ class DeploymentOrchestrator:
         event_sink: EventSink = None,
         deployment_id: Optional[str] = None,
         cancel_check: Optional[callable] = None,
+        build_slot: Optional[callable] = None,
     ):
         """
         Parameters
@@ -66,6 +76,10 @@ class DeploymentOrchestrator:
         cancel_check
             Optional zero-arg callable returning True if the deployment
             has been cancelled.  Checked between stages.
+        build_slot
+            Optional ``build_slot(limits)`` context manager entered around
+            ``docker build`` (not cache hits) — the build scheduler's
+            per-host admission gate.
         """
         self.logger = DeploymentLogger(deployment_id=deployment_id, sink=event_sink)
         self.validator = DeploymentValidator()
@@ -75,6 +89,7 @@ class DeploymentOrchestrator:
         self.rollback_manager = RollbackManager(logger=self.logger)
         self.cleanup_manager = CleanupManager(logger=self.logger)
         self._cancel_check = cancel_check
+        self._build_slot = build_slot
 
     # ------------------------------------------------------------------
     # Public entry point
@@ -84,7 +99,7 @@ class DeploymentOrchestrator:
         snapshot: ContainerSnapshot = ContainerSnapshot.empty(config.name)
         image_built = False
         volume_binds: dict = {}
-        inspect_temp_dir = None
+        build_context: BuildContext | None = None
         new_container_started = False
         renamed_old_name: str | None = None
 
@@ -104,15 +119,25 @@ class DeploymentOrchestrator:
 
             self._check_cancelled()
 
-            # 2. Build context (zip -> tar)
+            # 2. Build context — the ZIP is validated and inflated ONCE into
+            #    a scratch directory shared by detection, Dockerfile
+            #    rendering and the docker build itself.
             self.logger.info("prepare_resources", "Preparing build context.", progress=10)
-            tar_stream = convert_zip_to_tar(config.zip_path)
+            build_context = ingest_zip(config.zip_path)
+            self.logger.info(
+                "prepare_resources",
+                "Build context is ready.",
+                progress=11,
+                details={
+                    "file_count": build_context.file_count,
+                    "total_bytes": build_context.total_bytes,
+                },
+            )
 
             # 3. Platform auto-detection
             try:
-                inspect_temp_dir, project_root = extract_zip_to_temp(config.zip_path)
                 config = enrich_config_from_project(
-                    config, project_root, logger_sink=self.logger,
+                    config, build_context.project_root, logger_sink=self.logger,
                 )
             except Exception as exc:
                 self.logger.warning(
@@ -124,11 +149,13 @@ class DeploymentOrchestrator:
 
             self._check_cancelled()
 
-            # 4. Generate Dockerfile
+            # 4. Generate Dockerfile — one index scan shared by every
+            #    detection helper and entrypoint resolver.
+            manifest = ArchiveManifest.scan(build_context.root)
             dockerfile_text = self.dockerfile_generator.render(
                 platform=config.platform,
                 dockerfile_template=config.dockerfile_template,
-                tar_stream=tar_stream,
+                manifest=manifest,
                 config=config,
                 logger=self.logger,
             )
@@ -152,18 +179,36 @@ class DeploymentOrchestrator:
 
             self._check_cancelled()
 
-            # 6. Build image
+            # 6. Build image (or re-tag a cached build of the same digest)
+            build_digest = self._build_digest(manifest, dockerfile_text, config)
             self.logger.info("image_build", "Building Docker image.", progress=20)
             image = Image(
-                config.name, str(config.tag), dockerfile_text, tar_stream,
+                config.name, str(config.tag), dockerfile_text,
+                context_dir=build_context.root,
+                build_digest=build_digest,
                 max_cpu=config.max_cpu, max_ram=config.max_ram,
+                build_slot=self._build_slot,
             )
             image.create(on_build_output=self._on_build_output)
-            image_built = True
-            self.logger.info(
-                "image_build", "Docker image built successfully.",
-                progress=35, details={"image": config.image_ref},
-            )
+            if image.cache_hit:
+                # The image predates this deploy (it may back the previous
+                # container), so a failure must not remove it.
+                self.logger.info(
+                    "image_build", "Reused cached Docker image; build skipped.",
+                    progress=35,
+                    details={
+                        "image": config.image_ref,
+                        "build_digest": build_digest,
+                        "seconds_saved": image.seconds_saved,
+                    },
+                )
+            else:
+                image_built = True
+                self.logger.info(
+                    "image_build", "Docker image built successfully.",
+                    progress=35,
+                    details={"image": config.image_ref, "build_digest": build_digest},
+                )
 
             self._check_cancelled()
 
@@ -314,8 +359,8 @@ class DeploymentOrchestrator:
                 renamed_old_name=renamed_old_name,
             )
         finally:
-            if inspect_temp_dir:
-                shutil.rmtree(inspect_temp_dir, ignore_errors=True)
+            if build_context is not None:
+                build_context.cleanup()
 
     # ------------------------------------------------------------------
     # Cancellation
@@ -586,6 +631,26 @@ class DeploymentOrchestrator:
                 details={"network": spec.name, "internal": spec.internal},
             )
 
+    def _build_digest(self, manifest, dockerfile_text: str, config: DeploymentConfig) -> str | None:
+        """Cache key for this build, or None when caching is off / fails."""
+        if not build_cache_enabled():
+            return None
+        try:
+            return compute_build_digest(
+                manifest,
+                dockerfile_text=dockerfile_text,
+                buildargs=Image.DEFAULT_BUILDARGS,
+                config=config,
+            )
+        except Exception as exc:
+            self.logger.warning(
+                "image_build",
+                f"Could not compute build cache digest: {exc}. Building without cache.",
+                progress=20,
+                details={"error": str(exc)},
+            )
+            return None
+
     def _undo_rename(self, renamed_old_name: str, original_name: str) -> None:
         """Rename the old container back to its original name."""
         try:
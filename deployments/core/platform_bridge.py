@@ -7,20 +7,13 @@ Bridge between platforms/ plugins and DeploymentConfig / Orchestrator.
 from __future__ import annotations
 
 import logging
-import os
-import shutil
-import tempfile
-import zipfile
 from dataclasses import replace
 from typing import Any
 
-from deployments.common.security import (
-    is_safe_archive_name,
-    is_zip_symlink,
-    safe_join,
-    validate_final_app_layout,
+from deployments.common.exceptions import (
+    DeploymentSecurityError,
+    DeploymentValidationError,
 )
-from deployments.common.exceptions import DeploymentSecurityError
 
 from .types import DeploymentConfig
 
@@ -32,11 +25,6 @@ def _ensure_plugins_loaded() -> None:
     from .platforms import loader  # noqa: F401
 
 
-# Hard caps matching converter.convert_zip_to_tar.
-_MAX_EXTRACT_BYTES = 500 * 1024 * 1024
-_MAX_EXTRACT_MEMBERS = 5000
-
-
 def extract_zip_to_temp(zip_path: str) -> tuple[str, str]:
     """
     Extract deployment ZIP to a temporary directory for filesystem inspection.
@@ -44,75 +32,21 @@ def extract_zip_to_temp(zip_path: str) -> tuple[str, str]:
     Returns ``(temp_dir, project_root)``.  Caller MUST call
     ``shutil.rmtree(temp_dir)`` when finished.
 
-    Security:
-      * Rejects absolute paths, ``../`` traversal, Windows drive prefixes.
-      * Rejects symlink + hardlink members (Zip Slip vector).
-      * Caps total uncompressed size and member count.
-      * Uses ``safe_join`` to assert every member resolves inside ``temp_dir``.
+    Thin wrapper over ``build_context.ingest_zip`` (same Zip-Slip, symlink,
+    size and member-count checks).  Size / member-count violations are
+    re-raised as ``ValueError`` so upload endpoints can answer with a 400.
+    The deploy pipeline itself uses ``ingest_zip`` directly so the archive
+    is only inflated once per deploy.
     """
-    if not os.path.exists(zip_path):
-        raise FileNotFoundError(f"ZIP file not found at: {zip_path}")
+    from .build_context import ingest_zip
 
-    temp_dir = tempfile.mkdtemp(prefix="deploy-inspect-")
     try:
-        with zipfile.ZipFile(zip_path, "r") as zf:
-            total_bytes = 0
-            for idx, info in enumerate(zf.infolist()):
-                if idx >= _MAX_EXTRACT_MEMBERS:
-                    raise ValueError(
-                        f"ZIP has too many members (>{_MAX_EXTRACT_MEMBERS})."
-                    )
-                name = info.filename.replace("\\", "/")
-                if not is_safe_archive_name(name):
-                    raise DeploymentSecurityError(
-                        f"Unsafe path in ZIP: {info.filename}",
-                        stage="archive_validation",
-                        details={"filename": info.filename},
-                    )
-                if is_zip_symlink(info):
-                    raise DeploymentSecurityError(
-                        f"Refusing to extract symlink member '{info.filename}'.",
-                        stage="archive_validation",
-                        details={"filename": info.filename},
-                    )
-                # Cap on uncompressed size — guards against zip bombs.
-                total_bytes += info.file_size
-                if total_bytes > _MAX_EXTRACT_BYTES:
-                    raise ValueError(
-                        f"ZIP uncompressed size exceeds {_MAX_EXTRACT_BYTES} bytes."
-                    )
-
-                # Resolve target and assert it stays inside temp_dir.
-                target = safe_join(temp_dir, name)
-                if name.endswith("/"):
-                    os.makedirs(target, exist_ok=True)
-                    continue
-
-                os.makedirs(os.path.dirname(target), exist_ok=True)
-                # Force mode 0o644 for files — no executable bits.
-                with zf.open(info, "r") as src, open(target, "wb") as dst:
-                    import shutil as _shutil
-                    _shutil.copyfileobj(src, dst, length=64 * 1024)
-                os.chmod(target, 0o644)
-    except Exception:
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        raise
-
-    entries = [e for e in os.listdir(temp_dir) if not e.startswith(".")]
-    if len(entries) == 1 and os.path.isdir(os.path.join(temp_dir, entries[0])):
-        project_root = os.path.join(temp_dir, entries[0])
-    else:
-        project_root = temp_dir
-
-    # Post-extract gate: refuse any path that escaped the temp root
-    # or still contains ".." segments (defense in depth after safe_join).
-    try:
-        validate_final_app_layout(project_root)
+        context = ingest_zip(zip_path, prefix="deploy-inspect-")
     except DeploymentSecurityError:
-        shutil.rmtree(temp_dir, ignore_errors=True)
         raise
-
-    return temp_dir, project_root
+    except DeploymentValidationError as exc:
+        raise ValueError(exc.message) from exc
+    return context.root, context.project_root
 
 
 def enrich_config_from_project(
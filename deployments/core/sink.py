@@ -9,8 +9,10 @@ from channels.layers import get_channel_layer
 from django.conf import settings
 from django.utils import timezone
 
+from deploy.event_buffer import BufferedDeployWriter
 from deploy.models import Deploy, DeployLog, DeploymentStatusChoices
 
+from . import event_stream
 from .types import DeploymentEvent
 
 logger = logging.getLogger(__name__)
@@ -87,7 +89,14 @@ class DBAndChannelEventSink:
     Responsibilities (always best-effort, never abort the deploy pipeline):
       1. Persist DeployLog (cross-DB safe via raw FKs)
       2. Keep Deploy.progress / stage / status_message in sync
-      3. Broadcast to Channels group ``deploy_<id>`` → DeploymentConsumer
+      3. Broadcast to Channels group ``deploy_<id>`` → DeploymentConsumer,
+         appending each broadcast to the replayable Redis Stream
+         (``event_stream``) first so the event carries its stream id
+
+    (1) and (2) are buffered by ``BufferedDeployWriter``: Deploy updates are
+    coalesced and DeployLog rows bulk-inserted.  Terminal and error events
+    flush before ``__call__`` returns; call ``flush()`` when the producer
+    is done so trailing events are not left in the buffer.
 
     Usage::
 
@@ -123,6 +132,11 @@ class DBAndChannelEventSink:
         self._last_ws_at: float = 0.0
         self._last_ws_message: str = ""
         self._last_progress: Optional[int] = None
+        self._writer = BufferedDeployWriter(
+            self.deployment_id,
+            log_database=_log_db_alias(),
+            guard_terminal_success=True,
+        )
 
     def __call__(self, event: DeploymentEvent | dict) -> None:
         payload = _serialize_event(event)
@@ -137,6 +151,7 @@ class DBAndChannelEventSink:
 
         # Always keep Deploy row in sync for progress / stage transitions
         self._update_deploy_row(payload, skip_message=noisy and level == "info")
+        self._note_event(payload)
 
         # Broadcast: skip pure noise, throttle remaining build spam
         if noisy:
@@ -146,6 +161,33 @@ class DBAndChannelEventSink:
     def record(self, event: DeploymentEvent | dict) -> None:
         self(event)
 
+    def flush(self) -> None:
+        """Write any buffered Deploy update / DeployLog rows now."""
+        try:
+            self._writer.flush()
+        except Exception:
+            logger.exception(
+                "Failed to flush deploy events for %s", self.deployment_id
+            )
+
+    def _is_terminal(self, payload: dict) -> bool:
+        stage = payload.get("stage") or ""
+        if stage in self._SUCCESS_STAGES and payload.get("progress") == 100:
+            return True
+        return stage in ("deployment_failed", "cancelled")
+
+    def _note_event(self, payload: dict) -> None:
+        force = (
+            (payload.get("level") or "info").lower() == "error"
+            or self._is_terminal(payload)
+        )
+        try:
+            self._writer.note_event(payload.get("stage") or None, force=force)
+        except Exception:
+            logger.exception(
+                "Failed to flush deploy events for %s", self.deployment_id
+            )
+
     # ------------------------------------------------------------------
     # Persist
     # ------------------------------------------------------------------
@@ -161,7 +203,7 @@ class DBAndChannelEventSink:
             except Exception:
                 pass
 
-            DeployLog.objects.using(_log_db_alias()).create(
+            self._writer.add_log(DeployLog(
                 deploy_id=self.deployment_id,
                 service_id=service_id,
                 stage=(payload.get("stage") or "unknown")[:64],
@@ -170,7 +212,7 @@ class DBAndChannelEventSink:
                 message=(payload.get("message") or "")[:4000],
                 progress=payload.get("progress"),
                 details=payload.get("details") or {},
-            )
+            ))
         except Exception:
             logger.exception(
                 "Failed to write DeployLog for deploy %s stage=%s",
@@ -210,21 +252,12 @@ class DBAndChannelEventSink:
                 update_fields.setdefault("error_message", message[:1000])
 
             if update_fields:
-                # Guard against overwriting terminal statuses.  We use
-                # a .filter() exclusion so this is a single atomic
-                # UPDATE — no race window between read and write.
-                _terminal = (
-                    DeploymentStatusChoices.FAILED,
-                    DeploymentStatusChoices.CANCELLED,
-                    DeploymentStatusChoices.ROLLED_BACK,
-                )
-                # If we're about to set SUCCEEDED, exclude terminal
-                # source states — the monitor's FAILED / CANCELLED
-                # wins over our optimistic SUCCEEDED.
-                qs = Deploy.objects.filter(pk=self.deployment_id)
-                if update_fields.get("status") == DeploymentStatusChoices.SUCCEEDED:
-                    qs = qs.exclude(status__in=_terminal)
-                qs.update(**update_fields)
+                # Coalesced into the writer's next UPDATE.  The writer was
+                # built with ``guard_terminal_success`` so a SUCCEEDED is
+                # applied with a .filter() exclusion of terminal states —
+                # the monitor's FAILED / CANCELLED wins over our optimistic
+                # SUCCEEDED in a single atomic UPDATE.
+                self._writer.update_deploy(**update_fields)
         except Exception:
             logger.exception(
                 "Failed to update Deploy row for %s", self.deployment_id
@@ -276,20 +309,23 @@ class DBAndChannelEventSink:
                 )
                 return
 
+            ws_payload = {
+                "deploy_id": self.deployment_id,
+                "stage": payload.get("stage"),
+                "message": payload.get("message"),
+                "level": payload.get("level"),
+                "progress": payload.get("progress"),
+                "details": payload.get("details") or {},
+                "timestamp": payload.get("timestamp"),
+            }
+            # Replay log for late joiners / reconnects (see event_stream)
+            event_id = event_stream.append(self.deployment_id, ws_payload)
+            if event_id:
+                ws_payload["id"] = event_id
+
             async_to_sync(channel_layer.group_send)(
                 self._group_name,
-                {
-                    "type": "deployment.message",
-                    "payload": {
-                        "deploy_id": self.deployment_id,
-                        "stage": payload.get("stage"),
-                        "message": payload.get("message"),
-                        "level": payload.get("level"),
-                        "progress": payload.get("progress"),
-                        "details": payload.get("details") or {},
-                        "timestamp": payload.get("timestamp"),
-                    },
-                },
+                {"type": "deployment.message", "payload": ws_payload},
             )
         except Exception:
             logger.exception(
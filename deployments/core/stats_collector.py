@@ -0,0 +1,312 @@
+"""
+deployments/core/stats_collector.py
+-----------------------------------
+Background container stats collector with a Redis ring buffer per
+container.
+
+``Container.get_container_stats()`` does ``reload()`` + a one-shot
+``stats(stream=False)``, and Docker blocks for about a sampling interval
+on every call — so every dashboard poll of ``service_status`` held a
+request thread for a second or more.
+
+``StatsCollector`` (run by ``manage.py collect_container_stats``) keeps
+one streaming ``/containers/{id}/stats`` subscription per running managed
+container instead.  CPU is computed from the delta against the previous
+sample of the same stream, memory against the container limit, and each
+sample is pushed as a compact ``"ts,cpu,mem,running"`` string onto a
+capped Redis list:
+
+    stats:ring:<container name>   LPUSH + LTRIM + EXPIRE (one pipeline)
+
+``read_service_stats`` serves the status API from that list without
+touching Docker and can return the last N samples as a sparkline.  When
+the collector is not running (no heartbeat), has no sample for the
+container yet (it was started after the last discovery) or its newest
+sample is stale, it returns ``None`` and the caller falls back to a live
+Docker read.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from deployments.celery.monitoring.policies import MANAGED_CONTAINER_LABEL
+from deployments.celery.monitoring.runtime_index import _container_name
+
+from .manager.container_manager import compute_usage_percent
+
+logger = logging.getLogger(__name__)
+
+
+RING_KEY_PREFIX = "stats:ring:"
+HEARTBEAT_KEY = "stats:collector:heartbeat"
+
+DEFAULT_SAMPLE_SECONDS = 2.0
+DEFAULT_RING_SIZE = 90
+DEFAULT_DISCOVER_SECONDS = 10.0
+
+
+def _setting(name: str, default: Any) -> Any:
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def sample_seconds() -> float:
+    return max(0.5, float(_setting("SERVICE_STATS_SAMPLE_SECONDS", DEFAULT_SAMPLE_SECONDS)))
+
+
+def ring_size() -> int:
+    return max(1, int(_setting("SERVICE_STATS_RING_SIZE", DEFAULT_RING_SIZE)))
+
+
+def discover_seconds() -> float:
+    return max(1.0, float(_setting("SERVICE_STATS_DISCOVER_SECONDS", DEFAULT_DISCOVER_SECONDS)))
+
+
+def _stale_after() -> float:
+    # A running container's newest sample should never be older than a
+    # few sampling intervals; beyond that the stream (or container) died.
+    return max(3 * sample_seconds(), 10.0)
+
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        logger.exception("stats_collector: cannot obtain redis connection")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Ring buffer
+# ---------------------------------------------------------------------------
+
+def ring_key(container_name: str) -> str:
+    return f"{RING_KEY_PREFIX}{container_name}"
+
+
+def encode_sample(ts: float, cpu: float, memory: float, running: bool) -> str:
+    return f"{ts:.1f},{cpu:.2f},{memory:.2f},{1 if running else 0}"
+
+
+def decode_sample(raw: Any) -> Optional[dict]:
+    if isinstance(raw, bytes):
+        raw = raw.decode("ascii", "replace")
+    try:
+        ts, cpu, memory, running = str(raw).split(",")
+        return {
+            "ts": float(ts),
+            "cpu": float(cpu),
+            "ram": float(memory),
+            "running": running == "1",
+        }
+    except (TypeError, ValueError):
+        return None
+
+
+def push_sample(redis, container_name: str, encoded: str, *, size: int, ttl: int) -> None:
+    """Append one sample; newest first, capped at ``size``, one round trip."""
+    key = ring_key(container_name)
+    pipe = redis.pipeline(transaction=False)
+    pipe.lpush(key, encoded)
+    pipe.ltrim(key, 0, size - 1)
+    pipe.expire(key, ttl)
+    pipe.execute()
+
+
+def read_samples(redis, container_name: str, limit: int) -> list[dict]:
+    """Up to ``limit`` most recent samples, oldest first."""
+    raw = redis.lrange(ring_key(container_name), 0, max(0, limit - 1)) or []
+    samples = [s for s in (decode_sample(item) for item in raw) if s is not None]
+    samples.reverse()
+    return samples
+
+
+def collector_alive(redis) -> bool:
+    try:
+        return bool(redis.exists(HEARTBEAT_KEY))
+    except Exception:
+        return False
+
+
+def read_service_stats(
+    container_name: str,
+    *,
+    history: int = 0,
+    now: Optional[float] = None,
+    redis=None,
+) -> Optional[dict]:
+    """
+    Status payload for one container from its ring buffer.
+
+    Returns ``{"running", "cpu", "ram", "sampled_at"}`` plus
+    ``"history": [{"ts", "cpu", "ram"}, …]`` when ``history`` > 0, or
+    ``None`` when the ring cannot answer: Redis unavailable, no collector
+    running, no sample yet, or a newest sample older than ``_stale_after()``.
+    """
+    redis = redis if redis is not None else _redis()
+    if redis is None:
+        return None
+    try:
+        if not collector_alive(redis):
+            return None
+        samples = read_samples(redis, container_name, max(1, min(history, ring_size())))
+    except Exception:
+        logger.warning("Failed to read stats ring for %s", container_name, exc_info=True)
+        return None
+
+    now = time.time() if now is None else now
+    if not samples or now - samples[-1]["ts"] > _stale_after():
+        return None
+    latest = samples[-1]
+    running = latest["running"]
+    payload = {
+        "running": running,
+        "cpu": latest["cpu"] if running else 0.0,
+        "ram": latest["ram"] if running else 0.0,
+        "sampled_at": latest["ts"],
+    }
+    if history > 0:
+        payload["history"] = [
+            {"ts": s["ts"], "cpu": s["cpu"], "ram": s["ram"]}
+            for s in samples
+            if s["running"]
+        ]
+    return payload
+
+
+# ---------------------------------------------------------------------------
+# Collector
+# ---------------------------------------------------------------------------
+
+class StatsCollector:
+    """
+    Keep one streaming stats subscription per running managed container.
+
+    ``discover()`` lists running containers (one API call) and starts a
+    follower thread for each one without a live subscription; followers
+    exit on their own when Docker closes the stream (container stopped).
+    """
+
+    def __init__(
+        self,
+        api,
+        *,
+        redis=None,
+        sample_interval: Optional[float] = None,
+        size: Optional[int] = None,
+        discover_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.api = api
+        self.redis = redis if redis is not None else _redis()
+        self.sample_interval = sample_seconds() if sample_interval is None else sample_interval
+        self.size = ring_size() if size is None else size
+        self.discover_interval = discover_seconds() if discover_interval is None else discover_interval
+        self.ttl = int(max(self.size * self.sample_interval, self.discover_interval) * 2) + 60
+        self._clock = clock
+        self._followers: dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Main loop
+    # ------------------------------------------------------------------
+
+    def run(self) -> None:
+        logger.info(
+            "Stats collector started (sample=%ss ring=%s discover=%ss).",
+            self.sample_interval, self.size, self.discover_interval,
+        )
+        while not self._stop.is_set():
+            try:
+                self.discover()
+            except Exception:
+                logger.warning("Stats collector discovery failed.", exc_info=True)
+            self._stop.wait(self.discover_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def discover(self) -> int:
+        """Start followers for new running containers; returns how many."""
+        self.redis.set(HEARTBEAT_KEY, "1", ex=int(self.discover_interval * 3) + 5)
+        summaries = self.api.containers(filters={"label": MANAGED_CONTAINER_LABEL, "status": "running"})
+        started = 0
+        with self._lock:
+            for cid, thread in list(self._followers.items()):
+                if not thread.is_alive():
+                    del self._followers[cid]
+            for summary in summaries or ():
+                cid = summary.get("Id")
+                name = _container_name(summary.get("Names"))
+                if not cid or not name or cid in self._followers:
+                    continue
+                thread = threading.Thread(
+                    target=self.follow,
+                    args=(cid, name),
+                    name=f"stats-{name}",
+                    daemon=True,
+                )
+                self._followers[cid] = thread
+                thread.start()
+                started += 1
+        return started
+
+    @property
+    def following(self) -> int:
+        with self._lock:
+            return sum(1 for t in self._followers.values() if t.is_alive())
+
+    # ------------------------------------------------------------------
+    # One container
+    # ------------------------------------------------------------------
+
+    def follow(self, container_id: str, name: str) -> None:
+        """Consume one container's stats stream until it ends."""
+        try:
+            host_config = (self.api.inspect_container(container_id) or {}).get("HostConfig") or {}
+            self.consume(name, self.api.stats(container_id, stream=True, decode=True), host_config)
+        except Exception:
+            logger.debug("Stats stream for %s ended with an error.", name, exc_info=True)
+        finally:
+            self._push(name, encode_sample(self._clock(), 0.0, 0.0, False))
+
+    def consume(self, name: str, stream, host_config: dict) -> int:
+        """
+        Fold a stats stream into the ring; returns the number of samples
+        written.  Docker emits about one sample per second; only one per
+        ``sample_interval`` is kept, with CPU measured across the whole
+        interval.
+        """
+        previous = None
+        last_written = 0.0
+        written = 0
+        for stats in stream:
+            if self._stop.is_set():
+                break
+            if not stats or not stats.get("cpu_stats"):
+                continue
+            now = self._clock()
+            if previous is not None and now - last_written < self.sample_interval:
+                continue
+            cpu, memory, _ = compute_usage_percent(stats, host_config, previous)
+            if previous is not None:
+                self._push(name, encode_sample(now, cpu, memory, True))
+                written += 1
+            previous = stats
+            last_written = now
+        return written
+
+    def _push(self, name: str, encoded: str) -> None:
+        try:
+            push_sample(self.redis, name, encoded, size=self.size, ttl=self.ttl)
+        except Exception:
+            logger.warning("Failed to write stats sample for %s", name, exc_info=True)
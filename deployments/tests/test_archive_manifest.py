@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from deployments.core.archive_manifest import ArchiveManifest
+
+
+class TestArchiveManifest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test-manifest-")
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def _write(self, name, content=""):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+
+    def test_basename_index_is_shallowest_first(self):
+        self._write("app/nested/package.json", "{}")
+        self._write("package.json", '{"name": "root"}')
+        self._write("app/package.json", "{}")
+        manifest = ArchiveManifest.scan(self.root)
+
+        self.assertEqual(
+            manifest.find_basename("package.json"),
+            ("package.json", "app/package.json", "app/nested/package.json"),
+        )
+        self.assertEqual(
+            manifest.find_basename("package.json", max_depth=1),
+            ("package.json", "app/package.json"),
+        )
+        self.assertEqual(manifest.first("package.json"), "package.json")
+        self.assertTrue(manifest.has_basename("missing.txt", "package.json"))
+        self.assertIn("app/package.json", manifest)
+        self.assertEqual(len(manifest), 3)
+
+    def test_endswith_matches_whole_segments(self):
+        self._write("src/proj/settings.py")
+        self._write("src/myproj/settings.py")
+        manifest = ArchiveManifest.scan(self.root)
+
+        self.assertEqual(manifest.endswith("proj/settings.py"), ("src/proj/settings.py",))
+
+    def test_read_json_parses_and_caches(self):
+        self._write("composer.json", '{"require": {"php": "^8.2"}}')
+        self._write("broken.json", "{not json")
+        manifest = ArchiveManifest.scan(self.root)
+
+        self.assertEqual(manifest.read_json("composer.json"), {"require": {"php": "^8.2"}})
+        self.assertIsNone(manifest.read_json("broken.json"))
+        self.assertIsNone(manifest.read_json("absent.json"))
+        self.assertGreater(manifest.cache_bytes, 0)
+
+        os.remove(os.path.join(self.root, "composer.json"))
+        self.assertEqual(manifest.read_json("composer.json"), {"require": {"php": "^8.2"}})
+
+    def test_cache_respects_per_file_and_total_caps(self):
+        self._write("big.txt", "x" * 64)
+        self._write("a.txt", "a" * 16)
+        self._write("b.txt", "b" * 16)
+        manifest = ArchiveManifest.scan(self.root, max_file_bytes=32, max_cache_bytes=20)
+
+        self.assertEqual(manifest.read_text("big.txt"), "x" * 32)
+        self.assertEqual(manifest.cache_bytes, 0)
+        manifest.read_text("a.txt")
+        manifest.read_text("b.txt")
+        self.assertEqual(manifest.cache_bytes, 16)
+        self.assertEqual(manifest.read_text("b.txt"), "b" * 16)
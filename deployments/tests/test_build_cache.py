@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from deployments.core.archive_manifest import ArchiveManifest
+from deployments.core.build_cache import BUILD_DIGEST_LABEL, compute_build_digest
+from deployments.core.manager.image_manager import Image
+
+
+def _config(**overrides):
+    values = dict(
+        platform="django",
+        platform_type="app",
+        server_type=None,
+        entry_point=None,
+        celery=False,
+        celery_beat=False,
+        worker_count=1,
+        port=8000,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+class TestBuildDigest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="test-digest-")
+        self.addCleanup(shutil.rmtree, self.root, True)
+        self._write("manage.py", "print('hi')\n")
+        self._write("app/settings.py", "DEBUG = False\n")
+
+    def _write(self, name, content):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+
+    def _digest(self, dockerfile="FROM python:3.12\n", buildargs=None, config=None):
+        return compute_build_digest(
+            ArchiveManifest.scan(self.root),
+            dockerfile_text=dockerfile,
+            buildargs=buildargs if buildargs is not None else {"A": "1"},
+            config=config or _config(),
+        )
+
+    def test_digest_is_stable_for_identical_inputs(self):
+        first = self._digest()
+        os.utime(os.path.join(self.root, "manage.py"), (0, 0))
+        self.assertEqual(first, self._digest())
+
+    def test_digest_changes_with_each_input(self):
+        base = self._digest()
+        self.assertNotEqual(base, self._digest(dockerfile="FROM python:3.13\n"))
+        self.assertNotEqual(base, self._digest(buildargs={"A": "2"}))
+        self.assertNotEqual(base, self._digest(config=_config(server_type="asgi")))
+        self._write("app/settings.py", "DEBUG = True\n")
+        self.assertNotEqual(base, self._digest())
+
+    def test_runtime_environment_does_not_affect_digest(self):
+        base = self._digest()
+        self.assertEqual(base, self._digest(config=_config(environment={"K": "v"})))
+
+
+class TestImageCreateCache(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("deployments.core.manager.client_manager.get_docker_client")
+        self.client = MagicMock()
+        patcher.start().return_value = self.client
+        self.addCleanup(patcher.stop)
+        self.context_dir = tempfile.mkdtemp(prefix="test-image-")
+        self.addCleanup(shutil.rmtree, self.context_dir, True)
+
+    def _image(self):
+        return Image(
+            "demo", "1.0", "FROM scratch\n",
+            context_dir=self.context_dir, build_digest="d" * 64,
+        )
+
+    def test_hit_retags_existing_image_without_building(self):
+        cached = MagicMock(id="sha256:abc", attrs={"Config": {"Labels": {BUILD_DIGEST_LABEL: "d" * 64}}})
+        self.client.images.get.return_value = cached
+        with patch("deployments.core.build_cache.lookup_image_id", return_value="sha256:abc"), \
+                patch("deployments.core.build_cache.record_hit", return_value=42.0) as hit:
+            image = self._image()
+            image.create()
+
+        self.client.api.build.assert_not_called()
+        self.client.api.tag.assert_called_once_with("sha256:abc", repository="demo", tag="v1-0", force=True)
+        hit.assert_called_once()
+        self.assertTrue(image.cache_hit)
+        self.assertEqual(image.seconds_saved, 42.0)
+
+    def test_label_mismatch_is_not_reused(self):
+        stale = MagicMock(id="sha256:old", attrs={"Config": {"Labels": {BUILD_DIGEST_LABEL: "e" * 64}}})
+        self.client.images.get.return_value = stale
+        self.client.images.list.return_value = []
+        self.client.api.build.return_value = iter([{"aux": {"ID": "sha256:new"}}])
+        with patch("deployments.core.build_cache.lookup_image_id", return_value="sha256:old"), \
+                patch("deployments.core.build_cache.record_build") as record:
+            image = self._image()
+            image.create()
+
+        self.assertFalse(image.cache_hit)
+        self.client.api.tag.assert_called_once_with("sha256:new", repository="demo", tag="v1-0", force=True)
+        self.assertEqual(self.client.api.build.call_args.kwargs["labels"], {BUILD_DIGEST_LABEL: "d" * 64})
+        record.assert_called_once()
+
+    def test_miss_falls_back_to_label_query(self):
+        labelled = MagicMock(id="sha256:lbl")
+        self.client.images.list.return_value = [labelled]
+        with patch("deployments.core.build_cache.lookup_image_id", return_value=None), \
+                patch("deployments.core.build_cache.record_hit", return_value=0.0):
+            image = self._image()
+            image.create()
+
+        self.client.images.list.assert_called_once_with(filters={"label": f"{BUILD_DIGEST_LABEL}={'d' * 64}"})
+        self.client.api.build.assert_not_called()
+        self.assertTrue(image.cache_hit)
@@ -0,0 +1,131 @@
+"""
+Tests for ``deployments.core.build_context`` (single-pass ZIP ingestion).
+
+``ingest_zip`` must enforce the same archive-safety policy as
+``convert_zip_to_tar`` while writing straight to a scratch directory:
+  * rejects path traversal, absolute paths and symlinks
+  * enforces size + member-count caps
+  * strips executable bits
+  * peels a single wrapping top-level directory for ``project_root``
+"""
+
+import io
+import os
+import stat
+import tempfile
+import unittest
+import zipfile
+
+from deployments.common.exceptions import (
+    DeploymentSecurityError,
+    DeploymentValidationError,
+)
+from deployments.core.build_context import ingest_zip
+
+
+def _make_zip(members: dict[str, bytes | None]) -> bytes:
+    """Build a ZIP in memory.  None value => directory entry."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, content in members.items():
+            if content is None:
+                zf.writestr(name + "/", "")
+            else:
+                zf.writestr(name, content)
+    return buf.getvalue()
+
+
+class TestIngestZip(unittest.TestCase):
+
+    def setUp(self):
+        self._paths: list[str] = []
+
+    def tearDown(self):
+        for path in self._paths:
+            os.unlink(path)
+
+    def _write(self, zip_bytes: bytes) -> str:
+        with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as tf:
+            tf.write(zip_bytes)
+        self._paths.append(tf.name)
+        return tf.name
+
+    def test_extracts_files_once_into_scratch_dir(self):
+        path = self._write(_make_zip({
+            "app/main.py": b"print('hello')\n",
+            "README.md": b"# my app\n",
+            ".env.example": b"A=1\n",
+        }))
+        with ingest_zip(path) as context:
+            self.assertEqual(
+                context.names(), [".env.example", "README.md", "app/main.py"]
+            )
+            self.assertEqual(context.file_count, 3)
+            self.assertEqual(context.read_text("app/main.py"), "print('hello')\n")
+            self.assertEqual(context.project_root, context.root)
+            root = context.root
+        self.assertFalse(os.path.exists(root))
+
+    def test_single_wrapping_directory_becomes_project_root(self):
+        path = self._write(_make_zip({
+            "myapp": None,
+            "myapp/manage.py": b"",
+        }))
+        with ingest_zip(path) as context:
+            self.assertEqual(context.project_root, os.path.join(context.root, "myapp"))
+            self.assertEqual(context.names(), ["myapp/manage.py"])
+
+    def test_rejects_path_traversal(self):
+        path = self._write(_make_zip({"../escape.py": b"malicious"}))
+        with self.assertRaises(DeploymentSecurityError):
+            ingest_zip(path)
+
+    def test_rejects_absolute_path(self):
+        path = self._write(_make_zip({"/etc/passwd": b"root:x:0:0"}))
+        with self.assertRaises(DeploymentSecurityError):
+            ingest_zip(path)
+
+    def test_rejects_symlink(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            info = zipfile.ZipInfo("link")
+            info.external_attr = (stat.S_IFLNK | 0o777) << 16
+            zf.writestr(info, "/etc/passwd")
+        path = self._write(buf.getvalue())
+        with self.assertRaises(DeploymentSecurityError):
+            ingest_zip(path)
+
+    def test_enforces_member_cap(self):
+        path = self._write(_make_zip({f"f{i}.txt": b"x" for i in range(5)}))
+        with self.assertRaises(DeploymentValidationError):
+            ingest_zip(path, max_members=4)
+
+    def test_enforces_size_cap(self):
+        path = self._write(_make_zip({"big.bin": b"0" * 4096}))
+        with self.assertRaises(DeploymentValidationError):
+            ingest_zip(path, max_bytes=1024)
+
+    def test_failed_ingest_leaves_no_scratch_dir(self):
+        path = self._write(_make_zip({"ok.txt": b"x", "../bad": b"y"}))
+        before = set(os.listdir(tempfile.gettempdir()))
+        with self.assertRaises(DeploymentSecurityError):
+            ingest_zip(path, prefix="deploy-build-test-")
+        after = set(os.listdir(tempfile.gettempdir()))
+        self.assertFalse(
+            [n for n in after - before if n.startswith("deploy-build-test-")]
+        )
+
+    def test_strips_executable_bits(self):
+        path = self._write(_make_zip({"script.sh": b"#!/bin/sh\necho hi"}))
+        with ingest_zip(path) as context:
+            mode = os.stat(context.path("script.sh")).st_mode
+            self.assertEqual(mode & 0o111, 0)
+
+    def test_rejects_non_zip(self):
+        path = self._write(b"not a zip")
+        with self.assertRaises(DeploymentValidationError):
+            ingest_zip(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,303 @@
+"""
+Tests for ``deployments.celery.scheduler`` (ordering, admission, slots).
+"""
+
+import json
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+from deployments.celery import scheduler
+from deployments.common.exceptions import DeploymentCancelled, DeploymentLockError
+
+
+BUDGET = scheduler.HostBudget("host-a", 4.0, 8192)
+
+
+def _entry(deploy_id, user, *, state=scheduler.STATE_WAITING, priority=6, enqueued=0.0,
+           cpu=1.0, memory=1024, host="host-a"):
+    return {
+        "id": deploy_id, "user": user, "state": state, "priority": priority,
+        "enqueued": enqueued, "cpu": cpu, "memory": memory, "host": host,
+        "seen": 1e12, "started": 1e12,
+    }
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+        self.values = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lock(self, name, timeout=None, blocking_timeout=None):
+        with self._lock:
+            yield
+
+    def hgetall(self, key):
+        return {k.encode(): v.encode() for k, v in self.hashes.get(key, {}).items()}
+
+    def pipeline(self):
+        return self
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def execute(self):
+        return []
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = str(value).encode()
+
+
+class TestFairOrder(unittest.TestCase):
+
+    def test_users_take_turns(self):
+        entries = {
+            "a1": _entry("a1", "alice", enqueued=1),
+            "a2": _entry("a2", "alice", enqueued=2),
+            "a3": _entry("a3", "alice", enqueued=3),
+            "b1": _entry("b1", "bob", enqueued=4),
+        }
+        order = [e["id"] for e in scheduler.fair_order(entries)]
+        self.assertEqual(order, ["a1", "b1", "a2", "a3"])
+
+    def test_running_builds_count_against_the_user(self):
+        entries = {
+            "a0": _entry("a0", "alice", state=scheduler.STATE_BUILDING),
+            "a1": _entry("a1", "alice", enqueued=1),
+            "b1": _entry("b1", "bob", enqueued=2),
+        }
+        order = [e["id"] for e in scheduler.fair_order(entries)]
+        self.assertEqual(order, ["b1", "a1"])
+
+    def test_priority_beats_fair_share(self):
+        entries = {
+            "b1": _entry("b1", "bob", enqueued=1),
+            "a1": _entry("a1", "alice", enqueued=2),
+            "a2": _entry("a2", "alice", enqueued=3,
+                         priority=scheduler.kind_priority(scheduler.KIND_ROLLBACK)),
+        }
+        order = [e["id"] for e in scheduler.fair_order(entries)]
+        self.assertEqual(order[0], "a2")
+
+    def test_kind_priorities(self):
+        self.assertLess(scheduler.kind_priority("rollback"), scheduler.kind_priority("restart"))
+        self.assertLess(scheduler.kind_priority("restart"), scheduler.kind_priority("rebuild"))
+        self.assertLess(scheduler.kind_priority("rebuild"), scheduler.kind_priority("build"))
+        self.assertEqual(scheduler.kind_priority("unknown"), scheduler.kind_priority("build"))
+
+
+class TestAdmission(unittest.TestCase):
+
+    def test_admits_within_budget(self):
+        entries = {"d1": _entry("d1", "alice", cpu=2.0)}
+        self.assertTrue(scheduler.try_admit(entries, "d1", BUDGET))
+
+    def test_rejects_when_host_is_full(self):
+        entries = {
+            "run": _entry("run", "bob", state=scheduler.STATE_BUILDING, cpu=3.5),
+            "d1": _entry("d1", "alice", cpu=1.0),
+        }
+        self.assertFalse(scheduler.try_admit(entries, "d1", BUDGET))
+
+    def test_memory_is_budgeted_too(self):
+        entries = {
+            "run": _entry("run", "bob", state=scheduler.STATE_BUILDING, cpu=0.5, memory=8000),
+            "d1": _entry("d1", "alice", cpu=0.5, memory=512),
+        }
+        self.assertFalse(scheduler.try_admit(entries, "d1", BUDGET))
+
+    def test_other_hosts_do_not_consume_budget(self):
+        entries = {
+            "run": _entry("run", "bob", state=scheduler.STATE_BUILDING, cpu=4.0, host="host-b"),
+            "d1": _entry("d1", "alice", cpu=4.0),
+        }
+        self.assertTrue(scheduler.try_admit(entries, "d1", BUDGET))
+
+    def test_head_of_line_is_not_overtaken(self):
+        entries = {
+            "run": _entry("run", "carol", state=scheduler.STATE_BUILDING, cpu=2.0),
+            "big": _entry("big", "alice", enqueued=1, cpu=3.0),
+            "small": _entry("small", "bob", enqueued=2, cpu=1.0),
+        }
+        self.assertFalse(scheduler.try_admit(entries, "small", BUDGET))
+
+    def test_earlier_waiter_reserves_room(self):
+        entries = {
+            "first": _entry("first", "alice", enqueued=1, cpu=3.0),
+            "second": _entry("second", "bob", enqueued=2, cpu=2.0),
+        }
+        self.assertFalse(scheduler.try_admit(entries, "second", BUDGET))
+        self.assertTrue(scheduler.try_admit(entries, "first", BUDGET))
+
+    def test_queued_entries_do_not_block_waiters(self):
+        entries = {
+            "queued": _entry("queued", "alice", state=scheduler.STATE_QUEUED, enqueued=1, cpu=4.0),
+            "d1": _entry("d1", "bob", enqueued=2, cpu=2.0),
+        }
+        self.assertTrue(scheduler.try_admit(entries, "d1", BUDGET))
+
+    def test_build_cost_is_clamped_to_budget(self):
+        limits = {"NanoCpus": 16_000_000_000, "Memory": 32768 * 1024 * 1024}
+        self.assertEqual(scheduler.build_cost(limits, BUDGET), (4.0, 8192))
+
+
+class TestReapAndPositions(unittest.TestCase):
+
+    def test_reap(self):
+        now = 100_000.0
+        entries = {
+            "expired": _entry("expired", "a", state=scheduler.STATE_BUILDING),
+            "stale": _entry("stale", "b"),
+            "old": _entry("old", "c", state=scheduler.STATE_QUEUED, enqueued=0.0),
+            "fresh": _entry("fresh", "d", state=scheduler.STATE_QUEUED, enqueued=now),
+        }
+        entries["expired"]["started"] = now - 7200
+        entries["stale"]["seen"] = now - 600
+        self.assertTrue(scheduler.reap(entries, now))
+        self.assertNotIn("expired", entries)
+        self.assertNotIn("old", entries)
+        self.assertEqual(entries["stale"]["state"], scheduler.STATE_QUEUED)
+        self.assertIn("fresh", entries)
+
+    def test_positions_and_eta(self):
+        entries = {
+            "run": _entry("run", "a", state=scheduler.STATE_BUILDING),
+            "q1": _entry("q1", "b", state=scheduler.STATE_QUEUED, enqueued=1),
+            "w1": _entry("w1", "c", enqueued=2),
+        }
+        positions = scheduler.queue_positions(entries, 60.0, 1)
+        self.assertEqual(positions["w1"], (1, 60.0))
+        self.assertEqual(positions["q1"], (2, 120.0))
+        self.assertNotIn("run", positions)
+
+
+@mock.patch.object(scheduler, "refresh_queue_positions", lambda *a, **k: None)
+@mock.patch.object(scheduler, "_clear_position", lambda *a, **k: None)
+@mock.patch.object(scheduler, "poll_seconds", lambda: 0.01)
+class TestBuildSlot(unittest.TestCase):
+
+    LIMITS = {"NanoCpus": 3_000_000_000, "Memory": 1024 * 1024 * 1024}
+
+    def setUp(self):
+        self.redis = _FakeRedis()
+        patches = [
+            mock.patch.object(scheduler, "_redis", lambda: self.redis),
+            mock.patch.object(scheduler, "host_budget", lambda client=None: BUDGET),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _jobs(self):
+        return {k: json.loads(v) for k, v in self.redis.hashes.get(scheduler.JOBS_KEY, {}).items()}
+
+    def test_slot_is_held_then_released(self):
+        with scheduler.build_slot("d1", self.LIMITS):
+            self.assertEqual(self._jobs()["d1"]["state"], scheduler.STATE_BUILDING)
+        self.assertEqual(self._jobs(), {})
+        self.assertIsNotNone(self.redis.get(scheduler.DURATION_KEY))
+
+    def test_second_build_waits_for_the_first(self):
+        events = []
+        entered = threading.Event()
+        release = threading.Event()
+
+        def first():
+            with scheduler.build_slot("d1", self.LIMITS):
+                entered.set()
+                release.wait(5)
+                events.append("d1 done")
+
+        thread = threading.Thread(target=first)
+        thread.start()
+        self.assertTrue(entered.wait(5))
+
+        positions = []
+        timer = threading.Timer(0.1, release.set)
+        timer.start()
+        with scheduler.build_slot("d2", self.LIMITS, on_wait=lambda pos, eta: positions.append(pos)):
+            events.append("d2 start")
+        thread.join(5)
+        self.assertEqual(events, ["d1 done", "d2 start"])
+        self.assertEqual(positions, [1])
+
+    def test_cancel_while_waiting(self):
+        self.redis.hset(
+            scheduler.JOBS_KEY, "run",
+            json.dumps(_entry("run", "bob", state=scheduler.STATE_BUILDING, cpu=4.0)),
+        )
+        with self.assertRaises(DeploymentCancelled):
+            with scheduler.build_slot("d1", self.LIMITS, cancel_check=lambda: True):
+                self.fail("must not build")
+        self.assertNotIn("d1", self._jobs())
+
+    def test_waiters_do_not_rewrite_every_position_while_polling(self):
+        self.redis.hset(
+            scheduler.JOBS_KEY, "run",
+            json.dumps(_entry("run", "bob", state=scheduler.STATE_BUILDING, cpu=4.0)),
+        )
+        refreshes = []
+        timer = threading.Timer(0.1, lambda: self.redis.hdel(scheduler.JOBS_KEY, "run"))
+        timer.start()
+        with mock.patch.object(scheduler, "refresh_queue_positions", lambda *a, **k: refreshes.append(1)):
+            with scheduler.build_slot("d1", self.LIMITS):
+                pass
+        timer.join()
+        # First wait, admission and release; polling in between writes nothing.
+        self.assertEqual(len(refreshes), 3)
+
+    def test_admission_errors_are_retried(self):
+        real_mutate = scheduler._mutate
+        calls = []
+
+        def flaky(conn, change):
+            calls.append(1)
+            if len(calls) < 3:
+                raise ConnectionError("redis down")
+            return real_mutate(conn, change)
+
+        with mock.patch.object(scheduler, "_mutate", flaky):
+            with scheduler.build_slot("d1", self.LIMITS):
+                self.assertEqual(self._jobs()["d1"]["state"], scheduler.STATE_BUILDING)
+        self.assertEqual(len(calls), 4)  # two failures, admission, forget
+
+    def test_unreachable_scheduler_never_builds_without_a_slot(self):
+        def down(conn, change):
+            raise ConnectionError("redis down")
+
+        with mock.patch.object(scheduler, "_mutate", down), \
+                mock.patch.object(scheduler, "admission_timeout", lambda: 0.05):
+            with self.assertRaises(DeploymentLockError) as ctx:
+                with scheduler.build_slot("d1", self.LIMITS):
+                    self.fail("must not build")
+        self.assertTrue(ctx.exception.recoverable)
+
+    def test_enqueue_registers_and_publishes_with_priority(self):
+        task = mock.Mock()
+        deploy = mock.Mock(pk=7, service=mock.Mock(user_id=3))
+        scheduler.enqueue_deploy(task, deploy, kind=scheduler.KIND_RESTART, task_id="t")
+        task.apply_async.assert_called_once_with(
+            args=["7"], task_id="t", priority=scheduler.kind_priority("restart"),
+        )
+        entry = self._jobs()["7"]
+        self.assertEqual((entry["user"], entry["state"]), ("3", scheduler.STATE_QUEUED))
+
+    def test_untracked_enqueue_only_publishes(self):
+        task = mock.Mock()
+        scheduler.enqueue_deploy(task, mock.Mock(pk=8), track=False)
+        task.apply_async.assert_called_once()
+        self.assertEqual(self._jobs(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
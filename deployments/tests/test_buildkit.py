@@ -0,0 +1,253 @@
+"""
+Tests for ``deployments.core.buildkit`` and the BuildKit path of ``Image``.
+"""
+
+import base64
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import requests
+
+from deployments.core import buildkit
+from deployments.core.archive_manifest import ArchiveManifest
+from deployments.core.dockerfile import (
+    _hoist_php_system_layers,
+    _inject_pip_install,
+    _prepare_go_modules,
+)
+from deployments.core.manager import image_manager
+from deployments.core.manager.image_manager import Image
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number, value):
+    if isinstance(value, int):
+        return _varint(number << 3) + _varint(value)
+    if isinstance(value, str):
+        value = value.encode()
+    return _varint((number << 3) | 2) + _varint(len(value)) + value
+
+
+def _manifest(test, files):
+    root = tempfile.mkdtemp(prefix="test-buildkit-")
+    test.addCleanup(shutil.rmtree, root, True)
+    for name, content in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+    return ArchiveManifest.scan(root)
+
+
+class TestCacheMounts(unittest.TestCase):
+
+    def test_pip_gets_a_namespaced_cache_and_loses_no_cache_dir(self):
+        df = "FROM python\nCOPY requirements.txt /app/\nRUN pip install --no-cache-dir -r requirements.txt\nCOPY . /app\n"
+        out = buildkit.add_cache_mounts(df, "Svc_One")
+        self.assertIn(
+            "RUN --mount=type=cache,id=paas-svc_one-pip,target=/root/.cache/pip pip install -r requirements.txt",
+            out,
+        )
+        self.assertNotIn("--no-cache-dir", out)
+        self.assertIn("COPY . /app\n", out)
+
+    def test_each_package_manager(self):
+        cases = {
+            "npm ci || npm install": "/root/.npm",
+            "pnpm install --frozen-lockfile": "/root/.local/share/pnpm/store",
+            "yarn install --frozen-lockfile": "/usr/local/share/.cache/yarn",
+            "bun install": "/root/.bun/install/cache",
+            "composer install --no-dev": "/root/.cache/composer",
+            "go build -o main .": "/go/pkg/mod",
+        }
+        for command, target in cases.items():
+            out = buildkit.add_cache_mounts(f"FROM x\nRUN {command}\n", "svc")
+            self.assertIn(f"target={target}", out, command)
+
+    def test_continuation_lines_and_unrelated_runs(self):
+        df = "FROM x\nRUN apt-get update \\\n    && pip install -r r.txt\nRUN npm run build\n"
+        out = buildkit.add_cache_mounts(df, "svc")
+        self.assertTrue(out.startswith("FROM x\nRUN --mount=type=cache,id=paas-svc-pip"))
+        self.assertIn("\n    && pip install -r r.txt\nRUN npm run build\n", out)
+
+    def test_idempotent(self):
+        df = "FROM x\nRUN npm ci\n"
+        once = buildkit.add_cache_mounts(df, "svc")
+        self.assertEqual(buildkit.add_cache_mounts(once, "svc"), once)
+        self.assertTrue(buildkit.uses_cache_mounts(once))
+        self.assertFalse(buildkit.uses_cache_mounts(df))
+
+    def test_strip_for_classic_builder(self):
+        df = "FROM x\nRUN pip install -r r.txt \\\n    && pip install gunicorn\nRUN npm ci || npm install\n"
+        stripped = buildkit.strip_cache_mounts(buildkit.add_cache_mounts(df, "svc"))
+        self.assertNotIn("--mount", stripped)
+        self.assertIn("&& pip install gunicorn && rm -rf /root/.cache/pip\n", stripped)
+        self.assertIn("RUN npm ci || npm install && rm -rf /root/.npm\n", stripped)
+
+    def test_strip_keeps_foreign_targets(self):
+        df = "FROM x\nRUN --mount=type=cache,target=/data/cache make\n"
+        self.assertEqual(buildkit.strip_cache_mounts(df), "FROM x\nRUN make\n")
+
+    def test_capability_errors(self):
+        self.assertTrue(buildkit.is_capability_error("Dockerfile parse error line 3: Unknown flag: mount"))
+        self.assertFalse(buildkit.is_capability_error("npm ERR! 404 Not Found"))
+
+
+class TestManifestFirst(unittest.TestCase):
+
+    def test_runtime_pip_packages_go_before_the_source_copy(self):
+        df = "FROM python\nCOPY requirements.txt /app/\nRUN pip install -r requirements.txt\nCOPY . /app\nCMD [\"x\"]\n"
+        out = _inject_pip_install(df, ["gunicorn"])
+        self.assertLess(out.index("pip install --no-cache-dir gunicorn"), out.index("COPY . /app"))
+        self.assertNotIn("CMD", out)
+
+    def test_go_modules_download_before_source(self):
+        df = "FROM golang\nWORKDIR /app\nCOPY . .\nRUN go build -o main .\n"
+        out = _prepare_go_modules(df, _manifest(self, {"go.mod": "module x\n", "main.go": ""}))
+        self.assertIn("COPY go.mod go.sum* ./\nRUN go mod download\nCOPY . .\n", out)
+        self.assertEqual(_prepare_go_modules(df, _manifest(self, {"main.go": ""})), df)
+
+    def test_php_extension_installs_move_above_the_source_copy(self):
+        df = (
+            "FROM php\nCOPY . /var/www/html/\nRUN cd /var/www/html && composer install\n"
+            "# --- Composer-required PHP extensions ---\nRUN apt-get install -y libicu-dev\n"
+            "RUN docker-php-ext-install intl\n"
+        )
+        out = _hoist_php_system_layers(df)
+        self.assertEqual(
+            out.split("\n")[1:5],
+            ["# --- Composer-required PHP extensions ---", "RUN apt-get install -y libicu-dev",
+             "RUN docker-php-ext-install intl", "COPY . /var/www/html/"],
+        )
+
+
+class TestBuildStream(unittest.TestCase):
+
+    def _trace(self, payload):
+        return {"id": "moby.buildkit.trace", "aux": base64.b64encode(payload).decode()}
+
+    def test_decodes_vertices_and_logs(self):
+        started = _field(1, _field(1, "sha256:v1") + _field(3, "[2/3] RUN pip install") + _field(5, _field(1, 1)))
+        cached = _field(1, _field(1, "sha256:v0") + _field(3, "[1/3] FROM python") + _field(4, 1))
+        log = _field(3, _field(1, "sha256:v1") + _field(3, 1) + _field(4, "Collecting django\nDone\n"))
+        chunks = [
+            self._trace(cached + started),
+            self._trace(started + log),
+            {"id": "moby.image.id", "aux": {"ID": "sha256:img"}},
+        ]
+        out = list(buildkit.decode_build_stream(chunks))
+        self.assertEqual(
+            [c.get("stream") for c in out[:-1]],
+            ["CACHED [1/3] FROM python\n", "[2/3] RUN pip install\n", "Collecting django\n", "Done\n"],
+        )
+        self.assertEqual(out[-1]["aux"]["ID"], "sha256:img")
+
+
+class TestImageBuildKit(unittest.TestCase):
+
+    DOCKERFILE = "FROM scratch\nRUN --mount=type=cache,id=paas-demo-npm,target=/root/.npm npm ci\n"
+
+    def setUp(self):
+        patcher = patch("deployments.core.manager.client_manager.get_docker_client")
+        self.client = MagicMock()
+        self.client.version.return_value = {"ApiVersion": "1.43", "Os": "linux"}
+        self.client.api.base_url = "http+docker://localhost"
+        self.client.api.api_version = "1.43"
+        patcher.start().return_value = self.client
+        self.addCleanup(patcher.stop)
+        for p in (
+            patch.object(image_manager, "_BUILDKIT_SUPPORTED", None),
+            patch.object(buildkit, "buildkit_enabled", return_value=True),
+        ):
+            p.start()
+            self.addCleanup(p.stop)
+        self.context_dir = tempfile.mkdtemp(prefix="test-image-")
+        self.addCleanup(shutil.rmtree, self.context_dir, True)
+
+    def _image(self):
+        return Image("demo", "1.0", self.DOCKERFILE, context_dir=self.context_dir)
+
+    def _stream(self, *chunks):
+        response = MagicMock()
+        response.iter_content.return_value = iter([json.dumps(c).encode() + b"\n" for c in chunks])
+        self.client.api.post.return_value = response
+        return response
+
+    def _dockerfile(self):
+        with open(os.path.join(self.context_dir, "Dockerfile"), encoding="utf-8") as fh:
+            return fh.read()
+
+    def test_builds_with_buildkit_through_the_public_session(self):
+        api = self.client.api
+        self._stream({"id": "moby.image.id", "aux": {"ID": "sha256:bk"}})
+        self._image().create()
+
+        url = api.post.call_args.args[0]
+        self.assertEqual(url, "http+docker://localhost/v1.43/build")
+        self.assertEqual(api.post.call_args.kwargs["params"]["version"], "2")
+        api.build.assert_not_called()
+        api.tag.assert_called_once_with("sha256:bk", repository="demo", tag="v1-0", force=True)
+
+    def test_opted_out_hosts_keep_limits_on_the_classic_builder(self):
+        api = self.client.api
+        api.build.return_value = iter([{"aux": {"ID": "sha256:classic"}}])
+        with patch.object(buildkit, "buildkit_enabled", return_value=False):
+            Image("demo", "1.0", self.DOCKERFILE, context_dir=self.context_dir, max_cpu=0.5, max_ram=256).create()
+
+        api.post.assert_not_called()
+        self.assertEqual(api.build.call_args.kwargs["container_limits"]["Memory"], 256 * 1024 * 1024)
+        self.assertEqual(self._dockerfile(), "FROM scratch\nRUN npm ci && rm -rf /root/.npm\n")
+
+    def test_daemon_without_buildkit_builds_classic_once(self):
+        self.client.version.return_value = {"ApiVersion": "1.38", "Os": "linux"}
+        api = self.client.api
+        api.build.return_value = iter([{"aux": {"ID": "sha256:classic"}}])
+        self._image().create()
+
+        api.post.assert_not_called()
+        api.build.assert_called_once()
+        self.assertEqual(self._dockerfile(), "FROM scratch\nRUN npm ci && rm -rf /root/.npm\n")
+
+    def test_rejected_buildkit_build_fails_without_a_second_build(self):
+        api = self.client.api
+        response = self._stream()
+        error = requests.Response()
+        error.status_code = 400
+        error._content = b'{"message": "buildkit not supported by daemon"}'
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=error)
+
+        with self.assertRaises(image_manager.ImageBuildError):
+            self._image().create()
+        api.build.assert_not_called()
+        self.assertFalse(image_manager._BUILDKIT_SUPPORTED)
+
+    def test_build_errors_are_not_retried_classic(self):
+        api = self.client.api
+        self._stream({"error": "npm ERR! missing script"})
+        with self.assertRaises(image_manager.ImageBuildError):
+            self._image().create()
+        api.build.assert_not_called()
+
+    def test_cache_mounts_follow_the_buildkit_opt_in(self):
+        self.assertTrue(buildkit.cache_mounts_enabled())
+        with patch.object(buildkit, "buildkit_enabled", return_value=False):
+            self.assertFalse(buildkit.cache_mounts_enabled())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest import mock
+
+from deployments.core import event_stream
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return _queue
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class _FakeStreamRedis:
+    """XADD/XRANGE subset with exact MAXLEN trimming."""
+
+    def __init__(self):
+        self.entries = []
+        self.seq = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        entry_id = f"1000-{self.seq}".encode()
+        self.entries.append((entry_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        if maxlen is not None:
+            self.entries = self.entries[-maxlen:]
+        return entry_id
+
+    def expire(self, key, ttl):
+        return True
+
+    def xlen(self, key):
+        return len(self.entries)
+
+    def _select(self, lo, hi):
+        def key(entry):
+            return event_stream.parse_id(entry[0])
+
+        out = []
+        for entry in self.entries:
+            k = key(entry)
+            if lo != "-":
+                exclusive = lo.startswith("(")
+                bound = event_stream.parse_id(lo.lstrip("("))
+                if k < bound or (exclusive and k == bound):
+                    continue
+            out.append(entry)
+        return out
+
+    def xrange(self, key, min="-", max="+", count=None):
+        return self._select(min, max)[:count]
+
+    def xrevrange(self, key, max="+", min="-", count=None):
+        return list(reversed(self._select(min, max)))[:count]
+
+
+class TestEventStream(unittest.TestCase):
+    def setUp(self):
+        self.redis = _FakeStreamRedis()
+
+    def _append(self, n):
+        return [event_stream.append(7, {"message": f"m{i}"}, redis=self.redis) for i in range(n)]
+
+    def test_replays_strictly_after_cursor(self):
+        ids = self._append(5)
+        events, truncated = event_stream.read_after(7, ids[1], redis=self.redis)
+        self.assertEqual([e["id"] for e in events], ids[2:])
+        self.assertEqual(events[0]["message"], "m2")
+        self.assertFalse(truncated)
+
+    def test_zero_replays_everything(self):
+        ids = self._append(3)
+        events, truncated = event_stream.read_after(7, "0", redis=self.redis)
+        self.assertEqual([e["id"] for e in events], ids)
+        self.assertFalse(truncated)
+
+    def test_trimmed_cursor_is_reported(self):
+        with mock.patch.object(event_stream, "maxlen", return_value=10):
+            ids = self._append(15)
+            events, truncated = event_stream.read_after(7, ids[2], redis=self.redis)
+        self.assertTrue(truncated)
+        self.assertEqual([e["id"] for e in events], ids[5:])
+
+    def test_expired_stream_is_truncated_and_bad_cursor_ignored(self):
+        self.assertEqual(event_stream.read_after(7, "1000-3", redis=self.redis), ([], True))
+        self.assertEqual(event_stream.read_after(7, "garbage", redis=self.redis), ([], False))
+
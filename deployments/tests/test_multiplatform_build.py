@@ -1,35 +1,34 @@
-import io
-import tarfile
+import os
+import tempfile
 
+from deployments.core.archive_manifest import ArchiveManifest
 from deployments.core.entrypoints import check_requirements_txt
 
 
-def make_tar(files):
-    bio = io.BytesIO()
-    with tarfile.open(fileobj=bio, mode="w") as tar:
-        for name, content in files.items():
-            data = content.encode()
-            info = tarfile.TarInfo(name=name)
-            info.size = len(data)
-            tar.addfile(info, io.BytesIO(data))
-    bio.seek(0)
-    return bio
+def make_manifest(files):
+    root = tempfile.mkdtemp(prefix="test-build-")
+    for name, content in files.items():
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(content)
+    return ArchiveManifest.scan(root)
 
 
 def test_python_pyproject_is_accepted():
-    tar = make_tar({"pyproject.toml": "[project]\nname='demo'\ndependencies=[]\n"})
-    check_requirements_txt(tar, platform="python")
+    manifest = make_manifest({"pyproject.toml": "[project]\nname='demo'\ndependencies=[]\n"})
+    check_requirements_txt(manifest, platform="python")
 
 
 def test_python_pipfile_is_accepted():
-    tar = make_tar({"Pipfile": "[packages]\n"})
-    check_requirements_txt(tar, platform="python")
+    manifest = make_manifest({"Pipfile": "[packages]\n"})
+    check_requirements_txt(manifest, platform="python")
 
 
 def test_pnpm_lockfile_is_detected_and_prepared():
-    from deployments.core.dockerfile import _detect_node_package_manager_from_tar, _prepare_node_package_manager
-    tar = make_tar({"package.json": '{"packageManager":"pnpm@9.0.0"}', "pnpm-lock.yaml": "lockfileVersion: '9.0'\n"})
-    assert _detect_node_package_manager_from_tar(tar) == "pnpm"
+    from deployments.core.dockerfile import _detect_node_package_manager, _prepare_node_package_manager
+    manifest = make_manifest({"package.json": '{"packageManager":"pnpm@9.0.0"}', "pnpm-lock.yaml": "lockfileVersion: '9.0'\n"})
+    assert _detect_node_package_manager(manifest) == "pnpm"
     df = "FROM node:20-alpine\nWORKDIR /app\nCOPY package*.json ./\nRUN npm ci || npm install\n"
     out = _prepare_node_package_manager(df, "pnpm")
     assert "corepack enable" in out
@@ -46,9 +45,9 @@ def test_yarn_lockfile_is_prepared():
 
 def test_bun_lockfile_is_prepared():
     from deployments.core.dockerfile import _prepare_node_package_manager
-    tar = make_tar({"package.json": '{"packageManager":"bun@1.0.0"}', "bun.lockb": ""})
-    from deployments.core.dockerfile import _detect_node_package_manager_from_tar
-    assert _detect_node_package_manager_from_tar(tar) == "bun"
+    manifest = make_manifest({"package.json": '{"packageManager":"bun@1.0.0"}', "bun.lockb": ""})
+    from deployments.core.dockerfile import _detect_node_package_manager
+    assert _detect_node_package_manager(manifest) == "bun"
     df = "FROM node:20-alpine\nWORKDIR /app\nCOPY package*.json ./\nRUN npm ci || npm install\n"
     out = _prepare_node_package_manager(df, "bun")
     assert "npm install -g bun" in out
@@ -59,13 +58,13 @@ def test_php_wrapped_archive_uses_app_root_for_composer():
     from deployments.core.dockerfile import _detect_php_document_root, _detect_php_project, _render_php
     import base64
 
-    tar = make_tar({
+    manifest = make_manifest({
         "Acme/composer.json": '{"require":{"php":"^8.2","ext-intl":"*","ext-zip":"*"}}',
         "Acme/public/index.php": "<?php",
         "Acme/artisan": "#!/usr/bin/env php\n",
     })
-    assert _detect_php_document_root(tar) == "Acme/public"
-    info = _detect_php_project(tar)
+    assert _detect_php_document_root(manifest) == "Acme/public"
+    info = _detect_php_project(manifest)
     assert info["has_composer"] is True
     assert set(info["composer"]["extensions"]) == {"intl", "zip"}
 
@@ -80,7 +79,7 @@ def test_php_wrapped_archive_uses_app_root_for_composer():
         "COPY . /var/www/html/\n"
         "RUN docker-php-ext-install mysqli pdo pdo_mysql opcache\n"
     )
-    out = _render_php(dockerfile, tar, ConfigStub(), None)
+    out = _render_php(dockerfile, manifest, ConfigStub(), None)
     assert "COPY --from=registry.example.test/composer:2" in out
     assert "RUN cd /var/www/html/Acme" in out
     assert "docker-php-ext-install intl zip" in out
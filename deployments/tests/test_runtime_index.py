@@ -0,0 +1,140 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from deployments.celery.monitoring import runtime_index
+from deployments.celery.monitoring.policies import MANAGED_CONTAINER_LABEL, RUNTIME_RESYNC_SECONDS
+from deployments.celery.monitoring.runtime_index import (
+    ContainerRuntimeIndex,
+    _runtime_from_summary,
+    load_runtime_index,
+)
+
+
+def _event(action, name, **attrs):
+    attrs["name"] = name
+    return {"Type": "container", "Action": action, "Actor": {"Attributes": attrs}}
+
+
+class _FakeCache:
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.data[key] = value
+
+
+class TestRuntimeFromSummary(unittest.TestCase):
+    def test_running_with_health(self):
+        rt = _runtime_from_summary({"State": "running", "Status": "Up 3 minutes (healthy)"})
+        self.assertTrue(rt["exists"])
+        self.assertTrue(rt["running"])
+        self.assertEqual(rt["health"], "healthy")
+        self.assertIsNone(rt["exit_code"])
+
+    def test_exited_parses_exit_code(self):
+        rt = _runtime_from_summary({"State": "exited", "Status": "Exited (137) 2 hours ago"})
+        self.assertFalse(rt["running"])
+        self.assertEqual(rt["status"], "exited")
+        self.assertEqual(rt["exit_code"], 137)
+
+
+class TestContainerRuntimeIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ContainerRuntimeIndex(
+            {"web": _runtime_from_summary({"State": "running", "Status": "Up 1 minute"})},
+            cursor=1000,
+            synced_at=1000.0,
+        )
+
+    def test_snapshot_uses_one_filtered_list_call(self):
+        api = MagicMock()
+        api.containers.return_value = [
+            {"Names": ["/web"], "State": "running", "Status": "Up 1 minute"},
+            {"Names": ["/db", "/web/db"], "State": "exited", "Status": "Exited (1) 1 second ago"},
+        ]
+        index = ContainerRuntimeIndex.snapshot(api, now=2000.0)
+        api.containers.assert_called_once_with(all=True, filters={"label": MANAGED_CONTAINER_LABEL})
+        self.assertEqual(len(index), 2)
+        self.assertEqual(index.get("db")["exit_code"], 1)
+        self.assertEqual(index.cursor, 2000)
+
+    def test_die_then_start(self):
+        self.index.apply_event(_event("die", "web", exitCode="2"))
+        self.assertFalse(self.index.get("web")["running"])
+        self.assertEqual(self.index.get("web")["exit_code"], 2)
+        self.index.apply_event(_event("start", "web"))
+        self.assertTrue(self.index.get("web")["running"])
+        self.assertIsNone(self.index.get("web")["exit_code"])
+
+    def test_destroy_and_rename(self):
+        self.index.apply_event(_event("rename", "web-new", oldName="/web"))
+        self.assertIsNone(self.index.get("web"))
+        self.assertTrue(self.index.get("web-new")["running"])
+        self.index.apply_event(_event("destroy", "web-new"))
+        self.assertIsNone(self.index.get("web-new"))
+
+    def test_health_status_and_ignored_actions(self):
+        self.index.apply_event(_event("health_status: unhealthy", "web"))
+        self.assertEqual(self.index.get("web")["health"], "unhealthy")
+        self.assertIsNone(self.index.apply_event(_event("kill", "web")))
+        self.assertIsNone(self.index.apply_event({"Type": "network", "Action": "connect"}))
+
+    def test_drain_events_advances_cursor(self):
+        api = MagicMock()
+        api.events.return_value = iter([_event("die", "web", exitCode="0"), _event("create", "worker")])
+        changed = self.index.drain_events(api, until=1010)
+        self.assertEqual(changed, {"web", "worker"})
+        self.assertEqual(self.index.cursor, 1010)
+        self.assertEqual(self.index.events_applied, 2)
+        kwargs = api.events.call_args.kwargs
+        self.assertEqual(kwargs["since"], 999)
+        self.assertEqual(kwargs["until"], 1010)
+        self.assertEqual(kwargs["filters"]["label"], MANAGED_CONTAINER_LABEL)
+
+    def test_cache_round_trip(self):
+        restored = ContainerRuntimeIndex.from_cache(self.index.to_cache())
+        self.assertEqual(restored.states, self.index.states)
+        self.assertEqual(restored.cursor, 1000)
+        self.assertIsNone(ContainerRuntimeIndex.from_cache("garbage"))
+
+
+class TestLoadRuntimeIndex(unittest.TestCase):
+    def setUp(self):
+        self.cache = _FakeCache()
+        patcher = patch.object(runtime_index, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cold_start_snapshots_then_drains_events(self):
+        api = MagicMock()
+        api.containers.return_value = [{"Names": ["/web"], "State": "running", "Status": "Up"}]
+        api.events.return_value = iter([_event("die", "web", exitCode="1")])
+
+        index, source = load_runtime_index(api, now=1000.0)
+        self.assertEqual(source, "snapshot")
+        self.assertTrue(index.get("web")["running"])
+
+        index, source = load_runtime_index(api, now=1030.0)
+        self.assertEqual(source, "events")
+        self.assertFalse(index.get("web")["running"])
+        api.containers.assert_called_once()
+
+    def test_resyncs_after_interval(self):
+        api = MagicMock()
+        api.containers.return_value = []
+        load_runtime_index(api, now=1000.0)
+        _, source = load_runtime_index(api, now=1000.0 + RUNTIME_RESYNC_SECONDS)
+        self.assertEqual(source, "snapshot")
+        api.events.assert_not_called()
+
+    def test_docker_unavailable(self):
+        api = MagicMock()
+        api.containers.side_effect = ConnectionError("daemon down")
+        self.assertEqual(load_runtime_index(api, now=1000.0), (None, "unavailable"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+
+from deployments.core.manager.container_manager import compute_usage_percent
+from deployments.core.stats_collector import (
+    HEARTBEAT_KEY,
+    StatsCollector,
+    encode_sample,
+    read_samples,
+    read_service_stats,
+    ring_key,
+)
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return _queue
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.lists = {}
+        self.keys = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value.encode())
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lists.get(key, [])[start:end + 1]
+
+    def lrange(self, key, start, end):
+        return self.lists.get(key, [])[start:end + 1]
+
+    def expire(self, key, ttl):
+        return True
+
+    def set(self, key, value, ex=None):
+        self.keys[key] = value
+
+    def exists(self, key):
+        return int(key in self.keys)
+
+
+def _stats(total_usage, system_usage, mem_usage=256, mem_limit=1024):
+    return {
+        "cpu_stats": {
+            "cpu_usage": {"total_usage": total_usage},
+            "system_cpu_usage": system_usage,
+            "online_cpus": 2,
+        },
+        "precpu_stats": {},
+        "memory_stats": {"usage": mem_usage, "limit": mem_limit},
+    }
+
+
+class TestComputeUsagePercent(unittest.TestCase):
+    def test_uses_previous_sample_for_cpu_delta(self):
+        cpu, mem, limit = compute_usage_percent(
+            _stats(1_500, 10_000), {}, previous=_stats(1_000, 8_000),
+        )
+        # 500/2000 of the host across 2 CPUs → 25 % host-relative
+        self.assertAlmostEqual(cpu, 25.0)
+        self.assertAlmostEqual(mem, 25.0)
+        self.assertEqual(limit, 1024)
+
+    def test_cpu_quota_and_memory_limit_from_host_config(self):
+        cpu, mem, limit = compute_usage_percent(
+            _stats(1_500, 10_000),
+            {"CpuQuota": 50_000, "CpuPeriod": 100_000, "Memory": 512},
+            previous=_stats(1_000, 8_000),
+        )
+        # 0.5 cores used of a 0.5-core quota
+        self.assertAlmostEqual(cpu, 100.0)
+        self.assertAlmostEqual(mem, 50.0)
+        self.assertEqual(limit, 512)
+
+
+class TestStatsCollector(unittest.TestCase):
+    def setUp(self):
+        self.redis = _FakeRedis()
+        self.now = [1000.0]
+        self.collector = StatsCollector(
+            api=None,
+            redis=self.redis,
+            sample_interval=2.0,
+            size=3,
+            discover_interval=10.0,
+            clock=lambda: self.now[0],
+        )
+
+    def _stream(self, count):
+        for i in range(count):
+            self.now[0] = 1000.0 + i
+            yield _stats(1_000 + 100 * i, 8_000 + 1_000 * i)
+
+    def test_consume_throttles_and_caps_ring(self):
+        written = self.collector.consume("web", self._stream(12), {})
+        # first sample only seeds the delta; then one sample per 2 s
+        self.assertEqual(written, 5)
+        self.assertEqual(len(self.redis.lists[ring_key("web")]), 3)
+        self.assertEqual(self.redis.round_trips, 5)
+        samples = read_samples(self.redis, "web", 10)
+        self.assertEqual([s["ts"] for s in samples], [1006.0, 1008.0, 1010.0])
+        self.assertTrue(all(s["cpu"] == 10.0 for s in samples))
+
+    def test_discover_starts_one_follower_per_container(self):
+        class _Api:
+            def containers(self, filters):
+                return [{"Id": "abc", "Names": ["/web"]}]
+
+            def inspect_container(self, cid):
+                return {"HostConfig": {}}
+
+            def stats(self, cid, stream, decode):
+                return iter(())
+
+        self.collector.api = _Api()
+        self.assertEqual(self.collector.discover(), 1)
+        self.collector._followers["abc"].join(timeout=1)
+        self.assertIn(HEARTBEAT_KEY, self.redis.keys)
+        # stream ended → a "stopped" sample is written
+        self.assertFalse(read_samples(self.redis, "web", 1)[0]["running"])
+
+
+class TestReadServiceStats(unittest.TestCase):
+    def setUp(self):
+        self.redis = _FakeRedis()
+        self.redis.set(HEARTBEAT_KEY, "1")
+        for ts, cpu in ((100.0, 10.0), (102.0, 20.0), (104.0, 30.0)):
+            self.redis.lpush(ring_key("web"), encode_sample(ts, cpu, 40.0, True))
+
+    def test_latest_sample_and_history(self):
+        result = read_service_stats("web", history=2, now=105.0, redis=self.redis)
+        self.assertTrue(result["running"])
+        self.assertEqual(result["cpu"], 30.0)
+        self.assertEqual(result["ram"], 40.0)
+        self.assertEqual([p["cpu"] for p in result["history"]], [20.0, 30.0])
+
+    def test_stale_sample_defers_to_docker(self):
+        self.assertIsNone(read_service_stats("web", now=500.0, redis=self.redis))
+
+    def test_container_without_samples_defers_to_docker(self):
+        # just started: no sample until the next discovery
+        self.assertIsNone(read_service_stats("other", now=105.0, redis=self.redis))
+
+    def test_recent_stop_sample_reports_not_running(self):
+        self.redis.lpush(ring_key("web"), encode_sample(106.0, 0.0, 0.0, False))
+        result = read_service_stats("web", now=107.0, redis=self.redis)
+        self.assertFalse(result["running"])
+        self.assertEqual(result["cpu"], 0.0)
+
+    def test_no_collector_returns_none(self):
+        self.redis.keys.clear()
+        self.assertIsNone(read_service_stats("web", now=105.0, redis=self.redis))
+
+
+if __name__ == "__main__":
+    unittest.main()
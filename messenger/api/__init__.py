@@ -5,7 +5,7 @@ from .contacts import (
     BlockListCreateAPIView, UnblockAPIView,
 )
 from .conversations import (
-    ConversationListCreateAPIView, ConversationDetailAPIView,
+    ConversationListCreateAPIView, ConversationDetailAPIView, UnreadCountsAPIView,
 )
 from .messages import (
     MessageListCreateAPIView, MessageForwardAPIView, MessageReactAPIView,
@@ -45,7 +45,7 @@ from .common import ok, err, get_or_create_dm, _attach_list_side_data
 __all__ = [
     "UserSearchAPIView", "ContactListCreateAPIView", "ContactDeleteAPIView",
     "BlockListCreateAPIView", "UnblockAPIView",
-    "ConversationListCreateAPIView", "ConversationDetailAPIView",
+    "ConversationListCreateAPIView", "ConversationDetailAPIView", "UnreadCountsAPIView",
     "MessageListCreateAPIView", "MessageForwardAPIView", "MessageReactAPIView",
     "MessageEditAPIView", "MessageDeleteAPIView", "MarkReadAPIView",
     "MessageSearchAPIView", "ScheduledMessageCancelAPIView", "ScheduledMessageListAPIView",
@@ -30,10 +30,41 @@ from ..serializers import (
     build_conversation_list_context, prepare_conversation_detail,
 )
 from ..utils import validate_messenger_file, detect_kind, users_blocked, can_see_profile_photo
-from .common import ok, err, _attach_list_side_data, get_or_create_dm, logger
+from .common import ok, err, _attach_list_side_data, get_or_create_dm
 
 User = get_user_model()
 
+def _build_list_rows(request, conv_ids):
+    """Serialize chat-list rows for ``conv_ids`` the user still belongs to.
+
+    Returns ``{conv_id: row}``; conversations the user left are omitted.
+    """
+    if not conv_ids:
+        return {}
+    qs = (
+        Conversation.objects.filter(
+            id__in=conv_ids,
+            participants__user=request.user, participants__left_at__isnull=True,
+        )
+        .distinct()
+        .select_related("created_by")
+        .prefetch_related(
+            Prefetch(
+                "participants",
+                queryset=ConversationParticipant.objects.filter(left_at__isnull=True).select_related("user"),
+                to_attr="_prefetched_active_participants",
+            )
+        )
+    )
+    items = list(qs)
+    # ---- Kill N+1: bulk last_message + unread_count (2 queries total) ----
+    _attach_list_side_data(items, request.user)
+    ctx = build_conversation_list_context(request, items)
+    ctx["lean_list"] = True
+    ser = ConversationListSerializer(items, many=True, context=ctx)
+    return {row["id"]: dict(row) for row in ser.data}
+
+
 class ConversationListCreateAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -42,77 +73,31 @@ class ConversationListCreateAPIView(APIView):
         # Scheduled delivery is handled by Celery beat — do NOT run it on every
         # list request (that alone was adding tens/hundreds of ms per call).
 
-        page = int(request.query_params.get("page") or 1)
+        page = max(1, int(request.query_params.get("page") or 1))
         page_size = min(50, int(request.query_params.get("page_size") or 30))
+        start = (page - 1) * page_size
 
-        # ----- Hot path: per-user conversation list cache -----
-        try:
-            from ..message_cache import ConversationCacheService
-            cached_list = ConversationCacheService.get_user_conv_list(request.user.id)
-            if cached_list is not None:
-                total = len(cached_list)
-                start = (page - 1) * page_size
-                end = start + page_size
-                return ok(data={
-                    "results": cached_list[start:end],
-                    "page": page,
-                    "page_size": page_size,
-                    "total": total,
-                    "has_more": end < total,
-                })
-        except Exception:
-            logger.exception("conversation list cache read failed")
+        from ..inbox import InboxService
 
-        qs = (
-            Conversation.objects.filter(
-                participants__user=request.user, participants__left_at__isnull=True
-            )
-            .distinct()
-            .select_related("created_by")
-            .prefetch_related(
-                Prefetch(
-                    "participants",
-                    queryset=ConversationParticipant.objects.filter(left_at__isnull=True).select_related("user"),
-                    to_attr="_prefetched_active_participants",
-                )
-            )
-        )
-        items = list(qs[:200])
-        pin_map = {}
-        for c in items:
-            parts = getattr(c, "_prefetched_active_participants", None)
-            if parts is None:
-                parts = list(c.participants.all())
-            part = next((p for p in parts if p.user_id == request.user.id), None)
-            pin_map[c.id] = bool(part and part.is_pinned)
-        items.sort(
-            key=lambda c: (
-                not pin_map.get(c.id, False),
-                -(c.last_message_at.timestamp() if c.last_message_at else c.created_at.timestamp()),
-            )
+        # ----- Hot path: per-user inbox index (ZREVRANGE + MGET) -----
+        result = InboxService.page(
+            request.user.id, start, page_size,
+            lambda ids: _build_list_rows(request, ids),
         )
-
-        # ---- Kill N+1: bulk last_message + unread_count (2 queries total) ----
-        _attach_list_side_data(items, request.user)
-        ctx = build_conversation_list_context(request, items)
-        ctx["lean_list"] = True
-
-        start = (page - 1) * page_size
-        end = start + page_size
-        total = len(items)
-        ser = ConversationListSerializer(items, many=True, context=ctx)
-        full_data = list(ser.data)
-        try:
-            from ..message_cache import ConversationCacheService
-            ConversationCacheService.set_user_conv_list(request.user.id, full_data)
-        except Exception:
-            logger.exception("conversation list cache write failed")
+        if result is None:
+            # Redis unavailable: order from Postgres, serialize only this page
+            ordered = InboxService.ordered_from_db(request.user.id)
+            ids = [cid for cid, _ in ordered[start:start + page_size]]
+            built = _build_list_rows(request, ids)
+            result = ([built[cid] for cid in ids if cid in built], len(ordered))
+
+        rows, total = result
         return ok(data={
-            "results": full_data[start:end],
+            "results": rows,
             "page": page,
             "page_size": page_size,
             "total": total,
-            "has_more": end < total,
+            "has_more": start + page_size < total,
         })
 
     def post(self, request):
@@ -178,6 +163,16 @@ class ConversationListCreateAPIView(APIView):
         )
 
 
+class UnreadCountsAPIView(APIView):
+    """Badge numbers from the materialized per-participant counters."""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from ..unread import unread_totals
+        return ok(data=unread_totals(request.user.id))
+
+
 class ConversationDetailAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
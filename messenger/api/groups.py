@@ -133,6 +133,8 @@ class GroupAvatarAPIView(APIView):
         old_avatar = conv.avatar
         if old_avatar:
             try:
+                from ..media_derivatives import delete_image_thumbnail
+                delete_image_thumbnail(old_avatar.name, old_avatar.storage)
                 old_avatar.delete(save=False)
             except Exception:
                 logger.warning("Could not delete previous group avatar", exc_info=True)
@@ -158,6 +160,11 @@ class GroupAvatarAPIView(APIView):
             )
         # Force a refresh from DB so the serializer returns the committed path
         conv.refresh_from_db()
+        try:
+            from ..media_derivatives import schedule_image_thumbnail
+            schedule_image_thumbnail(conv.avatar.name)
+        except Exception:
+            logger.exception("group avatar thumbnail scheduling failed conv=%s", conv.pk)
         # Verify the file actually exists on disk (debug aid — surfaces
         # misconfigured MEDIA_ROOT / volume mounts early).
         try:
@@ -180,8 +187,10 @@ class GroupAvatarAPIView(APIView):
         if not part or part.role not in ("owner", "admin"):
             return err("Only admins can change the group avatar", status.HTTP_403_FORBIDDEN)
         if conv.avatar:
-            # Delete the file from storage
+            # Delete the file (and its thumbnail) from storage
             try:
+                from ..media_derivatives import delete_image_thumbnail
+                delete_image_thumbnail(conv.avatar.name, conv.avatar.storage)
                 conv.avatar.delete(save=False)
             except Exception:
                 pass
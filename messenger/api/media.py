@@ -33,7 +33,8 @@ from .common import ok, err, _attach_list_side_data, get_or_create_dm, logger
 
 User = get_user_model()
 class AttachmentDownloadAPIView(APIView):
-    """Attachment download — supports JWT via Authorization header OR ?token= query param.
+    """Attachment download — supports signed URLs (core.media_signing), JWT via
+    Authorization header OR ?token= query param.
     The query-param fallback lets the browser load <img src="...?token=..."> and
     <audio>/<video> without custom headers (which those tags cannot send).
 
@@ -82,14 +83,22 @@ class AttachmentDownloadAPIView(APIView):
         return None
 
     def get(self, request, pk):
-        user = self._authenticate(request)
-        if not user:
-            return err("Unauthorized", status.HTTP_401_UNAUTHORIZED)
-        request.user = user
+        from core.media_signing import verify_signed_request
+
+        # Signed URL (issued to a participant by the serializers): no JWT
+        # decode, user lookup or membership query.
+        user_id = verify_signed_request(request)
+        signed = user_id is not None
+        if not signed:
+            user = self._authenticate(request)
+            if not user:
+                return err("Unauthorized", status.HTTP_401_UNAUTHORIZED)
+            request.user = user
+            user_id = user.id
 
         att = get_object_or_404(MessageAttachment, pk=pk)
-        if not ConversationParticipant.objects.filter(
-            conversation=att.conversation, user=user, left_at__isnull=True
+        if not signed and not ConversationParticipant.objects.filter(
+            conversation_id=att.conversation_id, user_id=user_id, left_at__isnull=True
         ).exists():
             return err("Forbidden", status.HTTP_403_FORBIDDEN)
 
@@ -98,13 +107,13 @@ class AttachmentDownloadAPIView(APIView):
             return err("Media no longer available", status.HTTP_410_GONE)
 
         # View-once: recipients need a live open window (15s) + matching once token
-        if getattr(att, "is_view_once", False) and att.uploaded_by_id != user.id:
+        if getattr(att, "is_view_once", False) and att.uploaded_by_id != user_id:
             from django.utils import timezone as _tz
             from django.core.cache import cache
             from ..models import AttachmentViewOnceOpen
 
             once_tok = request.GET.get("once") or request.query_params.get("once")
-            key = f"messenger:view_once:{att.pk}:{user.id}"
+            key = f"messenger:view_once:{att.pk}:{user_id}"
             granted = False
             if once_tok:
                 try:
@@ -114,7 +123,7 @@ class AttachmentDownloadAPIView(APIView):
             if not granted:
                 return err("View-once media locked", status.HTTP_403_FORBIDDEN)
 
-            row = AttachmentViewOnceOpen.objects.filter(attachment=att, user=user).first()
+            row = AttachmentViewOnceOpen.objects.filter(attachment=att, user_id=user_id).first()
             if not row:
                 return err("View-once media locked", status.HTTP_403_FORBIDDEN)
             now = _tz.now()
@@ -128,7 +137,24 @@ class AttachmentDownloadAPIView(APIView):
                     pass
                 return err("View window expired", status.HTTP_410_GONE)
 
-        from django.http import FileResponse
+        from core.media_delivery import media_from_field, media_from_storage, serve_file
+
+        # ?variant=<size>|poster → preview derivative (see media_derivatives)
+        variant = request.GET.get("variant")
+        if variant:
+            from ..media_derivatives import variant_name
+            name = variant_name(att, variant)
+            if not name:
+                return err("Preview not available", status.HTTP_404_NOT_FOUND)
+            try:
+                media = media_from_storage(att.file.storage, name)
+            except OSError:
+                return err("File not found", status.HTTP_404_NOT_FOUND)
+            stem = (att.original_filename or "file").rsplit(".", 1)[0]
+            return serve_file(
+                request, media, content_type="image/webp", filename=f"{stem}.{variant}.webp",
+            )
+
         content_type = (
             att.content_type
             or mimetypes.guess_type(att.original_filename or att.file.name)[0]
@@ -136,25 +162,17 @@ class AttachmentDownloadAPIView(APIView):
         )
         inline_kinds = {"image", "gif", "video", "audio", "voice"}
         try:
-            fh = att.file.open("rb")
-        except Exception:
+            media = media_from_field(att.file)
+        except OSError:
             return err("File not found", status.HTTP_404_NOT_FOUND)
 
-        response = FileResponse(
-            fh,
-            as_attachment=att.kind not in inline_kinds,
-            filename=att.original_filename or (getattr(att.file, "name", None) or "file").rsplit("/", 1)[-1],
+        return serve_file(
+            request,
+            media,
             content_type=content_type,
+            filename=att.original_filename or "file",
+            disposition="inline" if att.kind in inline_kinds else "attachment",
         )
-        disposition = "inline" if att.kind in inline_kinds else "attachment"
-        safe_name = (att.original_filename or "file").replace('"', "")
-        response["Content-Disposition"] = f'{disposition}; filename="{safe_name}"'
-        response["Accept-Ranges"] = "bytes"
-        response["X-Content-Type-Options"] = "nosniff"
-        # Help cross-origin <video>/<audio>/wavesurfer range requests
-        response["Access-Control-Expose-Headers"] = "Content-Range, Accept-Ranges, Content-Length, Content-Type"
-        response["Cache-Control"] = "private, max-age=3600"
-        return response
 
 
 
@@ -218,6 +236,8 @@ class ConversationCleanupAPIView(APIView):
         Conversation.objects.filter(pk=conv.pk).update(
             last_message_at=None, updated_at=timezone.now()
         )
+        from ..unread import recount_unread
+        recount_unread(conversation_id=conv.id)
         # Drop Redis hot-cache for this chat + participant conversation lists.
         # Without this, clients keep seeing the old messages until TTL/expiry.
         try:
@@ -359,6 +379,11 @@ def maybe_purge_view_once_attachment(att) -> bool:
 def _purge_attachment_file(att) -> bool:
     """Delete disk file, mark purged, refresh message cache."""
     try:
+        try:
+            from ..media_derivatives import delete_derivatives
+            delete_derivatives(att)
+        except Exception:
+            logger.exception("purge derivatives failed id=%s", att.id)
         if att.file:
             try:
                 att.file.delete(save=False)
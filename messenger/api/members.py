@@ -223,15 +223,15 @@ class LeaveConversationAPIView(APIView):
                     "Leave DM: cache invalidation failed conv=%s", pk
                 )
             try:
-                from ..consumers import broadcast_member_change, _send
+                from ..consumers import broadcast_member_change
+                from ..fanout import fanout, user_group
                 payload = {
                     "type": "conversation.deleted",
                     "conversation_id": pk,
                     "user_id": request.user.id,
                 }
                 broadcast_member_change(pk, payload)
-                for uid in participant_uids:
-                    _send(f"messenger_user_{uid}", payload)
+                fanout([user_group(uid) for uid in participant_uids], payload)
             except Exception:
                 pass
             return ok("Left")
@@ -591,15 +591,15 @@ class DeleteConversationAPIView(APIView):
 
         # Notify participants so open clients close / refresh the chat.
         try:
-            from ..consumers import broadcast_member_change, _send
+            from ..consumers import broadcast_member_change
+            from ..fanout import fanout, user_group
             payload = {
                 "type": "conversation.deleted",
                 "conversation_id": conv_id,
                 "user_id": request.user.id,
             }
             broadcast_member_change(conv_id, payload)
-            for uid in participant_uids:
-                _send(f"messenger_user_{uid}", payload)
+            fanout([user_group(uid) for uid in participant_uids], payload)
         except Exception:
             logger.exception(
                 "DeleteConversation: broadcast failed conv=%s", conv_id
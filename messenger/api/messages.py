@@ -19,7 +19,7 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from ..models import (
     Contact, Block, Conversation, ConversationParticipant, Message,
     MessageReaction, MessageAttachment, GroupInviteLink,
-    ProfilePhotoPrivacy, ProfilePhotoAllowed, MessageReadReceipt, UserBio,
+    ProfilePhotoPrivacy, ProfilePhotoAllowed, UserBio,
     JoinRequest, PinnedMessage, CallSession,
 )
 from ..serializers import (
@@ -561,10 +561,14 @@ class MessageDeleteAPIView(APIView):
             ).first()
             if not part or part.role not in ("owner", "admin"):
                 return err("Forbidden", status.HTTP_403_FORBIDDEN)
+        was_scheduled = msg.is_scheduled
         msg.is_deleted = True
         msg.is_scheduled = False
         msg.body = ""
         msg.save(update_fields=["is_deleted", "is_scheduled", "body", "updated_at"])
+        if not was_scheduled:
+            from ..unread import drop_unread_for_message
+            drop_unread_for_message(msg)
         # Pins + attachment files (important for cancelled schedules / soft delete)
         try:
             from ..signals import soft_delete_message_side_effects
@@ -578,21 +582,13 @@ class MessageDeleteAPIView(APIView):
         except Exception:
             logger.exception("message cache schedule delete failed")
         try:
-            from ..consumers import _send
-            _send(f"messenger_conv_{msg.conversation_id}", {
+            from ..fanout import fanout_conversation
+            # Room + personal channels for participants so list previews update
+            fanout_conversation(msg.conversation_id, {
                 "type": "message.deleted",
                 "conversation_id": msg.conversation_id,
                 "message_id": msg.id,
             })
-            # personal channels for participants so list previews update
-            for uid in ConversationParticipant.objects.filter(
-                conversation_id=msg.conversation_id, left_at__isnull=True
-            ).values_list("user_id", flat=True):
-                _send(f"messenger_user_{uid}", {
-                    "type": "message.deleted",
-                    "conversation_id": msg.conversation_id,
-                    "message_id": msg.id,
-                })
         except Exception:
             logger.exception("broadcast delete failed")
         return ok("Deleted")
@@ -654,67 +650,94 @@ class MarkReadAPIView(APIView):
         else:
             return ok("Read", data={"receipts": 0, "skipped": True})
 
-        new_receipts = []
-        latest_created = None
-        for m in msg_qs.values("id", "sender_id", "created_at").iterator():
-            _, created = MessageReadReceipt.objects.get_or_create(
-                message_id=m["id"], user=request.user,
-            )
-            if created:
-                new_receipts.append({
-                    "message_id": m["id"],
-                    "sender_id": m["sender_id"],
-                    "reader_id": request.user.id,
-                })
-            if latest_created is None or m["created_at"] > latest_created:
-                latest_created = m["created_at"]
+        # One SELECT for the id set, chunked INSERT … ON CONFLICT DO NOTHING
+        # RETURNING for the receipts, one UPDATE for last_read_at + unread.
+        rows = list(msg_qs.order_by("id").values_list("id", "created_at"))
+        read_ids = [mid for mid, _ in rows]
+        latest_created = max((created for _, created in rows), default=None)
+        from ..receipts import id_ranges, insert_read_receipts
+        new_ids = insert_read_receipts(request.user.id, read_ids)
 
+        read_at = None
         if latest_created and (not part.last_read_at or latest_created > part.last_read_at):
-            part.last_read_at = latest_created
-            part.save(update_fields=["last_read_at"])
+            read_at = latest_created
         elif force_all:
             from django.utils import timezone as tz
-            part.last_read_at = tz.now()
-            part.save(update_fields=["last_read_at"])
-
-        if new_receipts:
+            read_at = tz.now()
+        if read_at is not None:
+            from ..unread import mark_read
+            mark_read(part, read_at)
+
+        if new_ids:
+            if message_ids:
+                # Viewport reads may skip messages; spans break at unread ones
+                sequence = list(
+                    Message.objects.filter(
+                        conversation_id=pk, is_deleted=False, is_system=False,
+                        is_scheduled=False, id__gte=read_ids[0], id__lte=read_ids[-1],
+                    ).exclude(sender=request.user).order_by("id").values_list("id", flat=True)
+                )
+                ranges = id_ranges(read_ids, sequence)
+            else:
+                # up_to / force_all select every eligible message in the span
+                ranges = [[read_ids[0], read_ids[-1]]]
             try:
                 from ..consumers import broadcast_read
-                broadcast_read(pk, request.user.id, new_receipts)
+                broadcast_read(pk, request.user.id, ranges, new_ids=new_ids)
             except Exception:
                 logger.exception("broadcast_read failed")
-        return ok("Read", data={"receipts": len(new_receipts)})
+        return ok("Read", data={"receipts": len(new_ids)})
 
 
 
 
 class MessageSearchAPIView(APIView):
-    """Search messages in a conversation (body contains query)."""
+    """Search messages in a conversation.
+
+    Word/prefix matches come from the ``search_vector`` GIN index and substring
+    matches from the pg_trgm index on ``body`` (see ``core.search``).
+    ``order=relevance`` (default) ranks by ``ts_rank``; ``order=recent`` is
+    newest first.  Pages are keyset based: pass back ``next_cursor``.
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request, pk):
-        from django.db.models import Q
+        from core.search import cursor_page, headlines, ranked_search
+
         conv = get_object_or_404(Conversation, pk=pk)
         part = conv.participants.filter(user=request.user, left_at__isnull=True).first()
         if not part:
             return err("Forbidden", status.HTTP_403_FORBIDDEN)
         q = (request.query_params.get("q") or "").strip()
         if len(q) < 1:
-            return ok(data={"results": [], "count": 0})
+            return ok(data={"results": [], "count": 0, "next_cursor": None})
         qs = Message.objects.filter(
             conversation=conv, is_deleted=False, is_scheduled=False, is_system=False
-        ).filter(body__icontains=q).select_related("sender").order_by("-created_at")
+        )
         if conv.type == Conversation.Type.GROUP and part.role not in ("owner", "admin"):
             visibility = getattr(conv, "history_visibility", "all") or "all"
             if visibility in ("none", "from_join") and part.joined_at:
                 qs = qs.filter(created_at__gte=part.joined_at)
-        limit = min(50, int(request.query_params.get("limit") or 30))
-        items = list(qs[:limit])
+        qs = ranked_search(qs, q, fields=("body",)).select_related("sender")
+        try:
+            limit = max(1, min(50, int(request.query_params.get("limit") or 30)))
+        except (TypeError, ValueError):
+            limit = 30
+        ranked = request.query_params.get("order") != "recent"
+        items, next_cursor = cursor_page(
+            qs, cursor=request.query_params.get("cursor"), limit=limit, ranked=ranked
+        )
+        snippets = headlines(Message, [m.pk for m in items], "body", q)
         ctx = build_message_list_context(request, items, conversation_id=conv.id)
+        results = MessageSerializer(items, many=True, context=ctx).data
+        for row, msg in zip(results, items):
+            row["snippet"] = snippets.get(msg.pk, "")
+            row["rank"] = round(float(msg.search_rank or 0.0), 6)
         return ok(data={
-            "results": MessageSerializer(items, many=True, context=ctx).data,
+            "results": results,
             "count": len(items),
+            "next_cursor": next_cursor,
         })
 
 
@@ -10,15 +10,16 @@ from __future__ import annotations
 import logging
 import urllib.parse
 
-from asgiref.sync import async_to_sync
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
-from channels.layers import get_channel_layer
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
+from .fanout import conv_group, fanout, fanout_conversation, user_group
+
 User = get_user_model()
 logger = logging.getLogger("messenger.ws")
 
@@ -169,8 +170,7 @@ def _broadcast_presence(user_id: int, online: bool) -> None:
         "user_id": int(user_id),
         "online": bool(online),
     }
-    for cid in conv_ids:
-        _send(f"messenger_conv_{cid}", data)
+    groups = [conv_group(cid) for cid in conv_ids]
 
     # Peers on the conversation list may only be in messenger_user_{peer}
     peer_ids = set()
@@ -187,10 +187,10 @@ def _broadcast_presence(user_id: int, online: bool) -> None:
             )
         except Exception:
             peer_ids = set()
-    for pid in peer_ids:
-        _send(f"messenger_user_{pid}", data)
+    groups += [user_group(pid) for pid in peer_ids]
     # Own other tabs
-    _send(f"messenger_user_{user_id}", data)
+    groups.append(user_group(user_id))
+    fanout(groups, data)
 
 
 
@@ -389,13 +389,7 @@ class MessengerConsumer(AsyncJsonWebsocketConsumer):
 
 
 def _send(group: str, data: dict):
-    layer = get_channel_layer()
-    if layer is None:
-        return
-    try:
-        async_to_sync(layer.group_send)(group, {"type": "messenger.event", "data": data})
-    except Exception:
-        logger.exception("group_send failed %s", group)
+    fanout([group], data)
 
 
 def broadcast_message(msg):
@@ -407,14 +401,8 @@ def broadcast_message(msg):
         "body": (msg.body or "")[:200],
         "created_at": msg.created_at.isoformat() if msg.created_at else None,
     }
-    _send(f"messenger_conv_{msg.conversation_id}", data)
-    # Notify all participants personally
-    from .models import ConversationParticipant
-    for uid in ConversationParticipant.objects.filter(
-        conversation_id=msg.conversation_id, left_at__isnull=True
-    ).values_list("user_id", flat=True):
-        if uid != msg.sender_id:
-            _send(f"messenger_user_{uid}", data)
+    # Room + every participant personally (one batch)
+    fanout_conversation(msg.conversation_id, data, exclude=[msg.sender_id])
 
 
 def broadcast_reaction(msg, user, emoji, action):
@@ -433,38 +421,35 @@ def broadcast_reaction(msg, user, emoji, action):
 
 def broadcast_call_event(conversation_id, data, exclude_user_id=None):
     """Fan-out call.started / call.ended to conversation participants."""
-    from .models import ConversationParticipant
     payload = dict(data)
     payload.setdefault("conversation_id", conversation_id)
-    _send(f"messenger_conv_{conversation_id}", payload)
-    for uid in ConversationParticipant.objects.filter(
-        conversation_id=conversation_id, left_at__isnull=True
-    ).values_list("user_id", flat=True):
-        if exclude_user_id and uid == exclude_user_id:
-            continue
-        _send(f"messenger_user_{uid}", payload)
+    fanout_conversation(conversation_id, payload, exclude=[exclude_user_id])
 
 
-def broadcast_read(conversation_id, reader_user_id, receipts):
+def broadcast_read(conversation_id, reader_user_id, ranges, *, new_ids=()):
     """Notify the conversation that some messages were just read by `reader_user_id`.
     Senders flip their tick state from 'sent' -> 'read'.
+
+    One coalesced event per read call: ``ranges`` are inclusive
+    ``[first_id, last_id]`` spans of the conversation (see
+    ``messenger.receipts.id_ranges``).  Small batches also carry the flat
+    ``message_ids`` of new receipts for older clients.
     """
-    if not receipts:
+    if not ranges or not new_ids:
         return
+    new_ids = list(new_ids)
     data = {
         "type": "message.read",
         "conversation_id": conversation_id,
         "reader_id": reader_user_id,
-        "message_ids": [r["message_id"] for r in receipts],
+        "ranges": [[int(a), int(b)] for a, b in ranges],
+        "count": len(new_ids),
+        "max_message_id": max(int(b) for _, b in ranges),
     }
-    # Notify every participant (including the reader — harmless)
-    from .models import ConversationParticipant
-    for uid in ConversationParticipant.objects.filter(
-        conversation_id=conversation_id, left_at__isnull=True
-    ).values_list("user_id", flat=True):
-        if uid != reader_user_id:
-            _send(f"messenger_user_{uid}", data)
-    _send(f"messenger_conv_{conversation_id}", data)
+    if len(new_ids) <= int(getattr(settings, "MESSENGER_READ_IDS_INLINE", 100)):
+        data["message_ids"] = new_ids
+    # Every other participant personally + the room
+    fanout_conversation(conversation_id, data, exclude=[reader_user_id])
 
 
 def broadcast_member_change(conversation_id, data: dict):
@@ -475,30 +460,14 @@ def broadcast_member_change(conversation_id, data: dict):
     (even though they're no longer an active participant) so their client can
     redirect them out of the chat.
     """
-    from .models import ConversationParticipant
-    _send(f"messenger_conv_{conversation_id}", data)
-    # Active participants (still in the group)
-    active_ids = set(
-        ConversationParticipant.objects.filter(
-            conversation_id=conversation_id, left_at__isnull=True
-        ).values_list("user_id", flat=True)
-    )
-    for uid in active_ids:
-        _send(f"messenger_user_{uid}", data)
-    # If this is a removal, also notify the removed user (now inactive).
-    # Their `left_at` is set, so the loop above skipped them.
-    if data.get("type") == "member.removed" and data.get("user_id"):
-        removed_uid = data.get("user_id")
-        if removed_uid not in active_ids:
-            _send(f"messenger_user_{removed_uid}", data)
-    # For "member.left" events, the leaver is still in active_ids at the time
-    # of broadcast (their `left_at` was set BEFORE broadcast), so they WILL
-    # receive the event via the loop above. We also explicitly send to them
-    # so their client redirects out even if they had already unsubscribed
-    # from the conversation channel.
-    if data.get("type") == "member.left" and data.get("user_id"):
-        leaver_uid = data.get("user_id")
-        _send(f"messenger_user_{leaver_uid}", data)
+    # Removed users have `left_at` set, so the participant query skips them;
+    # leavers may already have unsubscribed from the room.  Both still get
+    # the event on their personal channel so their client redirects out.
+    # (Duplicates with active participants are dropped by the fan-out.)
+    extra = []
+    if data.get("type") in ("member.removed", "member.left") and data.get("user_id"):
+        extra.append(data.get("user_id"))
+    fanout_conversation(conversation_id, data, extra_users=extra)
 
 
 def broadcast_profile_update(user_id: int):
@@ -521,10 +490,8 @@ def broadcast_profile_update(user_id: int):
         )
     except Exception:
         return
-    for cid in conv_ids:
-        _send(f"messenger_conv_{cid}", data)
     # Also notify the user's own personal channel so other tabs update too
-    _send(f"messenger_user_{user_id}", data)
+    fanout([conv_group(cid) for cid in conv_ids] + [user_group(user_id)], data)
 
 
 def broadcast_join_request(conversation_id, data: dict):
@@ -541,11 +508,11 @@ def broadcast_join_request(conversation_id, data: dict):
             left_at__isnull=True,
         ).values_list("user_id", flat=True)
     )
-    for uid in admin_ids:
-        _send(f"messenger_user_{uid}", data)
+    groups = [user_group(uid) for uid in admin_ids]
     # Also send to the requesting user so their "My Requests" panel updates
     if data.get("user_id"):
-        _send(f"messenger_user_{data['user_id']}", data)
+        groups.append(user_group(data["user_id"]))
+    fanout(groups, data)
 
 
 def broadcast_pin(conversation_id, data: dict):
@@ -553,9 +520,4 @@ def broadcast_pin(conversation_id, data: dict):
 
     Every participant's pinned-message bar should update in real-time.
     """
-    from .models import ConversationParticipant
-    _send(f"messenger_conv_{conversation_id}", data)
-    for uid in ConversationParticipant.objects.filter(
-        conversation_id=conversation_id, left_at__isnull=True
-    ).values_list("user_id", flat=True):
-        _send(f"messenger_user_{uid}", data)
+    fanout_conversation(conversation_id, data)
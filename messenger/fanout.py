@@ -0,0 +1,234 @@
+"""
+Messenger broadcast fan-out.
+
+Every realtime event goes to a conversation room and/or a set of personal
+``messenger_user_{id}`` groups.  Sending those one ``async_to_sync`` hop at a
+time costs an event-loop round trip *and* a Redis round trip per recipient
+on the request thread, so a 2 000-member group paid 2 000 sequential
+``group_send`` calls per message.
+
+This module:
+
+* resolves recipients once (one ``values_list`` query per event),
+* de-duplicates the target groups,
+* sends them in a single ``async_to_sync`` call that runs the
+  ``group_send`` coroutines concurrently (``MESSENGER_FANOUT_CONCURRENCY``
+  in flight, sharing the channel layer's connection pool),
+* optionally hands large fan-outs to a Celery worker
+  (``MESSENGER_FANOUT_ASYNC`` / ``MESSENGER_FANOUT_DEFER_MIN`` /
+  ``MESSENGER_FANOUT_QUEUE``) so the request returns immediately,
+* records per-event counters in ``messenger:fanout:stats``
+  (events, groups, failed, ms) for the cache dashboard.
+
+Failures never propagate: a broken layer or Redis only logs.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger("messenger.ws")
+
+STATS_KEY = "messenger:fanout:stats"
+MESSAGE_TYPE = "messenger.event"
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def conv_group(conversation_id) -> str:
+    return f"messenger_conv_{conversation_id}"
+
+
+def user_group(user_id) -> str:
+    return f"messenger_user_{user_id}"
+
+
+def participant_ids(conversation_id, *, exclude: Iterable = ()) -> List[int]:
+    """Active participant ids of a conversation (one query)."""
+    from .models import ConversationParticipant
+
+    skip = {int(x) for x in exclude if x}
+    try:
+        ids = ConversationParticipant.objects.filter(
+            conversation_id=conversation_id, left_at__isnull=True
+        ).values_list("user_id", flat=True)
+        return [uid for uid in ids if uid not in skip]
+    except Exception:
+        logger.exception("fanout: participant lookup failed conv=%s", conversation_id)
+        return []
+
+
+def _unique(groups: Iterable[str]) -> List[str]:
+    seen = set()
+    out = []
+    for g in groups:
+        if g and g not in seen:
+            seen.add(g)
+            out.append(g)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Sending
+# ---------------------------------------------------------------------------
+
+async def send_batch(layer, groups: List[str], message: dict, *, concurrency: int) -> int:
+    """``group_send`` to every group, ``concurrency`` at a time; returns failures."""
+    failed = 0
+    step = max(1, int(concurrency))
+    for start in range(0, len(groups), step):
+        chunk = groups[start:start + step]
+        results = await asyncio.gather(
+            *(layer.group_send(g, message) for g in chunk),
+            return_exceptions=True,
+        )
+        for group, result in zip(chunk, results):
+            if isinstance(result, BaseException):
+                failed += 1
+                logger.warning("group_send failed %s: %s", group, result)
+    return failed
+
+
+def deliver(event: str, groups: List[str], data: dict) -> int:
+    """Send ``data`` to ``groups`` now (one loop hop); returns groups reached."""
+    layer = get_channel_layer()
+    if layer is None or not groups:
+        return 0
+    message = {"type": MESSAGE_TYPE, "data": data}
+    started = time.perf_counter()
+    try:
+        failed = async_to_sync(send_batch)(
+            layer, groups, message,
+            concurrency=_setting("MESSENGER_FANOUT_CONCURRENCY", 100),
+        )
+    except Exception:
+        logger.exception("fanout %s failed (%d groups)", event, len(groups))
+        failed = len(groups)
+    elapsed_ms = (time.perf_counter() - started) * 1000.0
+    record(event, len(groups), failed, elapsed_ms)
+    return len(groups) - failed
+
+
+def _defer(event: str, groups: List[str], data: dict) -> bool:
+    if not _setting("MESSENGER_FANOUT_ASYNC", False):
+        return False
+    if len(groups) < int(_setting("MESSENGER_FANOUT_DEFER_MIN", 200)):
+        return False
+    try:
+        from .tasks import fanout_event
+
+        fanout_event.apply_async(
+            args=[event, groups, data],
+            queue=_setting("MESSENGER_FANOUT_QUEUE", None),
+        )
+        return True
+    except Exception:
+        logger.exception("fanout %s: enqueue failed, sending inline", event)
+        return False
+
+
+def fanout(groups: Iterable[str], data: dict, *, event: Optional[str] = None) -> int:
+    """Broadcast ``data`` to ``groups``.
+
+    Returns the number of groups reached inline, or ``0`` when the batch was
+    handed to the fan-out worker.
+    """
+    event = event or str(data.get("type") or "event")
+    targets = _unique(groups)
+    if _defer(event, targets, data):
+        return 0
+    return deliver(event, targets, data)
+
+
+def fanout_conversation(
+    conversation_id,
+    data: dict,
+    *,
+    room: bool = True,
+    exclude: Iterable = (),
+    extra_users: Iterable = (),
+) -> int:
+    """Room + personal groups of every active participant (minus ``exclude``)."""
+    groups = [conv_group(conversation_id)] if room else []
+    groups += [user_group(uid) for uid in participant_ids(conversation_id, exclude=exclude)]
+    groups += [user_group(uid) for uid in extra_users if uid]
+    return fanout(groups, data)
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        return None
+
+
+def record(event: str, groups: int, failed: int, elapsed_ms: float) -> None:
+    logger.debug(
+        "fanout %s groups=%d failed=%d %.1fms", event, groups, failed, elapsed_ms
+    )
+    r = _redis()
+    if not r:
+        return
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.hincrby(STATS_KEY, f"{event}:events", 1)
+        pipe.hincrby(STATS_KEY, f"{event}:groups", groups)
+        pipe.hincrby(STATS_KEY, f"{event}:failed", failed)
+        pipe.hincrbyfloat(STATS_KEY, f"{event}:ms", round(elapsed_ms, 3))
+        pipe.execute()
+    except Exception:
+        pass
+
+
+def get_fanout_stats() -> List[Dict]:
+    """Per-event totals, busiest first: event, events, groups, failed, ms, avg_ms."""
+    r = _redis()
+    if not r:
+        return []
+    try:
+        raw = r.hgetall(STATS_KEY) or {}
+    except Exception:
+        return []
+    rows: Dict[str, Dict] = {}
+    for field, value in raw.items():
+        if isinstance(field, bytes):
+            field = field.decode()
+        if isinstance(value, bytes):
+            value = value.decode()
+        event, _, metric = field.rpartition(":")
+        if not event:
+            continue
+        row = rows.setdefault(
+            event, {"event": event, "events": 0, "groups": 0, "failed": 0, "ms": 0.0}
+        )
+        row[metric] = float(value) if metric == "ms" else int(float(value))
+    out = []
+    for row in rows.values():
+        row["avg_groups"] = round(row["groups"] / row["events"], 1) if row["events"] else 0
+        row["avg_ms"] = round(row["ms"] / row["events"], 2) if row["events"] else 0
+        row["ms"] = round(row["ms"], 1)
+        out.append(row)
+    out.sort(key=lambda row: row["ms"], reverse=True)
+    return out
+
+
+def reset_fanout_stats() -> None:
+    r = _redis()
+    if r:
+        try:
+            r.delete(STATS_KEY)
+        except Exception:
+            pass
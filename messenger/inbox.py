@@ -0,0 +1,498 @@
+"""
+Per-user conversation inbox (Redis).
+
+Replaces the old whole-list JSON blob (``msgcache:user:{id}:conv_list``),
+which was rebuilt from up to 200 serialized conversations and thrown away
+for every participant on every new message.
+
+Keys
+----
+::
+
+    msgcache:inbox:{uid}              ZSET   conv_id → score
+    msgcache:inbox:{uid}:built        STRING marker: the ZSET is authoritative
+    msgcache:inbox:{uid}:unread       HASH   conv_id → unread count
+    msgcache:inbox:{uid}:row:{cid}    STRING viewer-specific list row (JSON)
+    msgcache:{cid}:summary            HASH   last_message (JSON preview),
+                                             last_message_id, last_message_at
+
+Score = ``PIN_OFFSET`` (pinned chats) + last activity in epoch ms, so a
+ZREVRANGE returns the exact order of the chat list: pinned first, then by
+``last_message_at`` (``created_at`` for empty chats).
+
+Read path: ZCARD + ZREVRANGE, then one pipeline of row MGET, unread HMGET
+and summary HMGETs — no Postgres.  Rows missing from Redis (first view,
+TTL, invalidation) are serialized for just those conversations by the
+caller-supplied builder.  The index itself is built with one light
+``values_list`` query; there is no cap on the number of chats.
+
+Write path (after commit):
+
+* new message   → one script updates the conversation summary and, for
+                  every participant with a built inbox, bumps the score
+                  and increments the unread counter (``on_new_message``)
+* participant   → add / re-score / remove one inbox entry, drop its row
+  saved           (pin, leave, join, last_read_at)
+* conversation  → drop the summary and every participant's row
+  changed         (``invalidate_conversation``)
+
+Unread counters mirror ``ConversationParticipant.unread_count``
+(``messenger.unread``): seeded from serialized rows (HSETNX), pushed on
+read and reconciliation, and only incremented once present, so a missing
+field always means "take the row's value".
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from .message_cache import (
+    _PREFIX,
+    _get_script,
+    _incr_stat,
+    _json_dumps,
+    _json_loads,
+    _redis,
+    record_hit,
+    record_miss,
+    run_after_commit,
+)
+
+logger = logging.getLogger("messenger")
+
+PIN_OFFSET = 10 ** 13  # > any epoch-ms timestamp until year 2286
+
+
+def _inbox_key(user_id) -> str:
+    return f"{_PREFIX}:inbox:{user_id}"
+
+
+def _built_key(user_id) -> str:
+    return f"{_PREFIX}:inbox:{user_id}:built"
+
+
+def _unread_key(user_id) -> str:
+    return f"{_PREFIX}:inbox:{user_id}:unread"
+
+
+def _row_key(user_id, conv_id) -> str:
+    return f"{_PREFIX}:inbox:{user_id}:row:{conv_id}"
+
+
+def _summary_key(conv_id) -> str:
+    return f"{_PREFIX}:{conv_id}:summary"
+
+
+def _inbox_ttl() -> int:
+    return int(getattr(settings, "MESSENGER_INBOX_TTL", 24 * 3600) or 0)
+
+
+def _row_ttl() -> int:
+    """List rows keep the old list-cache TTL (peer presence, titles, drafts)."""
+    return int(getattr(settings, "MESSENGER_LIST_CACHE_TTL", 300) or 300)
+
+
+def _decode(x):
+    return x.decode() if isinstance(x, bytes) else x
+
+
+def _ts_ms(value: Optional[datetime]) -> int:
+    return int(value.timestamp() * 1000) if value else 0
+
+
+def inbox_score(pinned: bool, last_activity: Optional[datetime]) -> int:
+    return (PIN_OFFSET if pinned else 0) + _ts_ms(last_activity)
+
+
+def message_preview(msg) -> Dict:
+    """Chat-list ``last_message`` dict (same shape as ConversationListSerializer)."""
+    from .serializers import _format_call_preview
+
+    body = msg.body or ""
+    if body.startswith("__call__:"):
+        body = _format_call_preview(body)
+    try:
+        has_att = bool(list(msg.attachments.all()))
+    except Exception:
+        has_att = False
+    return {
+        "id": msg.id,
+        "body": body[:100],
+        "sender_id": msg.sender_id,
+        "created_at": msg.created_at,
+        "has_attachments": has_att,
+        "is_system": bool(getattr(msg, "is_system", False)),
+    }
+
+
+# KEYS: summary, then (built, inbox, unread) per participant
+# ARGV: conv_id, msg_id, preview JSON, ts_ms, last_message_at, pin offset,
+#       summary ttl, then one "1"/"0" unread flag per participant
+_NEW_MESSAGE_LUA = """
+local conv = ARGV[1]
+local mid = tonumber(ARGV[2])
+local ts = tonumber(ARGV[4])
+local pin = tonumber(ARGV[6])
+local summary_ttl = tonumber(ARGV[7])
+
+local cur = tonumber(redis.call('HGET', KEYS[1], 'last_message_id') or '0')
+if mid > cur then
+  redis.call('HSET', KEYS[1], 'last_message', ARGV[3], 'last_message_id', mid,
+             'last_message_at', ARGV[5])
+end
+if summary_ttl > 0 then
+  redis.call('EXPIRE', KEYS[1], summary_ttl)
+end
+
+local touched = 0
+local user = 0
+for i = 2, #KEYS, 3 do
+  user = user + 1
+  if redis.call('EXISTS', KEYS[i]) == 1 then
+    local score = tonumber(redis.call('ZSCORE', KEYS[i + 1], conv))
+    local offset = 0
+    local base = -1
+    if score then
+      if score >= pin then offset = pin end
+      base = score - offset
+    end
+    if ts > base then
+      redis.call('ZADD', KEYS[i + 1], offset + ts, conv)
+    end
+    if ARGV[7 + user] == '1' and redis.call('HEXISTS', KEYS[i + 2], conv) == 1 then
+      redis.call('HINCRBY', KEYS[i + 2], conv, 1)
+    end
+    touched = touched + 1
+  end
+end
+return touched
+"""
+
+
+class InboxService:
+    """Sorted per-user inbox + shared conversation summaries."""
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def ordered_from_db(user_id: int) -> List[Tuple[int, int]]:
+        """``[(conv_id, score)]`` for every active chat of a user, newest first."""
+        from .models import ConversationParticipant
+
+        rows = ConversationParticipant.objects.filter(
+            user_id=user_id, left_at__isnull=True
+        ).values_list(
+            "conversation_id", "is_pinned",
+            "conversation__last_message_at", "conversation__created_at",
+        )
+        scores: Dict[int, int] = {}
+        for cid, pinned, last_at, created_at in rows:
+            scores[cid] = max(
+                scores.get(cid, 0), inbox_score(bool(pinned), last_at or created_at)
+            )
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+
+    @staticmethod
+    def ensure_index(r, user_id: int) -> None:
+        if r.exists(_built_key(user_id)):
+            return
+        ordered = InboxService.ordered_from_db(user_id)
+        ttl = _inbox_ttl()
+        key = _inbox_key(user_id)
+        pipe = r.pipeline(transaction=True)
+        pipe.delete(key)
+        for start in range(0, len(ordered), 1000):
+            pipe.zadd(key, {str(cid): score for cid, score in ordered[start:start + 1000]})
+        pipe.set(_built_key(user_id), "1")
+        if ttl > 0:
+            pipe.expire(key, ttl)
+            pipe.expire(_built_key(user_id), ttl)
+        pipe.execute()
+
+    # ------------------------------------------------------------------
+    # Read path
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def page(
+        user_id: int,
+        start: int,
+        count: int,
+        build_rows: Callable[[List[int]], Dict[int, Dict]],
+    ) -> Optional[Tuple[List[Dict], int]]:
+        """Rows ``start .. start+count-1`` of the inbox and the total chat count.
+
+        ``build_rows(conv_ids)`` serializes rows that are not in Redis and
+        omits conversations the user no longer belongs to.  Returns None
+        when Redis is unavailable (caller falls back to Postgres).
+        """
+        r = _redis()
+        if not r:
+            return None
+        try:
+            InboxService.ensure_index(r, user_id)
+            ttl = _inbox_ttl()
+            pipe = r.pipeline(transaction=False)
+            pipe.zcard(_inbox_key(user_id))
+            pipe.zrevrange(_inbox_key(user_id), start, start + count - 1)
+            if ttl > 0:
+                for key in (_inbox_key(user_id), _built_key(user_id), _unread_key(user_id)):
+                    pipe.expire(key, ttl)
+            res = pipe.execute()
+            total = int(res[0] or 0)
+            conv_ids = [int(_decode(x)) for x in res[1] or []]
+            if not conv_ids:
+                record_hit("list")
+                return [], total
+
+            pipe = r.pipeline(transaction=False)
+            pipe.mget([_row_key(user_id, cid) for cid in conv_ids])
+            pipe.hmget(_unread_key(user_id), [str(cid) for cid in conv_ids])
+            for cid in conv_ids:
+                pipe.hmget(_summary_key(cid), ["last_message", "last_message_id", "last_message_at"])
+            res = pipe.execute()
+            rows = {cid: _json_loads(raw) for cid, raw in zip(conv_ids, res[0])}
+            unread = dict(zip(conv_ids, res[1]))
+            summaries = dict(zip(conv_ids, res[2:]))
+
+            missing = [cid for cid in conv_ids if rows[cid] is None]
+            if missing:
+                record_miss("list")
+                built = build_rows(missing)
+                InboxService._store_rows(r, user_id, built)
+                gone = [cid for cid in missing if cid not in built]
+                if gone:
+                    InboxService._forget(r, user_id, gone)
+                    total -= len(gone)
+                for cid in missing:
+                    rows[cid] = built.get(cid)
+                    if cid in built:
+                        unread[cid] = None  # freshly counted by the builder
+            else:
+                record_hit("list")
+
+            out = []
+            for cid in conv_ids:
+                row = rows.get(cid)
+                if row is None:
+                    continue
+                out.append(InboxService._overlay(row, unread.get(cid), summaries.get(cid)))
+            return out, total
+        except Exception:
+            logger.exception("inbox page failed user=%s", user_id)
+            return None
+
+    @staticmethod
+    def _overlay(row: Dict, unread, summary) -> Dict:
+        if unread is not None:
+            row["unread_count"] = int(_decode(unread))
+        raw_last, last_id, last_at = summary or (None, None, None)
+        if raw_last is not None and last_id is not None:
+            current = row.get("last_message") or {}
+            if int(_decode(last_id)) >= int(current.get("id") or 0):
+                row["last_message"] = _json_loads(raw_last)
+                row["last_message_at"] = _decode(last_at)
+        return row
+
+    @staticmethod
+    def _store_rows(r, user_id: int, built: Dict[int, Dict]) -> None:
+        if not built:
+            return
+        ttl = _row_ttl()
+        pipe = r.pipeline(transaction=False)
+        for cid, row in built.items():
+            pipe.set(_row_key(user_id, cid), _json_dumps(row), ex=ttl)
+            pipe.hsetnx(_unread_key(user_id), str(cid), int(row.get("unread_count") or 0))
+        pipe.execute()
+        _incr_stat("list_set_ok", len(built))
+
+    @staticmethod
+    def _forget(r, user_id: int, conv_ids: Iterable[int]) -> None:
+        conv_ids = [str(cid) for cid in conv_ids]
+        if not conv_ids:
+            return
+        pipe = r.pipeline(transaction=False)
+        pipe.zrem(_inbox_key(user_id), *conv_ids)
+        pipe.hdel(_unread_key(user_id), *conv_ids)
+        pipe.delete(*[_row_key(user_id, cid) for cid in conv_ids])
+        pipe.execute()
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def on_new_message(msg, participant_ids: Optional[List[int]] = None) -> int:
+        """Update summary, scores and unread counters in place (one script).
+
+        Returns the number of participant inboxes touched.
+        """
+        if getattr(msg, "is_scheduled", False) or getattr(msg, "is_deleted", False):
+            return 0
+        r = _redis()
+        if not r:
+            return 0
+        conv_id = msg.conversation_id
+        try:
+            if participant_ids is None:
+                from .models import ConversationParticipant
+
+                participant_ids = list(
+                    ConversationParticipant.objects.filter(
+                        conversation_id=conv_id, left_at__isnull=True
+                    ).values_list("user_id", flat=True)
+                )
+            keys = [_summary_key(conv_id)]
+            flags = []
+            for uid in participant_ids:
+                keys += [_built_key(uid), _inbox_key(uid), _unread_key(uid)]
+                flags.append("1" if uid != msg.sender_id else "0")
+            preview = message_preview(msg)
+            return int(_get_script(r, _NEW_MESSAGE_LUA)(
+                keys=keys,
+                args=[
+                    conv_id, msg.id, _json_dumps(preview), _ts_ms(msg.created_at),
+                    _json_dumps(msg.created_at).strip('"'), PIN_OFFSET, _inbox_ttl(),
+                    *flags,
+                ],
+                client=r,
+            ) or 0)
+        except Exception:
+            logger.exception("inbox on_new_message failed msg=%s", getattr(msg, "id", None))
+            return 0
+
+    @staticmethod
+    def on_message_updated(msg) -> None:
+        """Refresh the summary preview when the edited message is the latest."""
+        r = _redis()
+        if not r:
+            return
+        key = _summary_key(msg.conversation_id)
+        try:
+            current = _decode(r.hget(key, "last_message_id"))
+            if current is None or int(current) != msg.id:
+                return
+            if getattr(msg, "is_deleted", False):
+                r.delete(key)
+            else:
+                r.hset(key, "last_message", _json_dumps(message_preview(msg)))
+        except Exception:
+            logger.exception("inbox on_message_updated failed msg=%s", msg.id)
+
+    @staticmethod
+    def on_participant_saved(
+        user_id: int,
+        conv_id: int,
+        *,
+        active: bool,
+        pinned: bool,
+        last_activity: Optional[datetime],
+        recount: bool = False,
+    ) -> None:
+        """Re-score (or remove) one inbox entry and drop its cached row."""
+        r = _redis()
+        if not r:
+            return
+        try:
+            if not active:
+                InboxService._forget(r, user_id, [conv_id])
+                return
+            pipe = r.pipeline(transaction=False)
+            pipe.delete(_row_key(user_id, conv_id))
+            if recount:
+                pipe.hdel(_unread_key(user_id), str(conv_id))
+            pipe.execute()
+            if r.exists(_built_key(user_id)):
+                r.zadd(_inbox_key(user_id), {str(conv_id): inbox_score(pinned, last_activity)})
+        except Exception:
+            logger.exception("inbox participant sync failed user=%s conv=%s", user_id, conv_id)
+
+    @staticmethod
+    def set_unread(rows: Iterable[Tuple[int, int, int]]) -> None:
+        """Push exact ``(user_id, conv_id, unread)`` values from Postgres."""
+        r = _redis()
+        if not r:
+            return
+        try:
+            ttl = _inbox_ttl()
+            pipe = r.pipeline(transaction=False)
+            for user_id, conv_id, unread in rows:
+                pipe.hset(_unread_key(user_id), str(conv_id), int(unread))
+                if ttl > 0:
+                    pipe.expire(_unread_key(user_id), ttl)
+            pipe.execute()
+        except Exception:
+            logger.exception("inbox set_unread failed")
+
+    @staticmethod
+    def invalidate_conversation(conv_id: int, *, summary: bool = True) -> None:
+        """Drop the shared summary and every active participant's row."""
+        r = _redis()
+        if not r:
+            return
+        try:
+            from .models import ConversationParticipant
+
+            uids = list(
+                ConversationParticipant.objects.filter(
+                    conversation_id=conv_id, left_at__isnull=True
+                ).values_list("user_id", flat=True)
+            )
+            keys = [_row_key(uid, conv_id) for uid in uids]
+            if summary:
+                keys.append(_summary_key(conv_id))
+            if keys:
+                r.delete(*keys)
+        except Exception:
+            logger.exception("inbox invalidate_conversation failed conv=%s", conv_id)
+
+    @staticmethod
+    def invalidate_user(user_id: int) -> None:
+        """Forget a user's whole inbox; the next list request rebuilds it."""
+        r = _redis()
+        if not r:
+            return
+        try:
+            ids = [_decode(x) for x in r.zrange(_inbox_key(user_id), 0, -1) or []]
+            keys = [_inbox_key(user_id), _built_key(user_id), _unread_key(user_id)]
+            keys += [_row_key(user_id, cid) for cid in ids]
+            pipe = r.pipeline(transaction=False)
+            for start in range(0, len(keys), 500):
+                pipe.delete(*keys[start:start + 500])
+            pipe.execute()
+        except Exception:
+            logger.exception("inbox invalidate_user failed user=%s", user_id)
+
+
+def schedule_participant_sync(participant, *, created: bool, update_fields=None) -> None:
+    """After commit: mirror a ConversationParticipant save into the inbox."""
+    if update_fields is not None and set(update_fields) <= {"last_read_at", "unread_count"}:
+        return  # counters are pushed by messenger.unread.recount_unread
+    user_id = participant.user_id
+    conv_id = participant.conversation_id
+    active = participant.left_at is None
+    pinned = bool(participant.is_pinned)
+    recount = update_fields is None or "last_read_at" in update_fields
+
+    def _job():
+        from .models import Conversation
+
+        row = (
+            Conversation.objects.filter(pk=conv_id)
+            .values_list("last_message_at", "created_at")
+            .first()
+        )
+        if row is None:
+            return
+        InboxService.on_participant_saved(
+            user_id, conv_id,
+            active=active, pinned=pinned,
+            last_activity=row[0] or row[1], recount=recount,
+        )
+
+    run_after_commit(_job)
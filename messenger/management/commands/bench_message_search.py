@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.search import cursor_page, ranked_search
+from messenger.models import Conversation, Message
+
+WORDS = [
+    "deploy", "build", "failed", "container", "restart", "volume", "backup",
+    "invoice", "domain", "certificate", "database", "migration", "logs",
+    "timeout", "redis", "worker", "queue", "release", "rollback", "latency",
+]
+
+SEED_SQL = """
+INSERT INTO messenger_message
+    (conversation_id, body, is_edited, is_system, is_deleted, is_scheduled, created_at, updated_at)
+SELECT %s,
+       concat_ws(' ', w[1 + (g * 7) %% 20], w[1 + (g * 13) %% 20], 'msg' || g,
+                 w[1 + (g * 3) %% 20], w[1 + (g * 17) %% 20]),
+       FALSE, FALSE, FALSE, FALSE,
+       now() - make_interval(secs => %s - g), now()
+FROM generate_series(1, %s) AS g, (SELECT %s::text[] AS w) AS words
+"""
+
+
+class Command(BaseCommand):
+    help = "Seed a large throwaway conversation and compare icontains against indexed message search."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1_000_000, help="Messages to seed.")
+        parser.add_argument("--runs", type=int, default=20, help="Timed runs per query.")
+        parser.add_argument(
+            "--keep",
+            action="store_true",
+            help="Keep the seeded conversation instead of deleting it afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        count = max(options["messages"], 1)
+        runs = max(options["runs"], 1)
+        conv = Conversation.objects.create(type=Conversation.Type.GROUP, title="search benchmark")
+        try:
+            started = time.perf_counter()
+            with connection.cursor() as cursor:
+                cursor.execute(SEED_SQL, [conv.id, count, count, WORDS])
+                cursor.execute("ANALYZE messenger_message")
+            self.stdout.write(f"Seeded {count} messages in {time.perf_counter() - started:.1f}s.")
+
+            base = Message.objects.filter(
+                conversation=conv, is_deleted=False, is_scheduled=False, is_system=False
+            )
+            for term in ("rollback", "certif", "msg99999", "ploy"):
+                legacy = self._measure(
+                    runs, lambda: list(base.filter(body__icontains=term).order_by("-created_at")[:30])
+                )
+                indexed = self._measure(
+                    runs, lambda: cursor_page(ranked_search(base, term, fields=("body",)), limit=30)
+                )
+                self.stdout.write(
+                    f"{term!r:12} icontains p50={legacy[0]:.1f}ms p95={legacy[1]:.1f}ms"
+                    f"  indexed p50={indexed[0]:.1f}ms p95={indexed[1]:.1f}ms"
+                    f"  ({legacy[0] / max(indexed[0], 1e-6):.1f}x)"
+                )
+        finally:
+            if options["keep"]:
+                self.stdout.write(f"Kept conversation {conv.id}.")
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute("DELETE FROM messenger_message WHERE conversation_id = %s", [conv.id])
+                conv.delete()
+
+    @staticmethod
+    def _measure(runs, fn):
+        fn()
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
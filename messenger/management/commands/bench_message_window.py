@@ -0,0 +1,56 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from messenger.message_cache import MessageCacheService, _cache_size, _redis
+from messenger.models import Conversation, Message
+
+
+class Command(BaseCommand):
+    help = (
+        "Cache a throwaway conversation and compare hot-window reads through the Lua script "
+        "against the multi-command path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=200, help="Timed reads per page shape.")
+        parser.add_argument("--limit", type=int, default=30, help="Page size.")
+
+    def handle(self, *args, **options):
+        if _redis() is None:
+            raise CommandError("Redis is not available.")
+        runs = max(options["runs"], 1)
+        limit = max(options["limit"], 1)
+        conv = Conversation.objects.create(type=Conversation.Type.GROUP, title="window benchmark")
+        try:
+            msgs = [
+                Message.objects.create(conversation=conv, body=f"msg-{n}")
+                for n in range(_cache_size())
+            ]
+            MessageCacheService.cache_messages(conv.id, msgs)
+            middle = msgs[len(msgs) // 2].id
+            pages = [{}, {"before_id": middle}, {"after_id": msgs[0].id}, {"around_id": middle}]
+
+            self._measure(1, conv.id, limit, pages, MessageCacheService.get_message_window)  # load script
+            multi = self._measure(runs, conv.id, limit, pages, MessageCacheService._get_message_window_multi)
+            lua = self._measure(runs, conv.id, limit, pages, MessageCacheService.get_message_window)
+            self.stdout.write(
+                f"multi p50={multi[0]:.0f}us p99={multi[1]:.0f}us"
+                f"  lua p50={lua[0]:.0f}us p99={lua[1]:.0f}us"
+                f"  ({lua[0] / max(multi[0], 1e-6):.2f}x)"
+            )
+        finally:
+            MessageCacheService.invalidate_chat_cache(conv.id)
+            conv.delete()
+
+    @staticmethod
+    def _measure(runs, conv_id, limit, pages, read):
+        samples = []
+        for _ in range(runs):
+            for kwargs in pages:
+                started = time.perf_counter()
+                read(conv_id, limit=limit, **kwargs)
+                samples.append((time.perf_counter() - started) * 1e6)
+        samples.sort()
+        return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.99))]
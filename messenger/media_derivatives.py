@@ -0,0 +1,283 @@
+"""
+Preview derivatives for messenger media.
+
+For image / gif / video attachments the ``generate_attachment_derivatives``
+Celery task writes next to the original upload:
+
+* ``<name>.w<size>.webp`` for every size in ``MESSENGER_THUMB_SIZES``
+  (longest edge, never upscaled);
+* ``<name>.poster.webp`` — a frame of a video, taken with a local ``ffmpeg``
+  when one is on PATH (videos get no previews otherwise);
+* ``MessageAttachment.placeholder`` — a tiny base64 WebP data URI (LQIP)
+  the client paints before anything else has loaded.
+
+Stored names are kept in ``MessageAttachment.derivatives``
+(``{"320": name, "poster": name}``) and served by the attachment download
+endpoint with ``?variant=<key>``.  View-once media gets no derivatives.
+``delete_derivatives`` runs when an attachment is purged or deleted.
+
+Avatars (group avatars, profile photos) get a single square-bounded
+``AVATAR_THUMB_SIZE`` thumbnail under the deterministic ``thumb_name``.
+"""
+from __future__ import annotations
+
+import base64
+import io
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from types import SimpleNamespace
+from typing import Dict, Optional, Sequence
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger("messenger")
+
+DEFAULT_THUMB_SIZES = (160, 320, 640)
+AVATAR_THUMB_SIZE = 160
+POSTER_MAX_EDGE = 1280
+PLACEHOLDER_EDGE = 16
+PREVIEW_KINDS = {"image", "gif", "video"}
+
+
+def thumb_sizes() -> Sequence[int]:
+    sizes = getattr(settings, "MESSENGER_THUMB_SIZES", None) or DEFAULT_THUMB_SIZES
+    return tuple(sorted({int(s) for s in sizes if int(s) > 0}))
+
+
+def thumb_name(name: str, size: int) -> str:
+    return f"{name}.w{size}.webp"
+
+
+def poster_name(name: str) -> str:
+    return f"{name}.poster.webp"
+
+
+# ---------------------------------------------------------------------------
+# Imaging
+# ---------------------------------------------------------------------------
+
+def _load_image(fh):
+    from PIL import Image, ImageOps
+
+    img = Image.open(fh)
+    img.seek(0)  # first frame of animated GIF / WebP
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+    return img
+
+
+def _webp(img, edge: int, quality: int = 80) -> bytes:
+    copy = img.copy()
+    copy.thumbnail((edge, edge))
+    buf = io.BytesIO()
+    copy.save(buf, format="WEBP", quality=quality, method=4)
+    return buf.getvalue()
+
+
+def placeholder_uri(img) -> str:
+    data = _webp(img, PLACEHOLDER_EDGE, quality=30)
+    return "data:image/webp;base64," + base64.b64encode(data).decode()
+
+
+def _store(storage, name: str, data: bytes) -> str:
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def _delete_names(storage, names) -> None:
+    for name in names:
+        if not name:
+            continue
+        try:
+            storage.delete(name)
+        except Exception:
+            logger.warning("derivative delete failed: %s", name, exc_info=True)
+
+
+def _ffmpeg() -> Optional[str]:
+    return shutil.which(getattr(settings, "MESSENGER_FFMPEG", "ffmpeg") or "ffmpeg")
+
+
+def _extract_poster(field_file, duration: Optional[float]):
+    """First meaningful frame of a video as a PIL image, or ``None``."""
+    ffmpeg = _ffmpeg()
+    if not ffmpeg:
+        return None
+    offset = 1.0 if not duration else min(1.0, max(0.0, float(duration) / 2))
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            src = field_file.storage.path(field_file.name)
+        except NotImplementedError:
+            src = os.path.join(tmp, "source")
+            with field_file.storage.open(field_file.name, "rb") as fin, open(src, "wb") as fout:
+                shutil.copyfileobj(fin, fout)
+        out = os.path.join(tmp, "poster.png")
+        cmd = [
+            ffmpeg, "-v", "error", "-y", "-ss", f"{offset:.2f}", "-i", src,
+            "-frames:v", "1", "-f", "image2", "-vcodec", "png", out,
+        ]
+        try:
+            subprocess.run(cmd, check=True, timeout=30, capture_output=True)
+        except (OSError, subprocess.SubprocessError):
+            logger.warning("poster extraction failed for %s", field_file.name, exc_info=True)
+            return None
+        if not os.path.exists(out):
+            return None
+        with open(out, "rb") as fh:
+            img = _load_image(fh)
+            img.load()
+            return img
+
+
+# ---------------------------------------------------------------------------
+# Attachments
+# ---------------------------------------------------------------------------
+
+def generate_for_attachment(att) -> Dict[str, str]:
+    """Build (or rebuild) derivatives for ``att``; returns the stored names."""
+    from .models import MessageAttachment
+
+    if (
+        att.kind not in PREVIEW_KINDS
+        or att.is_view_once
+        or att.is_purged
+        or not att.file
+    ):
+        return {}
+    storage = att.file.storage
+    delete_derivatives(att, clear=False)
+
+    if att.kind == MessageAttachment.Kind.VIDEO:
+        img = _extract_poster(att.file, att.duration)
+    else:
+        with att.file.open("rb") as fh:
+            img = _load_image(fh)
+            img.load()
+    if img is None:
+        return {}
+
+    derivatives: Dict[str, str] = {}
+    if att.kind == MessageAttachment.Kind.VIDEO:
+        derivatives["poster"] = _store(storage, poster_name(att.file.name), _webp(img, POSTER_MAX_EDGE))
+    longest = max(img.size)
+    for size in thumb_sizes():
+        if size >= longest and derivatives:
+            break  # never upscale; the largest useful size is already stored
+        derivatives[str(size)] = _store(storage, thumb_name(att.file.name, size), _webp(img, size))
+
+    updates = {"derivatives": derivatives, "placeholder": placeholder_uri(img)}
+    if not att.width or not att.height:
+        updates["width"], updates["height"] = img.size
+    MessageAttachment.objects.filter(pk=att.pk).update(**updates)
+    for key, value in updates.items():
+        setattr(att, key, value)
+    _refresh_cached_message(att)
+    return derivatives
+
+
+def delete_derivatives(att, *, clear: bool = True) -> None:
+    names = list((att.derivatives or {}).values())
+    if names:
+        storage = att.file.storage if att.file else default_storage
+        _delete_names(storage, names)
+    if clear and (names or att.placeholder):
+        from .models import MessageAttachment
+
+        MessageAttachment.objects.filter(pk=att.pk).update(derivatives={}, placeholder="")
+        att.derivatives, att.placeholder = {}, ""
+
+
+def variant_name(att, variant: str) -> Optional[str]:
+    return (att.derivatives or {}).get(str(variant)) or None
+
+
+def variant_urls(att_id: int, derivatives: Optional[Dict]) -> Dict[str, str]:
+    return {
+        key: f"/api/messenger/attachments/{att_id}/download/?variant={key}"
+        for key in (derivatives or {})
+    }
+
+
+def _refresh_cached_message(att) -> None:
+    if not att.message_id:
+        return
+    try:
+        from .message_cache import MessageCacheService
+        MessageCacheService.update_message(
+            SimpleNamespace(id=att.message_id, conversation_id=att.conversation_id)
+        )
+    except Exception:
+        logger.exception("message cache refresh after derivatives failed att=%s", att.pk)
+
+
+def schedule_attachment_derivatives(att) -> None:
+    if att.kind not in PREVIEW_KINDS or att.is_view_once:
+        return
+    from .message_cache import run_after_commit
+    from .tasks import generate_attachment_derivatives
+
+    run_after_commit(generate_attachment_derivatives.delay, att.pk)
+
+
+# ---------------------------------------------------------------------------
+# Avatars
+# ---------------------------------------------------------------------------
+
+def generate_image_thumbnail(name: str, storage=None) -> Optional[str]:
+    """Write the avatar thumbnail for storage file ``name``."""
+    storage = storage or default_storage
+    if not name or not storage.exists(name):
+        return None
+    with storage.open(name, "rb") as fh:
+        img = _load_image(fh)
+        img.load()
+    return _store(storage, thumb_name(name, AVATAR_THUMB_SIZE), _webp(img, AVATAR_THUMB_SIZE))
+
+
+def delete_image_thumbnail(name: str, storage=None) -> None:
+    if name:
+        _delete_names(storage or default_storage, [thumb_name(name, AVATAR_THUMB_SIZE)])
+
+
+def needs_image_thumbnail(field_file, thumbnail: str) -> bool:
+    """True unless ``thumbnail`` (the name recorded on the row) belongs to this file."""
+    return bool(field_file) and thumbnail != thumb_name(field_file.name, AVATAR_THUMB_SIZE)
+
+
+def image_thumbnail_url(field_file, thumbnail: str = "") -> Optional[str]:
+    """URL of the recorded avatar thumbnail, else the original's.
+
+    ``thumbnail`` is ``Profile.image_thumbnail`` / ``Conversation.avatar_thumbnail``;
+    one left over from a replaced image is ignored.  No storage lookups.
+    """
+    if not field_file:
+        return None
+    if needs_image_thumbnail(field_file, thumbnail):
+        return field_file.url
+    return field_file.storage.url(thumbnail)
+
+
+def record_image_thumbnail(name: str, thumbnail: str) -> None:
+    """Store the generated thumbnail name on every row that uses ``name``."""
+    from users.models import Profile
+
+    from .models import Conversation
+
+    Profile.objects.filter(image=name).update(image_thumbnail=thumbnail)
+    Conversation.objects.filter(avatar=name).update(avatar_thumbnail=thumbnail)
+
+
+def schedule_image_thumbnail(name: str) -> None:
+    if not name:
+        return
+    from .message_cache import run_after_commit
+    from .tasks import generate_image_thumbnail as task
+
+    run_after_commit(task.delay, name)
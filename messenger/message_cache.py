@@ -24,8 +24,17 @@ Reads never walk "page numbers".  A request is a **chunk by id**:
 * ``after_id``           → ZRANGEBYSCORE then MGET
 * ``around_id``          → older half + newer half around that id
 
+A window read (bounds check, id range, payload MGET, TTL touch and the
+hit/miss counter) runs as one server-side Lua script via EVALSHA — one
+round trip per cache hit.  ``MESSAGE_CACHE_LUA_READS = False`` switches
+back to the multi-command path (kept as the fallback and benchmark
+baseline).
+
 When the window exceeds ``MESSAGE_CACHE_SIZE``, the oldest ids are trimmed
-from the ZSET and their payload keys are deleted (sliding window).
+from the ZSET and their payload keys are deleted (sliding window).  The
+append, trim, orphan delete and meta rewrite run as one atomic script, so
+concurrent senders in a busy group never leave meta out of step with the
+ZSET.
 
 Add / update / delete keep the ZSET and payloads in sync after DB commit
 (``transaction.on_commit``).  PostgreSQL remains the source of truth; Redis
@@ -33,8 +42,10 @@ is a hot path only.  Ranges outside ``[min_id, max_id]`` fall through to DB.
 
 Also
 ----
-* Conversation list: short-lived JSON **per user**
-      msgcache:user:{user_id}:conv_list
+* Conversation list: sorted per-user inbox + conversation summaries,
+  updated in place on new messages (see ``messenger.inbox``)
+      msgcache:inbox:{user_id}[:built|:unread|:row:{conversation_id}]
+      msgcache:{conversation_id}:summary
 * Participants of a conversation:
       msgcache:{conversation_id}:participants
 
@@ -51,6 +62,8 @@ from typing import Any, Dict, List, Optional, Sequence, Tuple
 from django.conf import settings
 from django.utils import timezone
 
+from core.media_signing import sign_media_url
+
 logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
@@ -81,6 +94,10 @@ def _cache_ttl() -> int:
     return int(getattr(settings, "MESSAGE_CACHE_TTL", 6 * 3600) or 0)
 
 
+def _lua_reads_enabled() -> bool:
+    return bool(getattr(settings, "MESSAGE_CACHE_LUA_READS", True))
+
+
 # ---------------------------------------------------------------------------
 # Redis client
 # ---------------------------------------------------------------------------
@@ -301,11 +318,12 @@ def _user_mini(user) -> Optional[Dict[str, Any]]:
             .exclude(image__isnull=True)
             .exclude(image="")
             .order_by("order", "id")
-            .only("image")
+            .only("image", "image_thumbnail")
             .first()
         )
         if p is not None and p.image:
-            avatar_url = p.image.url
+            from .media_derivatives import image_thumbnail_url
+            avatar_url = image_thumbnail_url(p.image, p.image_thumbnail)
     except Exception:
         avatar_url = None
     return {
@@ -319,6 +337,8 @@ def _user_mini(user) -> Optional[Dict[str, Any]]:
 
 
 def _attachment_dict(att) -> Dict[str, Any]:
+    from .media_derivatives import variant_urls
+
     is_vo = bool(getattr(att, "is_view_once", False))
     is_purged = bool(getattr(att, "is_purged", False))
     # Never put a durable download URL for view-once in the shared cache;
@@ -334,6 +354,8 @@ def _attachment_dict(att) -> Dict[str, Any]:
         "height": att.height,
         "duration": att.duration,
         "url": url,
+        "thumbnails": {} if (is_vo or is_purged) else variant_urls(att.id, getattr(att, "derivatives", None)),
+        "placeholder": getattr(att, "placeholder", "") or "",
         "is_spoiler": bool(getattr(att, "is_spoiler", False)),
         "is_view_once": is_vo,
         "is_purged": is_purged,
@@ -418,6 +440,171 @@ def _json_loads(raw: Any) -> Optional[Dict]:
 # MessageCacheService
 # ---------------------------------------------------------------------------
 
+# ---------------------------------------------------------------------------
+# Server-side window read
+# ---------------------------------------------------------------------------
+# KEYS: meta, ids, stats
+# ARGV: mode (latest|before|after|around), anchor id, limit, ttl, payload key prefix
+#
+# Reply on hit:  {1, {min_id, max_id, more_older, more_newer, n_older}, ids, payloads}
+# Reply on miss: {0, reason}
+#
+# ``more_older`` / ``more_newer`` are the raw over-fetch flags (limit + 1);
+# the final has_more / next_* cursors are shaped in Python exactly like the
+# multi-command path.  Payload keys are derived from the ids inside the
+# script, so this relies on a single (non-cluster) Redis like the rest of
+# the cache.
+_WINDOW_LUA = """
+local meta = redis.call('HMGET', KEYS[1], 'min_id', 'max_id', 'count')
+local min_id = tonumber(meta[1])
+local max_id = tonumber(meta[2])
+local count = tonumber(meta[3]) or 0
+
+local function miss(reason)
+  redis.call('HINCRBY', KEYS[3], 'msg_miss', 1)
+  return {0, reason}
+end
+
+if not min_id or not max_id or count <= 0 then
+  return miss('meta')
+end
+
+local mode = ARGV[1]
+local anchor = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local prefix = ARGV[5]
+
+local ids = {}
+local more_older = 0
+local more_newer = 0
+local n_older = 0
+
+if mode == 'around' then
+  if anchor < min_id or anchor > max_id then
+    return miss('range')
+  end
+  local older_limit = math.max(1, math.floor(limit / 2))
+  local newer_limit = math.max(1, limit - older_limit)
+  local older = redis.call('ZREVRANGEBYSCORE', KEYS[2], anchor, min_id, 'LIMIT', 0, older_limit + 1)
+  if #older > older_limit then more_older = 1 end
+  for i = math.min(#older, older_limit), 1, -1 do
+    ids[#ids + 1] = older[i]
+  end
+  n_older = #ids
+  local newer = redis.call('ZRANGEBYSCORE', KEYS[2], anchor + 1, max_id, 'LIMIT', 0, newer_limit + 1)
+  if #newer > newer_limit then more_newer = 1 end
+  for i = 1, math.min(#newer, newer_limit) do
+    ids[#ids + 1] = newer[i]
+  end
+elseif mode == 'after' then
+  if anchor >= max_id or anchor < min_id - 1 then
+    return miss('range')
+  end
+  local raw = redis.call('ZRANGEBYSCORE', KEYS[2], anchor + 1, max_id, 'LIMIT', 0, limit + 1)
+  if #raw == 0 then
+    return miss('empty')
+  end
+  if #raw > limit then more_newer = 1 end
+  for i = 1, math.min(#raw, limit) do
+    ids[#ids + 1] = raw[i]
+  end
+else
+  local max_score = '+inf'
+  if mode == 'before' then
+    if min_id >= anchor then
+      return miss('range')
+    end
+    max_score = anchor - 1
+  end
+  local raw = redis.call('ZREVRANGEBYSCORE', KEYS[2], max_score, '-inf', 'LIMIT', 0, limit + 1)
+  if #raw == 0 then
+    return miss('empty')
+  end
+  if #raw > limit then more_older = 1 end
+  for i = math.min(#raw, limit), 1, -1 do
+    ids[#ids + 1] = raw[i]
+  end
+end
+
+local payloads = {}
+if #ids > 0 then
+  local keys = {}
+  for i, id in ipairs(ids) do
+    keys[i] = prefix .. id
+  end
+  payloads = redis.call('MGET', unpack(keys))
+  for i = 1, #keys do
+    if not payloads[i] then
+      return miss('payload:' .. ids[i])
+    end
+  end
+end
+
+if ttl > 0 then
+  redis.call('EXPIRE', KEYS[2], ttl)
+  redis.call('EXPIRE', KEYS[1], ttl)
+end
+redis.call('HINCRBY', KEYS[3], 'msg_hit', 1)
+return {1, {min_id, max_id, more_older, more_newer, n_older}, ids, payloads}
+"""
+
+# ---------------------------------------------------------------------------
+# Server-side sliding append
+# ---------------------------------------------------------------------------
+# KEYS: ids, meta, payload key of the new message
+# ARGV: msg id, payload JSON, window size, ttl, payload key prefix
+#
+# SET payload + ZADD, trim the oldest ranks beyond the window and delete
+# their payloads, then rewrite meta from the ZSET endpoints — all inside
+# one script, so concurrent senders cannot interleave between the trim and
+# the meta update.  Work is O(log n + dropped), not O(window).
+#
+# Reply: {count, min_id, max_id}
+_APPEND_LUA = """
+local mid = ARGV[1]
+local size = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local prefix = ARGV[5]
+
+if ttl > 0 then
+  redis.call('SET', KEYS[3], ARGV[2], 'EX', ttl)
+else
+  redis.call('SET', KEYS[3], ARGV[2])
+end
+redis.call('ZADD', KEYS[1], tonumber(mid), mid)
+
+local count = redis.call('ZCARD', KEYS[1])
+if count > size then
+  local dropped = redis.call('ZRANGE', KEYS[1], 0, count - size - 1)
+  redis.call('ZREMRANGEBYRANK', KEYS[1], 0, count - size - 1)
+  for _, id in ipairs(dropped) do
+    redis.call('DEL', prefix .. id)
+  end
+  count = size
+end
+
+local min_id = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+local max_id = redis.call('ZRANGE', KEYS[1], -1, -1)[1]
+redis.call('HSET', KEYS[2], 'min_id', min_id, 'max_id', max_id, 'count', count)
+if ttl > 0 then
+  redis.call('EXPIRE', KEYS[1], ttl)
+  redis.call('EXPIRE', KEYS[2], ttl)
+end
+return {count, tonumber(min_id), tonumber(max_id)}
+"""
+
+_scripts: Dict[str, Any] = {}
+
+
+def _get_script(r, source: str):
+    """``redis.commands.core.Script`` (EVALSHA, re-loads on NOSCRIPT)."""
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = r.register_script(source)
+    return script
+
+
 class MessageCacheService:
     """Shared Redis hot-cache for the latest messages of a conversation."""
 
@@ -562,6 +749,139 @@ class MessageCacheService:
         """
         Serve a page from the hot window when the requested range is covered.
 
+        One EVALSHA round trip (see ``_WINDOW_LUA``); falls back to the
+        multi-command path when Lua reads are disabled or the script fails.
+
+        Returns dict:
+          messages, has_more, next_before_id, has_more_newer, next_after_id
+        or None on miss (caller uses Postgres).
+        """
+        if not _lua_reads_enabled():
+            return MessageCacheService._get_message_window_multi(
+                conv_id, before_id=before_id, after_id=after_id,
+                around_id=around_id, limit=limit,
+            )
+        r = _redis()
+        if not r:
+            return None
+
+        limit = max(1, min(int(limit or 40), _cache_size()))
+        if around_id is not None:
+            mode, anchor = "around", int(around_id)
+        elif after_id is not None:
+            mode, anchor = "after", int(after_id)
+        elif before_id is not None:
+            mode, anchor = "before", int(before_id)
+        else:
+            mode, anchor = "latest", 0
+
+        try:
+            reply = _get_script(r, _WINDOW_LUA)(
+                keys=[_meta_key(conv_id), _ids_key(conv_id), STATS_KEY],
+                args=[mode, anchor, limit, _cache_ttl(), _msg_key(conv_id, "")],
+                client=r,
+            )
+        except Exception:
+            logger.exception(
+                "message_cache.get_message_window script failed conv=%s", conv_id
+            )
+            return MessageCacheService._get_message_window_multi(
+                conv_id, before_id=before_id, after_id=after_id,
+                around_id=around_id, limit=limit,
+            )
+
+        try:
+            if not reply or int(reply[0]) != 1:
+                reason = reply[1] if reply and len(reply) > 1 else b""
+                if isinstance(reason, bytes):
+                    reason = reason.decode()
+                if str(reason).startswith("payload:"):
+                    logger.warning(
+                        "message_cache: missing payload for msg %s in conv %s",
+                        str(reason).split(":", 1)[1], conv_id,
+                    )
+                return None
+            return MessageCacheService._shape_window(
+                mode, anchor, reply[1], reply[2], reply[3], conv_id,
+            )
+        except Exception:
+            logger.exception(
+                "message_cache.get_message_window failed conv=%s", conv_id
+            )
+            return None
+
+    @staticmethod
+    def _shape_window(mode, anchor, header, raw_ids, raw_payloads, conv_id):
+        """Turn a script reply into the public window dict."""
+        min_id, max_id, more_older, more_newer, n_older = (int(x) for x in header)
+        ids = [MessageCacheService._decode_id(x) for x in raw_ids]
+        messages: List[Dict] = []
+        for mid, raw in zip(ids, raw_payloads):
+            data = _json_loads(raw)
+            if data is None:
+                logger.warning(
+                    "message_cache: undecodable payload for msg %s in conv %s",
+                    mid, conv_id,
+                )
+                return None
+            messages.append(data)
+        has_more = bool(more_older)
+        has_more_newer = bool(more_newer)
+
+        if mode == "around":
+            older_ids, newer_ids = ids[:n_older], ids[n_older:]
+            # Older still in window above the first returned id?
+            if older_ids and older_ids[0] > min_id:
+                has_more = True
+            next_before = older_ids[0] if has_more and older_ids else None
+            next_after = (
+                newer_ids[-1] if newer_ids else (older_ids[-1] if older_ids else None)
+            )
+            if next_after is not None and next_after < max_id:
+                has_more_newer = True
+            elif next_after == max_id:
+                has_more_newer = False
+        elif mode == "after":
+            next_after = ids[-1]
+            if next_after >= max_id:
+                has_more_newer = False
+            elif not has_more_newer:
+                has_more_newer = next_after < max_id
+            # Client can still scroll up into older history
+            has_more = True
+            next_before = anchor
+        else:
+            # At the bottom of the hot window older messages may still live
+            # in Postgres, so has_more stays True; the next before_id call
+            # misses the cache and the DB returns the truth.
+            if messages and int(messages[0]["id"]) >= min_id:
+                has_more = True
+            next_before = messages[0]["id"] if has_more and messages else None
+            has_more_newer = mode == "before"
+            next_after = messages[-1]["id"] if messages else None
+
+        return {
+            "messages": messages,
+            "has_more": bool(has_more),
+            "next_before_id": next_before,
+            "has_more_newer": bool(has_more_newer),
+            "next_after_id": next_after,
+        }
+
+    @staticmethod
+    def _get_message_window_multi(
+        conv_id: int,
+        *,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+        around_id: Optional[int] = None,
+        limit: int = 40,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Multi-command window read (HGETALL meta, ZRANGE…, MGET, EXPIRE,
+        HINCRBY as separate round trips).  Fallback for
+        ``get_message_window`` and the baseline in its benchmark.
+
         Architecture
         ------------
         * Ordered id index:  ZSET ``msgcache:{conv}:ids`` (score = id)
@@ -868,7 +1188,8 @@ class MessageCacheService:
 
         List (ZSET) and payload (STRING) stay in sync: when the window exceeds
         MESSAGE_CACHE_SIZE, the oldest ids are dropped from the ZSET **and**
-        their payload keys are deleted.
+        their payload keys are deleted.  Append, trim, orphan delete and the
+        meta rewrite are one atomic script call (see ``_APPEND_LUA``).
         """
         r = _redis()
         if not r:
@@ -892,55 +1213,11 @@ class MessageCacheService:
 
             payload = message_to_cache_dict(msg)
             mid = msg.id
-            ids_key = _ids_key(conv_id)
-            meta_key = _meta_key(conv_id)
-            msg_key = _msg_key(conv_id, mid)
-
-            # Snapshot ids that will fall out of the window after this insert
-            # (rank 0 .. count-size-1 become excess once count becomes size+1)
-            try:
-                excess = r.zrange(ids_key, 0, -(size))  # may include ids to drop after add
-            except Exception:
-                excess = []
-
-            pipe = r.pipeline(transaction=True)
-            pipe.set(msg_key, _json_dumps(payload))
-            pipe.zadd(ids_key, {str(mid): mid})
-            pipe.zremrangebyrank(ids_key, 0, -(size + 1))
-            if ttl > 0:
-                pipe.expire(msg_key, ttl)
-                pipe.expire(ids_key, ttl)
-            pipe.execute()
-
-            # Delete payload keys for ids no longer in the ZSET
-            try:
-                still = set()
-                for x in r.zrange(ids_key, 0, -1) or []:
-                    if isinstance(x, bytes):
-                        x = x.decode()
-                    still.add(str(x))
-                drop = []
-                for x in excess or []:
-                    if isinstance(x, bytes):
-                        x = x.decode()
-                    if str(x) not in still and str(x) != str(mid):
-                        drop.append(_msg_key(conv_id, int(x)))
-                if drop:
-                    r.delete(*drop)
-            except Exception:
-                logger.exception("message_cache.add_message orphan cleanup failed")
-
-            min_raw = r.zrange(ids_key, 0, 0)
-            max_raw = r.zrange(ids_key, -1, -1)
-            count = r.zcard(ids_key)
-            min_id = int(min_raw[0]) if min_raw else mid
-            max_id = int(max_raw[0]) if max_raw else mid
-            r.hset(
-                meta_key,
-                mapping={"min_id": min_id, "max_id": max_id, "count": count},
+            _get_script(r, _APPEND_LUA)(
+                keys=[_ids_key(conv_id), _meta_key(conv_id), _msg_key(conv_id, mid)],
+                args=[mid, _json_dumps(payload), size, ttl, _msg_key(conv_id, "")],
+                client=r,
             )
-            if ttl > 0:
-                r.expire(meta_key, ttl)
         except Exception:
             logger.exception("message_cache.add_message failed msg=%s", getattr(msg, "id", None))
 
@@ -1203,6 +1480,15 @@ class MessageCacheService:
                         else:
                             ad["view_once_state"] = "pending"
                             ad["url"] = None
+                    if ad.get("is_purged"):
+                        ad["thumbnails"] = {}
+                    if viewer_id:
+                        if ad.get("url"):
+                            ad["url"] = sign_media_url(ad["url"], int(viewer_id))
+                        if ad.get("thumbnails"):
+                            ad["thumbnails"] = {
+                                k: sign_media_url(u, int(viewer_id)) for k, u in ad["thumbnails"].items()
+                            }
                     patched.append(ad)
                 out["attachments"] = patched
 
@@ -1257,102 +1543,39 @@ def run_after_commit(fn, *args, **kwargs):
 # Conversation-level caches (list per user, participants per chat)
 # ===========================================================================
 
-def _user_list_key(user_id: int) -> str:
-    return f"{_PREFIX}:user:{user_id}:conv_list"
-
-
 def _participants_key(conv_id: int) -> str:
     return f"{_PREFIX}:{conv_id}:participants"
 
 
-def _list_ttl() -> int:
-    return int(getattr(settings, "MESSENGER_LIST_CACHE_TTL", 60) or 60)
-
-
 def _conv_ttl() -> int:
     return int(getattr(settings, "MESSENGER_CONV_CACHE_TTL", 120) or 120)
 
 
 class ConversationCacheService:
-    """Short-lived caches for conversation list and participants.
+    """Conversation list invalidation and short-lived participant cache.
 
-    Conversation list is **per user** (pin state, unread, ordering differ).
+    The list itself is the per-user inbox in ``messenger.inbox``; the
+    methods below keep their old names for the API call sites.
     Participants are **per conversation** (shared across members).
     """
 
     # ----- conversation list (per user) -----
 
-    @staticmethod
-    def get_user_conv_list(user_id: int) -> Optional[List[Dict]]:
-        r = _redis()
-        if not r:
-            return None
-        try:
-            raw = r.get(_user_list_key(user_id))
-            data = _json_loads(raw)
-            if data is None:
-                record_miss("list")
-            else:
-                record_hit("list")
-            return data
-        except Exception:
-            logger.exception("get_user_conv_list failed user=%s", user_id)
-            return None
-
-    @staticmethod
-    def set_user_conv_list(user_id: int, payload: List[Dict]) -> None:
-        r = _redis()
-        if not r:
-            _incr_stat("list_set_fail")
-            return
-        try:
-            ttl = _list_ttl()
-            key = _user_list_key(user_id)
-            raw = _json_dumps(payload)
-            r.set(key, raw)
-            if ttl > 0:
-                r.expire(key, ttl)
-            _incr_stat("list_set_ok")
-        except Exception:
-            _incr_stat("list_set_fail")
-            logger.exception("set_user_conv_list failed user=%s", user_id)
-
     @staticmethod
     def invalidate_user_conv_list(user_id: int) -> None:
-        r = _redis()
-        if not r:
-            return
-        try:
-            r.delete(_user_list_key(user_id))
-        except Exception:
-            logger.exception("invalidate_user_conv_list failed user=%s", user_id)
+        """Forget one user's inbox (membership changed outside the ORM save path)."""
+        from .inbox import InboxService
+        InboxService.invalidate_user(user_id)
 
     @staticmethod
     def invalidate_conv_lists_for_conversation(conv_id: int) -> None:
-        """Drop list cache for every active participant of a conversation.
+        """Drop the cached list row of this chat for every active participant.
 
-        Called after new message / member change so the next list fetch is fresh.
+        Called after member / conversation changes and deletes so the next
+        list fetch re-serializes just that row.
         """
-        r = _redis()
-        if not r:
-            return
-        try:
-            from .models import ConversationParticipant
-            uids = list(
-                ConversationParticipant.objects.filter(
-                    conversation_id=conv_id, left_at__isnull=True
-                ).values_list("user_id", flat=True)
-            )
-            if not uids:
-                return
-            pipe = r.pipeline(transaction=False)
-            for uid in uids:
-                pipe.delete(_user_list_key(uid))
-            pipe.execute()
-        except Exception:
-            logger.exception(
-                "invalidate_conv_lists_for_conversation failed conv=%s", conv_id
-            )
+        from .inbox import InboxService
+        InboxService.invalidate_conversation(conv_id)
 
     # ----- participants (per conversation) -----
 
@@ -1398,7 +1621,7 @@ class ConversationCacheService:
 # ===========================================================================
 
 def schedule_add_message(msg) -> None:
-    """After commit: add message to hot window + invalidate affected lists."""
+    """After commit: add message to hot window + update participants' inboxes."""
     conv_id = getattr(msg, "conversation_id", None) or (
         msg.conversation.id if getattr(msg, "conversation", None) else None
     )
@@ -1415,18 +1638,18 @@ def schedule_add_message(msg) -> None:
             .first()
         )
         if fresh:
+            from .inbox import InboxService
             MessageCacheService.add_message(fresh)
-        if conv_id:
-            ConversationCacheService.invalidate_conv_lists_for_conversation(conv_id)
+            InboxService.on_new_message(fresh)
 
     run_after_commit(_job)
 
 
 def schedule_update_message(msg) -> None:
-    """Update one message in the hot window. Does NOT bust conversation-list cache.
+    """Update one message in the hot window.
 
-    List previews only need last_message text on *new* messages / deletes;
-    reactions and body edits of older rows should not force a full list rebuild.
+    List rows are untouched; the shared conversation summary is refreshed
+    only when the edited message is the chat's latest one.
     """
     msg_id = getattr(msg, "id", None)
 
@@ -1434,7 +1657,9 @@ def schedule_update_message(msg) -> None:
         from .models import Message
         fresh = Message.objects.filter(pk=msg_id).first()
         if fresh:
+            from .inbox import InboxService
             MessageCacheService.update_message(fresh)
+            InboxService.on_message_updated(fresh)
 
     run_after_commit(_job)
 
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+
+
+BACKFILL_SQL = """
+UPDATE messenger_conversationparticipant p
+SET unread_count = c.cnt
+FROM (
+    SELECT p2.id AS participant_id, COUNT(m.id) AS cnt
+    FROM messenger_conversationparticipant p2
+    JOIN messenger_message m
+      ON m.conversation_id = p2.conversation_id
+     AND m.is_deleted = FALSE
+     AND m.is_scheduled = FALSE
+     AND (m.sender_id IS NULL OR m.sender_id <> p2.user_id)
+     AND (p2.last_read_at IS NULL OR m.created_at > p2.last_read_at)
+    WHERE p2.left_at IS NULL
+    GROUP BY p2.id
+) c
+WHERE p.id = c.participant_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messenger", "0014_participant_draft"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversationparticipant",
+            name="unread_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
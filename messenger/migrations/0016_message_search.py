@@ -0,0 +1,50 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVectorField
+from django.db import migrations
+
+
+TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION messenger_message_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('simple', coalesce(NEW.body, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER messenger_message_search_vector_trg
+BEFORE INSERT OR UPDATE OF body ON messenger_message
+FOR EACH ROW EXECUTE FUNCTION messenger_message_search_vector();
+
+UPDATE messenger_message SET search_vector = to_tsvector('simple', coalesce(body, ''));
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS messenger_message_search_vector_trg ON messenger_message;
+DROP FUNCTION IF EXISTS messenger_message_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messenger", "0015_participant_unread_count"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="message",
+            name="search_vector",
+            field=SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(TRIGGER_SQL, reverse_sql=DROP_TRIGGER_SQL),
+        migrations.AddIndex(
+            model_name="message",
+            index=GinIndex(fields=["search_vector"], name="msg_search_vector_gin"),
+        ),
+        migrations.AddIndex(
+            model_name="message",
+            index=GinIndex(fields=["body"], name="msg_body_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messenger", "0016_message_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="messageattachment",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="messageattachment",
+            name="placeholder",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def record_existing_thumbnails(apps, schema_editor):
+    from messenger.media_derivatives import AVATAR_THUMB_SIZE, thumb_name
+
+    Conversation = apps.get_model("messenger", "Conversation")
+    for conv in Conversation.objects.exclude(avatar="").exclude(avatar__isnull=True).only("avatar").iterator():
+        name = thumb_name(conv.avatar.name, AVATAR_THUMB_SIZE)
+        if conv.avatar.storage.exists(name):
+            Conversation.objects.filter(pk=conv.pk).update(avatar_thumbnail=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("messenger", "0017_attachment_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="conversation",
+            name="avatar_thumbnail",
+            field=models.CharField(blank=True, default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(record_existing_thumbnails, migrations.RunPython.noop),
+    ]
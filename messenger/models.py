@@ -7,6 +7,8 @@ import os
 import secrets
 import uuid
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
@@ -123,6 +125,8 @@ class Conversation(models.Model):
     title = models.CharField(max_length=255, blank=True, default="")  # groups only
     description = models.TextField(blank=True, default="")
     avatar = models.ImageField(upload_to="messenger/groups/", null=True, blank=True)
+    # Set by messenger.tasks.generate_image_thumbnail once the file exists.
+    avatar_thumbnail = models.CharField(max_length=255, blank=True, default="", editable=False)
     is_public = models.BooleanField(default=False, db_index=True)  # appears in search
     is_closed = models.BooleanField(default=False)  # no new joins / messages
     # If True, users must send a join request that admins approve/reject
@@ -172,6 +176,10 @@ class ConversationParticipant(models.Model):
     is_muted = models.BooleanField(default=False)
     joined_at = models.DateTimeField(auto_now_add=True)
     last_read_at = models.DateTimeField(null=True, blank=True)
+    # Materialized badge: messages from others after last_read_at.
+    # Incremented on create, recounted on read, repaired by
+    # messenger.tasks.reconcile_unread_counts (see messenger.unread).
+    unread_count = models.PositiveIntegerField(default=0)
     # Soft leave
     left_at = models.DateTimeField(null=True, blank=True)
     # Per-user pin (chat appears at top of that user's list)
@@ -294,6 +302,8 @@ class Message(models.Model):
     is_scheduled = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # to_tsvector('simple', body), maintained by a DB trigger (migration 0016)
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
         ordering = ["created_at"]
@@ -301,9 +311,12 @@ class Message(models.Model):
             models.Index(fields=["conversation", "created_at"]),
             models.Index(fields=["conversation", "id"]),
             models.Index(fields=["is_scheduled", "scheduled_for"]),
+            GinIndex(fields=["search_vector"], name="msg_search_vector_gin"),
+            GinIndex(fields=["body"], name="msg_body_trgm", opclasses=["gin_trgm_ops"]),
         ]
 
     def save(self, *args, **kwargs):
+        adding = self._state.adding
         super().save(*args, **kwargs)
         # Do not bump conversation activity for still-pending scheduled messages
         if self.is_scheduled and self.scheduled_for:
@@ -311,6 +324,9 @@ class Message(models.Model):
         Conversation.objects.filter(pk=self.conversation_id).update(
             last_message_at=self.created_at, updated_at=timezone.now()
         )
+        if adding and not self.is_deleted:
+            from .unread import bump_unread
+            bump_unread(self.conversation_id, self.sender_id)
 
     def __str__(self):
         return f"Msg {self.pk} in {self.conversation_id}"
@@ -365,6 +381,10 @@ class MessageAttachment(models.Model):
     is_spoiler = models.BooleanField(default=False)  # blurred until recipient taps
     is_view_once = models.BooleanField(default=False)  # one open per recipient, then locked
     is_purged = models.BooleanField(default=False)  # file deleted after all recipients viewed
+    # Preview derivatives beside the original (see media_derivatives):
+    # {"160": name, "320": name, "poster": name} + a tiny LQIP data URI.
+    derivatives = models.JSONField(default=dict, blank=True)
+    placeholder = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -0,0 +1,78 @@
+"""
+Bulk read-receipt ingestion.
+
+Opening a chat after a long break used to run one ``get_or_create`` (SELECT
++ INSERT) per unread message.  ``insert_read_receipts`` writes the whole id
+set with ``INSERT … SELECT unnest(…) ON CONFLICT DO NOTHING RETURNING`` in
+chunks of ``MESSENGER_READ_RECEIPT_BATCH`` ids, so only receipts that are
+actually new come back (they drive the read ticks).
+
+``id_ranges`` compresses the ids of a read event into ``[first, last]``
+spans over the conversation's message sequence, which is what
+``broadcast_read`` sends instead of a flat id list.
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+
+def _batch_size() -> int:
+    return max(1, int(getattr(settings, "MESSENGER_READ_RECEIPT_BATCH", 1000) or 1000))
+
+
+def insert_read_receipts(user_id: int, message_ids: Sequence[int], *, seen_at=None) -> List[int]:
+    """Create missing receipts for ``message_ids``; returns ids that were new."""
+    from .models import MessageReadReceipt
+
+    ids = sorted({int(x) for x in message_ids})
+    if not ids:
+        return []
+    table = connection.ops.quote_name(MessageReadReceipt._meta.db_table)
+    seen_at = seen_at or timezone.now()
+    created: List[int] = []
+    step = _batch_size()
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), step):
+            cursor.execute(
+                f"""
+                INSERT INTO {table} (message_id, user_id, seen_at)
+                SELECT mid, %s, %s FROM unnest(%s::bigint[]) AS t(mid)
+                ON CONFLICT (message_id, user_id) DO NOTHING
+                RETURNING message_id
+                """,
+                [user_id, seen_at, ids[start:start + step]],
+            )
+            created.extend(row[0] for row in cursor.fetchall())
+    created.sort()
+    return created
+
+
+def id_ranges(ids: Iterable[int], sequence: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """Collapse ``ids`` into inclusive ``[first, last]`` runs.
+
+    ``sequence`` is the ordered list of candidate ids in the conversation;
+    two ids are adjacent when nothing from ``sequence`` lies between them.
+    Without it, only numerically consecutive ids merge.
+    """
+    wanted = sorted({int(x) for x in ids})
+    if not wanted:
+        return []
+    if sequence is None:
+        sequence = range(wanted[0], wanted[-1] + 1)
+    members = set(wanted)
+    ranges: List[List[int]] = []
+    current: Optional[List[int]] = None
+    for mid in sequence:
+        if mid in members:
+            if current is None:
+                current = [mid, mid]
+                ranges.append(current)
+            else:
+                current[1] = mid
+        else:
+            current = None
+    return ranges
@@ -12,6 +12,8 @@ from django.contrib.auth import get_user_model
 from django.db.models import Prefetch
 from rest_framework import serializers
 
+from core.media_signing import sign_for_request, sign_media_url
+
 from .models import (
     Contact, Block, Conversation, ConversationParticipant, Message,
     MessageReaction, MessageAttachment, GroupInviteLink,
@@ -106,6 +108,7 @@ class UserMiniSerializer(serializers.ModelSerializer):
 
 class MessageAttachmentSerializer(serializers.ModelSerializer):
     url = serializers.SerializerMethodField()
+    thumbnails = serializers.SerializerMethodField()
     is_spoiler = serializers.BooleanField(read_only=True)
     is_view_once = serializers.BooleanField(read_only=True)
     view_once_state = serializers.SerializerMethodField()
@@ -114,7 +117,7 @@ class MessageAttachmentSerializer(serializers.ModelSerializer):
         model = MessageAttachment
         fields = (
             "id", "original_filename", "content_type", "size", "kind",
-            "width", "height", "duration", "url", "created_at",
+            "width", "height", "duration", "url", "thumbnails", "placeholder", "created_at",
             "is_spoiler", "is_view_once", "is_purged", "view_once_state",
         )
 
@@ -156,9 +159,22 @@ class MessageAttachmentSerializer(serializers.ModelSerializer):
         if getattr(obj, "is_view_once", False):
             viewer = self._viewer()
             if viewer and getattr(viewer, "is_authenticated", False) and obj.uploaded_by_id == viewer.id:
-                return f"/api/messenger/attachments/{obj.pk}/download/"
+                return sign_media_url(f"/api/messenger/attachments/{obj.pk}/download/", viewer.id)
             return None
-        return f"/api/messenger/attachments/{obj.pk}/download/"
+        return sign_for_request(
+            f"/api/messenger/attachments/{obj.pk}/download/", self.context.get("request")
+        )
+
+    def get_thumbnails(self, obj):
+        """{"160": url, "320": url, "poster": url} — empty until the task ran."""
+        if getattr(obj, "is_purged", False) or getattr(obj, "is_view_once", False):
+            return {}
+        from .media_derivatives import variant_urls
+        request = self.context.get("request")
+        return {
+            key: sign_for_request(url, request)
+            for key, url in variant_urls(obj.pk, obj.derivatives).items()
+        }
 
 
 class ReactionSerializer(serializers.ModelSerializer):
@@ -303,13 +319,14 @@ class ConversationListSerializer(serializers.ModelSerializer):
     is_pinned = serializers.SerializerMethodField()
     created_by = serializers.SerializerMethodField()
     avatar_url = serializers.SerializerMethodField()
+    avatar_thumb_url = serializers.SerializerMethodField()
     draft_text = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
         fields = (
             "id", "public_id", "type", "title", "description", "avatar", "avatar_url",
-            "is_public", "is_closed", "requires_approval", "members_can_add", "only_admins_send",
+            "avatar_thumb_url", "is_public", "is_closed", "requires_approval", "members_can_add", "only_admins_send",
             "history_visibility", "created_by",
             "created_at", "updated_at", "last_message_at",
             "participants", "last_message", "unread_count", "peer", "is_pinned",
@@ -320,7 +337,16 @@ class ConversationListSerializer(serializers.ModelSerializer):
         if not obj.avatar:
             return None
         try:
-            return obj.avatar.url
+            return sign_for_request(obj.avatar.url, self.context.get("request"))
+        except Exception:
+            return None
+
+    def get_avatar_thumb_url(self, obj):
+        if not obj.avatar:
+            return None
+        try:
+            from .media_derivatives import image_thumbnail_url
+            return sign_for_request(image_thumbnail_url(obj.avatar, obj.avatar_thumbnail), self.context.get("request"))
         except Exception:
             return None
 
@@ -480,6 +506,7 @@ class ContactSerializer(serializers.ModelSerializer):
 class ProfilePhotoSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     url = serializers.SerializerMethodField()
+    thumb_url = serializers.SerializerMethodField()
     order = serializers.IntegerField()
     created_at = serializers.DateTimeField()
 
@@ -487,7 +514,16 @@ class ProfilePhotoSerializer(serializers.Serializer):
         if not obj.image:
             return None
         try:
-            return obj.image.url
+            return sign_for_request(obj.image.url, self.context.get("request"))
+        except Exception:
+            return None
+
+    def get_thumb_url(self, obj):
+        if not obj.image:
+            return None
+        try:
+            from .media_derivatives import image_thumbnail_url
+            return sign_for_request(image_thumbnail_url(obj.image, obj.image_thumbnail), self.context.get("request"))
         except Exception:
             return None
 
@@ -570,18 +606,19 @@ def build_user_mini_context(request, user_ids):
     avatar_map = {}
     try:
         from users.models import Profile
+        from .media_derivatives import image_thumbnail_url
         profiles = (
             Profile.objects.filter(user_id__in=user_ids)
             .exclude(image__isnull=True)
             .exclude(image="")
             .order_by("user_id", "order", "id")
-            .only("user_id", "image", "order")
+            .only("user_id", "image", "image_thumbnail", "order")
         )
         for p in profiles:
             if p.user_id in avatar_map:
                 continue
             try:
-                avatar_map[p.user_id] = p.image.url
+                avatar_map[p.user_id] = sign_media_url(image_thumbnail_url(p.image, p.image_thumbnail), viewer.id)
             except Exception:
                 pass
         # Privacy: null out avatars the viewer cannot see
@@ -3,10 +3,12 @@ import os
 import shutil
 
 from django.conf import settings
-from django.db.models.signals import pre_delete
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import Conversation, MessageAttachment, Message, PinnedMessage
+from .models import (
+    Conversation, ConversationParticipant, MessageAttachment, Message, PinnedMessage,
+)
 
 logger = logging.getLogger("messenger.signals")
 
@@ -21,6 +23,11 @@ def _delete_quietly(path):
 
 @receiver(pre_delete, sender=MessageAttachment)
 def attachment_pre_delete(sender, instance, **kwargs):
+    try:
+        from .media_derivatives import delete_derivatives
+        delete_derivatives(instance, clear=False)
+    except Exception:
+        logger.exception("attachment derivatives delete failed")
     try:
         if instance.file and getattr(instance.file, "path", None):
             _delete_quietly(instance.file.path)
@@ -28,6 +35,40 @@ def attachment_pre_delete(sender, instance, **kwargs):
         logger.exception("attachment file delete failed")
 
 
+@receiver(post_save, sender=MessageAttachment)
+def attachment_post_save_derivatives(sender, instance, created, **kwargs):
+    if not created:
+        return
+    try:
+        from .media_derivatives import schedule_attachment_derivatives
+        schedule_attachment_derivatives(instance)
+    except Exception:
+        logger.exception("derivative scheduling failed att=%s", instance.pk)
+
+
+@receiver(post_save, sender="users.Profile")
+def profile_photo_post_save_thumbnail(sender, instance, update_fields=None, **kwargs):
+    # Reorders and other saves that leave the image alone do not reschedule.
+    if update_fields is not None and "image" not in update_fields:
+        return
+    try:
+        from .media_derivatives import needs_image_thumbnail, schedule_image_thumbnail
+        if needs_image_thumbnail(instance.image, instance.image_thumbnail):
+            schedule_image_thumbnail(instance.image.name)
+    except Exception:
+        logger.exception("profile thumbnail scheduling failed id=%s", instance.pk)
+
+
+@receiver(pre_delete, sender="users.Profile")
+def profile_photo_pre_delete_thumbnail(sender, instance, **kwargs):
+    try:
+        from .media_derivatives import delete_image_thumbnail
+        if instance.image:
+            delete_image_thumbnail(instance.image.name, instance.image.storage)
+    except Exception:
+        logger.exception("profile thumbnail delete failed id=%s", instance.pk)
+
+
 @receiver(pre_delete, sender=Conversation)
 def conversation_pre_delete(sender, instance, **kwargs):
     media_root = getattr(settings, "MEDIA_ROOT", None)
@@ -41,6 +82,40 @@ def conversation_pre_delete(sender, instance, **kwargs):
             logger.exception("conv media cleanup failed")
 
 
+@receiver(post_save, sender=ConversationParticipant)
+def participant_post_save_inbox(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the member's inbox entry (order, pin, membership, unread) in step."""
+    rejoined = (
+        update_fields is not None and "left_at" in update_fields and instance.left_at is None
+    )
+    if created or rejoined:
+        # A new (or returning) member starts with the visible history unread;
+        # the counter of a left member was frozen when they left.
+        try:
+            from .unread import recount_unread
+            recount_unread([instance.pk])
+        except Exception:
+            logger.exception("unread recount for participant %s failed", instance.pk)
+    try:
+        from .inbox import schedule_participant_sync
+        schedule_participant_sync(instance, created=created, update_fields=update_fields)
+    except Exception:
+        logger.exception("inbox sync for participant %s failed", instance.pk)
+
+
+@receiver(post_save, sender=Conversation)
+def conversation_post_save_inbox(sender, instance, created, **kwargs):
+    """Title / avatar / settings changed → drop the cached list rows."""
+    if created:
+        return
+    try:
+        from .inbox import InboxService
+        from .message_cache import run_after_commit
+        run_after_commit(InboxService.invalidate_conversation, instance.pk, summary=False)
+    except Exception:
+        logger.exception("inbox invalidation for conversation %s failed", instance.pk)
+
+
 @receiver(pre_delete, sender=Message)
 def message_pre_delete_cleanup(sender, instance, **kwargs):
     """Hard-delete side effects for Message rows.
@@ -57,6 +57,8 @@ def deliver_due_scheduled_messages(limit=100):
             Conversation.objects.filter(pk=msg.conversation_id).update(
                 last_message_at=now, updated_at=now
             )
+            from .unread import bump_unread
+            bump_unread(msg.conversation_id, msg.sender_id)
             try:
                 from .message_cache import schedule_add_message
                 schedule_add_message(msg)
@@ -91,3 +93,48 @@ def purge_view_once_if_complete(attachment_id: int):
     except Exception:
         logger.exception("purge_view_once_if_complete failed id=%s", attachment_id)
     return False
+
+
+@shared_task(name="messenger.tasks.fanout_event", ignore_result=True)
+def fanout_event(event: str, groups, data):
+    """Off-request fan-out for large recipient sets (see ``messenger.fanout``)."""
+    from .fanout import deliver
+    return deliver(event, list(groups), data)
+
+
+@shared_task(name="messenger.tasks.reconcile_unread_counts", ignore_result=True)
+def reconcile_unread_counts():
+    """Repair drifted ConversationParticipant.unread_count values."""
+    from .unread import reconcile_unread_counts as _reconcile
+    return _reconcile()
+
+
+@shared_task(name="messenger.tasks.generate_attachment_derivatives", ignore_result=True)
+def generate_attachment_derivatives(attachment_id: int):
+    """WebP thumbnails, LQIP placeholder and video poster for one attachment."""
+    from .media_derivatives import generate_for_attachment
+    from .models import MessageAttachment
+
+    att = MessageAttachment.objects.filter(pk=attachment_id).first()
+    if not att:
+        return {}
+    try:
+        return generate_for_attachment(att)
+    except Exception:
+        logger.exception("generate_attachment_derivatives failed id=%s", attachment_id)
+        return {}
+
+
+@shared_task(name="messenger.tasks.generate_image_thumbnail", ignore_result=True)
+def generate_image_thumbnail(name: str):
+    """Avatar / profile photo thumbnail beside the original file."""
+    from .media_derivatives import generate_image_thumbnail as _generate, record_image_thumbnail
+
+    try:
+        thumbnail = _generate(name)
+        if thumbnail:
+            record_image_thumbnail(name, thumbnail)
+        return thumbnail
+    except Exception:
+        logger.exception("generate_image_thumbnail failed name=%s", name)
+        return None
@@ -0,0 +1,75 @@
+"""Tests for the batched broadcast fan-out (no Redis or database needed)."""
+from __future__ import annotations
+
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from . import fanout
+
+
+class _RecordingLayer:
+    """Channel layer stub that tracks how many sends overlap."""
+
+    def __init__(self, fail=()):
+        self.sent = []
+        self.fail = set(fail)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def group_send(self, group, message):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        if group in self.fail:
+            raise RuntimeError("boom")
+        self.sent.append((group, message))
+
+
+class FanoutTests(SimpleTestCase):
+    def setUp(self):
+        self.layer = _RecordingLayer()
+        for target, value in (
+            ("get_channel_layer", self.layer),
+            ("_redis", None),
+        ):
+            patcher = mock.patch.object(fanout, target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @override_settings(MESSENGER_FANOUT_CONCURRENCY=50)
+    def test_conversation_fanout_is_one_concurrent_batch(self):
+        with mock.patch.object(fanout, "participant_ids", return_value=list(range(1, 121))) as ids, \
+                mock.patch.object(fanout, "record") as record:
+            reached = fanout.fanout_conversation(7, {"type": "message.new"}, exclude=[3])
+
+        ids.assert_called_once_with(7, exclude=[3])
+        self.assertEqual(reached, 121)
+        self.assertEqual(self.layer.sent[0][0], "messenger_conv_7")
+        self.assertEqual(self.layer.sent[0][1], {"type": "messenger.event", "data": {"type": "message.new"}})
+        self.assertEqual(self.layer.peak, 50)
+        record.assert_called_once()
+        self.assertEqual(record.call_args.args[:3], ("message.new", 121, 0))
+
+    def test_duplicates_dropped_and_failures_counted(self):
+        self.layer.fail = {"messenger_user_2"}
+        with mock.patch.object(fanout, "record") as record:
+            reached = fanout.fanout(
+                ["messenger_user_1", "messenger_user_2", "messenger_user_1"],
+                {"type": "member.left"},
+            )
+        self.assertEqual(reached, 1)
+        self.assertEqual([g for g, _ in self.layer.sent], ["messenger_user_1"])
+        self.assertEqual(record.call_args.args[:3], ("member.left", 2, 1))
+
+    @override_settings(MESSENGER_FANOUT_ASYNC=True, MESSENGER_FANOUT_DEFER_MIN=3)
+    def test_large_batches_are_deferred_to_worker(self):
+        with mock.patch("messenger.tasks.fanout_event.apply_async") as enqueue:
+            self.assertEqual(fanout.fanout(["a", "b"], {"type": "x"}), 2)
+            enqueue.assert_not_called()
+            self.assertEqual(fanout.fanout(["a", "b", "c"], {"type": "x"}), 0)
+        enqueue.assert_called_once()
+        self.assertEqual(enqueue.call_args.kwargs["args"], ["x", ["a", "b", "c"], {"type": "x"}])
+        self.assertEqual(len(self.layer.sent), 2)
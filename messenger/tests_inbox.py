@@ -0,0 +1,100 @@
+"""
+Tests for the per-user inbox index (``messenger.inbox``).
+
+Like the message-cache tests these need the real Redis used by
+django-redis and are skipped when it is unavailable.
+"""
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from .inbox import InboxService
+from .message_cache import MessageCacheService, _redis
+from .models import Conversation, ConversationParticipant, Message
+from .tests_message_cache import redis_available
+
+User = get_user_model()
+
+
+class InboxServiceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="x")
+        cls.bob = User.objects.create_user(username="bob", password="x")
+        cls.convs = []
+        for i in range(3):
+            conv = Conversation.objects.create(type=Conversation.Type.GROUP, title=f"g{i}")
+            for user in (cls.alice, cls.bob):
+                ConversationParticipant.objects.create(conversation=conv, user=user)
+            cls.convs.append(conv)
+
+    def setUp(self):
+        if not redis_available():
+            self.skipTest("Redis not available")
+        self._flush()
+        self.built = []
+
+    def tearDown(self):
+        if redis_available():
+            self._flush()
+
+    def _flush(self):
+        for user in (self.alice, self.bob):
+            InboxService.invalidate_user(user.id)
+        for conv in self.convs:
+            MessageCacheService.invalidate_chat_cache(conv.id)
+            _redis().delete(f"msgcache:{conv.id}:summary")
+
+    def _rows(self, ids):
+        self.built.extend(ids)
+        return {cid: {"id": cid, "last_message": None, "unread_count": 0} for cid in ids}
+
+    def _page(self, user, start=0, count=10):
+        rows, total = InboxService.page(user.id, start, count, self._rows)
+        return [row["id"] for row in rows], total, rows
+
+    def _send(self, conv, sender, body):
+        msg = Message.objects.create(conversation=conv, sender=sender, body=body)
+        InboxService.on_new_message(msg)
+        return msg
+
+    def test_new_message_reorders_and_counts_without_rebuilding_rows(self):
+        ids, total, _ = self._page(self.alice)
+        self.assertEqual(total, 3)
+        self.built.clear()
+
+        first = self.convs[0]
+        self._send(first, self.bob, "hi")
+        self._send(first, self.bob, "again")
+
+        ids, _, rows = self._page(self.alice)
+        self.assertEqual(ids[0], first.id)
+        self.assertEqual(self.built, [])
+        self.assertEqual(rows[0]["unread_count"], 2)
+        self.assertEqual(rows[0]["last_message"]["body"], "again")
+        # sender's own counter is untouched
+        _, _, bob_rows = self._page(self.bob)
+        self.assertEqual(bob_rows[0]["unread_count"], 0)
+
+    def test_pinned_chats_stay_on_top(self):
+        part = ConversationParticipant.objects.get(conversation=self.convs[2], user=self.alice)
+        part.is_pinned = True
+        part.pinned_at = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            part.save(update_fields=["is_pinned", "pinned_at"])
+        self._page(self.alice)
+        self._send(self.convs[0], self.bob, "newer")
+        ids, _, _ = self._page(self.alice)
+        self.assertEqual(ids[:2], [self.convs[2].id, self.convs[0].id])
+
+    def test_leaving_removes_entry(self):
+        self._page(self.alice)
+        part = ConversationParticipant.objects.get(conversation=self.convs[1], user=self.alice)
+        part.left_at = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            part.save(update_fields=["left_at"])
+        ids, total, _ = self._page(self.alice)
+        self.assertNotIn(self.convs[1].id, ids)
+        self.assertEqual(total, 2)
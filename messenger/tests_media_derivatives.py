@@ -0,0 +1,83 @@
+"""Tests for the preview derivative helpers (``messenger.media_derivatives``)."""
+from __future__ import annotations
+
+import io
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db.models.fields.files import FieldFile
+from django.test import SimpleTestCase
+from PIL import Image
+
+from . import media_derivatives as md
+from .signals import profile_photo_post_save_thumbnail
+
+
+class MediaDerivativeHelperTests(SimpleTestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.storage = FileSystemStorage(location=self.root, base_url="/media/")
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _png(self, size=(800, 400)):
+        buf = io.BytesIO()
+        Image.new("RGB", size, (200, 40, 40)).save(buf, format="PNG")
+        return self.storage.save("images/a.png", ContentFile(buf.getvalue()))
+
+    def test_avatar_thumbnail_is_bounded_webp(self):
+        name = self._png()
+        thumb = md.generate_image_thumbnail(name, self.storage)
+        self.assertEqual(thumb, md.thumb_name(name, md.AVATAR_THUMB_SIZE))
+        with self.storage.open(thumb) as fh:
+            img = Image.open(fh)
+            self.assertEqual(img.format, "WEBP")
+            self.assertEqual(max(img.size), md.AVATAR_THUMB_SIZE)
+        md.delete_image_thumbnail(name, self.storage)
+        self.assertFalse(self.storage.exists(thumb))
+
+    def test_placeholder_is_tiny_data_uri(self):
+        uri = md.placeholder_uri(Image.new("RGB", (1000, 500), (0, 0, 255)))
+        self.assertTrue(uri.startswith("data:image/webp;base64,"))
+        self.assertLess(len(uri), 600)
+
+    def test_variant_urls(self):
+        self.assertEqual(
+            md.variant_urls(5, {"320": "x", "poster": "y"}),
+            {
+                "320": "/api/messenger/attachments/5/download/?variant=320",
+                "poster": "/api/messenger/attachments/5/download/?variant=poster",
+            },
+        )
+        self.assertEqual(md.variant_urls(5, None), {})
+
+    def _field_file(self, name):
+        return FieldFile(SimpleNamespace(), SimpleNamespace(storage=self.storage), name)
+
+    def test_thumbnail_url_uses_the_recorded_name_only(self):
+        f = self._field_file("images/a.png")
+        recorded = md.thumb_name("images/a.png", md.AVATAR_THUMB_SIZE)
+        with mock.patch.object(self.storage, "exists") as exists:
+            self.assertEqual(md.image_thumbnail_url(f, recorded), "/media/images/a.png.w160.webp")
+            self.assertEqual(md.image_thumbnail_url(f, ""), "/media/images/a.png")
+            # left over from a replaced image
+            self.assertEqual(md.image_thumbnail_url(f, "images/old.png.w160.webp"), "/media/images/a.png")
+        exists.assert_not_called()
+
+    def test_profile_saves_schedule_only_for_a_new_image(self):
+        name = "images/a.png"
+        profile = SimpleNamespace(pk=1, image=self._field_file(name), image_thumbnail="")
+        with mock.patch.object(md, "schedule_image_thumbnail") as schedule:
+            profile_photo_post_save_thumbnail(None, profile, created=False, update_fields=frozenset({"order"}))
+            schedule.assert_not_called()
+            profile_photo_post_save_thumbnail(None, profile, created=True, update_fields=None)
+            schedule.assert_called_once_with(name)
+
+            profile.image_thumbnail = md.thumb_name(name, md.AVATAR_THUMB_SIZE)
+            profile_photo_post_save_thumbnail(None, profile, created=False, update_fields=None)
+            self.assertEqual(schedule.call_count, 1)
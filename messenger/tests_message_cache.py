@@ -118,6 +118,26 @@ class MessageCacheServiceTests(TestCase):
         self.assertNotIn("msg-0", bodies)
         self.assertIn("newest", bodies)
 
+    # 4b. evicted payloads are deleted in the same call; meta follows the ZSET
+    def test_add_message_drops_orphan_payloads(self):
+        msgs = self._make_msgs(5)
+        MessageCacheService.cache_messages(self.conv.id, msgs)
+        newer = [
+            Message.objects.create(conversation=self.conv, sender=self.u1, body=f"n-{i}")
+            for i in range(2)
+        ]
+        for m in newer:
+            MessageCacheService.add_message(m)
+        r = _redis()
+        self.assertIsNone(r.get(_msg_key(self.conv.id, msgs[0].id)))
+        self.assertIsNone(r.get(_msg_key(self.conv.id, msgs[1].id)))
+        self.assertEqual(r.zcard(_ids_key(self.conv.id)), 5)
+        meta = MessageCacheService.get_meta(self.conv.id)
+        self.assertEqual(
+            (meta["min_id"], meta["max_id"], meta["count"]),
+            (msgs[2].id, newer[-1].id, 5),
+        )
+
     # 5. edit inside cache
     def test_update_message_in_cache(self):
         msgs = self._make_msgs(3)
@@ -203,3 +223,32 @@ class MessageCacheServiceTests(TestCase):
         meta = MessageCacheService.get_meta(self.conv.id)
         self.assertEqual(meta["count"], 5)  # MESSAGE_CACHE_SIZE
         self.assertEqual(meta["max_id"], extra[-1].id)
+
+    # 11. Lua window read matches the multi-command path
+    def test_lua_window_matches_multi_path(self):
+        msgs = self._make_msgs(5)
+        MessageCacheService.cache_messages(self.conv.id, msgs)
+        ids = [m.id for m in msgs]
+        cases = [
+            {},
+            {"before_id": ids[3]},
+            {"after_id": ids[1]},
+            {"around_id": ids[2]},
+            {"before_id": ids[0]},  # below the window → miss on both paths
+            {"after_id": ids[-1]},  # live edge → miss on both paths
+        ]
+        for kwargs in cases:
+            with self.subTest(**kwargs):
+                self.assertEqual(
+                    MessageCacheService.get_message_window(self.conv.id, limit=3, **kwargs),
+                    MessageCacheService._get_message_window_multi(
+                        self.conv.id, limit=3, **kwargs
+                    ),
+                )
+
+    # 12. Missing payload inside the window is a miss, not a short page
+    def test_lua_window_missing_payload_is_miss(self):
+        msgs = self._make_msgs(4)
+        MessageCacheService.cache_messages(self.conv.id, msgs)
+        _redis().delete(_msg_key(self.conv.id, msgs[-1].id))
+        self.assertIsNone(MessageCacheService.get_message_window(self.conv.id, limit=4))
@@ -0,0 +1,69 @@
+"""Tests for indexed message search (``core.search`` + ``MessageSearchAPIView``)."""
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Conversation, ConversationParticipant, Message
+
+User = get_user_model()
+
+
+class MessageSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="x")
+        cls.bob = User.objects.create_user(username="bob", password="x")
+        cls.conv = Conversation.objects.create(type=Conversation.Type.GROUP, title="g")
+        for user in (cls.alice, cls.bob):
+            ConversationParticipant.objects.create(conversation=cls.conv, user=user)
+        bodies = [
+            "the deploy failed again",
+            "redeployment finished",
+            "deploy deploy deploy",
+            "lunch?",
+            "<script>deploy</script>",
+        ]
+        cls.msgs = [
+            Message.objects.create(conversation=cls.conv, sender=cls.bob, body=body)
+            for body in bodies
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def _search(self, **params):
+        resp = self.client.get(f"/api/messenger/conversations/{self.conv.id}/messages/search/", params)
+        self.assertEqual(resp.status_code, 200, resp.content)
+        return resp.json()["data"]
+
+    def test_prefix_and_substring_matches_are_ranked(self):
+        data = self._search(q="deploy")
+        ids = [row["id"] for row in data["results"]]
+        self.assertEqual(set(ids), {m.id for m in self.msgs if "deploy" in m.body})
+        self.assertEqual(ids[0], self.msgs[2].id)  # most occurrences
+        self.assertEqual(ids[-1], self.msgs[1].id)  # substring only, rank 0
+
+    def test_snippets_are_escaped(self):
+        data = self._search(q="deploy", order="recent")
+        top = data["results"][0]
+        self.assertEqual(top["id"], self.msgs[4].id)
+        self.assertNotIn("<script>", top["snippet"])
+        self.assertIn("<mark>deploy</mark>", top["snippet"])
+
+    def test_cursor_pagination_walks_every_match_once(self):
+        seen = []
+        cursor = None
+        for _ in range(5):
+            params = {"q": "deploy", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            data = self._search(**params)
+            seen.extend(row["id"] for row in data["results"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 4)
+        self.assertEqual(len(set(seen)), 4)
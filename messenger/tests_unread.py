@@ -0,0 +1,147 @@
+"""Tests for unread counters and bulk read receipts."""
+from __future__ import annotations
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .inbox import InboxService
+
+from .models import Conversation, ConversationParticipant, Message, MessageReadReceipt
+from .receipts import id_ranges, insert_read_receipts
+from .tests_message_cache import redis_available
+from .unread import reconcile_unread_counts, unread_totals
+
+User = get_user_model()
+
+
+class UnreadCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="x")
+        cls.bob = User.objects.create_user(username="bob", password="x")
+        cls.conv = Conversation.objects.create(type=Conversation.Type.GROUP, title="g")
+        for user in (cls.alice, cls.bob):
+            ConversationParticipant.objects.create(conversation=cls.conv, user=user)
+
+    def _unread(self, user):
+        return ConversationParticipant.objects.get(conversation=self.conv, user=user).unread_count
+
+    def test_create_increments_everyone_but_sender(self):
+        for i in range(3):
+            Message.objects.create(conversation=self.conv, sender=self.bob, body=f"m{i}")
+        self.assertEqual(self._unread(self.alice), 3)
+        self.assertEqual(self._unread(self.bob), 0)
+        self.assertEqual(unread_totals(self.alice.id), {"total": 3, "conversations": 1})
+
+    def test_mark_read_recounts(self):
+        msgs = [
+            Message.objects.create(conversation=self.conv, sender=self.bob, body=f"m{i}")
+            for i in range(3)
+        ]
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        resp = client.post(
+            f"/api/messenger/conversations/{self.conv.id}/read/",
+            {"up_to_message_id": msgs[1].id},
+            format="json",
+        )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(self._unread(self.alice), 1)
+
+    def test_soft_delete_drops_the_inbox_counter(self):
+        if not redis_available():
+            self.skipTest("Redis not available")
+        InboxService.invalidate_user(self.alice.id)
+        self.addCleanup(InboxService.invalidate_user, self.alice.id)
+        msgs = [
+            Message.objects.create(conversation=self.conv, sender=self.bob, body=f"m{i}")
+            for i in range(2)
+        ]
+
+        def rows(ids):
+            return {cid: {"id": cid, "last_message": None, "unread_count": self._unread(self.alice)} for cid in ids}
+
+        page, _total = InboxService.page(self.alice.id, 0, 10, rows)
+        self.assertEqual(page[0]["unread_count"], 2)
+
+        client = APIClient()
+        client.force_authenticate(self.bob)
+        resp = client.delete(f"/api/messenger/messages/{msgs[0].id}/")
+        self.assertEqual(resp.status_code, 200, resp.content)
+
+        self.assertEqual(self._unread(self.alice), 1)
+        page, _total = InboxService.page(self.alice.id, 0, 10, rows)
+        self.assertEqual(page[0]["unread_count"], 1)
+
+    def test_rejoin_recounts(self):
+        part = ConversationParticipant.objects.get(conversation=self.conv, user=self.alice)
+        part.left_at = timezone.now()
+        part.save(update_fields=["left_at"])
+        Message.objects.create(conversation=self.conv, sender=self.bob, body="while away")
+        self.assertEqual(self._unread(self.alice), 0)
+
+        part.left_at = None
+        part.joined_at = timezone.now()
+        part.save(update_fields=["left_at", "joined_at"])
+        self.assertEqual(self._unread(self.alice), 1)
+
+    def test_reconcile_repairs_drift(self):
+        Message.objects.create(conversation=self.conv, sender=self.bob, body="hi")
+        ConversationParticipant.objects.filter(user=self.alice).update(unread_count=42)
+        result = reconcile_unread_counts()
+        self.assertEqual(result["repaired"], 1)
+        self.assertEqual(self._unread(self.alice), 1)
+
+
+class ReadReceiptTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create_user(username="alice", password="x")
+        cls.bob = User.objects.create_user(username="bob", password="x")
+        cls.conv = Conversation.objects.create(type=Conversation.Type.GROUP, title="g")
+        for user in (cls.alice, cls.bob):
+            ConversationParticipant.objects.create(conversation=cls.conv, user=user)
+
+    def test_bulk_insert_returns_only_new_receipts(self):
+        msgs = [
+            Message.objects.create(conversation=self.conv, sender=self.bob, body=f"m{i}")
+            for i in range(5)
+        ]
+        ids = [m.id for m in msgs]
+        self.assertEqual(insert_read_receipts(self.alice.id, ids[:2]), ids[:2])
+        self.assertEqual(insert_read_receipts(self.alice.id, ids), ids[2:])
+        self.assertEqual(MessageReadReceipt.objects.filter(user=self.alice).count(), 5)
+
+    def test_force_all_broadcasts_one_range(self):
+        msgs = [
+            Message.objects.create(conversation=self.conv, sender=self.bob, body=f"m{i}")
+            for i in range(4)
+        ]
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        with mock.patch("messenger.consumers.fanout_conversation") as fan:
+            resp = client.post(
+                f"/api/messenger/conversations/{self.conv.id}/read/",
+                {"force_all": True},
+                format="json",
+            )
+        self.assertEqual(resp.json()["data"]["receipts"], 4)
+        event = fan.call_args.args[1]
+        self.assertEqual(event["ranges"], [[msgs[0].id, msgs[-1].id]])
+        self.assertEqual(event["count"], 4)
+        self.assertEqual(self._unread(), 0)
+
+    def _unread(self):
+        return ConversationParticipant.objects.get(conversation=self.conv, user=self.alice).unread_count
+
+
+class IdRangeTests(SimpleTestCase):
+    def test_runs_break_only_at_skipped_messages(self):
+        sequence = [10, 14, 15, 21, 25, 30, 31]
+        self.assertEqual(id_ranges([10, 14, 21, 30, 31], sequence), [[10, 14], [21, 21], [30, 31]])
+        self.assertEqual(id_ranges([3, 4, 6]), [[3, 4], [6, 6]])
+        self.assertEqual(id_ranges([]), [])
@@ -0,0 +1,205 @@
+"""
+Materialized unread counters.
+
+``ConversationParticipant.unread_count`` holds the number of messages from
+other users after the participant's ``last_read_at`` (not deleted, not
+scheduled) — the same definition as the grouped COUNT the chat list used
+to run over ``messenger_message`` on every cold build.
+
+* new message        → ``bump_unread``  (one UPDATE … SET unread_count + 1)
+* read               → ``mark_read`` (last_read_at + tail COUNT, one UPDATE)
+* clear / (re)join  → ``recount_unread`` (COUNT over the unread tail only,
+                       served by the (conversation, created_at) index)
+* soft delete        → ``drop_unread_for_message``
+* drift (races, bulk ``.update()`` paths, restores)
+                     → ``reconcile_unread_counts`` (Celery beat)
+
+List and badge endpoints read the column; nothing scans message history.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import connection
+from django.db.models import F
+
+logger = logging.getLogger("messenger")
+
+# Correlated COUNT for one participant row aliased ``p``.
+_UNREAD_SUBQUERY = """
+    SELECT COUNT(*) FROM messenger_message m
+    WHERE m.conversation_id = p.conversation_id
+      AND m.is_deleted = FALSE
+      AND m.is_scheduled = FALSE
+      AND (m.sender_id IS NULL OR m.sender_id <> p.user_id)
+      AND (p.last_read_at IS NULL OR m.created_at > p.last_read_at)
+"""
+
+
+def bump_unread(conversation_id: int, sender_id: Optional[int]) -> int:
+    """+1 for every active participant except the sender."""
+    from .models import ConversationParticipant
+
+    qs = ConversationParticipant.objects.filter(
+        conversation_id=conversation_id, left_at__isnull=True
+    )
+    if sender_id is not None:
+        qs = qs.exclude(user_id=sender_id)
+    return qs.update(unread_count=F("unread_count") + 1)
+
+
+def recount_unread(
+    participant_ids: Iterable[int] = (),
+    *,
+    conversation_id: Optional[int] = None,
+) -> List[Tuple[int, int, int]]:
+    """Recount exact values; returns ``[(user_id, conversation_id, unread)]``."""
+    ids = [int(x) for x in participant_ids]
+    if conversation_id is not None:
+        where, params = "p.conversation_id = %s AND p.left_at IS NULL", [conversation_id]
+    elif ids:
+        where, params = "p.id = ANY(%s)", [ids]
+    else:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE messenger_conversationparticipant p
+            SET unread_count = ({_UNREAD_SUBQUERY})
+            WHERE {where}
+            RETURNING p.user_id, p.conversation_id, p.unread_count
+            """,
+            params,
+        )
+        rows = cursor.fetchall()
+    _sync_inbox(rows)
+    return rows
+
+
+def mark_read(participant, read_at) -> int:
+    """Set ``last_read_at`` and the matching recount in one UPDATE.
+
+    Returns the new unread count.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            UPDATE messenger_conversationparticipant p
+            SET last_read_at = %s,
+                unread_count = (
+                    SELECT COUNT(*) FROM messenger_message m
+                    WHERE m.conversation_id = p.conversation_id
+                      AND m.is_deleted = FALSE
+                      AND m.is_scheduled = FALSE
+                      AND (m.sender_id IS NULL OR m.sender_id <> p.user_id)
+                      AND m.created_at > %s
+                )
+            WHERE p.id = %s
+            RETURNING p.user_id, p.conversation_id, p.unread_count
+            """,
+            [read_at, read_at, participant.pk],
+        )
+        rows = cursor.fetchall()
+    participant.last_read_at = read_at
+    if rows:
+        participant.unread_count = rows[0][2]
+    _sync_inbox(rows)
+    return participant.unread_count
+
+
+def drop_unread_for_message(msg) -> List[Tuple[int, int, int]]:
+    """-1 for participants who had not read ``msg`` yet (soft delete).
+
+    Returns ``[(user_id, conversation_id, unread)]`` like ``recount_unread``.
+    """
+    params = [msg.conversation_id, msg.created_at]
+    exclude_sender = ""
+    if msg.sender_id is not None:
+        exclude_sender = "AND p.user_id <> %s"
+        params.append(msg.sender_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE messenger_conversationparticipant p
+            SET unread_count = p.unread_count - 1
+            WHERE p.conversation_id = %s
+              AND p.left_at IS NULL
+              AND p.unread_count > 0
+              AND (p.last_read_at IS NULL OR p.last_read_at < %s)
+              {exclude_sender}
+            RETURNING p.user_id, p.conversation_id, p.unread_count
+            """,
+            params,
+        )
+        rows = cursor.fetchall()
+    _sync_inbox(rows)
+    return rows
+
+
+def unread_totals(user_id: int) -> Dict[str, int]:
+    """Badge numbers: total unread messages and chats with unread messages."""
+    from django.db.models import Count, Q, Sum
+
+    from .models import ConversationParticipant
+
+    agg = ConversationParticipant.objects.filter(
+        user_id=user_id, left_at__isnull=True
+    ).aggregate(
+        total=Sum("unread_count"),
+        conversations=Count("id", filter=Q(unread_count__gt=0)),
+    )
+    return {
+        "total": int(agg["total"] or 0),
+        "conversations": int(agg["conversations"] or 0),
+    }
+
+
+def reconcile_unread_counts(batch_size: int = 1000) -> Dict[str, int]:
+    """Repair drifted counters for all active participants, batch by batch."""
+    from .models import ConversationParticipant
+
+    checked = repaired = 0
+    last_id = 0
+    while True:
+        ids = list(
+            ConversationParticipant.objects.filter(left_at__isnull=True, id__gt=last_id)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH expected AS (
+                    SELECT p.id, ({_UNREAD_SUBQUERY}) AS cnt
+                    FROM messenger_conversationparticipant p
+                    WHERE p.id = ANY(%s)
+                )
+                UPDATE messenger_conversationparticipant p
+                SET unread_count = e.cnt
+                FROM expected e
+                WHERE p.id = e.id AND p.unread_count <> e.cnt
+                RETURNING p.user_id, p.conversation_id, p.unread_count
+                """,
+                [ids],
+            )
+            rows = cursor.fetchall()
+        checked += len(ids)
+        repaired += len(rows)
+        _sync_inbox(rows)
+    if repaired:
+        logger.info("reconcile_unread_counts: repaired %d of %d", repaired, checked)
+    return {"checked": checked, "repaired": repaired}
+
+
+def _sync_inbox(rows) -> None:
+    if not rows:
+        return
+    try:
+        from .inbox import InboxService
+        InboxService.set_unread(rows)
+    except Exception:
+        logger.exception("inbox unread sync failed")
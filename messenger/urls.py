@@ -8,6 +8,7 @@ urlpatterns = [
     path("blocks/", apis.BlockListCreateAPIView.as_view()),
     path("blocks/<int:user_id>/unblock/", apis.UnblockAPIView.as_view()),
     path("conversations/", apis.ConversationListCreateAPIView.as_view()),
+    path("conversations/unread/", apis.UnreadCountsAPIView.as_view()),
     path("conversations/<int:pk>/", apis.ConversationDetailAPIView.as_view()),
     path("conversations/<int:pk>/messages/", apis.MessageListCreateAPIView.as_view()),
     path("conversations/<int:pk>/messages/search/", apis.MessageSearchAPIView.as_view()),
@@ -22,11 +22,13 @@ def cache_dashboard(request):
         reset_cache_stats,
         search_cache_keys,
     )
+    from .fanout import get_fanout_stats, reset_fanout_stats
 
     if request.method == "POST":
         action = request.POST.get("action") or ""
         if action == "reset_stats":
             reset_cache_stats()
+            reset_fanout_stats()
             return redirect(reverse("wagtail_messenger_cache_dashboard") + "?status=stats-reset")
         if action == "flush_all":
             deleted = invalidate_all_cache(reset_stats=False)
@@ -63,6 +65,7 @@ def cache_dashboard(request):
         {
             "title": "Messenger Cache",
             "stats": stats,
+            "fanout": get_fanout_stats(),
             "msg_hit_rate": msg_hit_rate,
             "list_hit_rate": list_hit_rate,
             "conv_id": conv_id,
@@ -270,6 +270,7 @@ class PlanApplyAPIView(APIView):
     def post(self, request, planId=None):
         from django.shortcuts import get_object_or_404
         from services.models import Service
+        from deployments.celery import scheduler
         from deployments.celery.tasks import deploy as start_service
         from core.global_settings.config import SERVICE_STATUS_CHOICES
         from django.db import transaction
@@ -309,7 +310,9 @@ class PlanApplyAPIView(APIView):
 
                     service.status = SERVICE_STATUS_CHOICES.QUEUED
                     service.save()
-                    transaction.on_commit(lambda: start_service.delay(str(deploy_item.id)))
+                    transaction.on_commit(
+                        lambda: scheduler.enqueue_deploy(start_service, deploy_item, kind=scheduler.KIND_REBUILD)
+                    )
 
         except Service.DoesNotExist:
             return Response({"error": _('Service not found or not owned by user.')}, status=status.HTTP_404_NOT_FOUND)
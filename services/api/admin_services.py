@@ -23,6 +23,7 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view, authentication_classes, permission_classes, action
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from deployments.celery import scheduler
 from deployments.celery.tasks import deploy as start_service
 from deployments.celery.tasks import stop as stop_service
 from deployments.celery.tasks import run_db_deploy  # DB platforms
@@ -514,22 +515,16 @@ def admin_start_service_apiview(request):
                 cancel_requested=False,
             )
 
-            if is_db:
-                transaction.on_commit(
-                    functools.partial(
-                        run_db_deploy.apply_async,
-                        args=[str(deploy_item.id)],
-                        task_id=task_id,
-                    )
-                )
-            else:
-                transaction.on_commit(
-                    functools.partial(
-                        start_service.apply_async,
-                        args=[str(deploy_item.id)],
-                        task_id=task_id,
-                    )
+            transaction.on_commit(
+                functools.partial(
+                    scheduler.enqueue_deploy,
+                    run_db_deploy if is_db else start_service,
+                    deploy_item,
+                    kind=scheduler.KIND_REBUILD if force_rebuild else scheduler.KIND_RESTART,
+                    task_id=task_id,
+                    track=not is_db,
                 )
+            )
 
     except Service.DoesNotExist:
         return Response(
@@ -24,6 +24,7 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view, authentication_classes, permission_classes, action
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
+from deployments.celery import scheduler
 from deployments.celery.tasks import deploy as start_service
 from deployments.celery.tasks import stop as stop_service
 from deployments.celery.tasks import run_db_deploy  # DB platforms
@@ -33,6 +34,7 @@ from deployments.core.db_deployer import DB_PLATFORMS, DBDeployer
 from deployments.core.deploy import Deploy as OrchestratorDeploy
 from deployments.core.manager.container_manager import Container
 from deployments.core.manager.client_manager import Client
+from deployments.core.stats_collector import read_service_stats, ring_size
 from docker.errors import NotFound as DockerNotFound
 
 
@@ -204,9 +206,12 @@ def start_service_apiview(request):
                 # application-level retry for transient Redis connection failures.
                 task = run_db_deploy if is_db else start_service
                 try:
-                    task.apply_async(
-                        args=[str(deploy_item.id)],
+                    scheduler.enqueue_deploy(
+                        task,
+                        deploy_item,
+                        kind=scheduler.KIND_REBUILD if force_rebuild else scheduler.KIND_RESTART,
                         task_id=task_id,
+                        track=not is_db,
                         retry=True,
                         retry_policy={
                             "max_retries": 5,
@@ -634,7 +639,18 @@ def force_cancel_deploy_apiview(request):
 @authentication_classes([JWTAuthentication])
 @permission_classes([IsAuthenticated])
 def service_status_apiview(request):
+    """
+    Running flag and CPU/RAM percentages for one service.
+
+    Served from the stats collector's ring buffer (no Docker call); pass
+    ``history=<n>`` to also get the last ``n`` samples for a sparkline.
+    Falls back to a live Docker read only when no collector is running.
+    """
     service_id = request.data.get("service_id", "")
+    try:
+        history = max(0, min(int(request.data.get("history") or 0), ring_size()))
+    except (TypeError, ValueError):
+        history = 0
 
     try:
         service_item = Service.objects.get(id=service_id, user=request.user)
@@ -651,6 +667,23 @@ def service_status_apiview(request):
         )
 
     name = service_item.get_docker_service_name()
+    buffered = read_service_stats(name, history=history)
+    if buffered is not None:
+        running = buffered["running"]
+        payload = {
+            "result": "success",
+            "running": running,
+            "cpu": buffered["cpu"],
+            "ram": buffered["ram"],
+            "sampled_at": buffered["sampled_at"],
+            "detail": (
+                _("Service is running.") if running else _("Service is not running.")
+            ),
+        }
+        if history:
+            payload["history"] = buffered["history"]
+        return Response(payload, status=status.HTTP_200_OK)
+
     try:
         container = Container(name=name)
         stats = container.get_container_stats() or {}
@@ -694,13 +727,13 @@ def service_status_apiview(request):
         ram = 0.0
         detail = _("Failed to get service stats.")
 
-    return Response(
-        {
-            "result": "success",
-            "running": running,
-            "cpu": cpu,
-            "ram": ram,
-            "detail": detail,
-        },
-        status=status.HTTP_200_OK,
-    )
+    payload = {
+        "result": "success",
+        "running": running,
+        "cpu": cpu,
+        "ram": ram,
+        "detail": detail,
+    }
+    if history:
+        payload["history"] = []
+    return Response(payload, status=status.HTTP_200_OK)
@@ -32,6 +32,7 @@ from deployments.core.db_deployer import DB_PLATFORMS, DBDeployer
 from deployments.core.deploy import Deploy as OrchestratorDeploy
 from deployments.core.manager.container_manager import Container
 from deployments.core.manager.client_manager import Client
+from deployments.core.manager.volume_manager import release_browser_helpers
 from docker.errors import NotFound as DockerNotFound
 
 
@@ -754,7 +755,10 @@ class VolumeViewSet(ModelViewSet):
 
         # Best-effort: remove Docker volume if present
         try:
-            docker_vol = _get_docker_volume(volume)
+            from .volume_files import _get_docker_volume
+
+            docker_vol, docker_name = _get_docker_volume(volume)
+            release_browser_helpers(Client()(), docker_name)
             try:
                 docker_vol.remove(force=True)
             except Exception as exc:
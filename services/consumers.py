@@ -1,4 +1,5 @@
 import asyncio
+import logging
 import urllib.parse
 
 from channels.db import database_sync_to_async
@@ -8,20 +9,34 @@ from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.tokens import AccessToken
 
+from .log_hub import HEARTBEAT_SECONDS, get_log_hub, log_group_name
 from .models import Service
-from deployments.core.manager.client_manager import Client
-from docker.errors import NotFound as DockerNotFound
 
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 class ServiceLogsConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live container logs for one service.
+
+    Client connects to:
+      ws/services/logs/<service_id>/?token=<jwt>[&batch=1]
+
+    Lines come from the shared per-container follower in ``log_hub``
+    (one Docker stream no matter how many sockets watch).  Server pushes:
+      {"type": "log.line", "line": "..."}           (default, one per line)
+      {"type": "log.lines", "lines": ["...", ...]}  (batch=1, one per frame)
+      {"type": "error", "message": "..."}
+    """
+
     async def connect(self):
         query = self.scope.get("query_string", b"").decode("utf-8")
         params = urllib.parse.parse_qs(query)
         token_list = params.get("token") or []
         access_token = token_list[0] if token_list else None
+        self.batch_frames = (params.get("batch") or ["0"])[0].lower() in ("1", "true", "yes")
 
         if not access_token:
             await self.close(code=4001)
@@ -38,145 +53,66 @@ class ServiceLogsConsumer(AsyncJsonWebsocketConsumer):
         self.service_id = self.scope["url_route"]["kwargs"].get("service_id")
         self.service = await database_sync_to_async(get_object_or_404)(Service.objects.filter(user=self.user), pk=self.service_id)
         self.container_name = self.service.get_docker_service_name()
+        self.group_name = log_group_name(self.container_name)
+        self.last_seq = 0
+        self.hub = get_log_hub()
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
-        self.log_task = asyncio.create_task(self.stream_container_logs())
+
+        replay, error = await self.hub.join(self.container_name, self.channel_name)
+        if replay:
+            self.last_seq = replay[-1][0]
+            await self._send_lines([line for _, line in replay])
+        if error:
+            await self.send_json({"type": "error", "message": error})
+        self.heartbeat_task = asyncio.create_task(self._heartbeat())
 
     async def disconnect(self, code):
-        if hasattr(self, "log_task") and not self.log_task.done():
-            self.log_task.cancel()
+        task = getattr(self, "heartbeat_task", None)
+        if task is not None and not task.done():
+            task.cancel()
             try:
-                await self.log_task
+                await task
             except asyncio.CancelledError:
                 pass
+        group = getattr(self, "group_name", None)
+        if group:
+            try:
+                await self.channel_layer.group_discard(group, self.channel_name)
+            except Exception:
+                logger.debug("group_discard failed", exc_info=True)
+            await self.hub.leave(self.container_name, self.channel_name)
+
+    async def _heartbeat(self):
+        """Keep this subscriber registered (and a follower alive somewhere)."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_SECONDS)
+            await self.hub.heartbeat(self.container_name, self.channel_name)
+
+    async def _send_lines(self, lines):
+        if not lines:
+            return
+        if self.batch_frames:
+            await self.send_json({"type": "log.lines", "lines": lines})
+            return
+        for line in lines:
+            await self.send_json({"type": "log.line", "line": line})
 
     # ---------------------------------------------------------------------
-    # Stream container logs over WebSocket.
-    #
-    # IMPORTANT — TTY handling:
-    #
-    # DB containers are now created with ``tty=True`` + ``stdin_open=True``
-    # to work around the MySQL 8.0.46 ``tcgetpgrp()`` ioctl bug (error
-    # MY-011065 "Inappropriate ioctl for device"). See
-    # deployments/core/db_deployer.py for the full rationale.
-    #
-    # Side effect of ``tty=True``: Docker's log stream changes format.
-    #
-    #   * Non-TTY containers: Docker wraps each stdout/stderr frame in an
-    #     8-byte header (stream type + length). The Python docker client
-    #     parses these headers and yields one chunk per frame — typically
-    #     one chunk per write() call, which is usually one line.
-    #
-    #   * TTY containers: Docker sends a raw byte stream with NO framing.
-    #     The Python docker client yields whatever the socket recv()
-    #     returns — which can be a single byte, a partial line, multiple
-    #     lines, or anything in between. If the consumer sends each chunk
-    #     as a separate WebSocket message, the frontend renders each byte
-    #     on its own line (the "character-by-character" bug).
-    #
-    # Fix: buffer incoming bytes and emit a WebSocket message only when
-    # we hit a newline (``\r\n`` or ``\n``). The buffer is per-stream so
-    # a partial line at the end of one recv() gets prepended to the next.
-    #
-    # We also detect the container's TTY mode at connect time and use a
-    # different code path for each mode, so non-TTY containers (app
-    # deploys) keep the original fast path with no buffering overhead.
+    # Channel-layer handlers (sent by log_hub.LogHub)
     # ---------------------------------------------------------------------
 
-    async def stream_container_logs(self):
-        loop = asyncio.get_running_loop()
-
-        def get_container():
-            client = Client()()
-            return client.containers.get(self.container_name)
-
-        try:
-            container = await loop.run_in_executor(None, get_container)
-        except DockerNotFound:
-            await self.send_json({"type": "error", "message": "Container not found or has been removed."})
-            return
-
-        # Detect TTY mode by inspecting the container's Config.Tty attribute.
-        # This is set at create time and never changes, so we read it once.
-        try:
-            container.reload()
-            is_tty = bool(container.attrs.get("Config", {}).get("Tty", False))
-        except Exception:
-            is_tty = False
-
-        if is_tty:
-            await self._stream_tty_logs(container, loop)
-        else:
-            await self._stream_framed_logs(container, loop)
-
-    async def _stream_framed_logs(self, container, loop):
-        """Fast path for non-TTY containers (app deploys).
-
-        Docker frames each write() in an 8-byte header, so each yielded
-        chunk is typically one complete line. No buffering needed.
-        """
-        def iter_logs():
-            for raw in container.logs(stream=True, follow=True, stdout=True, stderr=True, timestamps=True, tail=50):
-                if isinstance(raw, (bytes, bytearray)):
-                    yield raw.decode("utf-8", "replace")
-                else:
-                    yield str(raw)
-
-        try:
-            log_iter = iter_logs()
-            while True:
-                try:
-                    line = await loop.run_in_executor(None, lambda: next(log_iter))
-                except StopIteration:
-                    break
-                await self.send_json({"type": "log.line", "line": line})
-        except DockerNotFound:
-            await self.send_json({"type": "error", "message": "Container not found or has been removed."})
-        except Exception as exc:
-            await self.send_json({"type": "error", "message": f"Log stream error: {str(exc)}"})
-
-    async def _stream_tty_logs(self, container, loop):
-        """Buffered path for TTY-enabled containers (DB deploys with tty=True).
-
-        Docker sends a raw byte stream. We buffer until we hit a newline
-        and only then emit a WebSocket message, so the frontend receives
-        one complete line per message regardless of how the socket
-        fragmented the underlying bytes.
-        """
-        def iter_bytes():
-            # When the container has a TTY, docker-py's logs() yields raw
-            # bytes (no framing). We pass demux=False (the default) so we
-            # get a single stream — stdout and stderr are already merged
-            # by the PTY.
-            for raw in container.logs(stream=True, follow=True, stdout=True, stderr=True, timestamps=True, tail=50):
-                if isinstance(raw, (bytes, bytearray)):
-                    yield bytes(raw)
-                else:
-                    yield str(raw).encode("utf-8", "replace")
-
-        buf = b""
-        try:
-            byte_iter = iter_bytes()
-            while True:
-                try:
-                    chunk = await loop.run_in_executor(None, lambda: next(byte_iter))
-                except StopIteration:
-                    # Flush any remaining buffered bytes (e.g. a partial
-                    # line without a trailing newline) before closing.
-                    if buf:
-                        line = buf.decode("utf-8", "replace").rstrip("\r")
-                        if line:
-                            await self.send_json({"type": "log.line", "line": line})
-                    break
-
-                buf += chunk
-                # Split on \n (handles both \n and \r\n — we strip the
-                # trailing \r when decoding each line below).
-                while b"\n" in buf:
-                    line_bytes, buf = buf.split(b"\n", 1)
-                    line = line_bytes.decode("utf-8", "replace").rstrip("\r")
-                    if line:
-                        await self.send_json({"type": "log.line", "line": line})
-        except DockerNotFound:
-            await self.send_json({"type": "error", "message": "Container not found or has been removed."})
-        except Exception as exc:
-            await self.send_json({"type": "error", "message": f"Log stream error: {str(exc)}"})
+    async def service_logs_frame(self, event):
+        """type = "service_logs.frame"; drops lines already sent via replay."""
+        lines = event.get("lines") or []
+        seq = event.get("seq")
+        if seq is not None:
+            skip = max(0, self.last_seq - int(seq) + 1)
+            lines = lines[skip:]
+            self.last_seq = max(self.last_seq, int(seq) + len(event.get("lines") or []) - 1)
+        await self._send_lines(lines)
+
+    async def service_logs_error(self, event):
+        """type = "service_logs.error"."""
+        await self.send_json({"type": "error", "message": event.get("message") or ""})
@@ -0,0 +1,523 @@
+"""Shared per-container log fan-out for ``ServiceLogsConsumer``.
+
+Previously every WebSocket opened its own ``container.logs(follow=True)``
+stream and paid one ``run_in_executor`` hop per log line.  Now there is
+one follower per container for the whole deployment:
+
+* The follower is elected through a Redis lease (``logs:<name>:leader``).
+  Any consumer can start it, and a live one renews the lease every
+  ``HEARTBEAT_SECONDS``.  If the process holding it dies, the lease
+  expires and the next subscriber heartbeat takes over.
+* The blocking Docker stream is read by one dedicated thread that pushes
+  raw chunks onto an asyncio queue.  Lines are split (TTY or framed, see
+  ``LineSplitter``) and batched into frames every
+  ``SERVICE_LOG_FRAME_INTERVAL_MS`` (50) or ``SERVICE_LOG_FRAME_MAX_BYTES``
+  (64 KiB).  Each frame is broadcast to the Channels group
+  ``service_logs.<container>``.
+* Every line gets a sequence number (``logs:<name>:seq``) and is
+  appended to a bounded Redis replay ring (``logs:<name>:ring``).  Late
+  joiners get the ring first and drop frame lines they already saw.
+* Subscribers register in ``logs:<name>:subs`` (a ZSET of heartbeats).
+  The follower stops and releases the lease once nobody is watching.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from calendar import timegm
+from typing import Any, Callable, Optional
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from docker.errors import NotFound as DockerNotFound
+
+from deployments.core.manager.client_manager import Client
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 5
+LEASE_SECONDS = 15
+SUBSCRIBER_TTL_SECONDS = 3 * HEARTBEAT_SECONDS
+RING_TTL_SECONDS = 600
+
+DEFAULT_FRAME_INTERVAL_MS = 50
+DEFAULT_FRAME_MAX_BYTES = 64 * 1024
+DEFAULT_REPLAY_LINES = 200
+
+CONTAINER_NOT_FOUND = "Container not found or has been removed."
+
+_EOF = object()
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, name, default)
+
+
+def frame_interval() -> float:
+    return max(0, int(_setting("SERVICE_LOG_FRAME_INTERVAL_MS", DEFAULT_FRAME_INTERVAL_MS))) / 1000.0
+
+
+def frame_max_bytes() -> int:
+    return max(1024, int(_setting("SERVICE_LOG_FRAME_MAX_BYTES", DEFAULT_FRAME_MAX_BYTES)))
+
+
+def replay_lines() -> int:
+    return max(0, int(_setting("SERVICE_LOG_REPLAY_LINES", DEFAULT_REPLAY_LINES)))
+
+
+def log_group_name(container_name: str) -> str:
+    return f"service_logs.{container_name}"
+
+
+# ---------------------------------------------------------------------------
+# Line splitting / framing
+# ---------------------------------------------------------------------------
+
+class LineSplitter:
+    """
+    Turn raw ``container.logs(stream=True)`` chunks into log lines.
+
+    TTY handling: DB containers are created with ``tty=True`` to work
+    around the MySQL 8.0.46 ``tcgetpgrp()`` ioctl bug (see
+    deployments/core/db_deployer.py).  That changes the log stream
+    format:
+
+      * Non-TTY containers: Docker wraps each stdout/stderr write in an
+        8-byte header and docker-py yields one chunk per frame — usually
+        one line.  Chunks are split as-is, no buffering.
+      * TTY containers: a raw byte stream with NO framing; a chunk can be
+        a single byte, a partial line or several lines.  Bytes are
+        buffered until a newline so the frontend never renders a line
+        per byte.
+    """
+
+    def __init__(self, *, tty: bool):
+        self.tty = tty
+        self._buf = b""
+
+    def feed(self, chunk: bytes) -> list[str]:
+        if not self.tty:
+            return [line for line in chunk.decode("utf-8", "replace").splitlines() if line]
+        self._buf += chunk
+        lines = []
+        while b"\n" in self._buf:
+            line_bytes, self._buf = self._buf.split(b"\n", 1)
+            line = line_bytes.decode("utf-8", "replace").rstrip("\r")
+            if line:
+                lines.append(line)
+        return lines
+
+    def close(self) -> list[str]:
+        """Flush a trailing partial line (TTY) when the stream ends."""
+        buf, self._buf = self._buf, b""
+        line = buf.decode("utf-8", "replace").rstrip("\r")
+        return [line] if line else []
+
+
+class FrameBatcher:
+    """Accumulate lines until ``max_bytes`` or ``interval`` seconds."""
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int,
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._clock = clock
+        self._lines: list[str] = []
+        self._bytes = 0
+        self._opened_at = 0.0
+
+    def add(self, lines: list[str]) -> bool:
+        """Buffer lines; True when the frame is full and should be sent now."""
+        if lines and not self._lines:
+            self._opened_at = self._clock()
+        for line in lines:
+            self._lines.append(line)
+            self._bytes += len(line) + 1
+        return self._bytes >= self.max_bytes
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._lines)
+
+    def seconds_until_due(self) -> Optional[float]:
+        if not self._lines:
+            return None
+        return max(0.0, self._opened_at + self.interval - self._clock())
+
+    def take(self) -> list[str]:
+        lines, self._lines, self._bytes = self._lines, [], 0
+        return lines
+
+
+# ---------------------------------------------------------------------------
+# Redis state (lease, subscribers, replay ring)
+# ---------------------------------------------------------------------------
+
+_RENEW_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+  return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _text(value) -> str:
+    return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+
+
+def _line_second(line: str) -> Optional[str]:
+    """``YYYY-MM-DDTHH:MM:SS`` prefix of a ``timestamps=True`` log line."""
+    prefix = line[:19]
+    return prefix if len(prefix) == 19 and prefix[10:11] == "T" else None
+
+
+class LogStore:
+    """Synchronous Redis helpers; the hub calls them off the event loop."""
+
+    def __init__(self, redis=None):
+        self._redis = redis
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            from django_redis import get_redis_connection
+            self._redis = get_redis_connection("default")
+        return self._redis
+
+    @staticmethod
+    def key(name: str, suffix: str) -> str:
+        return f"logs:{name}:{suffix}"
+
+    # -- lease ----------------------------------------------------------
+
+    def acquire(self, name: str, token: str) -> bool:
+        return bool(self.redis.set(self.key(name, "leader"), token, nx=True, ex=LEASE_SECONDS))
+
+    def release(self, name: str, token: str) -> None:
+        self.redis.eval(_RELEASE_LUA, 1, self.key(name, "leader"), token)
+
+    def keep_following(self, name: str, token: str, *, now: Optional[float] = None) -> bool:
+        """Renew the lease; False if it was lost or nobody is subscribed."""
+        if not self.redis.eval(_RENEW_LUA, 1, self.key(name, "leader"), token, LEASE_SECONDS):
+            return False
+        return self.live_subscribers(name, now=now) > 0
+
+    # -- subscribers ----------------------------------------------------
+
+    def touch_subscriber(self, name: str, channel_name: str, *, now: Optional[float] = None) -> None:
+        key = self.key(name, "subs")
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(key, {channel_name: time.time() if now is None else now})
+        pipe.expire(key, RING_TTL_SECONDS)
+        pipe.execute()
+
+    def drop_subscriber(self, name: str, channel_name: str) -> None:
+        self.redis.zrem(self.key(name, "subs"), channel_name)
+
+    def live_subscribers(self, name: str, *, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        key = self.key(name, "subs")
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(key, "-inf", now - SUBSCRIBER_TTL_SECONDS)
+        pipe.zcard(key)
+        return int(pipe.execute()[-1] or 0)
+
+    # -- replay ring ----------------------------------------------------
+
+    def append(self, name: str, lines: list[str]) -> int:
+        """Store lines in the ring; returns the sequence number of the first."""
+        last_seq = int(self.redis.incrby(self.key(name, "seq"), len(lines)))
+        first_seq = last_seq - len(lines) + 1
+        ring = self.key(name, "ring")
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.rpush(ring, *[f"{first_seq + i}\t{line}" for i, line in enumerate(lines)])
+        pipe.ltrim(ring, -max(1, replay_lines()), -1)
+        pipe.expire(ring, RING_TTL_SECONDS)
+        pipe.expire(self.key(name, "seq"), RING_TTL_SECONDS)
+        pipe.execute()
+        return first_seq
+
+    def replay(self, name: str) -> list[tuple[int, str]]:
+        entries = []
+        for raw in self.redis.lrange(self.key(name, "ring"), 0, -1) or ():
+            seq, _, line = _text(raw).partition("\t")
+            try:
+                entries.append((int(seq), line))
+            except ValueError:
+                continue
+        return entries
+
+    def set_error(self, name: str, message: str) -> None:
+        self.redis.set(self.key(name, "error"), message, ex=LEASE_SECONDS)
+
+    def clear_error(self, name: str) -> None:
+        self.redis.delete(self.key(name, "error"))
+
+    def get_error(self, name: str) -> Optional[str]:
+        raw = self.redis.get(self.key(name, "error"))
+        return _text(raw) if raw is not None else None
+
+
+# ---------------------------------------------------------------------------
+# Hub
+# ---------------------------------------------------------------------------
+
+def _pump(stream, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue) -> None:
+    """Executor thread: move raw chunks from the Docker stream to the loop."""
+    def _put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    try:
+        for raw in stream:
+            if not isinstance(raw, (bytes, bytearray)):
+                raw = str(raw).encode("utf-8", "replace")
+            _put(bytes(raw))
+    except Exception as exc:
+        _put(exc)
+    finally:
+        _put(_EOF)
+
+
+class LogHub:
+    """Per-process registry of container log followers."""
+
+    def __init__(
+        self,
+        *,
+        store: Optional[LogStore] = None,
+        channel_layer=None,
+        docker_client: Optional[Callable[[], Any]] = None,
+    ):
+        self.store = store or LogStore()
+        self._channel_layer = channel_layer
+        self._docker_client = docker_client or (lambda: Client()())
+        self._followers: dict[str, asyncio.Task] = {}
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    async def _call(self, fn, *args, **kwargs):
+        return await sync_to_async(fn, thread_sensitive=False)(*args, **kwargs)
+
+    # ------------------------------------------------------------------
+    # Subscriber API (used by the consumer)
+    # ------------------------------------------------------------------
+
+    async def join(self, container_name: str, channel_name: str) -> tuple[list[tuple[int, str]], Optional[str]]:
+        """Register a subscriber; returns ``(replay entries, last error)``."""
+        try:
+            await self._call(self.store.touch_subscriber, container_name, channel_name)
+            replay = await self._call(self.store.replay, container_name)
+            error = await self._call(self.store.get_error, container_name)
+        except Exception:
+            logger.warning("log hub join failed for %s", container_name, exc_info=True)
+            replay, error = [], None
+        await self.ensure_follower(container_name)
+        return replay, error
+
+    async def heartbeat(self, container_name: str, channel_name: str) -> None:
+        try:
+            await self._call(self.store.touch_subscriber, container_name, channel_name)
+        except Exception:
+            logger.debug("log hub heartbeat failed for %s", container_name, exc_info=True)
+        await self.ensure_follower(container_name)
+
+    async def leave(self, container_name: str, channel_name: str) -> None:
+        try:
+            await self._call(self.store.drop_subscriber, container_name, channel_name)
+        except Exception:
+            logger.debug("log hub leave failed for %s", container_name, exc_info=True)
+
+    async def ensure_follower(self, container_name: str) -> bool:
+        """Start this process's follower if nobody holds the lease."""
+        task = self._followers.get(container_name)
+        if task is not None and not task.done():
+            return True
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._call(self.store.acquire, container_name, token)
+        except Exception:
+            logger.warning("log hub lease check failed for %s", container_name, exc_info=True)
+            return False
+        if not acquired:
+            return False
+        self._followers[container_name] = asyncio.create_task(self._follow(container_name, token))
+        return True
+
+    # ------------------------------------------------------------------
+    # Follower
+    # ------------------------------------------------------------------
+
+    def _open_container(self, container_name: str):
+        container = self._docker_client().containers.get(container_name)
+        try:
+            container.reload()
+            is_tty = bool(container.attrs.get("Config", {}).get("Tty", False))
+        except Exception:
+            is_tty = False
+        return container, is_tty
+
+    def _log_kwargs(self, replay: list[tuple[int, str]]) -> tuple[dict, Optional[str], set[str]]:
+        """
+        ``container.logs`` arguments for a (re)started follower.
+
+        With an existing ring the stream resumes from the second of the
+        last stored line (``since`` has second granularity); that second
+        and the ring lines already stored for it are returned so the
+        follower can skip them.
+        """
+        kwargs = dict(stream=True, follow=True, stdout=True, stderr=True, timestamps=True)
+        last_second = _line_second(replay[-1][1]) if replay else None
+        if not last_second:
+            kwargs["tail"] = replay_lines()
+            return kwargs, None, set()
+        kwargs["since"] = timegm(time.strptime(last_second, "%Y-%m-%dT%H:%M:%S"))
+        seen = {line for _, line in replay if line.startswith(last_second)}
+        return kwargs, last_second, seen
+
+    async def _follow(self, container_name: str, token: str) -> None:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stream = None
+        release = False
+        try:
+            container, is_tty = await loop.run_in_executor(None, self._open_container, container_name)
+            replay = await self._call(self.store.replay, container_name)
+            kwargs, seen_second, seen = self._log_kwargs(replay)
+            stream = await loop.run_in_executor(None, lambda: container.logs(**kwargs))
+            await self._call(self.store.clear_error, container_name)
+            # A dedicated thread, not the default executor: the stream
+            # blocks for as long as anyone is watching.
+            threading.Thread(
+                target=_pump,
+                args=(stream, loop, queue),
+                name=f"logs-{container_name}",
+                daemon=True,
+            ).start()
+
+            splitter = LineSplitter(tty=is_tty)
+            batcher = FrameBatcher(max_bytes=frame_max_bytes(), interval=frame_interval())
+            next_check = loop.time() + HEARTBEAT_SECONDS
+
+            while True:
+                wait = next_check - loop.time()
+                due = batcher.seconds_until_due()
+                if due is not None:
+                    wait = min(wait, due)
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=max(0.0, wait))
+                except asyncio.TimeoutError:
+                    item = None
+
+                items = [] if item is None else [item]
+                while not queue.empty() and len(items) < 256:
+                    items.append(queue.get_nowait())
+
+                ended = False
+                for item in items:
+                    if item is _EOF:
+                        batcher.add(splitter.close())
+                        ended = True
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    lines = splitter.feed(item)
+                    if seen_second is not None:
+                        lines = [line for line in lines if line not in seen]
+                        if lines and (_line_second(lines[-1]) or "") > seen_second:
+                            seen_second, seen = None, set()
+                    if batcher.add(lines):
+                        await self._publish(container_name, batcher.take())
+
+                if ended:
+                    await self._publish(container_name, batcher.take())
+                    break
+                if batcher.seconds_until_due() == 0.0:
+                    await self._publish(container_name, batcher.take())
+                if loop.time() >= next_check:
+                    next_check = loop.time() + HEARTBEAT_SECONDS
+                    if not await self._call(self.store.keep_following, container_name, token):
+                        release = True
+                        break
+        except DockerNotFound:
+            await self._publish_error(container_name, CONTAINER_NOT_FOUND)
+        except asyncio.CancelledError:
+            release = True
+            raise
+        except Exception as exc:
+            logger.warning("Log follower for %s failed", container_name, exc_info=True)
+            await self._publish_error(container_name, f"Log stream error: {str(exc)}")
+        finally:
+            if stream is not None:
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+            if self._followers.get(container_name) is asyncio.current_task():
+                del self._followers[container_name]
+            # On EOF / errors the lease is left to expire, which doubles as
+            # retry back-off: the next heartbeat after LEASE_SECONDS tries
+            # again (and resumes from the ring) if anyone is still watching.
+            if release:
+                try:
+                    await self._call(self.store.release, container_name, token)
+                except Exception:
+                    logger.debug("log hub lease release failed for %s", container_name, exc_info=True)
+
+    async def _publish(self, container_name: str, lines: list[str]) -> None:
+        if not lines:
+            return
+        try:
+            seq = await self._call(self.store.append, container_name, lines)
+        except Exception:
+            logger.warning("log replay ring write failed for %s", container_name, exc_info=True)
+            seq = None
+        await self.channel_layer.group_send(
+            log_group_name(container_name),
+            {"type": "service_logs.frame", "seq": seq, "lines": lines},
+        )
+
+    async def _publish_error(self, container_name: str, message: str) -> None:
+        try:
+            await self._call(self.store.set_error, container_name, message)
+        except Exception:
+            logger.debug("log hub error write failed for %s", container_name, exc_info=True)
+        try:
+            await self.channel_layer.group_send(
+                log_group_name(container_name),
+                {"type": "service_logs.error", "message": message},
+            )
+        except Exception:
+            logger.debug("log hub error broadcast failed for %s", container_name, exc_info=True)
+
+
+_hub: Optional[LogHub] = None
+
+
+def get_log_hub() -> LogHub:
+    global _hub
+    if _hub is None:
+        _hub = LogHub()
+    return _hub
@@ -0,0 +1,18 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("services", "0011_alter_service_read_only"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="service",
+            index=GinIndex(fields=["name"], name="service_name_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
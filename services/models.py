@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.db.models import Sum, Q
@@ -68,6 +69,10 @@ class Service(BaseModel):
 
     task_id = models.CharField(_("Task ID"), max_length=64, unique=True, null=True, blank=True)
 
+    class Meta:
+        # ILIKE '%q%' admin/table search (core.search.substring_q)
+        indexes = [GinIndex(fields=["name"], name="service_name_trgm", opclasses=["gin_trgm_ops"])]
+
     def save(self, *args, **kwargs):
         self.full_clean()
 
@@ -1,3 +1,458 @@
-from django.test import TestCase
+import asyncio
+import threading
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.test import SimpleTestCase
+
+from .log_hub import FrameBatcher, LineSplitter, LogHub, log_group_name
+
+
+class _MemoryStore:
+    """In-memory stand-in for ``log_hub.LogStore``."""
+
+    def __init__(self):
+        self.leader = None
+        self.subs = set()
+        self.ring = []
+        self.seq = 0
+        self.error = None
+
+    def acquire(self, name, token):
+        if self.leader is not None:
+            return False
+        self.leader = token
+        return True
+
+    def release(self, name, token):
+        if self.leader == token:
+            self.leader = None
+
+    def keep_following(self, name, token, now=None):
+        return self.leader == token and bool(self.subs)
+
+    def touch_subscriber(self, name, channel_name, now=None):
+        self.subs.add(channel_name)
+
+    def drop_subscriber(self, name, channel_name):
+        self.subs.discard(channel_name)
+
+    def append(self, name, lines):
+        first = self.seq + 1
+        self.ring.extend((first + i, line) for i, line in enumerate(lines))
+        self.seq += len(lines)
+        return first
+
+    def replay(self, name):
+        return list(self.ring)
+
+    def set_error(self, name, message):
+        self.error = message
+
+    def clear_error(self, name):
+        self.error = None
+
+    def get_error(self, name):
+        return self.error
+
+
+class _FakeLogStream:
+    """Blocking iterator over chunks; ``release`` lets it finish."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.done = threading.Event()
+
+    def __iter__(self):
+        yield from self.chunks
+        self.done.wait(timeout=5)
+
+    def close(self):
+        self.done.set()
+
+
+class LineSplitterTests(SimpleTestCase):
+    def test_tty_buffers_partial_lines(self):
+        splitter = LineSplitter(tty=True)
+        self.assertEqual(splitter.feed(b"hel"), [])
+        self.assertEqual(splitter.feed(b"lo\r\nwor"), ["hello"])
+        self.assertEqual(splitter.feed(b"ld\n\n"), ["world"])
+        self.assertEqual(splitter.feed(b"tail"), [])
+        self.assertEqual(splitter.close(), ["tail"])
+
+    def test_framed_chunks_split_without_buffering(self):
+        splitter = LineSplitter(tty=False)
+        self.assertEqual(splitter.feed(b"one\ntwo\n"), ["one", "two"])
+        self.assertEqual(splitter.feed(b"partial"), ["partial"])
+        self.assertEqual(splitter.close(), [])
+
+
+class FrameBatcherTests(SimpleTestCase):
+    def test_flushes_on_size_and_interval(self):
+        now = [0.0]
+        batcher = FrameBatcher(max_bytes=10, interval=0.05, clock=lambda: now[0])
+        self.assertIsNone(batcher.seconds_until_due())
+        self.assertFalse(batcher.add(["abc"]))
+        self.assertAlmostEqual(batcher.seconds_until_due(), 0.05)
+        now[0] = 0.06
+        self.assertEqual(batcher.seconds_until_due(), 0.0)
+        self.assertTrue(batcher.add(["defghij"]))
+        self.assertEqual(batcher.take(), ["abc", "defghij"])
+        self.assertFalse(batcher.pending)
+
+
+class LogHubTests(SimpleTestCase):
+    def setUp(self):
+        self.store = _MemoryStore()
+        self.layer = InMemoryChannelLayer()
+        self.stream = _FakeLogStream([b"2024-01-01T00:00:00Z a\n", b"2024-01-01T00:00:00Z b\n"])
+        container = MagicMock()
+        container.attrs = {"Config": {"Tty": False}}
+        container.logs.return_value = self.stream
+        self.container = container
+        client = MagicMock()
+        client.containers.get.return_value = container
+        self.hub = LogHub(store=self.store, channel_layer=self.layer, docker_client=lambda: client)
+
+    def test_one_follower_batches_frames_and_replays(self):
+        async def scenario():
+            group = log_group_name("web")
+            first = await self.layer.new_channel()
+            await self.layer.group_add(group, first)
+
+            replay, error = await self.hub.join("web", first)
+            self.assertEqual((replay, error), ([], None))
+            # a second viewer in the same process reuses the follower
+            second = await self.layer.new_channel()
+            await self.layer.group_add(group, second)
+            await self.hub.join("web", second)
+
+            frame = await asyncio.wait_for(self.layer.receive(first), timeout=2)
+            self.assertEqual(frame["type"], "service_logs.frame")
+            self.assertEqual(frame["seq"], 1)
+            self.assertEqual(frame["lines"], ["2024-01-01T00:00:00Z a", "2024-01-01T00:00:00Z b"])
+            self.assertEqual(await asyncio.wait_for(self.layer.receive(second), timeout=2), frame)
+
+            late = await self.layer.new_channel()
+            replay, _ = await self.hub.join("web", late)
+            self.assertEqual([seq for seq, _ in replay], [1, 2])
+
+            self.stream.close()
+            task = self.hub._followers.get("web")
+            if task is not None:
+                await asyncio.wait_for(task, timeout=2)
+
+        asyncio.run(scenario())
+        self.container.logs.assert_called_once()
+        self.assertEqual(self.container.logs.call_args.kwargs["tail"], 200)
+
+    def test_restart_resumes_from_ring(self):
+        self.store.append("web", ["2024-01-01T00:00:00Z a"])
+
+        async def scenario():
+            channel = await self.layer.new_channel()
+            await self.layer.group_add(log_group_name("web"), channel)
+            await self.hub.join("web", channel)
+            frame = await asyncio.wait_for(self.layer.receive(channel), timeout=2)
+            self.stream.close()
+            await asyncio.wait_for(self.hub._followers["web"], timeout=2)
+            return frame
+
+        frame = asyncio.run(scenario())
+        # "a" was already in the ring and is skipped after resuming
+        self.assertEqual(frame["lines"], ["2024-01-01T00:00:00Z b"])
+        self.assertEqual(frame["seq"], 2)
+        self.assertEqual(self.container.logs.call_args.kwargs["since"], 1704067200)
+
+    def test_missing_container_publishes_error(self):
+        from docker.errors import NotFound
+
+        client = MagicMock()
+        client.containers.get.side_effect = NotFound("gone")
+        hub = LogHub(store=self.store, channel_layer=self.layer, docker_client=lambda: client)
+
+        async def scenario():
+            channel = await self.layer.new_channel()
+            await self.layer.group_add(log_group_name("web"), channel)
+            await hub.join("web", channel)
+            return await asyncio.wait_for(self.layer.receive(channel), timeout=2)
+
+        event = asyncio.run(scenario())
+        self.assertEqual(event["type"], "service_logs.error")
+        self.assertEqual(self.store.error, event["message"])
+
+
+class VolumeBrowserTests(SimpleTestCase):
+    def test_normalize_path_rejects_escapes(self):
+        from .volume_browser import normalize_path
+
+        self.assertEqual(normalize_path("/app//data/"), "app/data")
+        self.assertEqual(normalize_path(""), "")
+        for bad in ("..", "../etc", "a/../../b"):
+            with self.assertRaises(ValueError):
+                normalize_path(bad)
+
+    def test_local_listing_pages_directories_first(self):
+        import os
+        import tempfile
+
+        from .volume_browser import dir_size_local, paginate, scan_local
+
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, "b_dir", "deep"))
+            os.makedirs(os.path.join(root, "a_dir"))
+            for name, size in (("c.txt", 3), ("a.txt", 5), ("b_dir/deep/x.bin", 7)):
+                with open(os.path.join(root, name), "wb") as fh:
+                    fh.write(b"x" * size)
+
+            entries = scan_local(root, "")
+            first, cursor = paginate(entries, None, 3)
+            rest, end = paginate(entries, cursor, 3)
+
+            self.assertEqual([e["name"] for e in first], ["a_dir", "b_dir", "a.txt"])
+            self.assertEqual([(e["path"], e["size"]) for e in rest], [("c.txt", 3)])
+            self.assertIsNone(end)
+            self.assertEqual([e["path"] for e in scan_local(root, "b_dir")], ["b_dir/deep"])
+            self.assertEqual(dir_size_local(root, "b_dir"), 7)
+            with self.assertRaises(ValueError):
+                scan_local(root, "a.txt")
+
+    def test_parse_stat_lines(self):
+        from .volume_browser import parse_stat_lines
+
+        raw = (
+            b"directory\t4096\t1700000000\t./node_modules\n"
+            b"regular empty file\t0\t1700000001\t./.keep\n"
+            b"symbolic link\t11\t1700000002\t./with\ttab\n"
+            b"garbage line\n"
+        )
+        entries = parse_stat_lines(raw, "app")
+
+        self.assertEqual(
+            [(e["path"], e["type"], e["size"]) for e in entries],
+            [("app/node_modules", "directory", 0), ("app/.keep", "file", 0), ("app/with\ttab", "file", 11)],
+        )
+
+    def test_helper_is_reused_and_restarted_after_idle_exit(self):
+        from types import SimpleNamespace
+
+        from docker.errors import NotFound
+
+        from .volume_browser import VolumeHelper
+
+        stale, fresh = MagicMock(status="running"), MagicMock(status="running")
+        stale.exec_run.side_effect = NotFound("gone")
+        fresh.exec_run.return_value = SimpleNamespace(
+            exit_code=0, output=(b"directory\t0\t1\t./pgdata\n", None)
+        )
+        client = MagicMock()
+        client.containers.get.side_effect = [stale, NotFound("gone")]
+        client.containers.run.return_value = fresh
+
+        entries = VolumeHelper("vol-1", client=client).list_dir("")
+
+        self.assertEqual([e["path"] for e in entries], ["pgdata"])
+        client.containers.run.assert_called_once()
+        self.assertEqual(client.containers.run.call_args.kwargs["labels"], {"paas.volume-browser": "vol-1"})
+        self.assertEqual(fresh.exec_run.call_args.args[0][-1], "")
+
+    def test_size_task_is_queued_once_per_generation(self):
+        from types import SimpleNamespace
+
+        from . import volume_browser
+
+        class _Redis:
+            def __init__(self):
+                self.keys = {}
+
+            def hmget(self, key, paths):
+                return [None] * len(paths)
+
+            def set(self, key, value, nx=False, ex=None):
+                if nx and key in self.keys:
+                    return None
+                self.keys[key] = value
+                return True
+
+            def delete(self, key):
+                self.keys.pop(key, None)
+
+        redis = _Redis()
+        volume = SimpleNamespace(pk=7)
+        entries = [{"path": "data", "type": "directory"}, {"path": "a.txt", "type": "file"}]
+        with patch.object(volume_browser, "_redis", return_value=redis), \
+                patch("deployments.celery.tasks.compute_volume_dir_sizes") as task:
+            for _ in range(3):
+                self.assertEqual(volume_browser.attach_sizes(volume, [dict(e) for e in entries], 2), ["data"])
+            task.delay.assert_called_once_with("7", ["data"], 2)
+
+            volume_browser.attach_sizes(volume, [dict(e) for e in entries], 3)
+            self.assertEqual(task.delay.call_count, 2)
+
+            volume_browser.release_size_task(7, 2)
+            volume_browser.attach_sizes(volume, [dict(e) for e in entries], 2)
+            self.assertEqual(task.delay.call_count, 3)
+
+    def test_release_browser_helpers_before_volume_removal(self):
+        from deployments.core.manager.volume_manager import release_browser_helpers
+
+        helper = MagicMock()
+        client = MagicMock()
+        client.containers.list.return_value = [helper]
+
+        self.assertEqual(release_browser_helpers(client, "vol-1"), 1)
+        client.containers.list.assert_called_once_with(
+            all=True, filters={"label": "paas.volume-browser=vol-1"}
+        )
+        helper.remove.assert_called_once_with(force=True)
+
+
+class VolumeArchiveTests(SimpleTestCase):
+    @staticmethod
+    async def _read(response):
+        return [chunk async for chunk in response]
+
+    def _tree(self, root):
+        import os
+
+        os.makedirs(os.path.join(root, "app", "logs"))
+        with open(os.path.join(root, "app", "logs", "big.log"), "wb") as fh:
+            fh.write(os.urandom(3 * 1024 * 1024))
+        with open(os.path.join(root, "app", "config.yml"), "wb") as fh:
+            fh.write(b"debug: false\n")
+
+    def test_local_stream_is_a_gzip_tar_of_the_sub_path(self):
+        import io
+        import tarfile
+        import tempfile
+
+        from .volume_archive import archive_response, stream_local
+
+        with tempfile.TemporaryDirectory() as root:
+            self._tree(root)
+            response = archive_response(stream_local(root, "app/"), "vol-app")
+            body = b"".join(async_to_sync(self._read)(response))
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="vol-app.tar.gz"', response["Content-Disposition"])
+        with tarfile.open(fileobj=io.BytesIO(body), mode="r:gz") as tar:
+            names = sorted(tar.getnames())
+            self.assertEqual(names, ["app", "app/config.yml", "app/logs", "app/logs/big.log"])
+            self.assertEqual(tar.extractfile("app/config.yml").read(), b"debug: false\n")
+
+    def test_response_streams_under_asgi(self):
+        import threading
+
+        from .volume_archive import archive_response
+
+        released = threading.Event()
+        finished = threading.Event()
+
+        def produce():
+            yield b"first"
+            # Buffering the whole iterator before sending would stall here.
+            if not released.wait(5):
+                raise AssertionError("first chunk was not delivered before the producer finished")
+            yield b"second"
+            finished.set()
+
+        response = archive_response(produce(), "vol", compress=False)
+        self.assertTrue(response.is_async)
+
+        async def read():
+            received = []
+            async for chunk in response:
+                if not received:
+                    self.assertFalse(finished.is_set())
+                    released.set()
+                received.append(chunk)
+            return received
+
+        self.assertEqual(async_to_sync(read)(), [b"first", b"second"])
+
+    def test_async_stream_closes_producer_on_cancel(self):
+        import time
+
+        from .volume_archive import archive_response, stream_docker
+
+        blocked = threading.Event()
+
+        def bits():
+            yield b"x" * 10
+            blocked.wait(5)  # daemon still producing when the client leaves
+            yield b"y" * 10
+
+        container = MagicMock()
+        container.get_archive.return_value = (bits(), {})
+        client = MagicMock()
+        client.containers.create.return_value = container
+        response = archive_response(stream_docker("vol-1", "", client=client), "vol", compress=False)
+
+        async def disconnect_after_first_chunk():
+            received = []
+            first = asyncio.Event()
+
+            async def consume():
+                async for chunk in response:
+                    received.append(chunk)
+                    first.set()
+
+            task = asyncio.ensure_future(consume())
+            await first.wait()
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            return received
+
+        self.assertEqual(async_to_sync(disconnect_after_first_chunk)(), [b"x" * 10])
+        container.remove.assert_not_called()  # the pull in flight finishes first
+        blocked.set()
+        deadline = time.monotonic() + 5
+        while not container.remove.called and time.monotonic() < deadline:
+            time.sleep(0.01)
+        container.remove.assert_called_once_with(force=True)
+
+    def test_local_stream_stops_writer_when_client_aborts(self):
+        import tempfile
+        import threading
+        import time
+
+        from .volume_archive import CHUNK_SIZE, stream_local
+
+        with tempfile.TemporaryDirectory() as root:
+            self._tree(root)
+            chunks = stream_local(root)
+            self.assertLessEqual(len(next(chunks)), CHUNK_SIZE)
+            chunks.close()
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and any(t.name == "volume-archive" for t in threading.enumerate()):
+                time.sleep(0.05)
+
+        self.assertFalse(any(t.name == "volume-archive" for t in threading.enumerate()))
+
+    def test_docker_stream_removes_helper_on_abort(self):
+        from .volume_archive import stream_docker
+
+        produced = []
+
+        def bits():
+            for i in range(100):
+                produced.append(i)
+                yield b"x" * 10
+
+        container = MagicMock()
+        container.get_archive.return_value = (bits(), {})
+        client = MagicMock()
+        client.containers.create.return_value = container
+
+        chunks = stream_docker("vol-1", "", client=client)
+        self.assertEqual(next(chunks), b"x" * 10)
+        chunks.close()
+
+        container.get_archive.assert_called_once_with("/data/.", chunk_size=256 * 1024)
+        container.remove.assert_called_once_with(force=True)
+        self.assertEqual(len(produced), 1)
+        self.assertEqual(client.containers.create.call_args.kwargs["volumes"]["vol-1"]["mode"], "ro")
+        container.start.assert_not_called()
@@ -0,0 +1,236 @@
+"""Streaming tar / tar.gz downloads of Docker volumes.
+
+The download view used to build the whole archive before sending a byte:
+the helper container ``cat``-ed a tar.gz into ``container.logs()`` (all of
+it in worker memory), which was then written to a temp file, and the local
+path built a temp tar.gz on disk.  Now both paths produce the archive
+while the client reads it, so peak memory is a few chunks regardless of
+volume size:
+
+* **Docker** (mountpoint not reachable): a created-but-never-started
+  ``alpine`` container with the volume mounted read-only; the daemon tars
+  the path and ``container.get_archive()`` yields it in ``CHUNK_SIZE``
+  pieces.  The stream is pulled, so a slow client slows the daemon down.
+* **Local** mountpoint: ``tarfile`` writes in stream mode (``w|``) from a
+  worker thread into a bounded queue (``QUEUE_CHUNKS`` deep); the thread
+  blocks when the client is slower than the disk.
+
+``?gzip=1`` (the default) compresses on the fly with one ``zlib``
+stream.
+
+``archive_response`` hands Django an async body
+(:func:`core.streaming.aiter_chunks`).  When the client goes away the sync
+iterator is closed: the local writer thread is told to stop and the
+Docker helper is removed with ``force=True``, which aborts the
+daemon-side tar.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import tarfile
+import threading
+import uuid
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from django.http import StreamingHttpResponse
+
+from core.streaming import aiter_chunks
+from deployments.core.manager.client_manager import Client
+from deployments.core.manager.volume_manager import BROWSER_HELPER_LABEL
+
+from .volume_browser import HELPER_IMAGE, HELPER_MOUNT, normalize_path
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+QUEUE_CHUNKS = 8
+GZIP_LEVEL = 6
+PUT_TIMEOUT_SECONDS = 1.0
+
+_DONE = object()
+
+
+class StreamCancelled(Exception):
+    pass
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """Compress an iterable of bytes into a single gzip member."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    try:
+        for chunk in chunks:
+            out = compressor.compress(chunk)
+            if out:
+                yield out
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+# ---------------------------------------------------------------------------
+# Local mountpoint
+# ---------------------------------------------------------------------------
+
+class _QueueWriter:
+    """File-like sink that hands ``CHUNK_SIZE`` pieces to a bounded queue."""
+
+    def __init__(self, q: queue.Queue, cancelled: threading.Event):
+        self.q = q
+        self.cancelled = cancelled
+        self.buf = bytearray()
+
+    def write(self, data) -> int:
+        self.buf += data
+        while len(self.buf) >= CHUNK_SIZE:
+            self._put(bytes(self.buf[:CHUNK_SIZE]))
+            del self.buf[:CHUNK_SIZE]
+        return len(data)
+
+    def flush(self) -> None:
+        if self.buf:
+            self._put(bytes(self.buf))
+            self.buf.clear()
+
+    def _put(self, item) -> None:
+        while True:
+            if self.cancelled.is_set():
+                raise StreamCancelled()
+            try:
+                self.q.put(item, timeout=PUT_TIMEOUT_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+
+def _local_target(root: str, rel: str) -> str:
+    real_root = os.path.realpath(root)
+    full = os.path.realpath(os.path.join(real_root, rel))
+    if full != real_root and not full.startswith(real_root + os.sep):
+        raise ValueError("Invalid path.")
+    if not os.path.lexists(full):
+        raise ValueError("Path not found.")
+    return full
+
+
+def stream_local(root: str, path: Optional[str] = None) -> Iterator[bytes]:
+    """Uncompressed tar of ``root/path``, produced while it is consumed."""
+    rel = normalize_path(path)
+    target = _local_target(root, rel)
+    arcname = os.path.basename(rel) if rel else "."
+    q: queue.Queue = queue.Queue(maxsize=QUEUE_CHUNKS)
+    cancelled = threading.Event()
+
+    def produce():
+        writer = _QueueWriter(q, cancelled)
+        try:
+            with tarfile.open(fileobj=writer, mode="w|", bufsize=CHUNK_SIZE) as tar:
+                tar.add(target, arcname=arcname)
+            writer.flush()
+        except StreamCancelled:
+            return
+        except Exception as exc:  # surfaced to the consumer
+            logger.exception("volume archive of %s failed", target)
+            _offer(q, cancelled, exc)
+            return
+        _offer(q, cancelled, _DONE)
+
+    thread = threading.Thread(target=produce, name="volume-archive", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
+
+
+def _offer(q: queue.Queue, cancelled: threading.Event, item) -> None:
+    while not cancelled.is_set():
+        try:
+            q.put(item, timeout=PUT_TIMEOUT_SECONDS)
+            return
+        except queue.Full:
+            continue
+
+
+# ---------------------------------------------------------------------------
+# Docker archive API
+# ---------------------------------------------------------------------------
+
+def stream_docker(docker_name: str, path: Optional[str] = None, client=None) -> Iterator[bytes]:
+    """Uncompressed tar of ``path`` inside the volume, via ``get_archive``."""
+    rel = normalize_path(path)
+    client = client or Client()()
+    container = client.containers.create(
+        HELPER_IMAGE,
+        command=["true"],
+        name=f"volarchive-{uuid.uuid4().hex[:12]}",
+        volumes={docker_name: {"bind": HELPER_MOUNT, "mode": "ro"}},
+        labels={BROWSER_HELPER_LABEL: docker_name},
+        network_mode="none",
+    )
+    try:
+        # "/data/." archives the contents of the mount rather than a "data/" dir.
+        source = f"{HELPER_MOUNT}/{rel}" if rel else f"{HELPER_MOUNT}/."
+        try:
+            bits, _stat = container.get_archive(source, chunk_size=CHUNK_SIZE)
+        except Exception as exc:
+            if getattr(exc, "status_code", None) == 404:
+                raise ValueError("Path not found.") from exc
+            raise
+        try:
+            yield from bits
+        finally:
+            close = getattr(bits, "close", None)
+            if close is not None:
+                close()
+    finally:
+        try:
+            container.remove(force=True)
+        except Exception:
+            logger.warning("could not remove archive helper %s", container.name, exc_info=True)
+
+
+# ---------------------------------------------------------------------------
+# Response
+# ---------------------------------------------------------------------------
+
+def _primed(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Pull the first chunk now so setup errors become an error response."""
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return iter(())
+
+    def rest():
+        try:
+            yield first
+            yield from chunks
+        finally:
+            chunks.close()
+
+    return rest()
+
+
+def archive_response(chunks: Iterator[bytes], filename: str, *, compress: bool = True) -> StreamingHttpResponse:
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename, content_type = f"{filename}.tar.gz", "application/gzip"
+    else:
+        filename, content_type = f"{filename}.tar", "application/x-tar"
+    response = StreamingHttpResponse(aiter_chunks(_primed(chunks)), content_type=content_type)
+    safe_name = filename.replace('"', "").replace("\r", "").replace("\n", "")
+    response["Content-Disposition"] = f'attachment; filename="{safe_name}"'
+    # Let the client's read rate reach us instead of nginx spooling to disk.
+    response["X-Accel-Buffering"] = "no"
+    response["Cache-Control"] = "no-store"
+    return response
@@ -0,0 +1,436 @@
+"""Directory-at-a-time browsing of Docker volumes.
+
+``volume_files_apiview`` used to return the whole tree in one response,
+built either by ``os.walk`` over the mountpoint or by a throw-away alpine
+container forking one ``wc -c`` per file.  Now a request lists ONE
+directory (``?path=``) a page at a time:
+
+* **Local** (mountpoint readable by the API): a single ``os.scandir``
+  pass; sizes and mtimes come from the ``DirEntry`` stat.
+* **Helper** (mountpoint not reachable, e.g. the API runs in a container):
+  one long-lived ``volbrowse-<hash>`` alpine container per volume with the
+  volume mounted read-only.  A listing is one ``exec`` running
+  ``find -maxdepth 1 -exec stat {} +``, so a single ``stat`` process covers
+  the directory.  The helper touches ``/tmp/.last`` on every exec and exits
+  by itself (``auto_remove``) after ``VOLUME_BROWSER_IDLE_SECONDS`` without
+  use; ``release_browser_helpers`` drops it before the volume is removed.
+
+Entries are sorted directories first, then by name, and paged with an
+opaque cursor (``?cursor=`` / ``next_cursor``).  Recursive directory totals
+(``?sizes=1``) are never computed inline: missing ones are queued to the
+``compute_volume_dir_sizes`` task (one at a time per volume generation,
+guarded by a SETNX marker the task releases) and cached in Redis under the volume's
+*generation* (``volume:<id>:gen``), which is bumped when the owning service
+stops or on ``?refresh=1``, so stale totals are simply never read again.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import stat as stat_module
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from docker.errors import APIError, NotFound as DockerNotFound
+
+from deployments.core.manager.client_manager import Client
+from deployments.core.manager.volume_manager import BROWSER_HELPER_LABEL
+
+logger = logging.getLogger(__name__)
+
+HELPER_IMAGE = "alpine:3.20"
+HELPER_MOUNT = "/data"
+DEFAULT_IDLE_SECONDS = 600
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+SIZE_CACHE_TTL_SECONDS = 24 * 3600
+GENERATION_TTL_SECONDS = 30 * 24 * 3600
+# Upper bound on how long one size task blocks another for the same
+# generation, should the worker die before releasing its marker.
+SIZE_TASK_MARKER_TTL_SECONDS = 10 * 60
+
+# Stays alive while execs keep touching /tmp/.last.
+_KEEPALIVE_SCRIPT = """
+touch /tmp/.last
+while :; do
+  sleep 15
+  last=$(stat -c %Y /tmp/.last 2>/dev/null || echo 0)
+  [ $(( $(date +%s) - last )) -ge {idle} ] && exit 0
+done
+"""
+
+# $1 = directory relative to the mount; one tab-separated line per entry.
+_ENTER = (
+    'touch /tmp/.last; cd -P "/data/$1" 2>/dev/null || exit 2; '
+    'case "$(pwd -P)" in /data|/data/*) ;; *) exit 2 ;; esac; '
+)
+_LIST_SCRIPT = _ENTER + (
+    "find . -mindepth 1 -maxdepth 1 -exec stat -c '%F\t%s\t%Y\t%n' {} +"
+)
+_SIZE_SCRIPT = _ENTER + (
+    "find . -type f -exec stat -c %s {} + | awk '{s += $1} END {print s + 0}'"
+)
+
+
+def _setting(name: str, default: Any) -> Any:
+    return getattr(settings, name, default)
+
+
+def idle_seconds() -> int:
+    return max(60, int(_setting("VOLUME_BROWSER_IDLE_SECONDS", DEFAULT_IDLE_SECONDS)))
+
+
+# ---------------------------------------------------------------------------
+# Paths, sorting, cursors
+# ---------------------------------------------------------------------------
+
+def normalize_path(path: Optional[str]) -> str:
+    """Volume-relative directory path; ``ValueError`` if it escapes the root."""
+    raw = (path or "").replace("\\", "/").strip().strip("/")
+    if not raw:
+        return ""
+    norm = posixpath.normpath(raw)
+    if norm == "." or norm.startswith("../") or norm == ".." or "\x00" in norm:
+        raise ValueError("Invalid path.")
+    return norm
+
+
+def _entry(parent: str, name: str, kind: str, size: int, mtime: Optional[float]) -> Dict:
+    return {
+        "name": name,
+        "path": f"{parent}/{name}" if parent else name,
+        "type": kind,
+        "size": 0 if kind == "directory" else max(0, int(size or 0)),
+        "modified_at": mtime,
+    }
+
+
+def sort_key(entry: Dict) -> Tuple[int, str]:
+    return (0 if entry["type"] == "directory" else 1, entry["name"])
+
+
+def encode_cursor(entry: Dict) -> str:
+    raw = json.dumps(list(sort_key(entry)), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[int, str]]:
+    if not cursor:
+        return None
+    try:
+        rank, name = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(rank), str(name)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+
+
+def paginate(entries: Iterable[Dict], cursor: Optional[str], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    after = decode_cursor(cursor)
+    ordered = sorted(entries, key=sort_key)
+    if after is not None:
+        ordered = [e for e in ordered if sort_key(e) > after]
+    page = ordered[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(ordered) > limit else None
+    return page, next_cursor
+
+
+# ---------------------------------------------------------------------------
+# Local mountpoint
+# ---------------------------------------------------------------------------
+
+def _local_dir(root: str, rel: str) -> str:
+    full = os.path.realpath(os.path.join(root, rel))
+    real_root = os.path.realpath(root)
+    if full != real_root and not full.startswith(real_root + os.sep):
+        raise ValueError("Invalid path.")
+    if not os.path.isdir(full):
+        raise ValueError("Not a directory.")
+    return full
+
+
+def scan_local(root: str, rel: str) -> List[Dict]:
+    entries = []
+    with os.scandir(_local_dir(root, rel)) as it:
+        for item in it:
+            try:
+                st = item.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            kind = "directory" if stat_module.S_ISDIR(st.st_mode) else "file"
+            entries.append(_entry(rel, item.name, kind, st.st_size, st.st_mtime))
+    return entries
+
+
+def dir_size_local(root: str, rel: str) -> int:
+    total, stack = 0, [_local_dir(root, rel)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for item in it:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            stack.append(item.path)
+                        elif item.is_file(follow_symlinks=False):
+                            total += item.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Helper container
+# ---------------------------------------------------------------------------
+
+def helper_name(docker_name: str) -> str:
+    return "volbrowse-" + hashlib.sha1(docker_name.encode()).hexdigest()[:16]
+
+
+def parse_stat_lines(raw: bytes, rel: str) -> List[Dict]:
+    entries = []
+    for line in raw.decode("utf-8", "replace").splitlines():
+        parts = line.split("\t", 3)
+        if len(parts) != 4:
+            continue
+        kind_s, size_s, mtime_s, name = parts
+        name = name[2:] if name.startswith("./") else name
+        if not name or "/" in name:
+            continue
+        kind = "directory" if kind_s == "directory" else "file"
+        try:
+            size, mtime = int(size_s), float(mtime_s)
+        except ValueError:
+            size, mtime = 0, None
+        entries.append(_entry(rel, name, kind, size, mtime))
+    return entries
+
+
+class VolumeHelper:
+    """The reusable browsing container for one Docker volume."""
+
+    def __init__(self, docker_name: str, client=None):
+        self.docker_name = docker_name
+        self.name = helper_name(docker_name)
+        self.client = client or Client()()
+
+    def _start(self):
+        try:
+            container = self.client.containers.get(self.name)
+            if container.status != "running":
+                container.start()
+            return container
+        except DockerNotFound:
+            pass
+        try:
+            return self.client.containers.run(
+                HELPER_IMAGE,
+                command=["sh", "-c", _KEEPALIVE_SCRIPT.format(idle=idle_seconds())],
+                name=self.name,
+                volumes={self.docker_name: {"bind": HELPER_MOUNT, "mode": "ro"}},
+                labels={BROWSER_HELPER_LABEL: self.docker_name},
+                detach=True,
+                auto_remove=True,
+                network_mode="none",
+                mem_limit="64m",
+                pids_limit=64,
+            )
+        except APIError as exc:
+            # Another request created it between our get() and run().
+            if getattr(exc, "status_code", None) == 409:
+                return self.client.containers.get(self.name)
+            raise
+
+    def run(self, script: str, rel: str) -> bytes:
+        last_exc = None
+        for _attempt in range(2):
+            container = self._start()
+            try:
+                result = container.exec_run(["sh", "-c", script, "sh", rel], demux=True)
+            except (DockerNotFound, APIError) as exc:
+                # Idle exit raced with this request; start a fresh helper.
+                last_exc = exc
+                continue
+            stdout, stderr = result.output if isinstance(result.output, tuple) else (result.output, b"")
+            if result.exit_code == 2:
+                raise ValueError("Not a directory.")
+            if result.exit_code not in (0, None) and not stdout:
+                raise RuntimeError((stderr or b"").decode("utf-8", "replace").strip() or f"helper exit {result.exit_code}")
+            return stdout or b""
+        raise last_exc
+
+    def list_dir(self, rel: str) -> List[Dict]:
+        return parse_stat_lines(self.run(_LIST_SCRIPT, rel), rel)
+
+    def dir_size(self, rel: str) -> int:
+        out = self.run(_SIZE_SCRIPT, rel).decode().strip()
+        try:
+            return int(float(out or 0))
+        except ValueError:
+            return 0
+
+
+# ---------------------------------------------------------------------------
+# Generations and cached totals
+# ---------------------------------------------------------------------------
+
+def _redis():
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except Exception:
+        logger.exception("volume_browser: cannot obtain redis connection")
+        return None
+
+
+def _gen_key(volume_id) -> str:
+    return f"volume:{volume_id}:gen"
+
+
+def _sizes_key(volume_id, generation: int) -> str:
+    return f"volume:{volume_id}:sizes:{generation}"
+
+
+def generation(volume_id, redis=None) -> int:
+    r = redis or _redis()
+    if r is None:
+        return 0
+    try:
+        return int(r.get(_gen_key(volume_id)) or 0)
+    except Exception:
+        logger.warning("volume_browser: generation read failed for %s", volume_id, exc_info=True)
+        return 0
+
+
+def bump_generation(volume_id, redis=None) -> Optional[int]:
+    """Invalidate every cached size of ``volume_id``."""
+    r = redis or _redis()
+    if r is None:
+        return None
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.incr(_gen_key(volume_id))
+        pipe.expire(_gen_key(volume_id), GENERATION_TTL_SECONDS)
+        return int(pipe.execute()[0])
+    except Exception:
+        logger.warning("volume_browser: generation bump failed for %s", volume_id, exc_info=True)
+        return None
+
+
+def _size_task_key(volume_id, generation: int) -> str:
+    return f"volume:{volume_id}:sizing:{generation}"
+
+
+def claim_size_task(volume_id, gen: int, redis=None) -> bool:
+    """SETNX the per-generation marker; False if a size task is already queued."""
+    r = redis or _redis()
+    if r is None:
+        return False  # nowhere to store the totals either
+    try:
+        return bool(r.set(_size_task_key(volume_id, gen), 1, nx=True, ex=SIZE_TASK_MARKER_TTL_SECONDS))
+    except Exception:
+        logger.warning("volume_browser: size task marker failed for %s", volume_id, exc_info=True)
+        return False
+
+
+def release_size_task(volume_id, gen: int, redis=None) -> None:
+    r = redis or _redis()
+    if r is None:
+        return
+    try:
+        r.delete(_size_task_key(volume_id, gen))
+    except Exception:
+        logger.warning("volume_browser: size task marker release failed for %s", volume_id, exc_info=True)
+
+
+def cached_sizes(volume_id, gen: int, paths: List[str], redis=None) -> Dict[str, int]:
+    r = redis or _redis()
+    if r is None or not paths:
+        return {}
+    try:
+        values = r.hmget(_sizes_key(volume_id, gen), paths)
+    except Exception:
+        logger.warning("volume_browser: size cache read failed for %s", volume_id, exc_info=True)
+        return {}
+    return {p: int(v) for p, v in zip(paths, values) if v is not None}
+
+
+def store_sizes(volume_id, gen: int, sizes: Dict[str, int], redis=None) -> None:
+    r = redis or _redis()
+    if r is None or not sizes:
+        return
+    key = _sizes_key(volume_id, gen)
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.hset(key, mapping={p: int(s) for p, s in sizes.items()})
+        pipe.expire(key, SIZE_CACHE_TTL_SECONDS)
+        pipe.execute()
+    except Exception:
+        logger.warning("volume_browser: size cache write failed for %s", volume_id, exc_info=True)
+
+
+def attach_sizes(volume, entries: List[Dict], gen: int) -> List[str]:
+    """Fill ``total_size`` on directory entries; returns paths still pending."""
+    dirs = [e["path"] for e in entries if e["type"] == "directory"]
+    known = cached_sizes(volume.pk, gen, dirs)
+    pending = []
+    for entry in entries:
+        if entry["type"] != "directory":
+            continue
+        entry["total_size"] = known.get(entry["path"])
+        if entry["total_size"] is None:
+            pending.append(entry["path"])
+    if pending and claim_size_task(volume.pk, gen):
+        try:
+            from deployments.celery.tasks import compute_volume_dir_sizes
+            compute_volume_dir_sizes.delay(str(volume.pk), pending, gen)
+        except Exception:
+            release_size_task(volume.pk, gen)
+            logger.warning("volume_browser: could not queue size task for %s", volume.pk, exc_info=True)
+    return pending
+
+
+def compute_sizes(volume, paths: List[str], gen: int) -> Dict[str, int]:
+    """Recursive totals for ``paths``; run from the Celery task.
+
+    Releases the marker taken by :func:`attach_sizes`, so directories
+    listed while this ran are picked up by the next listing.
+    """
+    from services.api.volume_files import _get_volume_mountpoint
+
+    try:
+        mountpoint, docker_name = _get_volume_mountpoint(volume)
+        helper = None if mountpoint else VolumeHelper(docker_name)
+        sizes = {}
+        for path in paths:
+            try:
+                rel = normalize_path(path)
+                sizes[path] = dir_size_local(mountpoint, rel) if mountpoint else helper.dir_size(rel)
+            except (ValueError, OSError):
+                continue
+        store_sizes(volume.pk, gen, sizes)
+        return sizes
+    finally:
+        release_size_task(volume.pk, gen)
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+def list_directory(mountpoint: Optional[str], docker_name: str, path: Optional[str]) -> Tuple[str, List[Dict]]:
+    rel = normalize_path(path)
+    if mountpoint:
+        return rel, scan_local(mountpoint, rel)
+    return rel, VolumeHelper(docker_name).list_dir(rel)
+
+
+def page_size(value) -> int:
+    try:
+        return min(max(int(value), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
@@ -0,0 +1,18 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tickets", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="ticketmessage",
+            index=GinIndex(fields=["body"], name="ticketmsg_body_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
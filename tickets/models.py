@@ -5,6 +5,7 @@ from __future__ import annotations
 import os, uuid
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from django.utils import timezone
 from django.utils.text import slugify
@@ -139,6 +140,8 @@ class TicketMessage(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        # ILIKE '%q%' admin/table search (core.search.substring_q)
+        indexes = [GinIndex(fields=["body"], name="ticketmsg_body_trgm", opclasses=["gin_trgm_ops"])]
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -220,7 +220,7 @@ TABLE_REGISTRY: Dict[str, dict] = {
     "custom_emails.EmailLog": {
         "label": "Email logs",
         "deletable": True,
-        "search_fields": ["to_address", "subject"],
+        "search_fields": ["recipient_email", "subject"],
         "per_page": 50,
     },
 
@@ -342,12 +342,13 @@ def _serialize_row(instance, cfg) -> dict:
 def _apply_search(qs, cfg, q):
     if not q or not cfg.get("search_fields"):
         return qs
-    from django.db.models import Q
-    q_obj = Q()
-    for fname in cfg["search_fields"]:
-        # Build nested lookup "__icontains"
-        q_obj |= Q(**{f"{fname}__icontains": q})
-    return qs.filter(q_obj)
+    from core.search import substring_q
+    # ILIKE rather than __icontains so the gin_trgm_ops indexes apply: user
+    # username/email (every ``user__username``), service and deploy names,
+    # ticket message bodies, email log recipient/subject.  The other search
+    # columns (plans, departments, templates, invites, auth codes, ticket
+    # subjects) are on small tables and left to sequential scans.
+    return qs.filter(substring_q(cfg["search_fields"], q))
 
 
 def _get_table_config(model_key: str) -> Tuple[object, dict, str]:
@@ -608,10 +609,7 @@ class AdminTableFKSearchAPIView(APIView):
                 # Multi-field search across registered search_fields
                 search_fields = cfg.get("search_fields") or []
                 if search_fields:
-                    q_obj = Q()
-                    for fname in search_fields:
-                        q_obj |= Q(**{f"{fname}__icontains": q})
-                    qs = qs.filter(q_obj)
+                    qs = _apply_search(qs, cfg, q)
                 else:
                     # Fallback: search across all string fields
                     q_obj = Q()
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+def record_existing_thumbnails(apps, schema_editor):
+    from messenger.media_derivatives import AVATAR_THUMB_SIZE, thumb_name
+
+    Profile = apps.get_model("users", "Profile")
+    for profile in Profile.objects.exclude(image="").only("image").iterator():
+        name = thumb_name(profile.image.name, AVATAR_THUMB_SIZE)
+        if profile.image.storage.exists(name):
+            Profile.objects.filter(pk=profile.pk).update(image_thumbnail=name)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0005_alter_user_is_superuser"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="image_thumbnail",
+            field=models.CharField(blank=True, default="", editable=False, max_length=255),
+        ),
+        migrations.RunPython(record_existing_thumbnails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_profile_image_thumbnail"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="user",
+            index=GinIndex(fields=["username"], name="user_username_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=GinIndex(fields=["email"], name="user_email_trgm", opclasses=["gin_trgm_ops"]),
+        ),
+    ]
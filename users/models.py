@@ -4,6 +4,7 @@ from phonenumber_field.modelfields import PhoneNumberField
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.utils import timezone
 from core.global_settings.config import COLOR_CHOICES, PaymentChoices
 from users.validators import ImageValidator
@@ -87,6 +88,11 @@ class User(AbstractBaseUser, PermissionsMixin):
         ordering = ["username"]
         verbose_name = "user"
         verbose_name_plural = "users"
+        # ILIKE '%q%' admin/table search (core.search.substring_q)
+        indexes = [
+            GinIndex(fields=["username"], name="user_username_trgm", opclasses=["gin_trgm_ops"]),
+            GinIndex(fields=["email"], name="user_email_trgm", opclasses=["gin_trgm_ops"]),
+        ]
 
 
 
@@ -111,6 +117,8 @@ class Profile(models.Model):
     order = models.IntegerField(_("Order"), default=0)
     user = models.ForeignKey(User,verbose_name=_("User Profile"), on_delete=models.CASCADE)
     image = models.ImageField(upload_to="images",verbose_name=_("Profile Image"), validators=[ImageValidator(size_kb=2048, max_w=2560, max_h=1440)])
+    # Set by messenger.tasks.generate_image_thumbnail once the file exists.
+    image_thumbnail = models.CharField(max_length=255, blank=True, default="", editable=False)
     created_at = models.DateTimeField(default=timezone.now)
     def clean(self):
         if self.pk is None: